@@ -1,30 +1,59 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-
-from fastapi import FastAPI, HTTPException
-from fastapi import Request
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Mapping, Optional
+
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, ValidationError
 
 import yaml
 
+from horticalc import telemetry, tracing
+from horticalc.acid import ACID_PRODUCTS, doses_for_residual, get_acid, titration_curves
+from horticalc.blending import BlendSources, optimize_blend
+from horticalc.catalog import search_fertilizers
 from horticalc.core import compute_solution
+from horticalc.ec import EC_MODELS
 from horticalc.data_io import (
-    load_fertilizers,
-    load_molar_masses,
-    load_nutrient_solution_data,
-    load_recipe,
-    load_water_profile_data,
-    repo_root,
-    save_nutrient_solution,
-    save_recipe,
-    save_water_profile,
+    DocumentInfo,
+    StoreConflictError,
+    load_prices,
+    nutrient_solution_document,
+    nutrient_solution_from_data,
+    open_store,
+    water_profile_document,
+    water_profile_from_data,
 )
+from horticalc.multistage import solve_program
+from horticalc.pareto import solve_pareto
+from horticalc.session import SolverSession
+from horticalc.snapshot import DataSnapshot, SnapshotManager
 from horticalc.solver import solve_recipe_data
+from horticalc.stock import plan_stock_tanks
+
+
+# Reference data (fertilizers, molar masses, compiled matrices). Handlers take one snapshot
+# per request; the watcher swaps in a new one when the source files change.
+SNAPSHOTS = SnapshotManager.from_env()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    SNAPSHOTS.start()
+    try:
+        yield
+    finally:
+        SNAPSHOTS.stop()
 
 
-app = FastAPI(title="Horticalc API", version="0.1.0")
+app = FastAPI(title="Horticalc API", version="0.1.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -33,12 +62,40 @@ app.add_middleware(
 )
 
 
-FERTILIZERS = load_fertilizers()
-MOLAR_MASSES = load_molar_masses()
-WATER_PROFILES_DIR = repo_root() / "data" / "water_profiles"
-NUTRIENT_SOLUTIONS_DIR = repo_root() / "data" / "nutrient_solutions"
-DEFAULT_RECIPE_PATH = repo_root() / "recipes" / "default.yml"
-RECIPES_DIR = repo_root() / "recipes"
+def _endpoint_label(request: Request) -> str:
+    """Route template of the matched route; one fixed label for unmatched paths."""
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    return path if isinstance(path, str) else "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not telemetry.is_enabled() and not tracing.is_enabled():
+        return await call_next(request)
+    start = time.perf_counter()
+    path = request.url.path
+    request_bytes = request.headers.get("content-length")
+    with tracing.trace(f"{request.method} {path}", method=request.method, path=path) as span:
+        response = await call_next(request)
+        response_bytes = response.headers.get("content-length")
+        span.set(status=response.status_code, request_bytes=request_bytes, response_bytes=response_bytes)
+    # the route is known only after routing; raw paths would give unbounded series
+    endpoint = _endpoint_label(request)
+    if request_bytes:
+        telemetry.observe("horticalc_request_bytes", float(request_bytes), endpoint=endpoint)
+    telemetry.observe(
+        "horticalc_request_seconds",
+        time.perf_counter() - start,
+        endpoint=endpoint,
+        status=response.status_code,
+    )
+    if response_bytes:
+        telemetry.observe("horticalc_response_bytes", float(response_bytes), endpoint=endpoint)
+    return response
+
+
+STORE = open_store()
 
 
 class FertilizerEntry(BaseModel):
@@ -46,14 +103,76 @@ class FertilizerEntry(BaseModel):
     grams: float = Field(ge=0)
 
 
+class AcidOption(BaseModel):
+    # `name` of a listed product, or `acid` (HNO3/H3PO4/H2SO4) with percent and density
+    name: Optional[str] = None
+    acid: Optional[str] = None
+    percent: Optional[float] = Field(default=None, gt=0, le=100)
+    density_g_per_ml: Optional[float] = Field(default=None, gt=0)
+    ml: Optional[float] = Field(default=None, ge=0)
+    residual_hco3_mg_per_l: Optional[float] = Field(default=None, ge=0)
+
+
+def _acid_option(option: Optional[AcidOption]) -> Optional[Dict[str, Any]]:
+    return option.model_dump(exclude_none=True) if option is not None else None
+
+
+class PrecipitationOption(BaseModel):
+    # saturation screen of the stock concentrate at `factor`-fold strength
+    factor: float = Field(default=100.0, gt=0)
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    temp_c: float = 25.0
+    fe_unchelated_fraction: float = Field(default=0.0, ge=0, le=1)
+    threshold: float = 0.0
+
+
+def _precipitation_option(option: Optional[PrecipitationOption]) -> Optional[Dict[str, Any]]:
+    return option.model_dump(exclude_none=True) if option is not None else None
+
+
 class RecipeRequest(BaseModel):
     liters: float = Field(default=10.0, gt=0)
     fertilizers: List[FertilizerEntry] = Field(default_factory=list)
     urea_as_nh4: bool = False
     phosphate_species: str = Field(default="H2PO4")
+    # pH for phosphate_species "auto"
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    ec_model: str = Field(default="mccleskey")
     water_profile_name: Optional[str] = None
     water_mg_l: Optional[Dict[str, float]] = None
     osmosis_percent: float | None = 0
+    acid: Optional[AcidOption] = None
+    precipitation: Optional[PrecipitationOption] = None
+
+
+class StockOption(BaseModel):
+    # A/B tank split: `ratio` is the injection ratio 1:ratio, `fixed` pins fertilizers to tanks
+    ratio: float = Field(default=100.0, gt=0)
+    tank_liters: float = Field(default=100.0, gt=0)
+    tanks: int = Field(default=2, ge=1, le=5)
+    acid_tank: bool = True
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    temp_c: float = 20.0
+    fe_unchelated_fraction: float = Field(default=0.0, ge=0, le=1)
+    threshold: float = 0.0
+    fixed: Dict[str, str] = Field(default_factory=dict)
+    solubility_g_per_l: Dict[str, float] = Field(default_factory=dict)
+    default_solubility_g_per_l: Optional[float] = Field(default=None, gt=0)
+    max_frontier: int = Field(default=50000, ge=1, le=200000)
+
+
+class StockPlanRequest(RecipeRequest):
+    stock: StockOption = Field(default_factory=StockOption)
+
+
+class StockPlanResponse(BaseModel):
+    ratio: float
+    tank_liters: float
+    working_liters: float
+    tanks: List[Dict[str, Any]]
+    max_ratio: Optional[float] = None
+    search: Dict[str, Any]
+    warnings: List[str] = Field(default_factory=list)
 
 
 class CalculationResponse(BaseModel):
@@ -72,6 +191,23 @@ class CalculationResponse(BaseModel):
     ec_water: Dict[str, Any]
     npk_metrics: Dict[str, Any]
     osmosis_percent: float
+    acid: Optional[Dict[str, Any]] = None
+    speciation: Optional[Dict[str, Any]] = None
+    precipitation: Optional[Dict[str, Any]] = None
+
+
+class LinearConstraint(BaseModel):
+    fertilizers: Dict[str, float]
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class DiscreteOptions(BaseModel):
+    resolution: float = Field(default=0.1, gt=0)
+    resolution_by_form: Dict[str, float] = Field(default_factory=dict)
+    resolution_by_fertilizer: Dict[str, float] = Field(default_factory=dict)
+    time_limit_s: float = Field(default=2.0, gt=0, le=30)
+    max_nodes: int = Field(default=20000, ge=1)
 
 
 class SolveRequest(BaseModel):
@@ -80,8 +216,21 @@ class SolveRequest(BaseModel):
     water_profile: Optional[Dict[str, Any]] = None
     fertilizers_allowed: List[str] = Field(default_factory=list)
     fixed_grams: Dict[str, float] = Field(default_factory=dict)
+    min_grams: Dict[str, float] = Field(default_factory=dict)
+    max_grams: Dict[str, float] = Field(default_factory=dict)
+    max_total_grams: Optional[float] = Field(default=None, ge=0)
+    constraints: List[LinearConstraint] = Field(default_factory=list)
+    discrete: Optional[DiscreteOptions] = None
+    prune_tolerance: Optional[float] = Field(default=None, ge=0)
+    ec_target_mS_per_cm: Optional[float] = Field(default=None, ge=0)
+    ec_max_mS_per_cm: Optional[float] = Field(default=None, ge=0)
+    ec_temp_c: float = 25.0
+    acid: Optional[AcidOption] = None
     urea_as_nh4: bool = False
     phosphate_species: str = Field(default="H2PO4")
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    ec_model: str = Field(default="mccleskey")
+    precipitation: Optional[PrecipitationOption] = None
 
 
 class SolveFertilizerEntry(BaseModel):
@@ -97,11 +246,117 @@ class SolveResponse(BaseModel):
     achieved_elements_mg_per_l: Dict[str, float]
     errors_mg_per_l: Dict[str, float]
     errors_percent: Dict[str, float]
+    active_constraints: Optional[List[Dict[str, Any]]] = None
+    discrete: Optional[Dict[str, Any]] = None
+    diagnostics: Optional[Dict[str, Any]] = None
+    ec: Optional[Dict[str, float]] = None
+    acid: Optional[Dict[str, Any]] = None
+    precipitation: Optional[Dict[str, Any]] = None
+
+
+class ParetoRequest(SolveRequest):
+    target_weights: Dict[str, float] = Field(default_factory=dict)
+    prices_per_kg: Dict[str, float] = Field(default_factory=dict)
+    points: int = Field(default=25, ge=2, le=200)
+
+
+class ParetoPoint(BaseModel):
+    # `lambda` is reserved in Python
+    price_weight: float = Field(alias="lambda")
+    cost: float
+    error: float
+    errors_mg_per_l: Dict[str, float]
+    fertilizers: List[SolveFertilizerEntry]
+
+
+class ParetoResponse(BaseModel):
+    liters: float
+    objective_elements: List[str]
+    target_weights: Dict[str, float]
+    points: List[ParetoPoint]
+
+
+class ProgramStage(BaseModel):
+    name: Optional[str] = None
+    weight: float = Field(default=1.0, ge=0)
+    targets: Dict[str, float] = Field(default_factory=dict)
+    nutrient_solution: Optional[str] = None
+    liters: Optional[float] = Field(default=None, gt=0)
+
+
+class ProgramRequest(BaseModel):
+    liters: float = Field(default=10.0, gt=0)
+    water_profile: Optional[Dict[str, Any]] = None
+    fertilizers_allowed: List[str] = Field(default_factory=list)
+    max_fertilizers: Optional[int] = Field(default=None, ge=1)
+    required: List[str] = Field(default_factory=list)
+    stages: List[ProgramStage] = Field(default_factory=list)
+    time_limit_s: float = Field(default=10.0, gt=0, le=60)
+    urea_as_nh4: bool = False
+    phosphate_species: str = Field(default="H2PO4")
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    ec_model: str = Field(default="mccleskey")
+    precipitation: Optional[PrecipitationOption] = None
+
+
+class ProgramStageResult(SolveResponse):
+    name: str
+    weight: float
+
+
+class ProgramResponse(BaseModel):
+    fertilizers: List[str]
+    stages: List[ProgramStageResult]
+    weighted_residual_mg_per_l: float
+    search: Dict[str, Any]
+
+
+class WaterSource(BaseModel):
+    name: str
+    mg_per_l: Dict[str, float] = Field(default_factory=dict)
+
+
+class WaterBlendRequest(BaseModel):
+    # plain strings are stored water profiles
+    sources: List[str | WaterSource] = Field(default_factory=list)
+    max_mg_per_l: Dict[str, float] = Field(default_factory=dict)
+    min_mg_per_l: Dict[str, float] = Field(default_factory=dict)
+    minimize: Optional[List[str]] = None
+    max_fraction: Dict[str, float] = Field(default_factory=dict)
+
+
+class WaterBlendResponse(BaseModel):
+    fractions: Dict[str, float]
+    mg_per_l: Dict[str, float]
+    elements_mg_per_l: Dict[str, float]
+    minimized: List[str]
+    minimized_fraction: float
+    binding: List[Dict[str, Any]]
+
+
+class AcidTitrationRequest(BaseModel):
+    acid: str | AcidOption
+    # plain strings are stored water profiles
+    water_profiles: List[str | WaterSource] = Field(min_length=1)
+    doses_ml_per_l: List[float] = Field(min_length=1)
+    residual_hco3_mg_per_l: Optional[float] = Field(default=None, ge=0)
+    temp_c: float = 25.0
+    phosphate_species: str = Field(default="H2PO4")
+
+
+class AcidTitrationResponse(BaseModel):
+    acid: Dict[str, Any]
+    doses_ml_per_l: List[float]
+    temp_c: float
+    profiles: Dict[str, Dict[str, List[float]]]
+    # ml/L per profile for `residual_hco3_mg_per_l`
+    dose_ml_per_l: Optional[Dict[str, float]] = None
 
 
 class WaterProfilePayload(BaseModel):
     name: str
     source: Optional[str] = ""
+    tags: List[str] = Field(default_factory=list)
     mg_per_l: Dict[str, float] = Field(default_factory=dict)
     osmosis_percent: float | None = 0
 
@@ -109,15 +364,19 @@ class WaterProfilePayload(BaseModel):
 class NutrientSolutionPayload(BaseModel):
     name: str
     source: Optional[str] = ""
+    tags: List[str] = Field(default_factory=list)
     targets_mg_per_l: Dict[str, float] = Field(default_factory=dict)
 
 
 class RecipePayload(BaseModel):
     name: str
+    tags: List[str] = Field(default_factory=list)
     liters: float = Field(default=10.0, gt=0)
     fertilizers: List[FertilizerEntry] = Field(default_factory=list)
     urea_as_nh4: bool = False
     phosphate_species: str = Field(default="H2PO4")
+    ph: Optional[float] = Field(default=None, gt=0, lt=14)
+    ec_model: str = Field(default="mccleskey")
     water_profile: Optional[str] = None
     osmosis_percent: float | None = 0
 
@@ -175,25 +434,31 @@ ALLOWED_TARGET_KEYS = {
 }
 
 
-def hco3_from_caco3(value: float) -> float:
+def hco3_from_caco3(value: float, molar_masses: Mapping[str, float] | None = None) -> float:
     if value == 0.0:
         return 0.0
-    equiv_weight_caco3 = MOLAR_MASSES["CaCO3"] / 2.0
-    return value * MOLAR_MASSES["HCO3"] / equiv_weight_caco3
+    mm = molar_masses if molar_masses is not None else SNAPSHOTS.current().molar_masses
+    equiv_weight_caco3 = mm["CaCO3"] / 2.0
+    return value * mm["HCO3"] / equiv_weight_caco3
 
 
-def hco3_from_kh(value: float) -> float:
+def hco3_from_kh(value: float, molar_masses: Mapping[str, float] | None = None) -> float:
     if value == 0.0:
         return 0.0
     mg_l_caco3 = value * 17.848
-    return hco3_from_caco3(mg_l_caco3)
+    return hco3_from_caco3(mg_l_caco3, molar_masses)
 
 
-def sanitize_water_profile(mg_per_l: Dict[str, float]) -> Dict[str, float]:
+def sanitize_water_profile(
+    mg_per_l: Dict[str, float],
+    molar_masses: Mapping[str, float] | None = None,
+) -> Dict[str, float]:
     sanitized = dict(mg_per_l)
     hco3 = sanitized.get("HCO3", 0.0)
     if hco3 == 0.0:
-        hco3 = hco3_from_caco3(sanitized.get("CaCO3", 0.0)) + hco3_from_kh(sanitized.get("KH", 0.0))
+        hco3 = hco3_from_caco3(sanitized.get("CaCO3", 0.0), molar_masses) + hco3_from_kh(
+            sanitized.get("KH", 0.0), molar_masses
+        )
         if hco3:
             sanitized["HCO3"] = hco3
     for key in ("KH", "CaCO3", "CO3"):
@@ -203,70 +468,230 @@ def sanitize_water_profile(mg_per_l: Dict[str, float]) -> Dict[str, float]:
 
 @app.get("/health")
 def health() -> dict:
-    return {"status": "ok"}
+    return {"status": "ok", **SNAPSHOTS.status()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(telemetry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _data_version_header(response: Response, snapshot: DataSnapshot) -> None:
+    response.headers["X-Data-Version"] = f"{snapshot.version}-{snapshot.digest}"
+
+
+def _query_bounds(request: Request, prefix: str) -> Dict[str, float]:
+    bounds: Dict[str, float] = {}
+    for key, value in request.query_params.items():
+        if not key.startswith(prefix):
+            continue
+        try:
+            bounds[key[len(prefix):]] = float(value)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Ungültiger Wert für {key}: '{value}'") from exc
+    return bounds
 
 
 @app.get("/fertilizers")
-def fertilizers() -> List[dict]:
+def fertilizers(
+    request: Request,
+    response: Response,
+    q: Optional[str] = None,
+    contains: List[str] = Query(default_factory=list),
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> List[dict]:
+    """Optional filters: `q` (name), `contains=Mg`, `min_<col>`/`max_<col>` (e.g. `min_K2O=0.2`), paging."""
+    snapshot = SNAPSHOTS.current()
+    nutrients = [part for value in contains for part in value.split(",") if part.strip()]
+    try:
+        total, page = search_fertilizers(
+            snapshot.fertilizers,
+            q=q,
+            contains=nutrients,
+            minimums=_query_bounds(request, "min_"),
+            maximums=_query_bounds(request, "max_"),
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response.headers["X-Total-Count"] = str(total)
+    _data_version_header(response, snapshot)
     return [
         {
             "name": fert.name,
             "form": fert.form,
             "weight_factor": fert.weight_factor,
-            "comp": fert.comp,
+            "comp": dict(fert.comp),
+        }
+        for fert in page
+    ]
+
+
+def _document_key(name: str) -> str:
+    return name[:-len(".yml")] if name.endswith(".yml") else name
+
+
+def _list_documents(
+    kind: str,
+    response: Response,
+    q: Optional[str],
+    tag: Optional[str],
+    order: str,
+    limit: Optional[int],
+    offset: int,
+) -> List[dict]:
+    try:
+        total, infos = STORE.list(kind, q=q, tag=tag, order=order, limit=limit, offset=offset)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response.headers["X-Total-Count"] = str(total)
+    return [
+        {
+            "name": info.name,
+            "filename": info.filename,
+            "tags": list(info.tags),
+            "modified": info.modified,
+            "version": info.version,
         }
-        for fert in FERTILIZERS.values()
+        for info in infos
     ]
 
 
+def _get_document(kind: str, name: str, response: Response, not_found: str) -> dict:
+    key = _document_key(name)
+    try:
+        info = STORE.info(kind, key)
+        data = STORE.get(kind, key)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=not_found) from exc
+    response.headers["X-Document-Version"] = str(info.version)
+    return data
+
+
+def _save_document(kind: str, key: str, data: dict, request: Request) -> DocumentInfo:
+    # `If-Match: <version>` turns concurrent overwrites into 409 instead of lost updates.
+    expected = request.headers.get("if-match")
+    try:
+        expected_version = int(expected.strip('"')) if expected else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid If-Match header: {expected}") from exc
+    try:
+        return STORE.put(kind, key, data, expected_version=expected_version)
+    except StoreConflictError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+
+
 @app.get("/water-profiles")
-def water_profiles() -> List[dict]:
-    if not WATER_PROFILES_DIR.exists():
-        return []
-    profiles = []
-    for path in sorted(WATER_PROFILES_DIR.glob("*.yml")):
-        data = load_water_profile_data(path)
-        profiles.append(
-            {
-                "name": data.get("name") or path.stem,
-                "filename": path.name,
-            }
-        )
-    return profiles
+def water_profiles(
+    response: Response,
+    q: Optional[str] = None,
+    tag: Optional[str] = None,
+    order: str = "key",
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> List[dict]:
+    return _list_documents("water_profiles", response, q, tag, order, limit, offset)
 
 
 @app.get("/water-profiles/{profile_name}")
-def water_profile(profile_name: str) -> dict:
-    filename = profile_name if profile_name.endswith(".yml") else f"{profile_name}.yml"
-    profile_path = WATER_PROFILES_DIR / filename
-    if not profile_path.exists():
-        raise HTTPException(status_code=404, detail="Water profile not found")
-    return load_water_profile_data(profile_path)
+def water_profile(profile_name: str, response: Response) -> dict:
+    data = _get_document("water_profiles", profile_name, response, "Water profile not found")
+    return water_profile_from_data(data, _document_key(profile_name))
+
+
+def _water_sources(sources: List[str | WaterSource]) -> tuple[List[str], List[Dict[str, float]]]:
+    names: List[str] = []
+    profiles: List[Dict[str, float]] = []
+    for source in sources:
+        if isinstance(source, str):
+            key = _document_key(source)
+            try:
+                data = STORE.get("water_profiles", key)
+            except KeyError as exc:
+                raise HTTPException(status_code=404, detail=f"Water profile not found: {source}") from exc
+            names.append(key)
+            profiles.append(water_profile_from_data(data, key)["mg_per_l"])
+        else:
+            names.append(source.name)
+            profiles.append(source.mg_per_l)
+    return names, profiles
+
+
+@app.post("/water-profiles/blend", response_model=WaterBlendResponse)
+def blend_water_profiles(payload: WaterBlendRequest, response: Response) -> WaterBlendResponse:
+    snapshot = SNAPSHOTS.current()
+    names, profiles = _water_sources(payload.sources)
+    try:
+        sources = BlendSources(names, profiles, snapshot.molar_masses)
+        result = optimize_blend(
+            sources,
+            max_mg_per_l=payload.max_mg_per_l,
+            min_mg_per_l=payload.min_mg_per_l,
+            minimize=payload.minimize,
+            max_fraction=payload.max_fraction,
+        )
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _data_version_header(response, snapshot)
+    return WaterBlendResponse(**result.to_dict())
 
 
-@app.get("/nutrient-solutions")
-def nutrient_solutions() -> List[dict]:
-    if not NUTRIENT_SOLUTIONS_DIR.exists():
-        return []
-    solutions = []
-    for path in sorted(NUTRIENT_SOLUTIONS_DIR.glob("*.yml")):
-        data = load_nutrient_solution_data(path)
-        solutions.append(
-            {
-                "name": data.get("name") or path.stem,
-                "filename": path.name,
-            }
+@app.get("/acids")
+def acids() -> List[Dict[str, Any]]:
+    return [acid.to_dict() for acid in ACID_PRODUCTS.values()]
+
+
+@app.get("/ec/models")
+def ec_models(parameters: bool = Query(default=False)) -> List[Dict[str, Any]]:
+    return [model.to_dict(include_parameters=parameters) for model in EC_MODELS.values()]
+
+
+@app.post("/acid/titration", response_model=AcidTitrationResponse)
+def acid_titration(payload: AcidTitrationRequest, response: Response) -> AcidTitrationResponse:
+    snapshot = SNAPSHOTS.current()
+    names, profiles = _water_sources(payload.water_profiles)
+    spec = payload.acid if isinstance(payload.acid, str) else _acid_option(payload.acid)
+    try:
+        acid = get_acid(spec)
+        curves = titration_curves(
+            acid,
+            profiles,
+            payload.doses_ml_per_l,
+            snapshot.molar_masses,
+            names=names,
+            temp_c=payload.temp_c,
+            phosphate_species=payload.phosphate_species,
         )
-    return solutions
+        data = curves.to_dict()
+        if payload.residual_hco3_mg_per_l is not None:
+            doses = doses_for_residual(
+                acid, profiles, payload.residual_hco3_mg_per_l, snapshot.molar_masses, payload.phosphate_species
+            )
+            data["dose_ml_per_l"] = dict(zip(names, doses.tolist()))
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    _data_version_header(response, snapshot)
+    return AcidTitrationResponse(**data)
+
+
+@app.get("/nutrient-solutions")
+def nutrient_solutions(
+    response: Response,
+    q: Optional[str] = None,
+    tag: Optional[str] = None,
+    order: str = "key",
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> List[dict]:
+    return _list_documents("nutrient_solutions", response, q, tag, order, limit, offset)
 
 
 @app.get("/nutrient-solutions/{solution_name}")
-def nutrient_solution(solution_name: str) -> dict:
-    filename = solution_name if solution_name.endswith(".yml") else f"{solution_name}.yml"
-    solution_path = NUTRIENT_SOLUTIONS_DIR / filename
-    if not solution_path.exists():
-        raise HTTPException(status_code=404, detail="Nutrient Solution not found")
-    return load_nutrient_solution_data(solution_path)
+def nutrient_solution(solution_name: str, response: Response) -> dict:
+    data = _get_document("nutrient_solutions", solution_name, response, "Nutrient Solution not found")
+    return nutrient_solution_from_data(data, _document_key(solution_name))
 
 
 @app.post("/water-profiles")
@@ -307,16 +732,16 @@ async def save_profile(request: Request) -> dict:
     if not safe_name:
         raise HTTPException(status_code=400, detail="Profile name results in empty filename")
 
-    profile_path = WATER_PROFILES_DIR / f"{safe_name}.yml"
-    WATER_PROFILES_DIR.mkdir(parents=True, exist_ok=True)
-    save_water_profile(
-        profile_path,
+    document = water_profile_document(
         name=name,
         source=profile.source or "",
         mg_per_l=mg_per_l,
         osmosis_percent=osmosis_percent,
     )
-    return {"status": "ok", "filename": profile_path.name}
+    if profile.tags:
+        document["tags"] = profile.tags
+    info = _save_document("water_profiles", safe_name, document, request)
+    return {"status": "ok", "filename": info.filename, "version": info.version}
 
 
 @app.post("/nutrient-solutions")
@@ -347,52 +772,44 @@ async def save_nutrient_solution_profile(request: Request) -> dict:
     if not safe_name:
         raise HTTPException(status_code=400, detail="Nutrient Solution name results in empty filename")
 
-    solution_path = NUTRIENT_SOLUTIONS_DIR / f"{safe_name}.yml"
-    NUTRIENT_SOLUTIONS_DIR.mkdir(parents=True, exist_ok=True)
-    save_nutrient_solution(
-        solution_path,
+    document = nutrient_solution_document(
         name=name,
         source=solution.source or "",
         targets_mg_per_l=targets_mg_per_l,
     )
-    return {"status": "ok", "filename": solution_path.name}
+    if solution.tags:
+        document["tags"] = solution.tags
+    info = _save_document("nutrient_solutions", safe_name, document, request)
+    return {"status": "ok", "filename": info.filename, "version": info.version}
 
 
 @app.get("/molar-masses")
-def molar_masses() -> Dict[str, float]:
-    return MOLAR_MASSES
+def molar_masses(response: Response) -> Dict[str, float]:
+    snapshot = SNAPSHOTS.current()
+    _data_version_header(response, snapshot)
+    return dict(snapshot.molar_masses)
 
 
 @app.get("/recipes/default")
-def default_recipe() -> dict:
-    if not DEFAULT_RECIPE_PATH.exists():
-        raise HTTPException(status_code=404, detail="Default recipe not found")
-    return load_recipe(DEFAULT_RECIPE_PATH)
+def default_recipe(response: Response) -> dict:
+    return _get_document("recipes", "default", response, "Default recipe not found")
 
 
 @app.get("/recipes")
-def recipes() -> List[dict]:
-    if not RECIPES_DIR.exists():
-        return []
-    recipes_out = []
-    for path in sorted(RECIPES_DIR.glob("*.yml")):
-        data = load_recipe(path)
-        recipes_out.append(
-            {
-                "name": data.get("name") or path.stem,
-                "filename": path.name,
-            }
-        )
-    return recipes_out
+def recipes(
+    response: Response,
+    q: Optional[str] = None,
+    tag: Optional[str] = None,
+    order: str = "key",
+    limit: Optional[int] = Query(default=None, ge=1),
+    offset: int = Query(default=0, ge=0),
+) -> List[dict]:
+    return _list_documents("recipes", response, q, tag, order, limit, offset)
 
 
 @app.get("/recipes/{recipe_name}")
-def recipe(recipe_name: str) -> dict:
-    filename = recipe_name if recipe_name.endswith(".yml") else f"{recipe_name}.yml"
-    recipe_path = RECIPES_DIR / filename
-    if not recipe_path.exists():
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    return load_recipe(recipe_path)
+def recipe(recipe_name: str, response: Response) -> dict:
+    return _get_document("recipes", recipe_name, response, "Recipe not found")
 
 
 @app.post("/recipes")
@@ -421,45 +838,62 @@ async def save_recipe_profile(request: Request) -> dict:
         "urea_as_nh4": recipe.urea_as_nh4,
         "phosphate_species": recipe.phosphate_species,
     }
+    if recipe.ph is not None:
+        payload_out["ph"] = recipe.ph
+    if recipe.ec_model != "mccleskey":
+        payload_out["ec_model"] = recipe.ec_model
     if recipe.water_profile:
         payload_out["water_profile"] = recipe.water_profile
     if recipe.osmosis_percent is not None:
         payload_out["osmosis_percent"] = recipe.osmosis_percent
+    if recipe.tags:
+        payload_out["tags"] = recipe.tags
 
-    recipe_path = RECIPES_DIR / f"{safe_name}.yml"
-    RECIPES_DIR.mkdir(parents=True, exist_ok=True)
-    save_recipe(recipe_path, payload_out)
-    return {"status": "ok", "filename": recipe_path.name}
+    info = _save_document("recipes", safe_name, payload_out, request)
+    return {"status": "ok", "filename": info.filename, "version": info.version}
 
 
-@app.post("/calculate", response_model=CalculationResponse)
-def calculate(payload: RecipeRequest) -> CalculationResponse:
+def _recipe_water(payload: RecipeRequest, snapshot: DataSnapshot) -> tuple[Dict[str, float], float]:
     water_mg_l: Dict[str, float] = {}
     osmosis_percent = 0.0
     if payload.water_profile_name:
-        profile_path = WATER_PROFILES_DIR / payload.water_profile_name
-        if not profile_path.exists():
-            raise HTTPException(status_code=404, detail="Water profile not found")
-        profile = load_water_profile_data(profile_path)
-        water_mg_l = sanitize_water_profile(profile.get("mg_per_l") or {})
+        key = _document_key(payload.water_profile_name)
+        with telemetry.stage("api.water_profile_load", profile=payload.water_profile_name):
+            try:
+                profile = water_profile_from_data(STORE.get("water_profiles", key), key)
+            except KeyError as exc:
+                raise HTTPException(status_code=404, detail="Water profile not found") from exc
+        water_mg_l = sanitize_water_profile(profile.get("mg_per_l") or {}, snapshot.molar_masses)
         osmosis_percent = float(profile.get("osmosis_percent") or 0)
     elif payload.water_mg_l:
-        water_mg_l = sanitize_water_profile(payload.water_mg_l)
+        water_mg_l = sanitize_water_profile(payload.water_mg_l, snapshot.molar_masses)
         if payload.osmosis_percent is not None:
             osmosis_percent = float(payload.osmosis_percent)
+    return water_mg_l, osmosis_percent
 
-    recipe = {
+
+def _recipe_dict(payload: RecipeRequest) -> dict:
+    return {
         "liters": payload.liters,
         "fertilizers": [entry.dict() for entry in payload.fertilizers],
         "urea_as_nh4": payload.urea_as_nh4,
         "phosphate_species": payload.phosphate_species,
+        "ph": payload.ph,
+        "ec_model": payload.ec_model,
+        "acid": _acid_option(payload.acid),
+        "precipitation": _precipitation_option(payload.precipitation),
     }
 
+
+def _calculate_payload(payload: RecipeRequest, snapshot: DataSnapshot) -> dict:
+    water_mg_l, osmosis_percent = _recipe_water(payload, snapshot)
+    recipe = _recipe_dict(payload)
+
     try:
         result = compute_solution(
             recipe,
-            FERTILIZERS,
-            MOLAR_MASSES,
+            snapshot.fertilizers_for([entry.name for entry in payload.fertilizers]),
+            snapshot.molar_masses,
             water_mg_l=water_mg_l,
             osmosis_percent=osmosis_percent,
         )
@@ -468,16 +902,213 @@ def calculate(payload: RecipeRequest) -> CalculationResponse:
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return CalculationResponse(**result.to_dict())
+    with telemetry.stage("core.to_dict"):
+        return result.to_dict()
 
 
-@app.post("/solve", response_model=SolveResponse)
-def solve(payload: SolveRequest) -> SolveResponse:
+@app.post("/calculate", response_model=CalculationResponse)
+def calculate(payload: RecipeRequest, response: Response) -> CalculationResponse:
+    snapshot = SNAPSHOTS.current()
+    data = _calculate_payload(payload, snapshot)
+    _data_version_header(response, snapshot)
+    with telemetry.stage("api.serialize"):
+        return CalculationResponse(**data)
+
+
+@app.post("/stock/plan", response_model=StockPlanResponse)
+def stock_plan(payload: StockPlanRequest, response: Response) -> StockPlanResponse:
+    snapshot = SNAPSHOTS.current()
+    water_mg_l, osmosis_percent = _recipe_water(payload, snapshot)
+    recipe = dict(_recipe_dict(payload), stock=payload.stock.model_dump(exclude_none=True))
+
+    try:
+        plan = plan_stock_tanks(
+            recipe,
+            snapshot.fertilizers_for([entry.name for entry in payload.fertilizers]),
+            snapshot.molar_masses,
+            water_mg_l=water_mg_l,
+            osmosis_percent=osmosis_percent,
+        )
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    _data_version_header(response, snapshot)
+    with telemetry.stage("api.serialize"):
+        return StockPlanResponse(**plan.to_dict())
+
+
+LIVE_OUTPUT_FIELDS = tuple(CalculationResponse.model_fields)
+
+
+class LiveCalculation:
+    """Per-connection recipe state for the `/ws/calculate` channel.
+
+    Edits only mutate the state and bump `version`; the compute loop picks up the
+    latest version, so a burst of edits results in a single calculation.
+    """
+
+    def __init__(self) -> None:
+        self.liters = 10.0
+        self.grams: Dict[str, float] = {}
+        self.water_mg_l: Dict[str, float] = {}
+        self.osmosis_percent = 0.0
+        self.urea_as_nh4 = False
+        self.phosphate_species = "H2PO4"
+        self.ph: Optional[float] = None
+        self.ec_model = "mccleskey"
+        self.water_profile_name: Optional[str] = None
+        self.acid: Optional[AcidOption] = None
+        self.precipitation: Optional[PrecipitationOption] = None
+        self.version = 0
+        self.seq: Any = None
+        self.last_output: Dict[str, Any] = {}
+
+    def apply(self, message: dict) -> None:
+        op = message.get("op")
+        if op == "replace":
+            request = RecipeRequest(**(message.get("recipe") or {}))
+            self.liters = request.liters
+            self.grams = {}
+            for entry in request.fertilizers:
+                self.grams[entry.name] = self.grams.get(entry.name, 0.0) + entry.grams
+            self.water_mg_l = dict(request.water_mg_l or {})
+            self.osmosis_percent = float(request.osmosis_percent or 0)
+            self.urea_as_nh4 = request.urea_as_nh4
+            self.phosphate_species = request.phosphate_species
+            self.ph = request.ph
+            self.ec_model = request.ec_model
+            self.water_profile_name = request.water_profile_name
+            self.acid = request.acid
+            self.precipitation = request.precipitation
+        elif op == "grams":
+            name = str(message.get("name") or "").strip()
+            grams = float(message.get("grams") or 0.0)
+            if not name:
+                raise ValueError("grams edit requires a fertilizer name")
+            if grams < 0:
+                raise ValueError("grams must be >= 0")
+            if grams == 0.0:
+                self.grams.pop(name, None)
+            else:
+                self.grams[name] = grams
+        elif op == "water":
+            key = str(message.get("key") or "")
+            if key not in ALLOWED_WATER_KEYS and key not in ("KH", "CaCO3", "CO3"):
+                raise ValueError(f"Invalid water key: {key}")
+            self.water_mg_l[key] = float(message.get("value") or 0.0)
+        elif op == "osmosis":
+            self.osmosis_percent = float(message.get("value") or 0.0)
+        elif op == "liters":
+            liters = float(message.get("value") or 0.0)
+            if liters <= 0:
+                raise ValueError("liters must be > 0")
+            self.liters = liters
+        else:
+            raise ValueError(f"Unknown live edit op: {op}")
+        self.version += 1
+        if "seq" in message:
+            self.seq = message["seq"]
+
+    def request(self) -> RecipeRequest:
+        return RecipeRequest(
+            liters=self.liters,
+            fertilizers=[FertilizerEntry(name=name, grams=grams) for name, grams in self.grams.items()],
+            urea_as_nh4=self.urea_as_nh4,
+            phosphate_species=self.phosphate_species,
+            ph=self.ph,
+            ec_model=self.ec_model,
+            water_profile_name=self.water_profile_name,
+            water_mg_l=dict(self.water_mg_l),
+            osmosis_percent=self.osmosis_percent,
+            acid=self.acid,
+            precipitation=self.precipitation,
+        )
+
+    def changed_fields(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        changed = {
+            key: value
+            for key, value in output.items()
+            if key not in self.last_output or self.last_output[key] != value
+        }
+        self.last_output = output
+        return changed
+
+
+def _error_detail(exc: Exception) -> Any:
+    return exc.detail if isinstance(exc, HTTPException) else str(exc) or type(exc).__name__
+
+
+async def _receive_object(websocket: WebSocket) -> Optional[dict]:
+    """Next JSON object from the client; malformed messages get an error frame and None."""
+    text = await websocket.receive_text()
+    try:
+        message = json.loads(text)
+    except ValueError:
+        await websocket.send_json({"type": "error", "seq": None, "detail": "Message is not valid JSON"})
+        return None
+    if not isinstance(message, dict):
+        await websocket.send_json({"type": "error", "seq": None, "detail": "Message must be an object"})
+        return None
+    return message
+
+
+@app.websocket("/ws/calculate")
+async def live_calculate(websocket: WebSocket) -> None:
+    await websocket.accept()
+    state = LiveCalculation()
+    pending = asyncio.Event()
+
+    async def compute_loop() -> None:
+        while True:
+            await pending.wait()
+            pending.clear()
+            version, seq = state.version, state.seq
+            snapshot = SNAPSHOTS.current()
+            try:
+                data = await run_in_threadpool(_calculate_payload, state.request(), snapshot)
+            except Exception as exc:
+                # any failure is reported; the loop must survive for the next edit
+                if version == state.version:
+                    await websocket.send_json({"type": "error", "seq": seq, "detail": _error_detail(exc)})
+                continue
+            if version != state.version:
+                # Superseded while computing; the newer state is already pending.
+                continue
+            # optional fields (acid, precipitation) are absent from the result and sent as null
+            output = {key: data.get(key) for key in LIVE_OUTPUT_FIELDS}
+            await websocket.send_json(
+                {
+                    "type": "result",
+                    "seq": seq,
+                    "data_version": snapshot.version,
+                    "changed": state.changed_fields(output),
+                }
+            )
+
+    worker = asyncio.create_task(compute_loop())
+    try:
+        while True:
+            message = await _receive_object(websocket)
+            if message is None:
+                continue
+            try:
+                state.apply(message)
+            except (TypeError, ValueError, ValidationError) as exc:
+                await websocket.send_json({"type": "error", "seq": message.get("seq"), "detail": str(exc)})
+                continue
+            pending.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
+
+def _solver_inputs(payload: SolveRequest, snapshot: DataSnapshot) -> tuple[Dict[str, Any], Dict[str, Any] | None]:
     water_profile_data: Dict[str, Any] | None = None
     if payload.water_profile:
         water_profile_data = dict(payload.water_profile)
         mg_per_l = water_profile_data.get("mg_per_l") or {}
-        water_profile_data["mg_per_l"] = sanitize_water_profile(mg_per_l)
+        water_profile_data["mg_per_l"] = sanitize_water_profile(mg_per_l, snapshot.molar_masses)
         if "osmosis_percent" not in water_profile_data:
             water_profile_data["osmosis_percent"] = 0.0
 
@@ -486,21 +1117,236 @@ def solve(payload: SolveRequest) -> SolveResponse:
         "targets": payload.targets,
         "fertilizers_allowed": payload.fertilizers_allowed,
         "fixed_grams": payload.fixed_grams,
+        "min_grams": payload.min_grams,
+        "max_grams": payload.max_grams,
+        "max_total_grams": payload.max_total_grams,
+        "constraints": [constraint.dict() for constraint in payload.constraints],
+        "discrete": payload.discrete.dict() if payload.discrete else None,
+        "prune_tolerance": payload.prune_tolerance,
+        "ec_target_mS_per_cm": payload.ec_target_mS_per_cm,
+        "ec_max_mS_per_cm": payload.ec_max_mS_per_cm,
+        "ec_temp_c": payload.ec_temp_c,
+        "acid": _acid_option(payload.acid),
         "urea_as_nh4": payload.urea_as_nh4,
         "phosphate_species": payload.phosphate_species,
+        "ph": payload.ph,
+        "ec_model": payload.ec_model,
+        "precipitation": _precipitation_option(payload.precipitation),
     }
+    return recipe, water_profile_data
+
+
+class LiveSolve:
+    """Per-connection solver session for the `/ws/solve` channel.
+
+    `replace` sets the full solve request, `targets` merges target edits. Edits are
+    collected until the compute loop takes them, which then re-solves the kept
+    `SolverSession` warm (or rebuilds it after `replace` or a data reload).
+    """
+
+    def __init__(self) -> None:
+        self.request: Optional[SolveRequest] = None
+        self.targets: Dict[str, float] = {}
+        self.changes: Dict[str, float] = {}
+        self.rebuild = True
+        self.session: Optional[SolverSession] = None
+        self.data_version: Optional[int] = None
+        self.version = 0
+        self.seq: Any = None
+
+    def apply(self, message: dict) -> None:
+        op = message.get("op")
+        if op == "replace":
+            self.request = SolveRequest(**(message.get("request") or {}))
+            self.targets = dict(self.request.targets)
+            self.changes = {}
+            self.rebuild = True
+        elif op == "targets":
+            if self.request is None:
+                raise ValueError("targets edit requires a 'replace' first")
+            edits = message.get("targets")
+            if not isinstance(edits, dict):
+                raise ValueError("targets must be an object")
+            edits = {str(key): float(value) for key, value in edits.items()}
+            self.targets.update(edits)
+            self.changes.update(edits)
+        else:
+            raise ValueError(f"Unknown solve edit op: {op}")
+        self.version += 1
+        if "seq" in message:
+            self.seq = message["seq"]
+
+    def take(self) -> tuple[bool, Dict[str, float]]:
+        rebuild, changes = self.rebuild, self.changes
+        self.rebuild, self.changes = False, {}
+        return rebuild, changes
+
+    def solve(self, rebuild: bool, changes: Dict[str, float], snapshot: DataSnapshot) -> dict:
+        try:
+            if rebuild or self.session is None or self.data_version != snapshot.version:
+                recipe, water_profile_data = _solver_inputs(self.request, snapshot)
+                recipe["targets"] = dict(self.targets)
+                self.session = None
+                self.session = SolverSession(
+                    recipe,
+                    ferts=snapshot.fertilizers_for(self.request.fertilizers_allowed),
+                    mm=snapshot.molar_masses,
+                    water_profile_data=water_profile_data,
+                    compiled=snapshot.compiled,
+                )
+                self.data_version = snapshot.version
+                result = self.session.result
+            else:
+                result = self.session.set_targets(changes)
+        except Exception as exc:
+            # the taken changes are lost with the failed solve: rebuild from the full targets next time
+            self.session = None
+            if isinstance(exc, (KeyError, ValueError)):
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+            raise
+        return SolveResponse(**result.to_dict()).dict()
+
+
+@app.websocket("/ws/solve")
+async def live_solve(websocket: WebSocket) -> None:
+    await websocket.accept()
+    state = LiveSolve()
+    pending = asyncio.Event()
+
+    async def compute_loop() -> None:
+        while True:
+            await pending.wait()
+            pending.clear()
+            version, seq = state.version, state.seq
+            rebuild, changes = state.take()
+            snapshot = SNAPSHOTS.current()
+            try:
+                data = await run_in_threadpool(state.solve, rebuild, changes, snapshot)
+            except Exception as exc:
+                # any failure is reported; the loop must survive for the next edit
+                if version == state.version:
+                    await websocket.send_json({"type": "error", "seq": seq, "detail": _error_detail(exc)})
+                continue
+            if version != state.version:
+                # Superseded while solving; the newer edits are already pending.
+                continue
+            await websocket.send_json({"type": "result", "seq": seq, "data_version": snapshot.version, "result": data})
+
+    worker = asyncio.create_task(compute_loop())
+    try:
+        while True:
+            message = await _receive_object(websocket)
+            if message is None:
+                continue
+            try:
+                state.apply(message)
+            except (TypeError, ValueError, ValidationError) as exc:
+                await websocket.send_json({"type": "error", "seq": message.get("seq"), "detail": str(exc)})
+                continue
+            pending.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
+
+@app.post("/solve", response_model=SolveResponse)
+def solve(payload: SolveRequest, response: Response) -> SolveResponse:
+    snapshot = SNAPSHOTS.current()
+    recipe, water_profile_data = _solver_inputs(payload, snapshot)
 
     try:
-        result = solve_recipe_data(
-            recipe,
-            ferts=FERTILIZERS,
-            mm=MOLAR_MASSES,
-            water_profile_data=water_profile_data,
-        )
+        with telemetry.stage("solver.solve", fertilizers=len(payload.fertilizers_allowed)):
+            result = solve_recipe_data(
+                recipe,
+                ferts=snapshot.fertilizers_for(payload.fertilizers_allowed),
+                mm=snapshot.molar_masses,
+                water_profile_data=water_profile_data,
+                compiled=snapshot.compiled,
+            )
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    _data_version_header(response, snapshot)
+    with telemetry.stage("api.serialize"):
+        return SolveResponse(**result.to_dict())
+
+
+@app.post("/solve/pareto", response_model=ParetoResponse)
+def solve_pareto_front(payload: ParetoRequest, response: Response) -> ParetoResponse:
+    snapshot = SNAPSHOTS.current()
+    recipe, water_profile_data = _solver_inputs(payload, snapshot)
+    recipe.pop("discrete")
+    recipe["target_weights"] = payload.target_weights
+    recipe["points"] = payload.points
+
+    try:
+        with telemetry.stage("solver.solve", fertilizers=len(payload.fertilizers_allowed)):
+            front = solve_pareto(
+                recipe,
+                ferts=snapshot.fertilizers_for(payload.fertilizers_allowed),
+                mm=snapshot.molar_masses,
+                water_profile_data=water_profile_data,
+                compiled=snapshot.compiled,
+                prices=payload.prices_per_kg or load_prices(),
+            )
+    except (KeyError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    _data_version_header(response, snapshot)
+    with telemetry.stage("api.serialize"):
+        return ParetoResponse(**front.to_dict())
+
+
+@app.post("/solve/multistage", response_model=ProgramResponse)
+def solve_multistage(payload: ProgramRequest, response: Response) -> ProgramResponse:
+    snapshot = SNAPSHOTS.current()
+    program: Dict[str, Any] = {
+        "liters": payload.liters,
+        "fertilizers_allowed": payload.fertilizers_allowed,
+        "max_fertilizers": payload.max_fertilizers,
+        "required": payload.required,
+        "time_limit_s": payload.time_limit_s,
+        "urea_as_nh4": payload.urea_as_nh4,
+        "phosphate_species": payload.phosphate_species,
+        "ph": payload.ph,
+        "ec_model": payload.ec_model,
+        "precipitation": _precipitation_option(payload.precipitation),
+        "stages": [
+            {
+                key: value
+                for key, value in {
+                    "name": stage.name,
+                    "weight": stage.weight,
+                    "targets": stage.targets,
+                    "nutrient_solution": _document_key(stage.nutrient_solution) if stage.nutrient_solution else None,
+                    "liters": stage.liters,
+                }.items()
+                if value not in (None, {})
+            }
+            for stage in payload.stages
+        ],
+    }
+    if payload.water_profile:
+        water_profile = dict(payload.water_profile)
+        water_profile["mg_per_l"] = sanitize_water_profile(water_profile.get("mg_per_l") or {}, snapshot.molar_masses)
+        program["water_profile"] = water_profile
+
+    try:
+        with telemetry.stage("solver.solve", fertilizers=len(payload.fertilizers_allowed), stages=len(payload.stages)):
+            result = solve_program(
+                program,
+                ferts=snapshot.fertilizers_for(payload.fertilizers_allowed),
+                mm=snapshot.molar_masses,
+                compiled=snapshot.compiled,
+                store=STORE,
+            )
     except (KeyError, ValueError) as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return SolveResponse(**result.to_dict())
+    _data_version_header(response, snapshot)
+    with telemetry.stage("api.serialize"):
+        return ProgramResponse(**result.to_dict())
 
 
 if __name__ == "__main__":
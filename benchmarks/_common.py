@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT / "src") not in sys.path:
+    sys.path.insert(0, str(ROOT / "src"))
+
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_water_profile_data  # noqa: E402
+
+
+def load_yaml(relative: str) -> dict:
+    with (ROOT / relative).open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def golden_inputs() -> tuple[dict, dict, dict, dict, float]:
+    recipe = load_yaml("recipes/golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    osmosis_percent = float(recipe.get("osmosis_percent", profile.get("osmosis_percent", 0.0)))
+    return recipe, load_fertilizers(), load_molar_masses(), profile["mg_per_l"], osmosis_percent
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from ._common import ROOT, load_yaml
+
+CONCURRENCY_LEVELS = (1, 4, 16)
+REQUESTS_PER_ROUND = 32
+
+
+def _client():
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    return TestClient(app)
+
+
+def _rounds(client, path: str, payload: dict) -> dict:
+    def run(concurrency: int):
+        def one(_: int) -> None:
+            response = client.post(path, json=payload)
+            response.raise_for_status()
+
+        def round_trip() -> None:
+            if concurrency == 1:
+                for idx in range(REQUESTS_PER_ROUND):
+                    one(idx)
+                return
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(one, range(REQUESTS_PER_ROUND)))
+
+        return round_trip
+
+    return {f"c={level},n={REQUESTS_PER_ROUND}": run(level) for level in CONCURRENCY_LEVELS}
+
+
+def bench_calculate():
+    recipe = load_yaml("recipes/golden.yml")
+    profile = load_yaml("data/water_profiles/default.yml")
+    payload = {
+        "liters": recipe["liters"],
+        "fertilizers": recipe["fertilizers"],
+        "water_mg_l": profile["mg_per_l"],
+        "osmosis_percent": profile.get("osmosis_percent", 0),
+    }
+    return _rounds(_client(), "/calculate", payload)
+
+
+def bench_solve():
+    recipe = load_yaml("recipes/solve_golden.yml")
+    profile = load_yaml("data/water_profiles/default.yml")
+    payload = {
+        "liters": recipe["liters"],
+        "targets": recipe["targets_mg_per_l"],
+        "fertilizers_allowed": recipe["fertilizers_allowed"],
+        "water_profile": {"mg_per_l": profile["mg_per_l"], "osmosis_percent": profile.get("osmosis_percent", 0)},
+    }
+    return _rounds(_client(), "/solve", payload)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import numpy as np
+
+from ._common import golden_inputs
+
+from horticalc.core import ION_INDEX, compute_solution
+from horticalc.precipitation import screen_concentrate
+from horticalc.stock import plan_stock_tanks
+
+
+def bench_compute_solution():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    return lambda: compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis_percent)
+
+
+def bench_compute_solution_to_dict():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    return lambda: compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis_percent).to_dict()
+
+
+def bench_precipitation_screen():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    result = compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis_percent)
+    water_ions = np.nan_to_num(result.block_array("water_ions_mmol_l"))
+    fertilizer_ions = np.nan_to_num(result.block_array("fertilizer_ions_mmol_l"))
+    # 1000 candidate mixes: the golden fertilizers scaled ion by ion
+    mixes = fertilizer_ions * np.random.default_rng(0).uniform(0.5, 1.5, size=(1000, len(ION_INDEX)))
+    return lambda: screen_concentrate(water_ions, mixes, 100.0, ION_INDEX.labels, 5.8)
+
+
+def bench_stock_plan():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    recipe = dict(recipe, stock={"tanks": 3, "ph": 5.8})
+    return lambda: plan_stock_tanks(recipe, ferts, mm, water, osmosis_percent)
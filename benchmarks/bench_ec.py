@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import numpy as np
+
+from ._common import golden_inputs
+
+from horticalc.core import ION_INDEX, compute_solution
+from horticalc.ec import EC_MODELS, compute_ec, ec_matrix
+
+
+def bench_compute_ec():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    ions = compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis_percent).ions_mmol_l
+    return {
+        "full": lambda: compute_ec(ions),
+        "minimal": lambda: compute_ec(
+            ions,
+            include_breakdown=False,
+            include_transport_numbers=False,
+            include_atc_to_25=False,
+        ),
+    }
+
+
+def bench_ec_models():
+    recipe, ferts, mm, water, osmosis_percent = golden_inputs()
+    result = compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis_percent)
+    rows = np.resize(np.nan_to_num(result.block_array("ions_mmol_l")), (1000, len(ION_INDEX)))
+    return {name: (lambda name=name: ec_matrix(rows, ION_INDEX.labels, (18.0, 25.0), name)) for name in EC_MODELS}
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+from ._common import ROOT
+
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe
+
+COLD_SCRIPT = """
+import sys
+sys.path.insert(0, {src!r})
+from horticalc.data_io import load_fertilizers
+load_fertilizers()
+"""
+
+
+def bench_load_fertilizers():
+    def cold() -> None:
+        # Fresh interpreter: start-up + module import + CSV parse, i.e. a worker cold start.
+        subprocess.run([sys.executable, "-c", COLD_SCRIPT.format(src=str(ROOT / "src"))], check=True)
+
+    return {"cold": cold, "warm": load_fertilizers}
+
+
+def bench_load_molar_masses():
+    return load_molar_masses
+
+
+def bench_load_recipe():
+    path = ROOT / "recipes" / "golden.yml"
+    return lambda: load_recipe(path)
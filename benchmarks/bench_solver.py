@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from ._common import load_yaml
+
+from horticalc.data_io import load_fertilizers, load_molar_masses
+from horticalc.solver import solve_recipe_data
+
+FERTILIZER_COUNTS = (5, 20, 60)
+
+
+def _scaled_recipe(recipe: dict, ferts: dict, count: int) -> dict:
+    allowed = list(recipe["fertilizers_allowed"])
+    for name in ferts:
+        if len(allowed) >= count:
+            break
+        if name not in allowed and any(float(v) for v in ferts[name].comp.values()):
+            allowed.append(name)
+    scaled = dict(recipe)
+    scaled["fertilizers_allowed"] = allowed[:count]
+    return scaled
+
+
+def bench_solve_recipe_data():
+    recipe = load_yaml("recipes/solve_golden.yml")
+    ferts = load_fertilizers()
+    mm = load_molar_masses()
+    cases = {}
+    for count in FERTILIZER_COUNTS:
+        scaled = _scaled_recipe(recipe, ferts, count)
+        cases[f"n={count}"] = lambda scaled=scaled: solve_recipe_data(scaled, ferts=ferts, mm=mm)
+    return cases
@@ -60,6 +60,15 @@ let waterUnit = "mg_l";
 let lastCalculation = null;
 let lastSolveResult = null;
 let recalculateTimer = null;
+let liveSocket = null;
+let liveSocketBase = null;
+let liveSeq = 0;
+let liveSentState = null;
+let liveOutput = {};
+let solveSocket = null;
+let solveSocketBase = null;
+let solveSocketActive = false;
+let solveSeq = 0;
 let fertilizerSelectTable;
 let calculatorTable;
 let currentProfileMode = "calculator";
@@ -317,6 +326,10 @@ function renderSolverTargetsTable() {
     input.value = solverTargetValues[field.key] || 0;
     input.addEventListener("input", (event) => {
       solverTargetValues[field.key] = Number(event.target.value) || 0;
+      if (solveSocketActive && solveSocketReady()) {
+        // The server keeps the solver session and re-solves from the last solution.
+        sendSolveEdit({ op: "targets", targets: { [field.key]: solverTargetValues[field.key] } });
+      }
     });
     valueCell.appendChild(input);
 
@@ -614,14 +627,120 @@ function scheduleRecalculate() {
   if (recalculateTimer) {
     clearTimeout(recalculateTimer);
   }
+  const socket = liveSocketReady() ? liveSocket : null;
   recalculateTimer = setTimeout(async () => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      sendLiveEdits(socket);
+      return;
+    }
     try {
       const data = await calculate();
       renderCalculation(data);
     } catch (error) {
       reportError(error, "Berechnung fehlgeschlagen");
     }
-  }, 250);
+  }, socket ? 60 : 250);
+}
+
+function liveSocketUrl() {
+  return `${apiBase().replace(/^http/, "ws")}/ws/calculate`;
+}
+
+function liveSocketReady() {
+  if (typeof WebSocket === "undefined") {
+    return false;
+  }
+  if (liveSocket && liveSocketBase !== apiBase()) {
+    liveSocket.close();
+    liveSocket = null;
+  }
+  if (!liveSocket) {
+    openLiveSocket();
+    return false;
+  }
+  return liveSocket.readyState === WebSocket.OPEN;
+}
+
+function openLiveSocket() {
+  let socket;
+  try {
+    socket = new WebSocket(liveSocketUrl());
+  } catch (error) {
+    return;
+  }
+  liveSocket = socket;
+  liveSocketBase = apiBase();
+  liveSentState = null;
+  liveOutput = {};
+  socket.addEventListener("message", (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type === "result") {
+      // The server only sends fields that changed since its previous result.
+      liveOutput = { ...liveOutput, ...message.changed };
+    }
+    if (message.seq !== liveSeq) {
+      // Superseded by a newer edit; its result is on the way.
+      return;
+    }
+    if (message.type === "error") {
+      reportError(new Error(message.detail), "Berechnung fehlgeschlagen");
+      return;
+    }
+    renderCalculation(liveOutput);
+  });
+  socket.addEventListener("close", () => {
+    if (liveSocket === socket) {
+      liveSocket = null;
+      liveSentState = null;
+    }
+  });
+}
+
+function liveStateFromPayload(payload) {
+  const grams = {};
+  payload.fertilizers.forEach((entry) => {
+    grams[entry.name] = (grams[entry.name] || 0) + entry.grams;
+  });
+  return {
+    liters: payload.liters,
+    grams,
+    water: payload.water_mg_l,
+    osmosis: payload.osmosis_percent,
+  };
+}
+
+function buildLiveEdits(previous, next) {
+  const edits = [];
+  Object.keys({ ...previous.grams, ...next.grams }).forEach((name) => {
+    if ((previous.grams[name] || 0) !== (next.grams[name] || 0)) {
+      edits.push({ op: "grams", name, grams: next.grams[name] || 0 });
+    }
+  });
+  Object.keys({ ...previous.water, ...next.water }).forEach((key) => {
+    if ((previous.water[key] || 0) !== (next.water[key] || 0)) {
+      edits.push({ op: "water", key, value: next.water[key] || 0 });
+    }
+  });
+  if (previous.osmosis !== next.osmosis) {
+    edits.push({ op: "osmosis", value: next.osmosis });
+  }
+  if (previous.liters !== next.liters) {
+    edits.push({ op: "liters", value: next.liters });
+  }
+  return edits;
+}
+
+function sendLiveEdits(socket) {
+  const payload = buildPayload();
+  const nextState = liveStateFromPayload(payload);
+  const edits = liveSentState
+    ? buildLiveEdits(liveSentState, nextState)
+    : [{ op: "replace", recipe: payload }];
+  liveSentState = nextState;
+  edits.forEach((edit) => {
+    liveSeq += 1;
+    socket.send(JSON.stringify({ ...edit, seq: liveSeq }));
+  });
 }
 
 
@@ -1269,6 +1388,56 @@ async function solveRecipe() {
   return response.json();
 }
 
+function solveSocketReady() {
+  if (typeof WebSocket === "undefined") {
+    return false;
+  }
+  if (solveSocket && solveSocketBase !== apiBase()) {
+    solveSocket.close();
+    solveSocket = null;
+  }
+  if (!solveSocket) {
+    openSolveSocket();
+    return false;
+  }
+  return solveSocket.readyState === WebSocket.OPEN;
+}
+
+function openSolveSocket() {
+  let socket;
+  try {
+    socket = new WebSocket(`${apiBase().replace(/^http/, "ws")}/ws/solve`);
+  } catch (error) {
+    return;
+  }
+  solveSocket = socket;
+  solveSocketBase = apiBase();
+  solveSocketActive = false;
+  socket.addEventListener("message", (event) => {
+    const message = JSON.parse(event.data);
+    if (message.seq !== solveSeq) {
+      // Superseded by a newer edit; its result is on the way.
+      return;
+    }
+    if (message.type === "error") {
+      reportError(new Error(message.detail), "Solver fehlgeschlagen");
+      return;
+    }
+    renderSolverResults(message.result);
+  });
+  socket.addEventListener("close", () => {
+    if (solveSocket === socket) {
+      solveSocket = null;
+      solveSocketActive = false;
+    }
+  });
+}
+
+function sendSolveEdit(message) {
+  solveSeq += 1;
+  solveSocket.send(JSON.stringify({ ...message, seq: solveSeq }));
+}
+
 function renderEcPair(ecValues, el18, el25) {
   const ec18 = Number(ecValues["18.0"]);
   const ec25 = Number(ecValues["25.0"]);
@@ -1577,6 +1746,11 @@ solverAllowedFertilizersSelect.addEventListener("change", () => {
 });
 
 solveButton.addEventListener("click", async () => {
+  if (solveSocketReady()) {
+    sendSolveEdit({ op: "replace", request: buildSolvePayload() });
+    solveSocketActive = true;
+    return;
+  }
   try {
     const data = await solveRecipe();
     renderSolverResults(data);
@@ -2,18 +2,58 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
 
 from .core import run_recipe, solve_recipe
+from . import tracing
+from .profiling import PROFILE_MODES, run_profiled
+
+
+def _add_output_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--out",
+        help="Optional: JSON Ergebnis in Datei schreiben",
+        default=None,
+    )
+    parser.add_argument(
+        "--pretty",
+        help="JSON hübsch formatieren",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        default=None,
+        help="Optional: Lauf profilieren (cpu = cProfile + Collapsed Stacks, mem = tracemalloc)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default=None,
+        help="Basis-Pfad für Profil-Dateien (ohne Endung), Default: horticalc_<befehl>_<modus>",
+    )
 
 
 def main(argv: list[str] | None = None) -> None:
     args_list = list(argv) if argv is not None else None
     if args_list is None:
-        import sys
-
         args_list = sys.argv[1:]
 
+    if args_list and args_list[0] == "bench":
+        from .bench import main as bench_main
+
+        raise SystemExit(bench_main(args_list[1:]))
+
+    if args_list and args_list[0] == "catalog":
+        from .catalog import main as catalog_main
+
+        raise SystemExit(catalog_main(args_list[1:]))
+
+    if args_list and args_list[0] == "store":
+        from .data_io import store_main
+
+        raise SystemExit(store_main(args_list[1:]))
+
     if args_list and args_list[0] == "solve":
         parser = argparse.ArgumentParser(
             prog="horticalc solve",
@@ -23,19 +63,73 @@ def main(argv: list[str] | None = None) -> None:
             "recipe",
             help="Path to a Solver Recipe (YAML), e.g. recipes/solve_golden.yml",
         )
+        _add_output_args(parser)
+        args = parser.parse_args(args_list[1:])
+        recipe_path = Path(args.recipe).expanduser().resolve()
+        command = "solve"
+        run = lambda: solve_recipe(recipe_path)  # noqa: E731
+    elif args_list and args_list[0] == "season":
+        from .multistage import solve_program_file
+
+        parser = argparse.ArgumentParser(
+            prog="horticalc season",
+            description="Horticalc Solver – ein Düngerset für alle Stufen eines Programms",
+        )
+        parser.add_argument(
+            "recipe",
+            help="Path to a program (YAML) with stages, fertilizers_allowed and max_fertilizers",
+        )
+        _add_output_args(parser)
+        args = parser.parse_args(args_list[1:])
+        recipe_path = Path(args.recipe).expanduser().resolve()
+        command = "season"
+        run = lambda: solve_program_file(recipe_path).to_dict()  # noqa: E731
+    elif args_list and args_list[0] == "blend":
+        from .blending import blend_file
+
+        parser = argparse.ArgumentParser(
+            prog="horticalc blend",
+            description="Horticalc Wassermischung – Anteile mehrerer Wasserquellen unter Grenzwerten",
+        )
         parser.add_argument(
-            "--out",
-            help="Optional: JSON Ergebnis in Datei schreiben",
-            default=None,
+            "recipe",
+            help="Path to a blend config (YAML) with sources, max_mg_per_l/min_mg_per_l, minimize",
+        )
+        _add_output_args(parser)
+        args = parser.parse_args(args_list[1:])
+        recipe_path = Path(args.recipe).expanduser().resolve()
+        command = "blend"
+        run = lambda: blend_file(recipe_path).to_dict()  # noqa: E731
+    elif args_list and args_list[0] == "stock":
+        from .stock import plan_recipe_file
+
+        parser = argparse.ArgumentParser(
+            prog="horticalc stock",
+            description="Horticalc Stammlösungen – Dünger auf A/B-Tanks verteilen",
         )
         parser.add_argument(
-            "--pretty",
-            help="JSON hübsch formatieren",
-            action="store_true",
+            "recipe",
+            help="Path to a Recipe (YAML); optional `stock` block with ratio, tank_liters, tanks, fixed",
         )
+        parser.add_argument("--ratio", type=float, default=None, help="Injektionsverhältnis 1:ratio")
+        parser.add_argument("--tank-liters", type=float, default=None, help="Volumen je Tank in Litern")
+        parser.add_argument("--tanks", type=int, default=None, help="Anzahl Tanks ohne Säuretank")
+        parser.add_argument("--ph", type=float, default=None, help="pH für den Fällungs-Screen")
+        _add_output_args(parser)
         args = parser.parse_args(args_list[1:])
         recipe_path = Path(args.recipe).expanduser().resolve()
-        result = solve_recipe(recipe_path)
+        overrides = {
+            key: value
+            for key, value in (
+                ("ratio", args.ratio),
+                ("tank_liters", args.tank_liters),
+                ("tanks", args.tanks),
+                ("ph", args.ph),
+            )
+            if value is not None
+        }
+        command = "stock"
+        run = lambda: plan_recipe_file(recipe_path, overrides).to_dict()  # noqa: E731
     else:
         parser = argparse.ArgumentParser(
             prog="horticalc",
@@ -45,19 +139,22 @@ def main(argv: list[str] | None = None) -> None:
             "recipe",
             help="Path to a Recipe (YAML), e.g. recipes/golden.yml",
         )
-        parser.add_argument(
-            "--out",
-            help="Optional: JSON Ergebnis in Datei schreiben",
-            default=None,
-        )
-        parser.add_argument(
-            "--pretty",
-            help="JSON hübsch formatieren",
-            action="store_true",
-        )
+        _add_output_args(parser)
         args = parser.parse_args(args_list)
         recipe_path = Path(args.recipe).expanduser().resolve()
-        result = run_recipe(recipe_path)
+        command = "calculate"
+        run = lambda: run_recipe(recipe_path)  # noqa: E731
+
+    def traced_run():
+        with tracing.trace(f"cli.{command}", recipe=str(recipe_path)):
+            return run()
+
+    if args.profile:
+        out_base = Path(args.profile_out or f"horticalc_{command}_{args.profile}").expanduser().resolve()
+        result, report = run_profiled(args.profile, traced_run, out_base)
+        print(report, file=sys.stderr)
+    else:
+        result = traced_run()
 
     if args.pretty:
         text = json.dumps(result, indent=2, ensure_ascii=False)
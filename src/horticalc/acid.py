@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from . import telemetry
+from .core import COMP_COLS, ION_INDEX, WATER_PROFILE_KEYS, _ions_of_forms, _mm, water_forms_matrix
+from .data_io import Fertilizer
+
+
+@dataclass(frozen=True)
+class _AcidType:
+    form: str  # COMP_COLS column of the anion
+    hydrogens: int
+    anion: str  # molar mass key of the anion
+
+
+_ACID_TYPES: Dict[str, _AcidType] = {
+    "HNO3": _AcidType(form="NO3", hydrogens=1, anion="NO3"),
+    "H3PO4": _AcidType(form="P2O5", hydrogens=3, anion="PO4"),
+    "H2SO4": _AcidType(form="SO4", hydrogens=2, anion="SO4"),
+}
+
+
+@dataclass(frozen=True)
+class Acid:
+    """Commercial acid: `percent` w/w of `acid` (HNO3, H3PO4, H2SO4), dosed in ml."""
+
+    name: str
+    acid: str
+    percent: float
+    density_g_per_ml: float
+
+    def __post_init__(self) -> None:
+        if self.acid not in _ACID_TYPES:
+            raise KeyError(f"Unbekannte Säure: '{self.acid}' (erwartet: {', '.join(_ACID_TYPES)})")
+        if not 0 < self.percent <= 100 or self.density_g_per_ml <= 0:
+            raise ValueError(f"Säure '{self.name}': Konzentration muss in (0, 100] und Dichte > 0 sein")
+
+    def molar_mass(self, mm: Dict[str, float]) -> float:
+        kind = _ACID_TYPES[self.acid]
+        return kind.hydrogens * _mm(mm, "H") + _mm(mm, kind.anion)
+
+    def protons(self, phosphate_species: str = "H2PO4") -> int:
+        """H+ per molecule that neutralize HCO3 at nutrient-solution pH.
+
+        HNO3 and H2SO4 dissociate completely; H3PO4 only down to the phosphate species
+        the calculation assumes (H2PO4- by default).
+        """
+        if self.acid == "H3PO4":
+            return 2 if phosphate_species.upper() == "HPO4" else 1
+        return _ACID_TYPES[self.acid].hydrogens
+
+    def mmol_per_ml(self, mm: Dict[str, float]) -> float:
+        return self.density_g_per_ml * self.percent / 100.0 * 1000.0 / self.molar_mass(mm)
+
+    def hco3_mg_per_ml(self, mm: Dict[str, float], phosphate_species: str = "H2PO4") -> float:
+        """mg HCO3 neutralized by 1 ml (= mg/L HCO3 per ml/L)."""
+        return self.mmol_per_ml(mm) * self.protons(phosphate_species) * _mm(mm, "HCO3")
+
+    def fertilizer(self, mm: Dict[str, float], phosphate_species: str = "H2PO4") -> Fertilizer:
+        """Pseudo-fertilizer (recipe unit ml): anion as N/P2O5/SO4 and the neutralized HCO3 as negative HCO3."""
+        per_g = self.percent / 100.0 / self.molar_mass(mm)  # mol acid per g product
+        if self.acid == "HNO3":
+            anion = _mm(mm, "N")
+        elif self.acid == "H3PO4":
+            anion = _mm(mm, "P2O5") / 2.0
+        else:
+            anion = _mm(mm, "SO4")
+        comp = {
+            _ACID_TYPES[self.acid].form: per_g * anion,
+            "HCO3": -per_g * self.protons(phosphate_species) * _mm(mm, "HCO3"),
+        }
+        return Fertilizer(self.name, "Flüssig", self.density_g_per_ml, comp)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "acid": self.acid,
+            "percent": self.percent,
+            "density_g_per_ml": self.density_g_per_ml,
+        }
+
+
+ACID_PRODUCTS: Dict[str, Acid] = {
+    acid.name: acid
+    for acid in (
+        Acid("Salpetersäure 38%", "HNO3", 38.0, 1.235),
+        Acid("Salpetersäure 53%", "HNO3", 53.0, 1.33),
+        Acid("Salpetersäure 65%", "HNO3", 65.0, 1.39),
+        Acid("Phosphorsäure 75%", "H3PO4", 75.0, 1.57),
+        Acid("Phosphorsäure 85%", "H3PO4", 85.0, 1.685),
+        Acid("Schwefelsäure 37%", "H2SO4", 37.0, 1.28),
+        Acid("Schwefelsäure 96%", "H2SO4", 96.0, 1.835),
+    )
+}
+
+
+def get_acid(spec: str | Mapping | Acid) -> Acid:
+    """Acid from a product name in ACID_PRODUCTS or a mapping with acid/percent/density_g_per_ml."""
+    if isinstance(spec, Acid):
+        return spec
+    if isinstance(spec, str):
+        spec = {"name": spec}
+    if "acid" not in spec:
+        name = str(spec.get("name") or "")
+        if name not in ACID_PRODUCTS:
+            raise KeyError(f"Unbekanntes Säureprodukt: '{name}' (bekannt: {', '.join(ACID_PRODUCTS)})")
+        return ACID_PRODUCTS[name]
+    percent = float(spec.get("percent") or 0.0)
+    acid = str(spec["acid"])
+    return Acid(
+        name=str(spec.get("name") or f"{acid} {percent:g}%"),
+        acid=acid,
+        percent=percent,
+        density_g_per_ml=float(spec.get("density_g_per_ml") or 0.0),
+    )
+
+
+@dataclass
+class AcidDose:
+    acid: Acid
+    ml: float
+    liters: float
+    water_hco3_mg_l: float
+    residual_hco3_mg_l: float
+    free_acid_mmol_l: float
+    phosphate_species: str = "H2PO4"
+
+    @property
+    def ml_per_l(self) -> float:
+        return self.ml / self.liters
+
+    def forms(self, mm: Dict[str, float]) -> np.ndarray:
+        """mg/L of the dose in COMP_COLS forms, like `core._fertilizer_forms`."""
+        fert = self.acid.fertilizer(mm, self.phosphate_species)
+        forms = np.zeros(len(COMP_COLS))
+        forms[fert.comp_index] = self.ml * fert.weight_factor * fert.comp_values * 1000.0 / self.liters
+        return forms
+
+    def to_dict(self) -> dict:
+        return {
+            **self.acid.to_dict(),
+            "ml": self.ml,
+            "ml_per_l": self.ml_per_l,
+            "water_hco3_mg_per_l": self.water_hco3_mg_l,
+            "residual_hco3_mg_per_l": self.residual_hco3_mg_l,
+            "free_acid_mmol_per_l": self.free_acid_mmol_l,
+        }
+
+
+def resolve_acid_dose(
+    spec: str | Mapping,
+    water_hco3_mg_l: float,
+    liters: float,
+    mm: Dict[str, float],
+    phosphate_species: str = "H2PO4",
+) -> AcidDose:
+    """Dose of the recipe option `acid`: either fixed `ml` or `residual_hco3_mg_per_l`.
+
+    Only the water's alkalinity (HCO3 after the osmosis mix) sets the dose; HCO3 from
+    fertilizers is neutralized by the same acid but does not raise the dose, so the
+    solver baseline does not depend on the solved grams. Acid beyond the HCO3 stays as
+    free H+ in the ion state.
+    """
+    if isinstance(spec, str):
+        spec = {"name": spec}
+    acid = get_acid(spec)
+    per_ml_l = acid.hco3_mg_per_ml(mm, phosphate_species)
+    has_ml = spec.get("ml") is not None
+    has_residual = spec.get("residual_hco3_mg_per_l") is not None
+    if has_ml == has_residual:
+        raise ValueError("Säure: genau eines von 'ml' oder 'residual_hco3_mg_per_l' angeben")
+    if has_ml:
+        ml = float(spec["ml"])
+        if ml < 0:
+            raise ValueError("Säure: 'ml' muss >= 0 sein")
+    else:
+        residual = float(spec["residual_hco3_mg_per_l"])
+        if residual < 0:
+            raise ValueError("Säure: 'residual_hco3_mg_per_l' muss >= 0 sein")
+        ml = max(water_hco3_mg_l - residual, 0.0) / per_ml_l * liters
+    neutralized = ml / liters * per_ml_l
+    return AcidDose(
+        acid=acid,
+        ml=ml,
+        liters=liters,
+        water_hco3_mg_l=water_hco3_mg_l,
+        residual_hco3_mg_l=max(water_hco3_mg_l - neutralized, 0.0),
+        free_acid_mmol_l=max(neutralized - water_hco3_mg_l, 0.0) / _mm(mm, "HCO3"),
+        phosphate_species=phosphate_species,
+    )
+
+
+@dataclass
+class TitrationCurves:
+    acid: Acid
+    names: List[str]
+    doses_ml_per_l: np.ndarray  # (doses,)
+    hco3_mg_l: np.ndarray  # (profiles, doses)
+    ec_mS_per_cm: np.ndarray  # (profiles, doses)
+    free_acid_mmol_l: np.ndarray  # (profiles, doses)
+    temp_c: float
+
+    def to_dict(self) -> dict:
+        return {
+            "acid": self.acid.to_dict(),
+            "doses_ml_per_l": self.doses_ml_per_l.tolist(),
+            "temp_c": self.temp_c,
+            "profiles": {
+                name: {
+                    "hco3_mg_per_l": self.hco3_mg_l[row].tolist(),
+                    "ec_mS_per_cm": self.ec_mS_per_cm[row].tolist(),
+                    "free_acid_mmol_per_l": self.free_acid_mmol_l[row].tolist(),
+                }
+                for row, name in enumerate(self.names)
+            },
+        }
+
+
+def _water_ions(mm: Dict[str, float], profiles: Sequence[Mapping[str, float]], phosphate_species: str) -> np.ndarray:
+    no_forms = np.zeros(len(COMP_COLS))
+    ions = np.zeros((len(profiles), len(ION_INDEX)))
+    for row, forms in enumerate(water_forms_matrix(mm, profiles)):
+        water_forms = {key: float(value) for key, value in zip(WATER_PROFILE_KEYS, forms) if value}
+        ions[row] = _ions_of_forms(mm, no_forms, water_forms, False, phosphate_species)
+    return ions
+
+
+def doses_for_residual(
+    acid: Acid,
+    profiles: Sequence[Mapping[str, float]],
+    residual_hco3_mg_l: float | Sequence[float],
+    mm: Dict[str, float],
+    phosphate_species: str = "H2PO4",
+) -> np.ndarray:
+    """ml acid per liter that bring each water profile down to the residual HCO3."""
+    hco3 = water_forms_matrix(mm, profiles)[:, WATER_PROFILE_KEYS.index("HCO3")]
+    residual = np.broadcast_to(np.asarray(residual_hco3_mg_l, dtype=float), hco3.shape)
+    return np.clip(hco3 - residual, 0.0, None) / acid.hco3_mg_per_ml(mm, phosphate_species)
+
+
+def titration_curves(
+    acid: Acid,
+    profiles: Sequence[Mapping[str, float]],
+    doses_ml_per_l: Sequence[float],
+    mm: Dict[str, float],
+    *,
+    names: Sequence[str] | None = None,
+    temp_c: float = 25.0,
+    phosphate_species: str = "H2PO4",
+) -> TitrationCurves:
+    """Residual HCO3, EC and free acid for every (water profile, dose) pair.
+
+    Ions are linear in the dose, so the whole grid is the water ion rows plus the dose
+    times one acid ion vector, evaluated with a single `ec_batch` call. HCO3- and the
+    acid's H+ cancel; past the equivalence point the remaining H+ counts towards the EC
+    like in `compute_solution`.
+    """
+    from .ec import ec_batch
+
+    doses = np.asarray(doses_ml_per_l, dtype=float)
+    if doses.ndim != 1 or np.any(doses < 0):
+        raise ValueError("Säuredosen müssen eine Liste von Werten >= 0 sein")
+    names = list(names) if names is not None else [str(i) for i in range(len(profiles))]
+    if len(names) != len(profiles):
+        raise ValueError("Für jedes Wasserprofil wird genau ein Name gebraucht")
+
+    with telemetry.stage("acid.titration", profiles=len(profiles), doses=len(doses)):
+        water = _water_ions(mm, profiles, phosphate_species)
+        per_ml = AcidDose(acid, 1.0, 1.0, 0.0, 0.0, 0.0, phosphate_species).forms(mm)
+        acid_ions = _ions_of_forms(mm, per_ml, {}, False, phosphate_species)
+        ions = water[:, None, :] + doses[None, :, None] * acid_ions
+        h, proton = ION_INDEX.positions["HCO3-"], ION_INDEX.positions["H+"]
+        alkalinity = ions[..., h] - ions[..., proton]
+        ions[..., h] = np.clip(alkalinity, 0.0, None)
+        ions[..., proton] = free_acid = np.clip(-alkalinity, 0.0, None)
+        ec = ec_batch(ions, ION_INDEX.labels, temp_c)
+    return TitrationCurves(
+        acid=acid,
+        names=names,
+        doses_ml_per_l=doses,
+        hco3_mg_l=ions[..., h] * _mm(mm, "HCO3"),
+        ec_mS_per_cm=ec,
+        free_acid_mmol_l=free_acid,
+        temp_c=temp_c,
+    )
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import importlib
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+from .data_io import repo_root
+
+DEFAULT_THRESHOLD = 0.10
+
+
+def benchmarks_dir() -> Path:
+    return repo_root() / "benchmarks"
+
+
+def discover_cases(pattern: str | None = None) -> Dict[str, Callable[[], object]]:
+    """Collect `bench_*` functions from `benchmarks/bench_*.py`.
+
+    Each function does its setup and returns either the callable to time or a dict
+    of `{suffix: callable}` for parameterized cases (e.g. concurrency levels).
+    """
+    root = str(repo_root())
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+    cases: Dict[str, Callable[[], object]] = {}
+    for path in sorted(benchmarks_dir().glob("bench_*.py")):
+        module = importlib.import_module(f"benchmarks.{path.stem}")
+        group = path.stem[len("bench_"):]
+        for attr in sorted(dir(module)):
+            if not attr.startswith("bench_"):
+                continue
+            factory = getattr(module, attr)
+            if not callable(factory):
+                continue
+            base = f"{group}.{attr[len('bench_'):]}"
+            if pattern and pattern not in base:
+                continue
+            made = factory()
+            if isinstance(made, dict):
+                for suffix, func in made.items():
+                    cases[f"{base}[{suffix}]"] = func
+            else:
+                cases[base] = made
+    return cases
+
+
+def time_case(func: Callable[[], object], *, repeats: int = 5, min_time_s: float = 0.05) -> dict:
+    func()  # warmup
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time_s or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_time_s / elapsed) + 1))
+
+    per_call: List[float] = [elapsed / loops]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        per_call.append((time.perf_counter() - start) / loops)
+
+    median = statistics.median(per_call)
+    return {
+        "median_s": median,
+        "min_s": min(per_call),
+        "mean_s": statistics.fmean(per_call),
+        "stdev_s": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "loops": loops,
+        "repeats": len(per_call),
+        "ops_per_s": 0.0 if median == 0 else 1.0 / median,
+    }
+
+
+def run_benchmarks(
+    pattern: str | None = None,
+    *,
+    repeats: int = 5,
+    min_time_s: float = 0.05,
+) -> dict:
+    import numpy as np
+
+    results = {}
+    for name, func in discover_cases(pattern).items():
+        results[name] = time_case(func, repeats=repeats, min_time_s=min_time_s)
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeats": repeats,
+            "min_time_s": min_time_s,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Compare median timings; a case regresses when it is slower than baseline * (1 + threshold)."""
+    base_results = baseline.get("results") or {}
+    cur_results = current.get("results") or {}
+    cases = {}
+    regressions: List[str] = []
+    for name, cur in cur_results.items():
+        base = base_results.get(name)
+        if not base:
+            cases[name] = {"status": "new", "median_s": cur["median_s"]}
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        if ratio > 1.0 + threshold:
+            status = "regression"
+            regressions.append(name)
+        elif ratio < 1.0 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        cases[name] = {
+            "status": status,
+            "baseline_median_s": base["median_s"],
+            "median_s": cur["median_s"],
+            "ratio": ratio,
+        }
+    missing = sorted(set(base_results) - set(cur_results))
+    return {"threshold": threshold, "regressions": regressions, "missing": missing, "cases": cases}
+
+
+def load_results(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_results(path: Path, results: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def format_table(results: dict, comparison: dict | None = None) -> str:
+    lines = [f"{'case':<48} {'median':>12} {'ops/s':>12}" + ("   vs baseline" if comparison else "")]
+    for name, res in (results.get("results") or {}).items():
+        line = f"{name:<48} {res['median_s'] * 1e3:>10.3f}ms {res['ops_per_s']:>12.1f}"
+        if comparison:
+            case = comparison["cases"].get(name, {})
+            if "ratio" in case:
+                line += f"   x{case['ratio']:.2f} {case['status']}"
+            else:
+                line += f"   {case.get('status', '')}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def compare_ec_models(
+    outputs: Iterable[Path] | None = None,
+    temps_c: tuple[float, ...] = (18.0, 25.0),
+    reference: str = "mccleskey",
+    rows: int = 1000,
+    *,
+    repeats: int = 5,
+    min_time_s: float = 0.05,
+) -> dict:
+    """Speed and agreement of the registered EC models on the golden outputs.
+
+    Every model evaluates the ion compositions of `solutions/*_output.json` in one kernel
+    call; agreement is the deviation from `reference`, speed the time of one call on
+    `rows` compositions (the golden rows repeated).
+    """
+    import numpy as np
+
+    from .ec import EC_MODELS, ec_matrix, get_ec_model
+
+    get_ec_model(reference)
+    paths = sorted(outputs) if outputs is not None else sorted((repo_root() / "solutions").glob("*_output.json"))
+    if not paths:
+        raise ValueError("Keine Golden-Outputs für den EC-Modellvergleich gefunden")
+    compositions = [json.loads(path.read_text(encoding="utf-8"))["ions_mmol_per_l"] for path in paths]
+    cases = [path.name.removesuffix(".json").removesuffix("_output") for path in paths]
+    labels = sorted({label for ions in compositions for label in ions})
+    ions = np.array([[ions.get(label, 0.0) for label in labels] for ions in compositions])
+    batch = np.resize(ions, (rows, len(labels)))
+
+    ec = {name: ec_matrix(ions, labels, temps_c, name) for name in EC_MODELS}
+    models = {}
+    for name in EC_MODELS:
+        deviation = ec[name] - ec[reference]
+        timing = time_case(
+            lambda name=name: ec_matrix(batch, labels, temps_c, name), repeats=repeats, min_time_s=min_time_s
+        )
+        models[name] = {
+            "ec_mS_per_cm": {
+                case: {f"{temp_c:.1f}": float(value) for temp_c, value in zip(temps_c, row)}
+                for case, row in zip(cases, ec[name])
+            },
+            "max_abs_diff_mS_per_cm": float(np.max(np.abs(deviation))),
+            "max_rel_diff": float(np.max(np.abs(deviation) / ec[reference])),
+            "us_per_row": timing["median_s"] / rows * 1e6,
+            "timing": timing,
+        }
+    return {"reference": reference, "temps_c": list(temps_c), "cases": cases, "rows": rows, "models": models}
+
+
+def format_ec_models(report: dict) -> str:
+    temp_key = f"{report['temps_c'][-1]:.1f}"
+    lines = [
+        f"{'model':<14} {'µs/row':>10} {'max Δ vs ' + report['reference']:>22}   "
+        + "   ".join(f"EC{temp_key} {case}" for case in report["cases"])
+    ]
+    for name, model in report["models"].items():
+        values = "   ".join(
+            f"{model['ec_mS_per_cm'][case][temp_key]:>{len(case) + 7}.4f}" for case in report["cases"]
+        )
+        lines.append(
+            f"{name:<14} {model['us_per_row']:>10.3f} {model['max_rel_diff'] * 100:>21.2f}%   {values}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Iterable[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="horticalc bench",
+        description="Horticalc Benchmarks – core, EC, solver, I/O and API throughput",
+    )
+    parser.add_argument("-k", "--filter", help="Nur Cases, deren Name diesen Text enthält", default=None)
+    parser.add_argument("--repeats", type=int, default=5, help="Wiederholungen pro Case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Mindestlaufzeit pro Wiederholung (s)")
+    parser.add_argument("--out", default=None, help="Ergebnisse als JSON‑Baseline speichern")
+    parser.add_argument("--compare", default=None, help="Gegen eine gespeicherte JSON‑Baseline vergleichen")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative Verlangsamung, ab der ein Case als Regression gilt (0.10 = 10%%)",
+    )
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON statt Tabelle ausgeben")
+    parser.add_argument(
+        "--ec-models",
+        action="store_true",
+        help="EC-Modelle vergleichen: Laufzeit und Abweichung auf den Golden-Outputs (solutions/)",
+    )
+    args = parser.parse_args(list(argv))
+
+    if args.ec_models:
+        report = compare_ec_models(repeats=args.repeats, min_time_s=args.min_time)
+        print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_ec_models(report))
+        return 0
+
+    results = run_benchmarks(args.filter, repeats=args.repeats, min_time_s=args.min_time)
+    comparison = None
+    if args.compare:
+        comparison = compare_results(load_results(Path(args.compare)), results, args.threshold)
+
+    if args.json:
+        payload = dict(results)
+        if comparison is not None:
+            payload["comparison"] = comparison
+        print(json.dumps(payload, indent=2, ensure_ascii=False))
+    else:
+        print(format_table(results, comparison))
+        if comparison and comparison["regressions"]:
+            print(f"\nRegressionen (> {args.threshold:.0%}): " + ", ".join(comparison["regressions"]))
+
+    if args.out:
+        save_results(Path(args.out).expanduser().resolve(), results)
+
+    return 1 if comparison and comparison["regressions"] else 0
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+import yaml
+
+from . import telemetry
+from .core import ELEMENT_INDEX, WATER_PROFILE_KEYS, _compute_solution_state, water_forms_matrix
+from .data_io import DocumentStore, load_molar_masses, open_store, water_profile_from_data
+
+# ½ε‖f‖² turns the linear blend problem into a strictly convex QP and decides between
+# otherwise equal blends (spread evenly); the minimised fraction can be off the LP
+# optimum by O(ε)
+_REGULARIZATION = 1e-6
+
+
+class BlendSources:
+    """Water sources as matrices: normalized forms and element mg/L, one row per source.
+
+    Blends are linear in the volume fractions, so any number of candidate blends (rows of
+    a fractions matrix) is evaluated with one matrix product.
+    """
+
+    def __init__(self, names: Sequence[str], profiles: Sequence[Mapping[str, float]], mm: Dict[str, float]) -> None:
+        if not names:
+            raise ValueError("Mindestens eine Wasserquelle angeben")
+        if len(set(names)) != len(names):
+            raise ValueError("Wasserquellen brauchen eindeutige Namen")
+        self.names = list(names)
+        self.forms = water_forms_matrix(mm, profiles)
+        self.elements = np.zeros((len(names), len(ELEMENT_INDEX)))
+        for row, forms in enumerate(self.forms):
+            water_forms = {key: float(value) for key, value in zip(WATER_PROFILE_KEYS, forms) if value}
+            elements, *_ = _compute_solution_state(mm, {}, water_forms, False, "H2PO4")
+            self.elements[row] = np.nan_to_num(ELEMENT_INDEX.pack(elements))
+
+    def evaluate(self, fractions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(forms, elements) in mg/L for each row of `fractions` (candidates x sources)."""
+        fractions = np.atleast_2d(np.asarray(fractions, dtype=float))
+        return fractions @ self.forms, fractions @ self.elements
+
+    def feasible(
+        self,
+        fractions: np.ndarray,
+        max_mg_per_l: Mapping[str, float] | None = None,
+        min_mg_per_l: Mapping[str, float] | None = None,
+        tol: float = 1e-9,
+    ) -> np.ndarray:
+        """Boolean mask of the candidate rows that keep all element limits."""
+        _, elements = self.evaluate(fractions)
+        ok = np.ones(len(elements), dtype=bool)
+        for key, limit in (max_mg_per_l or {}).items():
+            ok &= elements[:, _element_position(key)] <= float(limit) + tol
+        for key, limit in (min_mg_per_l or {}).items():
+            ok &= elements[:, _element_position(key)] >= float(limit) - tol
+        return ok
+
+
+@dataclass
+class BlendResult:
+    fractions: Dict[str, float]
+    mg_per_l: Dict[str, float]
+    elements_mg_l: Dict[str, float]
+    minimized: List[str]
+    minimized_fraction: float
+    binding: List[dict]
+
+    def to_dict(self) -> dict:
+        return {
+            "fractions": self.fractions,
+            "mg_per_l": self.mg_per_l,
+            "elements_mg_per_l": self.elements_mg_l,
+            "minimized": self.minimized,
+            "minimized_fraction": self.minimized_fraction,
+            "binding": self.binding,
+        }
+
+
+def _element_position(key: str) -> int:
+    pos = ELEMENT_INDEX.positions.get(key)
+    if pos is None:
+        raise KeyError(f"Unbekanntes Element in den Wassergrenzen: '{key}' (erwartet: {', '.join(ELEMENT_INDEX.labels)})")
+    return pos
+
+
+def optimize_blend(
+    sources: BlendSources,
+    *,
+    max_mg_per_l: Mapping[str, float] | None = None,
+    min_mg_per_l: Mapping[str, float] | None = None,
+    minimize: Sequence[str] | None = None,
+    max_fraction: Mapping[str, float] | None = None,
+) -> BlendResult:
+    """Volume fractions with the smallest share of the `minimize` sources that keep the limits.
+
+    `minimize` defaults to the sources without any ions (RO/distilled water). The LP is
+    solved as a QP with a small ridge (`_REGULARIZATION`) by the active-set method of the
+    solver, so the optimum is approximate to O(1e-6); infeasible limits raise ValueError.
+    """
+    from .solver import _active_set_qp
+
+    names = sources.names
+    n = len(names)
+    max_mg_per_l = {str(k): float(v) for k, v in (max_mg_per_l or {}).items()}
+    min_mg_per_l = {str(k): float(v) for k, v in (min_mg_per_l or {}).items()}
+    max_fraction = {str(k): float(v) for k, v in (max_fraction or {}).items()}
+    if minimize is None:
+        minimize = [name for name, row in zip(names, sources.forms) if not row.any()]
+    for name in list(minimize) + list(max_fraction):
+        if name not in names:
+            raise KeyError(f"Unbekannte Wasserquelle: '{name}'")
+
+    rows: List[np.ndarray] = []
+    d: List[float] = []
+    labels: List[dict] = []
+    for key, limit in max_mg_per_l.items():
+        rows.append(sources.elements[:, _element_position(key)])
+        d.append(limit)
+        labels.append({"type": "max_mg_per_l", "element": key, "limit": limit})
+    for key, limit in min_mg_per_l.items():
+        rows.append(-sources.elements[:, _element_position(key)])
+        d.append(-limit)
+        labels.append({"type": "min_mg_per_l", "element": key, "limit": limit})
+    for name, limit in max_fraction.items():
+        rows.append(np.eye(n)[names.index(name)])
+        d.append(limit)
+        labels.append({"type": "max_fraction", "source": name, "limit": limit})
+    rows.extend([np.ones(n), -np.ones(n)])
+    d.extend([1.0, -1.0])
+    labels.extend([{"type": "total"}, {"type": "total"}])
+    rows.extend(-np.eye(n))
+    d.extend([0.0] * n)
+    labels.extend({"type": "nonnegative", "source": name} for name in names)
+
+    cost = np.array([1.0 if name in minimize else 0.0 for name in names])
+    with telemetry.stage("water.blend", sources=n, limits=len(max_mg_per_l) + len(min_mg_per_l)):
+        try:
+            result = _active_set_qp(_REGULARIZATION * np.eye(n), cost, np.vstack(rows), np.array(d))
+        except ValueError as exc:
+            raise ValueError("Keine Mischung der Wasserquellen erfüllt die Grenzen") from exc
+    fractions = np.clip(result.x, 0.0, None)
+    fractions[fractions < 1e-9] = 0.0
+    fractions /= fractions.sum()
+
+    forms, elements = sources.evaluate(fractions)
+    binding = [dict(labels[j]) for j in sorted(result.active) if labels[j]["type"] not in ("total", "nonnegative")]
+    return BlendResult(
+        fractions=dict(zip(names, fractions.tolist())),
+        mg_per_l={key: float(value) for key, value in zip(WATER_PROFILE_KEYS, forms[0]) if value != 0.0},
+        elements_mg_l={key: float(value) for key, value in zip(ELEMENT_INDEX.labels, elements[0]) if value != 0.0},
+        minimized=list(minimize),
+        minimized_fraction=float(cost @ fractions),
+        binding=binding,
+    )
+
+
+def load_sources(entries: Sequence[str | Mapping], store: DocumentStore | None = None) -> tuple[List[str], List[dict]]:
+    """Source names and mg/L profiles; plain strings are water profiles from the store.
+
+    Only `mg_per_l` of a stored profile is used: its `osmosis_percent` describes a mix,
+    while RO water is a source of its own here.
+    """
+    names: List[str] = []
+    profiles: List[dict] = []
+    for entry in entries:
+        if isinstance(entry, str):
+            store = store or open_store()
+            profile = water_profile_from_data(store.get("water_profiles", entry), entry)
+            names.append(entry)
+            profiles.append(profile["mg_per_l"])
+        else:
+            if not entry.get("name"):
+                raise ValueError("Wasserquelle ohne Namen")
+            names.append(str(entry["name"]))
+            profiles.append({str(k): float(v) for k, v in (entry.get("mg_per_l") or {}).items()})
+    return names, profiles
+
+
+def blend_from_config(config: Mapping, *, mm: Dict[str, float] | None = None, store: DocumentStore | None = None) -> BlendResult:
+    names, profiles = load_sources(list(config.get("sources") or []), store)
+    sources = BlendSources(names, profiles, mm or load_molar_masses())
+    return optimize_blend(
+        sources,
+        max_mg_per_l=config.get("max_mg_per_l"),
+        min_mg_per_l=config.get("min_mg_per_l"),
+        minimize=config.get("minimize"),
+        max_fraction=config.get("max_fraction"),
+    )
+
+
+def blend_file(path: Path) -> BlendResult:
+    with path.open("r", encoding="utf-8") as f, telemetry.stage("io.yaml_load"):
+        config = yaml.safe_load(f) or {}
+    return blend_from_config(config)
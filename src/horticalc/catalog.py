@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+from . import telemetry
+from .data_io import COMP_COLS, Fertilizer, load_fertilizers, repo_root
+
+CATALOG_ENV = "HORTICALC_CATALOG_DB"
+
+# Nutrient names accepted by `contains`: the COMP_COLS themselves plus element symbols.
+NUTRIENT_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    **{col: (col,) for col in COMP_COLS},
+    "N": ("NH4", "NO3", "Ur-N"),
+    "P": ("P2O5",),
+    "K": ("K2O",),
+    "Ca": ("CaO",),
+    "Mg": ("MgO",),
+    "Na": ("Na2O",),
+    "S": ("SO4",),
+    "Si": ("SiO2",),
+    "C": ("CO3", "HCO3"),
+}
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fertilizers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    name_lower TEXT NOT NULL,
+    form TEXT NOT NULL,
+    weight_factor REAL NOT NULL,
+    {", ".join(f'"{col}" REAL NOT NULL DEFAULT 0' for col in COMP_COLS)},
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_fertilizers_name_lower ON fertilizers (name_lower);
+""" + "".join(
+    f'CREATE INDEX IF NOT EXISTS idx_fertilizers_comp_{idx} ON fertilizers ("{col}");\n'
+    for idx, col in enumerate(COMP_COLS)
+)
+
+_COMP_SQL = ", ".join(f'"{col}"' for col in COMP_COLS)
+_COLUMNS = f"name, form, weight_factor, {_COMP_SQL}, extra"
+
+# SQLite's default limit on bound parameters is 999 in older builds.
+_MAX_PARAMS = 900
+
+
+def resolve_nutrient(name: str) -> Tuple[str, ...]:
+    cols = NUTRIENT_COLUMNS.get(name.strip())
+    if cols is None:
+        raise ValueError(f"Unbekannter Nährstoff '{name}' (erwartet: {', '.join(NUTRIENT_COLUMNS)})")
+    return cols
+
+
+def _check_column(col: str) -> str:
+    if col not in COMP_COLS:
+        raise ValueError(f"Unbekannte Nährstoffspalte '{col}' (erwartet: {', '.join(COMP_COLS)})")
+    return col
+
+
+def import_csv(db_path: Path, csv_path: Path | None = None) -> int:
+    """(Re)build the SQLite catalog at `db_path` from a fertilizers CSV; returns the row count."""
+    if csv_path is None:
+        csv_path = repo_root() / "data" / "fertilizers.csv"
+    ferts = load_fertilizers(csv_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for fert in ferts.values():
+        values = [0.0] * len(COMP_COLS)
+        for pos, frac in zip(fert.comp_index.tolist(), fert.comp_values.tolist()):
+            values[pos] = frac
+        extra = json.dumps(dict(fert.extra), ensure_ascii=False) if fert.extra else None
+        rows.append((fert.name, fert.name.lower(), fert.form, float(fert.weight_factor), *values, extra))
+
+    placeholders = ", ".join("?" for _ in range(len(COMP_COLS) + 5))
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.executescript(_SCHEMA)
+            conn.execute("DELETE FROM fertilizers")
+            conn.executemany(
+                f"INSERT INTO fertilizers (name, name_lower, form, weight_factor, {_COMP_SQL}, extra) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (str(csv_path),))
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def _row_to_fertilizer(row: Sequence) -> Fertilizer:
+    name, form, weight = row[0], row[1], row[2]
+    comp: Dict[str, float] = {col: value for col, value in zip(COMP_COLS, row[3:3 + len(COMP_COLS)]) if value}
+    extra = row[3 + len(COMP_COLS)]
+    if extra:
+        comp.update(json.loads(extra))
+    return Fertilizer(name=name, form=form, weight_factor=weight, comp=comp)
+
+
+class FertilizerCatalog(Mapping[str, Fertilizer]):
+    """Read-only fertilizer mapping backed by an SQLite catalog.
+
+    Fertilizers are loaded on lookup and kept in a bounded LRU cache, so a recipe or
+    solve only touches the rows it references. Use `import_csv` to build the file.
+    """
+
+    def __init__(self, db_path: Path, cache_size: int = 4096) -> None:
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Dünger-Katalog nicht gefunden: {self.db_path}")
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Fertilizer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"{self.db_path.as_uri()}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, fert: Fertilizer) -> None:
+        with self._lock:
+            self._cache[fert.name] = fert
+            self._cache.move_to_end(fert.name)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached(self, name: str) -> Fertilizer | None:
+        with self._lock:
+            fert = self._cache.get(name)
+            if fert is not None:
+                self._cache.move_to_end(name)
+        telemetry.inc("horticalc_cache_total", cache="catalog", result="hit" if fert is not None else "miss")
+        return fert
+
+    def __getitem__(self, name: str) -> Fertilizer:
+        fert = self._cached(name)
+        if fert is not None:
+            return fert
+        with telemetry.stage("catalog.get"):
+            row = self._conn().execute(f"SELECT {_COLUMNS} FROM fertilizers WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        fert = _row_to_fertilizer(row)
+        self._remember(fert)
+        return fert
+
+    def __contains__(self, name: object) -> bool:
+        if not isinstance(name, str):
+            return False
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, Fertilizer]:
+        """Load several fertilizers at once; unknown names are left out."""
+        wanted = list(dict.fromkeys(str(name) for name in names))
+        found: Dict[str, Fertilizer] = {}
+        missing = []
+        for name in wanted:
+            fert = self._cached(name)
+            if fert is None:
+                missing.append(name)
+            else:
+                found[name] = fert
+        with telemetry.stage("catalog.get_many", names=len(missing)):
+            for start in range(0, len(missing), _MAX_PARAMS):
+                chunk = missing[start:start + _MAX_PARAMS]
+                rows = self._conn().execute(
+                    f"SELECT {_COLUMNS} FROM fertilizers WHERE name IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    fert = _row_to_fertilizer(row)
+                    self._remember(fert)
+                    found[fert.name] = fert
+        return {name: found[name] for name in wanted if name in found}
+
+    def __iter__(self) -> Iterator[str]:
+        rows = self._conn().execute("SELECT name FROM fertilizers ORDER BY id").fetchall()
+        return iter([row[0] for row in rows])
+
+    def __len__(self) -> int:
+        return int(self._conn().execute("SELECT COUNT(*) FROM fertilizers").fetchone()[0])
+
+    def values(self):  # type: ignore[override]
+        with telemetry.stage("catalog.scan"):
+            rows = self._conn().execute(f"SELECT {_COLUMNS} FROM fertilizers ORDER BY id").fetchall()
+        return [_row_to_fertilizer(row) for row in rows]
+
+    def search(
+        self,
+        *,
+        q: str | None = None,
+        contains: Sequence[str] = (),
+        minimums: Mapping[str, float] | None = None,
+        maximums: Mapping[str, float] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[Fertilizer]]:
+        where: List[str] = []
+        params: List[object] = []
+        if q:
+            escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("name_lower LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        for nutrient in contains:
+            cols = resolve_nutrient(nutrient)
+            where.append("(" + " OR ".join(f'"{col}" > 0' for col in cols) + ")")
+        for col, value in (minimums or {}).items():
+            where.append(f'"{_check_column(col)}" >= ?')
+            params.append(float(value))
+        for col, value in (maximums or {}).items():
+            where.append(f'"{_check_column(col)}" <= ?')
+            params.append(float(value))
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        conn = self._conn()
+        with telemetry.stage("catalog.search"):
+            total = int(conn.execute(f"SELECT COUNT(*) FROM fertilizers{clause}", params).fetchone()[0])
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM fertilizers{clause} ORDER BY id LIMIT ? OFFSET ?",
+                [*params, -1 if limit is None else int(limit), int(offset)],
+            ).fetchall()
+        return total, [_row_to_fertilizer(row) for row in rows]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def search_fertilizers(
+    source: Mapping[str, Fertilizer],
+    *,
+    q: str | None = None,
+    contains: Sequence[str] = (),
+    minimums: Mapping[str, float] | None = None,
+    maximums: Mapping[str, float] | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> Tuple[int, List[Fertilizer]]:
+    """Filter and page fertilizers; returns `(total matches, page)`.
+
+    Uses indexed SQL for a `FertilizerCatalog` and a linear scan for plain dicts.
+    """
+    if isinstance(source, FertilizerCatalog):
+        return source.search(q=q, contains=contains, minimums=minimums, maximums=maximums, limit=limit, offset=offset)
+
+    contains_cols = [resolve_nutrient(nutrient) for nutrient in contains]
+    minimums = {_check_column(col): float(v) for col, v in (minimums or {}).items()}
+    maximums = {_check_column(col): float(v) for col, v in (maximums or {}).items()}
+    needle = q.lower() if q else None
+
+    if not (needle or contains_cols or minimums or maximums):
+        matches = list(source.values())
+        end = None if limit is None else offset + limit
+        return len(matches), matches[offset:end]
+
+    matches: List[Fertilizer] = []
+    for fert in source.values():
+        if needle and needle not in fert.name.lower():
+            continue
+        comp = dict(fert.components())
+        if any(not any(comp.get(col, 0.0) > 0 for col in cols) for cols in contains_cols):
+            continue
+        if any(comp.get(col, 0.0) < value for col, value in minimums.items()):
+            continue
+        if any(comp.get(col, 0.0) > value for col, value in maximums.items()):
+            continue
+        matches.append(fert)
+    end = None if limit is None else offset + limit
+    return len(matches), matches[offset:end]
+
+
+def fertilizer_source() -> Mapping[str, Fertilizer]:
+    """The SQLite catalog from `HORTICALC_CATALOG_DB` if set, else `data/fertilizers.csv`."""
+    db_path = os.environ.get(CATALOG_ENV)
+    if db_path:
+        return FertilizerCatalog(Path(db_path).expanduser().resolve())
+    return load_fertilizers()
+
+
+def _parse_bounds(items: Sequence[str]) -> Dict[str, float]:
+    bounds: Dict[str, float] = {}
+    for item in items:
+        col, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Erwartet SPALTE=WERT, erhalten: '{item}'")
+        bounds[col.strip()] = float(value)
+    return bounds
+
+
+def main(argv: Iterable[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="horticalc catalog", description="Horticalc Dünger-Katalog (SQLite)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Katalog aus einer Dünger-CSV (neu) aufbauen")
+    imp.add_argument("db", help="Pfad der SQLite-Datei")
+    imp.add_argument("--csv", default=None, help="Dünger-CSV, Default: data/fertilizers.csv")
+
+    search = sub.add_parser("search", help="Katalog durchsuchen")
+    search.add_argument("db", help="Pfad der SQLite-Datei")
+    search.add_argument("-q", default=None, help="Teilstring im Düngernamen")
+    search.add_argument("--contains", action="append", default=[], help="Nährstoff enthalten, z.B. Mg oder K2O")
+    search.add_argument("--min", action="append", default=[], help="Mindestanteil, z.B. K2O=0.2")
+    search.add_argument("--max", action="append", default=[], help="Höchstanteil, z.B. Cl=0.01")
+    search.add_argument("--limit", type=int, default=50)
+    search.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args(list(argv))
+
+    db_path = Path(args.db).expanduser().resolve()
+    if args.command == "import":
+        csv_path = Path(args.csv).expanduser().resolve() if args.csv else None
+        count = import_csv(db_path, csv_path)
+        print(f"{count} Dünger nach {db_path} importiert")
+        return 0
+
+    catalog = FertilizerCatalog(db_path)
+    total, page = catalog.search(
+        q=args.q,
+        contains=args.contains,
+        minimums=_parse_bounds(args.min),
+        maximums=_parse_bounds(args.max),
+        limit=args.limit,
+        offset=args.offset,
+    )
+    print(json.dumps(
+        {"total": total, "fertilizers": [{"name": f.name, "form": f.form, "comp": dict(f.comp)} for f in page]},
+        indent=2,
+        ensure_ascii=False,
+    ))
+    return 0
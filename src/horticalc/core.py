@@ -2,29 +2,25 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Mapping, Sequence, Tuple
 
+import numpy as np
+
+from . import telemetry
 from .data_io import (
+    COMP_COLS,
     Fertilizer,
-    load_fertilizers,
     load_molar_masses,
     load_recipe,
     load_water_profile_data,
     repo_root,
 )
+from .labeled import LabeledView, LabelIndex, stack_blocks
 from .sluijsmann import compute_sluijsmann
 
+if TYPE_CHECKING:
+    from .acid import AcidDose
 
-COMP_COLS: List[str] = [
-    # N forms (as element N fraction in fertilizers)
-    "NH4", "NO3", "Ur-N",
-    # oxides
-    "P2O5", "K2O", "CaO", "MgO", "Na2O",
-    # anions / other
-    "SO4", "Cl", "CO3", "HCO3", "SiO2",
-    # trace elements
-    "Fe", "Mn", "Cu", "Zn", "B", "Mo",
-]
 
 OXIDE_FORM_COLS: List[str] = [
     "P2O5",
@@ -201,6 +197,34 @@ def apply_osmosis_mix(water_mg_l: Dict[str, float], osmosis_percent: float) -> D
     return {k: float(v) * factor for k, v in water_mg_l.items()}
 
 
+def water_forms_matrix(mm: Dict[str, float], profiles: Sequence[Mapping[str, float]]) -> np.ndarray:
+    """(profiles x WATER_PROFILE_KEYS) matrix of normalized water forms in mg/L."""
+    matrix = np.zeros((len(profiles), len(WATER_PROFILE_KEYS)))
+    for row, profile in enumerate(profiles):
+        normalized = normalize_water_profile(mm, dict(profile))
+        matrix[row] = [normalized.get(key, 0.0) for key in WATER_PROFILE_KEYS]
+    return matrix
+
+
+def blend_water_profiles(
+    mm: Dict[str, float],
+    profiles: Sequence[Mapping[str, float]],
+    fractions: Sequence[float],
+) -> Dict[str, float]:
+    """Mix water profiles by volume fractions (summing to 1).
+
+    Every profile is normalized first, so sources that declare hardness as KH, CaCO3 or
+    HCO3 mix correctly. `apply_osmosis_mix` is the two-source case with an empty RO profile.
+    """
+    weights = np.asarray(fractions, dtype=float)
+    if weights.shape != (len(profiles),):
+        raise ValueError("Für jedes Wasserprofil wird genau ein Anteil gebraucht")
+    if np.any(weights < 0) or abs(float(weights.sum()) - 1.0) > 1e-9:
+        raise ValueError("Mischungsanteile müssen >= 0 sein und sich zu 1 summieren")
+    blended = weights @ water_forms_matrix(mm, profiles)
+    return {key: float(value) for key, value in zip(WATER_PROFILE_KEYS, blended) if value != 0.0}
+
+
 def _compute_nitrogen(
     mm: Dict[str, float],
     forms_mg_l: Dict[str, float],
@@ -248,6 +272,8 @@ def _compute_oxides_and_elements(
 
     for form in OXIDE_FORM_COLS:
         oxides[form] = forms_mg_l.get(form, 0.0) + water_forms.get(form, 0.0)
+    # negative HCO3 is acid beyond the alkalinity (free H+, see `_compute_ions`)
+    oxides["HCO3"] = max(oxides["HCO3"], 0.0)
 
     # Oxides from fertilizers
     for ox in OXIDE_ELEMENT_FORMS:
@@ -264,7 +290,7 @@ def _compute_oxides_and_elements(
             elements[el] = elements.get(el, 0.0) + val
 
     hco3_mg_l = forms_mg_l.get("HCO3", 0.0) + water_forms.get("HCO3", 0.0)
-    if hco3_mg_l:
+    if hco3_mg_l > 0:
         elements["HCO3"] = elements.get("HCO3", 0.0) + hco3_mg_l
 
     return oxides
@@ -337,84 +363,369 @@ def _compute_ions(
         add_ion("Cl-", cl_mg_l, "Cl", charge=-1)
 
     hco3_mg_l = forms_mg_l.get("HCO3", 0.0) + water_forms.get("HCO3", 0.0)
-    if hco3_mg_l:
+    if hco3_mg_l > 0:
         add_ion("HCO3-", hco3_mg_l, "HCO3", charge=-1)
+    elif hco3_mg_l < 0:
+        # acid (negative HCO3) beyond the alkalinity stays as free H+
+        free_h = -hco3_mg_l / _mm(mm, "HCO3")
+        ions_mmol["H+"] = free_h
+        ions_meq["H+"] = free_h
     co3_mg_l = forms_mg_l.get("CO3", 0.0) + water_forms.get("CO3", 0.0)
     if co3_mg_l:
         add_ion("CO3^2-", co3_mg_l, "CO3", charge=-2)
 
-    cations_sum = sum(v for v in ions_meq.values() if v > 0)
-    anions_sum = -sum(v for v in ions_meq.values() if v < 0)
+    return ions_mmol, ions_meq, _ion_balance(ions_meq)
+
+
+# ion labels whose amounts `speciate` redistributes (phosphate and carbonate)
+SPECIATED_IONS: tuple[str, ...] = ("H2PO4-", "HPO4^2-", "PO4^3-", "HCO3-", "CO3^2-")
+
+
+def _speciate_ions(
+    ions_list: Sequence[Dict[str, float]], ph: float, temp_c: float = 25.0, ion_pairs: bool = False
+) -> tuple[List[Dict[str, float]], List[Dict[str, float]], dict]:
+    """pH speciation of several ion states in one batch: mmol/L and meq/L dicts per state.
+
+    The summary (ionic strength, activity coefficients, neutral H3PO4/CO2) is that of the
+    first state. With `ion_pairs` the split is solved on the ionic strength left after
+    CaSO4°/MgSO4° pairing; Ca, Mg and SO4 stay totals in the returned dicts.
+    """
+    from .speciation import label_charges, speciate
+
+    labels = ION_INDEX.labels
+    nominal = np.nan_to_num(np.vstack([ION_INDEX.pack(ions) for ions in ions_list]))
+    result = speciate(nominal, labels, ph, temp_c, ion_pairs=ion_pairs)
+    positions = ION_INDEX.positions
+    charges = dict(zip(labels, label_charges(labels).tolist()))
+    mmol_out: List[Dict[str, float]] = []
+    meq_out: List[Dict[str, float]] = []
+    for row, ions in enumerate(ions_list):
+        mmol = {label: value for label, value in ions.items() if label not in SPECIATED_IONS}
+        for label in SPECIATED_IONS:
+            value = float(result.ions_mmol_per_l[row, positions[label]])
+            if value > 0:
+                mmol[label] = value
+        mmol_out.append(mmol)
+        meq_out.append({label: value * charges[label] for label, value in mmol.items()})
+    return mmol_out, meq_out, {"ph": ph, "temp_c": temp_c, **result.summary(0)}
+
+
+def _ion_balance(ions_meq: Dict[str, float]) -> Dict[str, float]:
+    # float start values: an empty balance is 0.0 like every other block value
+    cations_sum = sum((v for v in ions_meq.values() if v > 0), 0.0)
+    anions_sum = -sum((v for v in ions_meq.values() if v < 0), 0.0)
     denom = (cations_sum + anions_sum)
     err_signed = 0.0 if denom == 0 else (cations_sum - anions_sum) / denom * 100.0
     err_abs = abs(err_signed)
 
-    ion_balance = {
+    return {
         "cations_meq_per_l": cations_sum,
         "anions_meq_per_l": anions_sum,
         "error_percent_signed": err_signed,
         "error_percent_abs": err_abs,
     }
 
-    return ions_mmol, ions_meq, ion_balance
+
+ELEMENT_INDEX = LabelIndex(
+    (
+        "N_total", "N_NH4", "N_NO3", "N_UREA",
+        "P", "K", "Ca", "Mg", "Na",
+        "S", "C", "Si", "Cl", "Fe", "Mn", "Cu", "Zn", "B", "Mo",
+        "HCO3",
+    )
+)
+OXIDE_INDEX = LabelIndex((*OXIDE_FORM_COLS, "N_total"))
+ION_INDEX = LabelIndex(
+    (
+        "NH4+", "K+", "Ca+2", "Mg+2", "Na+", "H+",
+        "NO3-", "H2PO4-", "HPO4^2-", "PO4^3-", "SO4^2-", "Cl-", "HCO3-", "CO3^2-",
+    )
+)
+ION_BALANCE_INDEX = LabelIndex(
+    ("cations_meq_per_l", "anions_meq_per_l", "error_percent_signed", "error_percent_abs")
+)
+
+
+class _Block:
+    """Descriptor exposing one packed float64 block as a read-only `LabeledView`."""
+
+    def __init__(self, index: LabelIndex) -> None:
+        self.index = index
+        self.slot = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.slot = f"_{name}"
+
+    def __get__(self, obj: object, owner: type | None = None):
+        if obj is None:
+            return self
+        return LabeledView(self.index, getattr(obj, self.slot))
+
+
+def _pack(index: LabelIndex, values: Mapping[str, float] | np.ndarray) -> np.ndarray:
+    if isinstance(values, np.ndarray):
+        if values.shape != (len(index),):
+            raise ValueError(f"Block array must have shape ({len(index)},), got {values.shape}")
+        return values
+    if isinstance(values, LabeledView) and values.index is index:
+        return values.values
+    return index.pack(values)
 
 
-@dataclass
 class CalcResult:
-    liters: float
-    elements_mg_l: Dict[str, float]
-    oxides_mg_l: Dict[str, float]
-    ions_mmol_l: Dict[str, float]
-    ions_meq_l: Dict[str, float]
-    ion_balance: Dict[str, float]
-    fertilizer_elements_mg_l: Dict[str, float]
-    fertilizer_oxides_mg_l: Dict[str, float]
-    fertilizer_ions_mmol_l: Dict[str, float]
-    fertilizer_ions_meq_l: Dict[str, float]
-    fertilizer_ion_balance: Dict[str, float]
-    ec_fertilizer: Dict[str, object]
-    water_elements_mg_l: Dict[str, float]
-    water_oxides_mg_l: Dict[str, float]
-    water_ions_mmol_l: Dict[str, float]
-    water_ions_meq_l: Dict[str, float]
-    water_ion_balance: Dict[str, float]
-    ec_water: Dict[str, object]
-    sluijsmann: Dict[str, float | dict]
-    osmosis_percent: float
+    """Nutrient Solution result with one float64 array per block.
+
+    The `*_mg_l`, `*_ions_*` and `*_ion_balance` attributes are read-only dict-like
+    views; labels absent from a block (NaN) behave like missing dict keys.
+    """
+
+    elements_mg_l = _Block(ELEMENT_INDEX)
+    oxides_mg_l = _Block(OXIDE_INDEX)
+    ions_mmol_l = _Block(ION_INDEX)
+    ions_meq_l = _Block(ION_INDEX)
+    ion_balance = _Block(ION_BALANCE_INDEX)
+    fertilizer_elements_mg_l = _Block(ELEMENT_INDEX)
+    fertilizer_oxides_mg_l = _Block(OXIDE_INDEX)
+    fertilizer_ions_mmol_l = _Block(ION_INDEX)
+    fertilizer_ions_meq_l = _Block(ION_INDEX)
+    fertilizer_ion_balance = _Block(ION_BALANCE_INDEX)
+    water_elements_mg_l = _Block(ELEMENT_INDEX)
+    water_oxides_mg_l = _Block(OXIDE_INDEX)
+    water_ions_mmol_l = _Block(ION_INDEX)
+    water_ions_meq_l = _Block(ION_INDEX)
+    water_ion_balance = _Block(ION_BALANCE_INDEX)
+
+    BLOCKS: tuple[str, ...] = (
+        "elements_mg_l",
+        "oxides_mg_l",
+        "ions_mmol_l",
+        "ions_meq_l",
+        "ion_balance",
+        "fertilizer_elements_mg_l",
+        "fertilizer_oxides_mg_l",
+        "fertilizer_ions_mmol_l",
+        "fertilizer_ions_meq_l",
+        "fertilizer_ion_balance",
+        "water_elements_mg_l",
+        "water_oxides_mg_l",
+        "water_ions_mmol_l",
+        "water_ions_meq_l",
+        "water_ion_balance",
+    )
+
+    __slots__ = (
+        "liters",
+        "ec_fertilizer",
+        "ec_water",
+        "sluijsmann",
+        "osmosis_percent",
+        "acid",
+        "speciation",
+        "ec_model",
+        "precipitation",
+        *(f"_{name}" for name in BLOCKS),
+    )
+
+    def __init__(
+        self,
+        liters: float,
+        elements_mg_l: Mapping[str, float] | np.ndarray,
+        oxides_mg_l: Mapping[str, float] | np.ndarray,
+        ions_mmol_l: Mapping[str, float] | np.ndarray,
+        ions_meq_l: Mapping[str, float] | np.ndarray,
+        ion_balance: Mapping[str, float] | np.ndarray,
+        fertilizer_elements_mg_l: Mapping[str, float] | np.ndarray,
+        fertilizer_oxides_mg_l: Mapping[str, float] | np.ndarray,
+        fertilizer_ions_mmol_l: Mapping[str, float] | np.ndarray,
+        fertilizer_ions_meq_l: Mapping[str, float] | np.ndarray,
+        fertilizer_ion_balance: Mapping[str, float] | np.ndarray,
+        ec_fertilizer: Dict[str, object],
+        water_elements_mg_l: Mapping[str, float] | np.ndarray,
+        water_oxides_mg_l: Mapping[str, float] | np.ndarray,
+        water_ions_mmol_l: Mapping[str, float] | np.ndarray,
+        water_ions_meq_l: Mapping[str, float] | np.ndarray,
+        water_ion_balance: Mapping[str, float] | np.ndarray,
+        ec_water: Dict[str, object],
+        sluijsmann: Dict[str, float | dict],
+        osmosis_percent: float,
+        acid: Dict[str, object] | None = None,
+        speciation: Dict[str, object] | None = None,
+        ec_model: str = "mccleskey",
+        precipitation: Dict[str, object] | None = None,
+    ) -> None:
+        self.liters = liters
+        self.ec_fertilizer = ec_fertilizer
+        self.ec_water = ec_water
+        self.sluijsmann = sluijsmann
+        self.osmosis_percent = osmosis_percent
+        self.acid = acid
+        self.speciation = speciation
+        self.ec_model = ec_model
+        self.precipitation = precipitation
+        values = locals()
+        for name in self.BLOCKS:
+            block: _Block = getattr(type(self), name)
+            setattr(self, block.slot, _pack(block.index, values[name]))
+
+    def block_array(self, name: str) -> np.ndarray:
+        """Raw (read-only) float64 array of a block; absent labels are NaN."""
+        if name not in self.BLOCKS:
+            raise KeyError(f"Unknown CalcResult block: {name}")
+        return getattr(self, f"_{name}")
+
+    @classmethod
+    def block_labels(cls, name: str) -> tuple[str, ...]:
+        if name not in cls.BLOCKS:
+            raise KeyError(f"Unknown CalcResult block: {name}")
+        return getattr(cls, name).index.labels
+
+    def __repr__(self) -> str:
+        return f"CalcResult(liters={self.liters!r}, elements_mg_l={self.elements_mg_l.to_dict()!r}, ...)"
 
     def to_dict(self) -> dict:
         from .metrics import format_npks
         from .ec import compute_ec
 
-        return {
+        with telemetry.stage("metrics.format_npks"):
+            npk_metrics = format_npks(self)
+
+        out = {
             "liters": self.liters,
-            "elements_mg_per_l": self.elements_mg_l,
-            "oxides_mg_per_l": self.oxides_mg_l,
-            "ions_mmol_per_l": self.ions_mmol_l,
-            "ions_meq_per_l": self.ions_meq_l,
-            "ion_balance": self.ion_balance,
-            "fertilizer_elements_mg_per_l": self.fertilizer_elements_mg_l,
-            "fertilizer_oxides_mg_per_l": self.fertilizer_oxides_mg_l,
-            "fertilizer_ions_mmol_per_l": self.fertilizer_ions_mmol_l,
-            "fertilizer_ions_meq_per_l": self.fertilizer_ions_meq_l,
-            "fertilizer_ion_balance": self.fertilizer_ion_balance,
+            "elements_mg_per_l": self.elements_mg_l.to_dict(),
+            "oxides_mg_per_l": self.oxides_mg_l.to_dict(),
+            "ions_mmol_per_l": self.ions_mmol_l.to_dict(),
+            "ions_meq_per_l": self.ions_meq_l.to_dict(),
+            "ion_balance": self.ion_balance.to_dict(),
+            "fertilizer_elements_mg_per_l": self.fertilizer_elements_mg_l.to_dict(),
+            "fertilizer_oxides_mg_per_l": self.fertilizer_oxides_mg_l.to_dict(),
+            "fertilizer_ions_mmol_per_l": self.fertilizer_ions_mmol_l.to_dict(),
+            "fertilizer_ions_meq_per_l": self.fertilizer_ions_meq_l.to_dict(),
+            "fertilizer_ion_balance": self.fertilizer_ion_balance.to_dict(),
             "ec_fertilizer": self.ec_fertilizer,
-            "water_elements_mg_per_l": self.water_elements_mg_l,
-            "water_oxides_mg_per_l": self.water_oxides_mg_l,
-            "water_ions_mmol_per_l": self.water_ions_mmol_l,
-            "water_ions_meq_per_l": self.water_ions_meq_l,
-            "water_ion_balance": self.water_ion_balance,
-            "ec": compute_ec(self.ions_mmol_l),
+            "water_elements_mg_per_l": self.water_elements_mg_l.to_dict(),
+            "water_oxides_mg_per_l": self.water_oxides_mg_l.to_dict(),
+            "water_ions_mmol_per_l": self.water_ions_mmol_l.to_dict(),
+            "water_ions_meq_per_l": self.water_ions_meq_l.to_dict(),
+            "water_ion_balance": self.water_ion_balance.to_dict(),
+            "ec": compute_ec(self.ions_mmol_l.to_dict(), model=self.ec_model),
             "ec_water": self.ec_water,
-            "npk_metrics": format_npks(self),
+            "npk_metrics": npk_metrics,
             "sluijsmann": self.sluijsmann,
             "osmosis_percent": self.osmosis_percent,
         }
+        if self.acid is not None:
+            out["acid"] = self.acid
+        if self.speciation is not None:
+            out["speciation"] = self.speciation
+        if self.precipitation is not None:
+            out["precipitation"] = self.precipitation
+        return out
+
+
+def stack_results(
+    results: Sequence[CalcResult],
+    block: str,
+    fill_value: float = 0.0,
+) -> tuple[tuple[str, ...], np.ndarray]:
+    """Stack one block of many results into a (results x labels) float64 array.
+
+    Absent labels are filled with `fill_value` (pass `np.nan` to keep them distinguishable).
+    """
+    if block not in CalcResult.BLOCKS:
+        raise KeyError(f"Unknown CalcResult block: {block}")
+    index = getattr(CalcResult, block).index
+    return stack_blocks([result.block_array(block) for result in results], index, fill_value)
+
+
+def _fertilizer_forms(recipe: dict, fertilizers: Mapping[str, Fertilizer], liters: float) -> np.ndarray:
+    """mg/L of the recipe's fertilizers in their declared forms (COMP_COLS order)."""
+    forms = np.zeros(len(COMP_COLS))
+    for entry in recipe.get("fertilizers", []):
+        name = str(entry.get("name") or "").strip()
+        grams = float(entry.get("grams") or 0.0)
+        if grams == 0.0:
+            continue
+        if name not in fertilizers:
+            raise KeyError(f"Unbekannter Dünger im Rezept: '{name}'")
+
+        fert = fertilizers[name]
+        eff_g = grams * float(fert.weight_factor or 1.0)
+        forms[fert.comp_index] += eff_g * fert.comp_values * 1000.0 / liters
+    return forms
+
+
+def _acid_dose(
+    recipe: dict, water_forms: Dict[str, float], liters: float, mm: Dict[str, float]
+) -> AcidDose | None:
+    """Dose of the recipe option `acid` (None without one)."""
+    spec = recipe.get("acid")
+    if not spec:
+        return None
+    from .acid import resolve_acid_dose
+
+    phosphate_species = str(recipe.get("phosphate_species", "H2PO4"))
+    return resolve_acid_dose(spec, water_forms.get("HCO3", 0.0), liters, mm, phosphate_species)
+
+
+def _precipitation(
+    recipe: dict,
+    water_ions_mmol: Dict[str, float],
+    fert_ions_mmol: Dict[str, float],
+    water_elements: Dict[str, float],
+    fert_elements: Dict[str, float],
+    mm: Dict[str, float],
+) -> Dict[str, object] | None:
+    """Saturation screen of the recipe option `precipitation` (None without one)."""
+    spec = recipe.get("precipitation")
+    if not spec:
+        return None
+    from .precipitation import screen_recipe_option
+
+    fe_mm = _mm(mm, "Fe")
+    with telemetry.stage("core.precipitation"):
+        return screen_recipe_option(
+            spec,
+            water_ions_mmol,
+            fert_ions_mmol,
+            water_elements.get("Fe", 0.0) / fe_mm,
+            fert_elements.get("Fe", 0.0) / fe_mm,
+            recipe.get("ph"),
+        )
+
+
+def _ions_of_forms(
+    mm: Dict[str, float],
+    forms: np.ndarray,
+    water_forms: Dict[str, float],
+    urea_as_nh4: bool,
+    phosphate_species: str,
+) -> np.ndarray:
+    """Ion concentrations (mmol/L, ION_INDEX order, absent = 0) of fertilizer forms plus water."""
+    _, _, ions_mmol, _, _ = _compute_solution_state(
+        mm, dict(zip(COMP_COLS, forms.tolist())), water_forms, urea_as_nh4, phosphate_species
+    )
+    return np.nan_to_num(ION_INDEX.pack(ions_mmol))
+
+
+def fertilizer_ions_per_g(
+    fertilizers: Sequence[Fertilizer],
+    molar_masses: Dict[str, float],
+    liters: float,
+    urea_as_nh4: bool = False,
+    phosphate_species: str = "H2PO4",
+) -> np.ndarray:
+    """(ions x fertilizers) matrix: mmol/L of each ion per recipe unit (g, ml for liquids)."""
+    matrix = np.zeros((len(ION_INDEX), len(fertilizers)))
+    for col, fert in enumerate(fertilizers):
+        forms = np.zeros(len(COMP_COLS))
+        forms[fert.comp_index] = float(fert.weight_factor or 1.0) * fert.comp_values * 1000.0 / liters
+        matrix[:, col] = _ions_of_forms(molar_masses, forms, {}, urea_as_nh4, phosphate_species)
+    return matrix
 
 
 def compute_solution(
     recipe: dict,
-    fertilizers: Dict[str, Fertilizer],
+    fertilizers: Mapping[str, Fertilizer],
     molar_masses: Dict[str, float],
     water_mg_l: Dict[str, float] | None = None,
     osmosis_percent: float = 0.0,
@@ -422,69 +733,86 @@ def compute_solution(
     from .ec import compute_ec
 
     mm = molar_masses
-    water_mg_l = apply_osmosis_mix(water_mg_l or {}, osmosis_percent)
-    water_forms = normalize_water_profile(mm, water_mg_l)
+    with telemetry.stage("core.water_normalization"):
+        water_mg_l = apply_osmosis_mix(water_mg_l or {}, osmosis_percent)
+        water_forms = normalize_water_profile(mm, water_mg_l)
 
     liters = float(recipe.get("liters") or 10.0)
     urea_as_nh4 = bool(recipe.get("urea_as_nh4", False))
     phosphate_species = str(recipe.get("phosphate_species", "H2PO4"))
+    ec_model = str(recipe.get("ec_model") or "mccleskey")
 
     # 1) Contributions from fertilizers -> mg/L in their declared forms
-    forms_mg_l: Dict[str, float] = {k: 0.0 for k in COMP_COLS}
-    for entry in recipe.get("fertilizers", []):
-        name = str(entry.get("name") or "").strip()
-        grams = float(entry.get("grams") or 0.0)
-        if grams == 0.0:
-            continue
-        if name not in fertilizers:
-            raise KeyError(f"Unbekannter Dünger im Rezept: '{name}'")
-
-        fert = fertilizers[name]
-        eff_g = grams * float(fert.weight_factor or 1.0)
-        for key, frac in fert.comp.items():
-            if key not in forms_mg_l:
-                continue
-            forms_mg_l[key] += eff_g * float(frac) * 1000.0 / liters
+    with telemetry.stage("core.fertilizer_forms", fertilizers=len(recipe.get("fertilizers", []))):
+        forms = _fertilizer_forms(recipe, fertilizers, liters)
+    # acid for the water's alkalinity is a pseudo-fertilizer dosed in ml
+    acid = _acid_dose(recipe, water_forms, liters, mm)
+    if acid is not None:
+        forms = forms + acid.forms(mm)
+    forms_mg_l: Dict[str, float] = dict(zip(COMP_COLS, forms.tolist()))
 
     # 2) Add water baseline (water profile is in mg/L of its own forms)
     # Water NH4/NO3 are interpreted as molecules (NH4, NO3), NOT "N as ...".
 
     # 3) Compute element totals (mg/L), oxides, and ions
-    elements, oxides, ions_mmol, ions_meq, ion_balance = _compute_solution_state(
-        mm,
-        forms_mg_l,
-        water_forms,
-        urea_as_nh4,
-        phosphate_species,
-    )
+    with telemetry.stage("core.state.total"):
+        elements, oxides, ions_mmol, ions_meq, ion_balance = _compute_solution_state(
+            mm,
+            forms_mg_l,
+            water_forms,
+            urea_as_nh4,
+            phosphate_species,
+        )
 
     # 4b) Water-only EC (baseline without fertilizers)
     water_only_forms = {k: 0.0 for k in COMP_COLS}
-    water_elements, water_oxides, water_ions_mmol, water_ions_meq, water_ion_balance = _compute_solution_state(
-        mm,
-        water_only_forms,
-        water_forms,
-        urea_as_nh4,
-        phosphate_species,
-    )
-    ec_water = compute_ec(water_ions_mmol)
-    fertilizer_only_forms = dict(forms_mg_l)
+    with telemetry.stage("core.state.water"):
+        water_elements, water_oxides, water_ions_mmol, water_ions_meq, water_ion_balance = _compute_solution_state(
+            mm,
+            water_only_forms,
+            water_forms,
+            urea_as_nh4,
+            phosphate_species,
+        )
     fertilizer_water_forms: Dict[str, float] = {k: 0.0 for k in OXIDE_FORM_COLS}
-    fert_elements, fert_oxides, fert_ions_mmol, fert_ions_meq, fert_ion_balance = _compute_solution_state(
-        mm,
-        fertilizer_only_forms,
-        fertilizer_water_forms,
-        urea_as_nh4,
-        phosphate_species,
-    )
-    ec_fertilizer = compute_ec(fert_ions_mmol)
-
-    sluijsmann = compute_sluijsmann(
-        liters=liters,
-        oxides_mg_l=oxides,
-        elements_mg_l=elements,
-        config=recipe.get("sluijsmann"),
-    )
+    fertilizer_only_forms = dict(forms_mg_l)
+    with telemetry.stage("core.state.fertilizer"):
+        fert_elements, fert_oxides, fert_ions_mmol, fert_ions_meq, fert_ion_balance = _compute_solution_state(
+            mm,
+            fertilizer_only_forms,
+            fertilizer_water_forms,
+            urea_as_nh4,
+            phosphate_species,
+        )
+
+    # 4b') optional saturation screen of the stock concentrate, on the nominal ion states
+    precipitation = _precipitation(recipe, water_ions_mmol, fert_ions_mmol, water_elements, fert_elements, mm)
+
+    # 4c) optional pH speciation of phosphate and carbonate, all three states in one batch
+    speciation = None
+    if phosphate_species.lower() == "auto":
+        ph = recipe.get("ph")
+        if ph is None:
+            raise ValueError("phosphate_species: auto braucht einen pH-Wert (ph)")
+        with telemetry.stage("core.speciation"):
+            (ions_mmol, water_ions_mmol, fert_ions_mmol), (ions_meq, water_ions_meq, fert_ions_meq), speciation = (
+                _speciate_ions(
+                    [ions_mmol, water_ions_mmol, fert_ions_mmol], float(ph), ion_pairs=ec_model == "activity"
+                )
+            )
+        ion_balance = _ion_balance(ions_meq)
+        water_ion_balance = _ion_balance(water_ions_meq)
+        fert_ion_balance = _ion_balance(fert_ions_meq)
+    ec_water = compute_ec(water_ions_mmol, model=ec_model)
+    ec_fertilizer = compute_ec(fert_ions_mmol, model=ec_model)
+
+    with telemetry.stage("core.sluijsmann"):
+        sluijsmann = compute_sluijsmann(
+            liters=liters,
+            oxides_mg_l=oxides,
+            elements_mg_l=elements,
+            config=recipe.get("sluijsmann"),
+        )
 
     return CalcResult(
         liters=liters,
@@ -507,12 +835,109 @@ def compute_solution(
         ec_water=ec_water,
         sluijsmann=sluijsmann,
         osmosis_percent=float(osmosis_percent),
+        acid=None if acid is None else acid.to_dict(),
+        speciation=speciation,
+        ec_model=ec_model,
+        precipitation=precipitation,
     )
 
 
+@dataclass
+class EcScaling:
+    recipe: dict
+    factor: float
+    target_ec_mS_per_cm: float
+    ec_mS_per_cm: float
+    temp_c: float
+
+    @property
+    def reachable(self) -> bool:
+        return abs(self.ec_mS_per_cm - self.target_ec_mS_per_cm) <= 1e-6 * max(1.0, self.target_ec_mS_per_cm)
+
+    def to_dict(self) -> dict:
+        return {
+            "recipe": self.recipe,
+            "factor": self.factor,
+            "target_ec_mS_per_cm": self.target_ec_mS_per_cm,
+            "ec_mS_per_cm": self.ec_mS_per_cm,
+            "temp_c": self.temp_c,
+            "reachable": self.reachable,
+        }
+
+
+def scale_recipes_to_ec(
+    recipes: Sequence[dict],
+    target_ec_mS_per_cm: float | Sequence[float],
+    fertilizers: Mapping[str, Fertilizer],
+    molar_masses: Dict[str, float],
+    water_mg_l: Dict[str, float] | None = None,
+    osmosis_percent: float = 0.0,
+    temp_c: float = 25.0,
+) -> List[EcScaling]:
+    """Scale the fertilizer amounts of each recipe so the solution hits the target EC.
+
+    Ion concentrations are linear in the fertilizer amounts, so every recipe only needs
+    its water and fertilizer ion vectors; the factors of all recipes are then found
+    together by `ec.scale_to_ec`. Recipes whose target lies below the water EC are scaled
+    to 0 (`reachable` is false).
+    """
+    from .ec import ec_batch, scale_to_ec
+
+    mm = molar_masses
+    water_forms = normalize_water_profile(mm, apply_osmosis_mix(water_mg_l or {}, osmosis_percent))
+    no_forms = np.zeros(len(COMP_COLS))
+    water = np.zeros((len(recipes), len(ION_INDEX)))
+    fert = np.zeros((len(recipes), len(ION_INDEX)))
+    with telemetry.stage("core.ec_scaling.ions", recipes=len(recipes)):
+        for row, recipe in enumerate(recipes):
+            liters = float(recipe.get("liters") or 10.0)
+            urea_as_nh4 = bool(recipe.get("urea_as_nh4", False))
+            phosphate_species = str(recipe.get("phosphate_species", "H2PO4"))
+            forms = _fertilizer_forms(recipe, fertilizers, liters)
+            # the acid treats the water and is not scaled with the fertilizers
+            acid = _acid_dose(recipe, water_forms, liters, mm)
+            acid_forms = no_forms if acid is None else acid.forms(mm)
+            water[row] = _ions_of_forms(mm, acid_forms, water_forms, urea_as_nh4, phosphate_species)
+            fert[row] = _ions_of_forms(mm, forms, {}, urea_as_nh4, phosphate_species)
+    targets = np.broadcast_to(np.asarray(target_ec_mS_per_cm, dtype=float), (len(recipes),))
+    if np.any(targets < 0):
+        raise ValueError("Ziel-EC muss >= 0 sein")
+    with telemetry.stage("core.ec_scaling.newton", recipes=len(recipes)):
+        factors = scale_to_ec(water, fert, targets, ION_INDEX.labels, temp_c=temp_c)
+    missing = np.flatnonzero(np.isnan(factors))
+    if missing.size:
+        raise ValueError(f"Rezept {int(missing[0])} enthält keine Dünger mit EC-Beitrag")
+    achieved = ec_batch(water + factors[:, None] * fert, ION_INDEX.labels, temp_c)
+
+    out = []
+    for recipe, factor, target, ec in zip(recipes, factors.tolist(), targets.tolist(), achieved.tolist()):
+        scaled = dict(recipe)
+        scaled["fertilizers"] = [
+            dict(entry, grams=float(entry.get("grams") or 0.0) * factor) for entry in recipe.get("fertilizers", [])
+        ]
+        out.append(EcScaling(scaled, factor, target, ec, temp_c))
+    return out
+
+
+def scale_recipe_to_ec(
+    recipe: dict,
+    target_ec_mS_per_cm: float,
+    fertilizers: Mapping[str, Fertilizer],
+    molar_masses: Dict[str, float],
+    water_mg_l: Dict[str, float] | None = None,
+    osmosis_percent: float = 0.0,
+    temp_c: float = 25.0,
+) -> EcScaling:
+    return scale_recipes_to_ec(
+        [recipe], target_ec_mS_per_cm, fertilizers, molar_masses, water_mg_l, osmosis_percent, temp_c
+    )[0]
+
+
 def run_recipe(recipe_path: Path) -> dict:
+    from .catalog import fertilizer_source
+
     recipe = load_recipe(recipe_path)
-    ferts = load_fertilizers()
+    ferts = fertilizer_source()
     mm = load_molar_masses()
 
     wp_name = str(recipe.get("water_profile") or "default")
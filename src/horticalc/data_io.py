@@ -1,20 +1,121 @@
 from __future__ import annotations
 
 import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
 
+import numpy as np
 import yaml
 
+from . import telemetry
+
+
+COMP_COLS: List[str] = [
+    # N forms (as element N fraction in fertilizers)
+    "NH4", "NO3", "Ur-N",
+    # oxides
+    "P2O5", "K2O", "CaO", "MgO", "Na2O",
+    # anions / other
+    "SO4", "Cl", "CO3", "HCO3", "SiO2",
+    # trace elements
+    "Fe", "Mn", "Cu", "Zn", "B", "Mo",
+]
+COMP_POSITIONS: Dict[str, int] = {col: idx for idx, col in enumerate(COMP_COLS)}
+
+_EMPTY: Mapping[str, float] = MappingProxyType({})
+
 
-@dataclass(frozen=True)
 class Fertilizer:
-    name: str
-    form: str
-    weight_factor: float
-    # composition fractions (mass fraction, e.g. 0.14 = 14%)
-    comp: Dict[str, float]
+    """Fertilizer with a sparse composition vector over `COMP_COLS`.
+
+    `comp_index`/`comp_values` hold only the nonzero mass fractions (e.g. 0.14 = 14%);
+    other nonzero numeric CSV columns are kept in `extra`. `comp` is built on first access.
+    """
+
+    __slots__ = ("name", "form", "weight_factor", "comp_index", "comp_values", "extra", "_comp")
+
+    def __init__(self, name: str, form: str, weight_factor: float, comp: Mapping[str, float]) -> None:
+        index: List[int] = []
+        values: List[float] = []
+        extra: Dict[str, float] = {}
+        for key, value in comp.items():
+            value = float(value)
+            if value == 0.0:
+                continue
+            pos = COMP_POSITIONS.get(key)
+            if pos is None:
+                extra[key] = value
+            else:
+                index.append(pos)
+                values.append(value)
+        comp_index = np.array(index, dtype=np.intp)
+        comp_values = np.array(values, dtype=float)
+        comp_index.flags.writeable = False
+        comp_values.flags.writeable = False
+
+        set_ = object.__setattr__
+        set_(self, "name", name)
+        set_(self, "form", form)
+        set_(self, "weight_factor", weight_factor)
+        set_(self, "comp_index", comp_index)
+        set_(self, "comp_values", comp_values)
+        set_(self, "extra", MappingProxyType(extra) if extra else _EMPTY)
+        set_(self, "_comp", None)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Fertilizer is immutable")
+
+    def __reduce__(self):
+        return (Fertilizer, (self.name, self.form, self.weight_factor, dict(self.comp)))
+
+    def components(self) -> Iterator[Tuple[str, float]]:
+        """Nonzero `(COMP_COLS column, fraction)` pairs."""
+        for pos, frac in zip(self.comp_index.tolist(), self.comp_values.tolist()):
+            yield COMP_COLS[pos], frac
+
+    @property
+    def comp(self) -> Mapping[str, float]:
+        """Read-only dict view of the nonzero composition (including `extra`)."""
+        comp = self._comp
+        if comp is None:
+            data = dict(self.components())
+            data.update(self.extra)
+            comp = MappingProxyType(data)
+            object.__setattr__(self, "_comp", comp)
+        return comp
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Fertilizer):
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.form == other.form
+            and self.weight_factor == other.weight_factor
+            and dict(self.comp) == dict(other.comp)
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.form, self.weight_factor))
+
+    def __repr__(self) -> str:
+        return (
+            f"Fertilizer(name={self.name!r}, form={self.form!r}, "
+            f"weight_factor={self.weight_factor!r}, comp={dict(self.comp)!r})"
+        )
+
+
+def _safe_load(stream) -> object:
+    with telemetry.stage("io.yaml_load"):
+        return yaml.safe_load(stream)
 
 
 def repo_root() -> Path:
@@ -27,7 +128,7 @@ def load_fertilizers(csv_path: Path | None = None) -> Dict[str, Fertilizer]:
         csv_path = repo_root() / "data" / "fertilizers.csv"
 
     ferts: Dict[str, Fertilizer] = {}
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
+    with telemetry.stage("io.fertilizers_csv"), csv_path.open("r", encoding="utf-8", newline="") as f:
         reader = csv.DictReader(f)
         for row in reader:
             name = (row.get("Düngername") or "").strip()
@@ -57,13 +158,39 @@ def load_molar_masses(path: Path | None = None) -> Dict[str, float]:
     if path is None:
         path = repo_root() / "data" / "molar_masses.yml"
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _safe_load(f) or {}
     return {str(k): float(v) for k, v in data.items()}
 
 
+def load_prices(path: Path | None = None) -> Dict[str, float]:
+    """Prices per kg product (schema: {currency, prices_per_kg: {name: price}}); empty if the default file is absent."""
+    if path is None:
+        path = repo_root() / "data" / "prices.yml"
+        if not path.exists():
+            return {}
+    with path.open("r", encoding="utf-8") as f:
+        data = _safe_load(f) or {}
+    return {str(k): float(v) for k, v in (data.get("prices_per_kg") or {}).items()}
+
+
+def load_solubility(path: Path | None = None) -> Tuple[Dict[str, float], float | None]:
+    """Solubility in g/L per product and the default for unlisted powders (schema: {default_g_per_l, solubility_g_per_l: {name: g/L}}); empty if the default file is absent."""
+    if path is None:
+        path = repo_root() / "data" / "solubility.yml"
+        if not path.exists():
+            return {}, None
+    with path.open("r", encoding="utf-8") as f:
+        data = _safe_load(f) or {}
+    default = data.get("default_g_per_l")
+    return (
+        {str(k): float(v) for k, v in (data.get("solubility_g_per_l") or {}).items()},
+        None if default is None else float(default),
+    )
+
+
 def load_water_profile(path: Path) -> Dict[str, float]:
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _safe_load(f) or {}
     # schema: {name, source, mg_per_l:{...}}
     mp = data.get("mg_per_l") or {}
     return {str(k): float(v) for k, v in mp.items()}
@@ -71,10 +198,14 @@ def load_water_profile(path: Path) -> Dict[str, float]:
 
 def load_water_profile_data(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _safe_load(f) or {}
+    return water_profile_from_data(data, path.stem)
+
+
+def water_profile_from_data(data: Mapping, default_name: str) -> dict:
     mp = data.get("mg_per_l") or {}
     return {
-        "name": data.get("name") or path.stem,
+        "name": data.get("name") or default_name,
         "source": data.get("source") or "",
         "mg_per_l": {str(k): float(v) for k, v in mp.items()},
         "osmosis_percent": float(data.get("osmosis_percent") or 0),
@@ -88,28 +219,41 @@ def save_water_profile(
     mg_per_l: Dict[str, float],
     osmosis_percent: float = 0,
 ) -> None:
-    payload = {
+    payload = water_profile_document(name, source, mg_per_l, osmosis_percent)
+    with path.open("w", encoding="utf-8") as f:
+        yaml.safe_dump(payload, f, sort_keys=True, allow_unicode=True)
+
+
+def water_profile_document(
+    name: str,
+    source: str,
+    mg_per_l: Mapping[str, float],
+    osmosis_percent: float = 0,
+) -> dict:
+    return {
         "name": name,
         "source": source,
         "mg_per_l": {str(k): float(v) for k, v in mg_per_l.items()},
         "osmosis_percent": float(osmosis_percent),
     }
-    with path.open("w", encoding="utf-8") as f:
-        yaml.safe_dump(payload, f, sort_keys=True, allow_unicode=True)
 
 
 def load_recipe(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _safe_load(f) or {}
     return data
 
 
 def load_nutrient_solution_data(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = _safe_load(f) or {}
+    return nutrient_solution_from_data(data, path.stem)
+
+
+def nutrient_solution_from_data(data: Mapping, default_name: str) -> dict:
     targets = data.get("targets_mg_per_l") or {}
     return {
-        "name": data.get("name") or path.stem,
+        "name": data.get("name") or default_name,
         "source": data.get("source") or "",
         "targets_mg_per_l": {str(k): float(v) for k, v in targets.items()},
     }
@@ -121,16 +265,417 @@ def save_nutrient_solution(
     source: str,
     targets_mg_per_l: Dict[str, float],
 ) -> None:
-    payload = {
+    payload = nutrient_solution_document(name, source, targets_mg_per_l)
+    with path.open("w", encoding="utf-8") as f:
+        yaml.safe_dump(payload, f, sort_keys=True, allow_unicode=True)
+
+
+def nutrient_solution_document(name: str, source: str, targets_mg_per_l: Mapping[str, float]) -> dict:
+    return {
         "name": name,
         "source": source,
         "targets_mg_per_l": {str(k): float(v) for k, v in targets_mg_per_l.items()},
     }
-    with path.open("w", encoding="utf-8") as f:
-        yaml.safe_dump(payload, f, sort_keys=True, allow_unicode=True)
 
 
 def save_recipe(path: Path, data: dict) -> None:
     payload = dict(data)
     with path.open("w", encoding="utf-8") as f:
         yaml.safe_dump(payload, f, sort_keys=True, allow_unicode=True)
+
+
+# --- Document storage (recipes, water profiles, nutrient solutions) -------------------
+
+STORE_KINDS: Tuple[str, ...] = ("recipes", "water_profiles", "nutrient_solutions")
+STORE_ENV = "HORTICALC_STORE_DB"
+
+
+class StoreConflictError(ValueError):
+    """Raised when a document changed since the version the caller last read."""
+
+
+@dataclass(frozen=True)
+class DocumentInfo:
+    kind: str
+    key: str
+    name: str
+    tags: Tuple[str, ...]
+    modified: float
+    version: int
+
+    @property
+    def filename(self) -> str:
+        return f"{self.key}.yml"
+
+
+def _check_kind(kind: str) -> str:
+    if kind not in STORE_KINDS:
+        raise KeyError(f"Unbekannte Dokumentart '{kind}' (erwartet: {', '.join(STORE_KINDS)})")
+    return kind
+
+
+def _document_tags(data: Mapping) -> Tuple[str, ...]:
+    tags = data.get("tags") or ()
+    if isinstance(tags, str):
+        tags = [tags]
+    return tuple(dict.fromkeys(str(tag).strip() for tag in tags if str(tag).strip()))
+
+
+def _page(infos: List[DocumentInfo], limit: int | None, offset: int) -> Tuple[int, List[DocumentInfo]]:
+    end = None if limit is None else offset + limit
+    return len(infos), infos[offset:end]
+
+
+class DocumentStore(ABC):
+    """Backend interface; documents are plain dicts addressed by `(kind, key)`."""
+
+    @abstractmethod
+    def get(self, kind: str, key: str) -> dict:
+        ...
+
+    @abstractmethod
+    def info(self, kind: str, key: str) -> DocumentInfo:
+        ...
+
+    @abstractmethod
+    def put(self, kind: str, key: str, data: Mapping, *, expected_version: int | None = None) -> DocumentInfo:
+        ...
+
+    def put_many(self, kind: str, documents: Iterable[Tuple[str, Mapping]]) -> int:
+        count = 0
+        for key, data in documents:
+            self.put(kind, key, data)
+            count += 1
+        return count
+
+    @abstractmethod
+    def delete(self, kind: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(
+        self,
+        kind: str,
+        *,
+        q: str | None = None,
+        tag: str | None = None,
+        order: str = "key",
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[DocumentInfo]]:
+        """Filter by name substring and tag; `order` is `key`, `name` or `modified` (newest first)."""
+
+    def exists(self, kind: str, key: str) -> bool:
+        try:
+            self.info(kind, key)
+        except KeyError:
+            return False
+        return True
+
+
+class YamlStore(DocumentStore):
+    """One YAML file per document under `recipes/` and `data/...`.
+
+    Parsed headers are cached by file mtime, so repeated listings only re-read changed files.
+    Writes are atomic (temp file + rename) and serialized per process.
+    """
+
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = Path(root) if root is not None else repo_root()
+        self._lock = threading.Lock()
+        self._headers: Dict[Path, Tuple[int, DocumentInfo]] = {}
+
+    def directory(self, kind: str) -> Path:
+        _check_kind(kind)
+        if kind == "recipes":
+            return self.root / "recipes"
+        return self.root / "data" / kind
+
+    def path(self, kind: str, key: str) -> Path:
+        return self.directory(kind) / f"{key}.yml"
+
+    def _info(self, kind: str, path: Path) -> DocumentInfo:
+        stat = path.stat()
+        cached = self._headers.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns:
+            return cached[1]
+        with path.open("r", encoding="utf-8") as f:
+            data = _safe_load(f) or {}
+        info = DocumentInfo(
+            kind=kind,
+            key=path.stem,
+            name=str(data.get("name") or path.stem),
+            tags=_document_tags(data),
+            modified=stat.st_mtime,
+            version=stat.st_mtime_ns,
+        )
+        self._headers[path] = (stat.st_mtime_ns, info)
+        return info
+
+    def get(self, kind: str, key: str) -> dict:
+        path = self.path(kind, key)
+        if not path.exists():
+            raise KeyError(f"{kind}/{key}")
+        with path.open("r", encoding="utf-8") as f:
+            return _safe_load(f) or {}
+
+    def info(self, kind: str, key: str) -> DocumentInfo:
+        path = self.path(kind, key)
+        if not path.exists():
+            raise KeyError(f"{kind}/{key}")
+        return self._info(kind, path)
+
+    def put(self, kind: str, key: str, data: Mapping, *, expected_version: int | None = None) -> DocumentInfo:
+        path = self.path(kind, key)
+        with self._lock:
+            if expected_version is not None:
+                current = path.stat().st_mtime_ns if path.exists() else 0
+                if current != expected_version:
+                    raise StoreConflictError(f"{kind}/{key} wurde zwischenzeitlich geändert")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                yaml.safe_dump(dict(data), f, sort_keys=True, allow_unicode=True)
+            os.replace(tmp_path, path)
+            return self._info(kind, path)
+
+    def delete(self, kind: str, key: str) -> None:
+        path = self.path(kind, key)
+        with self._lock:
+            if not path.exists():
+                raise KeyError(f"{kind}/{key}")
+            path.unlink()
+            self._headers.pop(path, None)
+
+    def list(
+        self,
+        kind: str,
+        *,
+        q: str | None = None,
+        tag: str | None = None,
+        order: str = "key",
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[DocumentInfo]]:
+        directory = self.directory(kind)
+        if not directory.exists():
+            return 0, []
+        with telemetry.stage("io.store_list", backend="yaml", kind=kind):
+            infos = [self._info(kind, path) for path in sorted(directory.glob("*.yml"))]
+        needle = q.lower() if q else None
+        infos = [
+            info
+            for info in infos
+            if (needle is None or needle in info.name.lower()) and (tag is None or tag in info.tags)
+        ]
+        if order == "name":
+            infos.sort(key=lambda info: info.name.lower())
+        elif order == "modified":
+            infos.sort(key=lambda info: info.modified, reverse=True)
+        elif order != "key":
+            raise ValueError(f"Unbekannte Sortierung '{order}' (erwartet: key, name, modified)")
+        return _page(infos, limit, offset)
+
+
+_STORE_SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS documents (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    modified REAL NOT NULL,
+    version INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE TABLE IF NOT EXISTS document_tags (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (kind, key, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_documents_name ON documents (kind, name_lower);
+CREATE INDEX IF NOT EXISTS idx_documents_modified ON documents (kind, modified);
+CREATE INDEX IF NOT EXISTS idx_document_tags_tag ON document_tags (kind, tag);
+"""
+
+_STORE_ORDER = {"key": "d.key", "name": "d.name_lower, d.key", "modified": "d.modified DESC, d.key"}
+
+
+class SqliteStore(DocumentStore):
+    """All documents in one SQLite file (WAL mode); every write is its own transaction."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_STORE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so version checks cannot race.
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _tags(self, conn: sqlite3.Connection, kind: str, key: str) -> Tuple[str, ...]:
+        rows = conn.execute(
+            "SELECT tag FROM document_tags WHERE kind = ? AND key = ? ORDER BY rowid", (kind, key)
+        ).fetchall()
+        return tuple(row[0] for row in rows)
+
+    def get(self, kind: str, key: str) -> dict:
+        row = self._conn().execute(
+            "SELECT data FROM documents WHERE kind = ? AND key = ?", (_check_kind(kind), key)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"{kind}/{key}")
+        return json.loads(row[0])
+
+    def info(self, kind: str, key: str) -> DocumentInfo:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT name, modified, version FROM documents WHERE kind = ? AND key = ?", (_check_kind(kind), key)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"{kind}/{key}")
+        return DocumentInfo(kind, key, row[0], self._tags(conn, kind, key), row[1], row[2])
+
+    def _put(
+        self,
+        conn: sqlite3.Connection,
+        kind: str,
+        key: str,
+        data: Mapping,
+        expected_version: int | None,
+    ) -> DocumentInfo:
+        row = conn.execute("SELECT version FROM documents WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        current = row[0] if row is not None else 0
+        if expected_version is not None and current != expected_version:
+            raise StoreConflictError(f"{kind}/{key} wurde zwischenzeitlich geändert")
+        name = str(data.get("name") or key)
+        tags = _document_tags(data)
+        modified = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO documents (kind, key, name, name_lower, modified, version, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, key, name, name.lower(), modified, current + 1, json.dumps(dict(data), ensure_ascii=False)),
+        )
+        conn.execute("DELETE FROM document_tags WHERE kind = ? AND key = ?", (kind, key))
+        conn.executemany(
+            "INSERT INTO document_tags (kind, key, tag) VALUES (?, ?, ?)", [(kind, key, tag) for tag in tags]
+        )
+        return DocumentInfo(kind, key, name, tags, modified, current + 1)
+
+    def put(self, kind: str, key: str, data: Mapping, *, expected_version: int | None = None) -> DocumentInfo:
+        _check_kind(kind)
+        with self._write() as conn:
+            return self._put(conn, kind, key, data, expected_version)
+
+    def put_many(self, kind: str, documents: Iterable[Tuple[str, Mapping]]) -> int:
+        _check_kind(kind)
+        count = 0
+        with self._write() as conn:
+            for key, data in documents:
+                self._put(conn, kind, key, data, None)
+                count += 1
+        return count
+
+    def delete(self, kind: str, key: str) -> None:
+        _check_kind(kind)
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM documents WHERE kind = ? AND key = ?", (kind, key)).rowcount
+            conn.execute("DELETE FROM document_tags WHERE kind = ? AND key = ?", (kind, key))
+        if not deleted:
+            raise KeyError(f"{kind}/{key}")
+
+    def list(
+        self,
+        kind: str,
+        *,
+        q: str | None = None,
+        tag: str | None = None,
+        order: str = "key",
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> Tuple[int, List[DocumentInfo]]:
+        if order not in _STORE_ORDER:
+            raise ValueError(f"Unbekannte Sortierung '{order}' (erwartet: key, name, modified)")
+        where = ["d.kind = ?"]
+        params: List[object] = [_check_kind(kind)]
+        if q:
+            escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("d.name_lower LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if tag:
+            where.append("EXISTS (SELECT 1 FROM document_tags t WHERE t.kind = d.kind AND t.key = d.key AND t.tag = ?)")
+            params.append(tag)
+        clause = " AND ".join(where)
+
+        conn = self._conn()
+        with telemetry.stage("io.store_list", backend="sqlite", kind=kind):
+            total = int(conn.execute(f"SELECT COUNT(*) FROM documents d WHERE {clause}", params).fetchone()[0])
+            rows = conn.execute(
+                f"SELECT d.key, d.name, d.modified, d.version FROM documents d WHERE {clause} "
+                f"ORDER BY {_STORE_ORDER[order]} LIMIT ? OFFSET ?",
+                [*params, -1 if limit is None else int(limit), int(offset)],
+            ).fetchall()
+            infos = [
+                DocumentInfo(kind, key, name, self._tags(conn, kind, key), modified, version)
+                for key, name, modified, version in rows
+            ]
+        return total, infos
+
+
+def open_store() -> DocumentStore:
+    """SQLite store from `HORTICALC_STORE_DB` if set, else the YAML files in the repo."""
+    db_path = os.environ.get(STORE_ENV)
+    if db_path:
+        return SqliteStore(Path(db_path).expanduser().resolve())
+    return YamlStore()
+
+
+def copy_documents(source: DocumentStore, target: DocumentStore, kinds: Iterable[str] = STORE_KINDS) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for kind in kinds:
+        _, infos = source.list(kind)
+        counts[kind] = target.put_many(kind, ((info.key, source.get(kind, info.key)) for info in infos))
+    return counts
+
+
+def store_main(argv: Iterable[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="horticalc store",
+        description="Rezepte, Wasserprofile und Nährlösungen zwischen YAML-Dateien und SQLite kopieren",
+    )
+    parser.add_argument("command", choices=("import", "export"), help="import: YAML -> SQLite, export: SQLite -> YAML")
+    parser.add_argument("db", help="Pfad der SQLite-Datei")
+    parser.add_argument("--root", default=None, help="Wurzel der YAML-Ablage (recipes/, data/...), Default: Repo")
+    parser.add_argument("--kind", action="append", choices=STORE_KINDS, default=None, help="Nur diese Dokumentart")
+    args = parser.parse_args(list(argv))
+
+    yaml_store = YamlStore(Path(args.root).expanduser().resolve() if args.root else None)
+    sqlite_store = SqliteStore(Path(args.db).expanduser().resolve())
+    kinds = args.kind or STORE_KINDS
+    if args.command == "import":
+        counts = copy_documents(yaml_store, sqlite_store, kinds)
+    else:
+        counts = copy_documents(sqlite_store, yaml_store, kinds)
+    for kind, count in counts.items():
+        print(f"{kind}: {count}")
+    return 0
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from . import telemetry
+from .data_io import Fertilizer
+from .solver import BoundSpec, QPResult, _active_set_qp, _least_squares_qp
+
+DEFAULT_RESOLUTION = 0.1
+DEFAULT_TIME_LIMIT_S = 2.0
+DEFAULT_MAX_NODES = 20000
+
+
+@dataclass(frozen=True)
+class DiscreteSpec:
+    """Dosing step per variable fertilizer (in recipe units: g, for `Flüssig` ml) and search limits."""
+
+    steps: np.ndarray
+    time_limit_s: float
+    max_nodes: int
+
+
+@dataclass
+class DiscreteResult:
+    x: np.ndarray
+    optimal: bool
+    nodes: int
+    elapsed_s: float
+    objective: float
+    relaxed_objective: float
+
+    def to_dict(self, names: List[str], steps: np.ndarray) -> dict:
+        return {
+            "resolution": {name: float(step) for name, step in zip(names, steps)},
+            "optimal": self.optimal,
+            "nodes": self.nodes,
+            "elapsed_s": self.elapsed_s,
+            "residual_mg_per_l": math.sqrt(2.0 * max(self.objective, 0.0)),
+            "relaxed_residual_mg_per_l": math.sqrt(2.0 * max(self.relaxed_objective, 0.0)),
+        }
+
+
+def _option(config: dict, key: str, default):
+    value = config.get(key)
+    return default if value is None else value
+
+
+def discrete_spec(recipe: dict, fertilizers: List[Fertilizer]) -> DiscreteSpec | None:
+    config = recipe.get("discrete")
+    if not config:
+        return None
+    if config is True:
+        config = {}
+    if not isinstance(config, dict):
+        raise ValueError("discrete muss true oder ein Objekt sein")
+
+    default = float(_option(config, "resolution", DEFAULT_RESOLUTION))
+    by_form = {str(k): float(v) for k, v in (config.get("resolution_by_form") or {}).items()}
+    by_name = {str(k): float(v) for k, v in (config.get("resolution_by_fertilizer") or {}).items()}
+    names = {fert.name for fert in fertilizers}
+    for name in by_name:
+        if name not in names:
+            raise KeyError(f"Unbekannter Dünger in discrete.resolution_by_fertilizer: '{name}'")
+    steps = np.array([by_name.get(fert.name, by_form.get(fert.form, default)) for fert in fertilizers], dtype=float)
+    if not np.all(np.isfinite(steps) & (steps > 0)):
+        raise ValueError("discrete: Auflösung muss > 0 sein")
+
+    time_limit_s = float(_option(config, "time_limit_s", DEFAULT_TIME_LIMIT_S))
+    max_nodes = int(_option(config, "max_nodes", DEFAULT_MAX_NODES))
+    if time_limit_s <= 0 or max_nodes < 1:
+        raise ValueError("discrete: time_limit_s und max_nodes müssen > 0 sein")
+    return DiscreteSpec(steps=steps, time_limit_s=time_limit_s, max_nodes=max_nodes)
+
+
+def _lattice_descent(
+    A: np.ndarray,
+    b: np.ndarray,
+    steps: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    spec: BoundSpec,
+    z: np.ndarray,
+) -> np.ndarray | None:
+    """Greedy ±1-step coordinate descent on the lattice; None if `z` violates the general rows."""
+    z = z.copy()
+    cols = A * steps
+    norms = np.einsum("ij,ij->j", cols, cols)
+    G_steps = spec.G * steps
+    slack = spec.h - G_steps @ z
+    tol = 1e-9 * np.maximum(1.0, np.abs(spec.h))
+    if np.any(slack < -tol):
+        return None
+    r = cols @ z - b
+    for _ in range(100):
+        improved = False
+        for i in range(len(z)):
+            for delta in (1.0, -1.0):
+                if not lo[i] <= z[i] + delta <= hi[i]:
+                    continue
+                if delta * float(cols[:, i] @ r) + 0.5 * norms[i] >= -1e-12:
+                    continue
+                if np.any(slack - delta * G_steps[:, i] < -tol):
+                    continue
+                z[i] += delta
+                r += delta * cols[:, i]
+                slack -= delta * G_steps[:, i]
+                improved = True
+                break
+        if not improved:
+            break
+    return z
+
+
+def solve_discrete(
+    A: np.ndarray,
+    b: np.ndarray,
+    fixed: np.ndarray,
+    variable_mask: np.ndarray,
+    spec: BoundSpec,
+    discrete: DiscreteSpec,
+    seed: np.ndarray,
+    variable_names: List[str],
+) -> DiscreteResult:
+    """Branch-and-bound over integer multiples of `discrete.steps`, seeded from the continuous `seed`.
+
+    Relaxations are the bounded least-squares QP, warm-started from the parent's active set.
+    When the time or node limit is hit, the best lattice point found so far is returned
+    with `optimal=False`.
+    """
+    started = time.perf_counter()
+    if fixed.size:
+        b = b - A @ fixed
+    b = np.maximum(b, 0.0)
+    A = A[:, variable_mask]
+    steps = discrete.steps
+    n = A.shape[1]
+    if n == 0:
+        objective = 0.5 * float(b @ b)
+        return DiscreteResult(np.zeros(0), True, 0, 0.0, objective, objective)
+
+    lo = np.ceil(spec.lower / steps - 1e-9)
+    hi = np.floor(spec.upper / steps + 1e-9)
+    if np.any(lo > hi):
+        bad = variable_names[int(np.argmax(lo > hi))]
+        raise ValueError(f"Keine Dosierstufe zwischen min_grams und max_grams für '{bad}'")
+
+    H, g = _least_squares_qp(A, b)
+    constant = 0.5 * float(b @ b)
+    eye = np.eye(n)
+    C = np.vstack([spec.G, eye, -eye])
+
+    def relax(z_lo: np.ndarray, z_hi: np.ndarray, active: List[int] | None) -> QPResult:
+        d = np.concatenate([spec.h, z_hi * steps, -(z_lo * steps)])
+        return _active_set_qp(H, g, C, d, active=active)
+
+    def bound(qp: QPResult) -> float:
+        return 0.5 * float(qp.x @ H @ qp.x) + float(g @ qp.x) + constant
+
+    def objective(z: np.ndarray) -> float:
+        r = A @ (z * steps) - b
+        return 0.5 * float(r @ r)
+
+    root = relax(lo, hi, None)
+    relaxed_objective = bound(root)
+
+    best_z: np.ndarray | None = None
+    best_f = np.inf
+    z_seed = seed / steps
+    for candidate in (np.round(z_seed), np.floor(z_seed + 1e-9), np.round(root.x / steps)):
+        z = _lattice_descent(A, b, steps, lo, hi, spec, np.clip(candidate, lo, hi))
+        if z is not None and objective(z) < best_f:
+            best_z, best_f = z, objective(z)
+
+    stack = [(lo, hi, root)]
+    nodes = 0
+    optimal = True
+    while stack:
+        if nodes >= discrete.max_nodes or time.perf_counter() - started > discrete.time_limit_s:
+            optimal = False
+            break
+        z_lo, z_hi, qp = stack.pop()
+        nodes += 1
+        if bound(qp) >= best_f - 1e-9 * max(1.0, best_f):
+            continue
+        z_relaxed = qp.x / steps
+        frac = np.abs(z_relaxed - np.round(z_relaxed))
+        i = int(np.argmax(frac))
+        if frac[i] <= 1e-6:
+            z = np.clip(np.round(z_relaxed), z_lo, z_hi)
+            if objective(z) < best_f:
+                best_z, best_f = z, objective(z)
+            continue
+        down_hi = z_hi.copy()
+        down_hi[i] = math.floor(z_relaxed[i])
+        up_lo = z_lo.copy()
+        up_lo[i] = math.ceil(z_relaxed[i])
+        children = []
+        for child_lo, child_hi in ((z_lo, down_hi), (up_lo, z_hi)):
+            try:
+                child = relax(child_lo, child_hi, qp.active)
+            except ValueError:
+                continue
+            children.append((bound(child), child_lo, child_hi, child))
+        # depth-first, better child on top of the stack
+        for _, child_lo, child_hi, child in sorted(children, key=lambda item: -item[0]):
+            stack.append((child_lo, child_hi, child))
+
+    telemetry.inc("horticalc_solver_nodes_total", nodes)
+    if best_z is None:
+        raise ValueError("Keine diskrete Lösung innerhalb des Zeit-/Knotenlimits gefunden")
+    return DiscreteResult(
+        x=np.round(best_z * steps, 9),
+        optimal=optimal,
+        nodes=nodes,
+        elapsed_s=time.perf_counter() - started,
+        objective=best_f,
+        relaxed_objective=relaxed_objective,
+    )
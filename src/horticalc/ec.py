@@ -3,7 +3,12 @@ from __future__ import annotations
 import math
 import re
 from dataclasses import dataclass
-from typing import Dict, Iterable
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Sequence
+
+import numpy as np
+
+from . import telemetry
 
 
 @dataclass(frozen=True)
@@ -29,6 +34,9 @@ MCCLESKEY_PARAMS: dict[str, McCleskeyParams] = {
 
 FALLBACK_LAMBDA_25: dict[str, float] = {
     "H2PO4-": 36.0,
+    "HPO4^2-": 114.0,
+    "PO4^3-": 278.4,
+    "H+": 349.65,
 }
 
 ION_CARET_RE = re.compile(r"^(?P<formula>[A-Za-z0-9]+)\^(?P<charge>\d+)(?P<sign>[+-])$")
@@ -36,6 +44,9 @@ ION_SIMPLE_RE = re.compile(r"^(?P<formula>[A-Za-z0-9]+)(?P<sign>[+-])(?P<charge>
 
 
 def parse_ion_key(label: str) -> tuple[str, int]:
+    if label in MCCLESKEY_PARAMS:
+        # canonical keys such as "Ca2+" would read as formula "Ca2" with charge 1
+        return label, MCCLESKEY_PARAMS[label].z
     match = ION_CARET_RE.match(label)
     if match:
         formula = match.group("formula")
@@ -68,6 +79,7 @@ def _poly_value(coeffs: Iterable[float], temp_c: float) -> float:
 
 
 def _mccleskey_k(params: McCleskeyParams, temp_c: float, ionic_strength: float) -> float:
+    """McCleskey Eq. 7 for one ion: the scalar reference the vectorised kernels are tested against."""
     k0 = _poly_value(params.k0, temp_c)
     if ionic_strength == 0:
         return k0
@@ -97,8 +109,39 @@ def compute_ec(
     include_transport_numbers: bool = True,
     include_atc_to_25: bool = True,
     atc_alpha_per_c: float = 0.019,
+    model: str = "mccleskey",
+) -> dict:
+    """EC of an ion composition at `temps_c` with the registered model `model`."""
+    ec_model = get_ec_model(model)
+    with telemetry.stage("ec.compute", model=model):
+        return _compute_ec(
+            ions_mmol_per_l,
+            temps_c,
+            density_kg_per_l,
+            fallback_temp_beta_per_c,
+            include_breakdown,
+            include_transport_numbers,
+            include_atc_to_25,
+            atc_alpha_per_c,
+            ec_model,
+        )
+
+
+def _compute_ec(
+    ions_mmol_per_l: dict[str, float],
+    temps_c: tuple[float, ...],
+    density_kg_per_l: float,
+    fallback_temp_beta_per_c: float,
+    include_breakdown: bool,
+    include_transport_numbers: bool,
+    include_atc_to_25: bool,
+    atc_alpha_per_c: float,
+    ec_model: EcModel,
 ) -> dict:
     molalities: Dict[str, float] = {}
+    mmol: Dict[str, float] = {}
+    # kernels parse the labels again: pass them as given ("Ca2+" would parse as charge 1)
+    raw_labels: Dict[str, str] = {}
     charges: Dict[str, int] = {}
     warnings: list[str] = []
     coverage = {
@@ -119,49 +162,68 @@ def compute_ec(
         mol_per_l = mmol_per_l / 1000.0
         molality = mol_per_l / density_kg_per_l
         molalities[canonical] = molality
+        mmol[canonical] = mmol_per_l
+        raw_labels[canonical] = raw_ion
         charges[canonical] = charge
 
     ionic_strength = _ionic_strength(molalities, charges) if molalities else 0.0
 
+    # ions without parameters count for the ionic strength, not for the EC
+    conducting: list[str] = []
+    for ion in molalities:
+        if ion in MCCLESKEY_PARAMS:
+            params = MCCLESKEY_PARAMS[ion]
+            if charges[ion] != params.z:
+                warnings.append(
+                    f"Ion '{ion}' hat Ladung {charges[ion]}, erwartet {params.z}; verwende Tabellenladung."
+                )
+            coverage["mccleskey_ions_used"].append(ion)
+        elif ion in FALLBACK_LAMBDA_25:
+            coverage["fallback_ions_used"].append(ion)
+        else:
+            coverage["ignored_ions"].append(ion)
+            warnings.append(f"Ion '{ion}' hat keine McCleskey- oder Fallback-Parameter und wurde ignoriert.")
+            continue
+        conducting.append(ion)
+
+    low, high = ec_model.temperature_range_c
+    for temp_c in temps_c:
+        if not low <= temp_c <= high:
+            warnings.append(
+                f"{temp_c:g} °C liegt außerhalb des Gültigkeitsbereichs von '{ec_model.name}' ({low:g}–{high:g} °C)."
+            )
+
+    labels = tuple(molalities)
+    info: Dict[str, object] = {}
+    contrib = np.zeros((len(temps_c), 0))
+    if labels:
+        # a single row: contributions (T, n)
+        contrib, info = ec_model.kernel(
+            np.array([mmol[ion] for ion in labels]),
+            tuple(raw_labels[ion] for ion in labels),
+            np.array(temps_c, dtype=float),
+            density_kg_per_l,
+            fallback_temp_beta_per_c,
+        )
+    columns = [(ion, labels.index(ion)) for ion in conducting]
+    contrib_rows = contrib.tolist()
+
     contrib_mS_per_cm: Dict[str, Dict[str, float]] = {}
     transport_numbers: Dict[str, Dict[str, float]] = {}
     ec_mS_per_cm: Dict[str, float] = {}
     ec_uS_per_cm: Dict[str, float] = {}
 
-    for temp_c in temps_c:
+    for row, temp_c in enumerate(temps_c):
         temp_key = _temp_key(temp_c)
         total = 0.0
         contributions: Dict[str, float] = {}
 
-        for ion, molality in molalities.items():
-            if ion in MCCLESKEY_PARAMS:
-                params = MCCLESKEY_PARAMS[ion]
-                if charges[ion] != params.z:
-                    warnings.append(
-                        f"Ion '{ion}' hat Ladung {charges[ion]}, erwartet {params.z}; verwende Tabellenladung."
-                    )
-                k_val = _mccleskey_k(params, temp_c, ionic_strength)
-                contrib = k_val * molality
-                coverage["mccleskey_ions_used"].append(ion)
-            elif ion in FALLBACK_LAMBDA_25:
-                lambda_25 = FALLBACK_LAMBDA_25[ion]
-                if fallback_temp_beta_per_c == 0.0:
-                    lambda_t = lambda_25
-                else:
-                    lambda_t = lambda_25 * (1 + fallback_temp_beta_per_c * (temp_c - 25.0))
-                mol_per_l = molality * density_kg_per_l
-                contrib = lambda_t * mol_per_l
-                coverage["fallback_ions_used"].append(ion)
-            else:
-                coverage["ignored_ions"].append(ion)
-                warnings.append(
-                    f"Ion '{ion}' hat keine McCleskey- oder Fallback-Parameter und wurde ignoriert."
-                )
-                continue
-            if contrib < 0:
-                warnings.append(f"Negativer EC-Beitrag für '{ion}' ({contrib:.6g} mS/cm).")
-            contributions[ion] = contrib
-            total += contrib
+        for ion, column in columns:
+            value = contrib_rows[row][column]
+            if value < 0:
+                warnings.append(f"Negativer EC-Beitrag für '{ion}' ({value:.6g} mS/cm).")
+            contributions[ion] = value
+            total += value
 
         ec_mS_per_cm[temp_key] = total
         ec_uS_per_cm[temp_key] = total * 1000.0
@@ -192,9 +254,10 @@ def compute_ec(
     coverage["fallback_ions_used"] = sorted(set(coverage["fallback_ions_used"]))
     coverage["ignored_ions"] = sorted(set(coverage["ignored_ions"]))
 
-    return {
-        "method": "McCleskey2012(Eq7-9,Table1) + VanysekCRC93(fallback)",
+    out = {
+        "method": ec_model.method,
         "inputs": {
+            "model": ec_model.name,
             "temps_c": list(temps_c),
             "density_kg_per_l": density_kg_per_l,
             "fallback_temp_beta_per_c": fallback_temp_beta_per_c,
@@ -209,3 +272,330 @@ def compute_ec(
         "coverage": coverage,
         "atc": atc,
     }
+    if ec_model.ion_pairs:
+        out["activity"] = _activity_block(ec_model, info, temps_c)
+    return out
+
+
+def _activity_block(ec_model: EcModel, info: Dict[str, object], temps_c: tuple[float, ...]) -> dict:
+    """Self-consistent ionic strength and ion pairs per temperature (zeros without ions)."""
+    strengths = info.get("ionic_strength_mol_per_kg", np.zeros(len(temps_c)))
+    pairs = info.get("ion_pairs_mmol_per_l", np.zeros((len(temps_c), len(ec_model.ion_pairs))))
+    return {
+        "ionic_strength_mol_per_kg": {
+            _temp_key(temp_c): float(strengths[row]) for row, temp_c in enumerate(temps_c)
+        },
+        "ion_pairs_mmol_per_l": {
+            _temp_key(temp_c): {name: float(pairs[row, k]) for k, name in enumerate(ec_model.ion_pairs)}
+            for row, temp_c in enumerate(temps_c)
+        },
+        "iterations": int(info.get("iterations", 0)),
+    }
+
+
+def _ec_coefficients(
+    labels: Sequence[str], temp_c: float, fallback_temp_beta_per_c: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Per-label k0, A, B, z² and fallback λ at `temp_c` for the vectorised model."""
+    n = len(labels)
+    k0, A, B, z2, lam = (np.zeros(n) for _ in range(5))
+    for idx, label in enumerate(labels):
+        try:
+            canonical, charge = parse_ion_key(label)
+        except ValueError:
+            continue
+        z2[idx] = charge * charge
+        if canonical in MCCLESKEY_PARAMS:
+            params = MCCLESKEY_PARAMS[canonical]
+            k0[idx] = _poly_value(params.k0, temp_c)
+            A[idx] = _poly_value(params.A, temp_c)
+            B[idx] = params.B
+        elif canonical in FALLBACK_LAMBDA_25:
+            lam[idx] = FALLBACK_LAMBDA_25[canonical] * (1 + fallback_temp_beta_per_c * (temp_c - 25.0))
+    return k0, A, B, z2, lam
+
+
+def ec_batch(
+    ions_mmol_per_l: np.ndarray,
+    labels: Sequence[str],
+    temp_c: float = 25.0,
+    density_kg_per_l: float = 1.0,
+    fallback_temp_beta_per_c: float = 0.022,
+    gradient: bool = False,
+) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
+    """EC in mS/cm at `temp_c` for rows of ion concentrations (mmol/L, columns = `labels`).
+
+    Same model as `compute_ec` without breakdown or warnings. With `gradient` also returns
+    dEC/dc in mS/cm per mmol/L, same shape as the input.
+    """
+    k0, A, B, z2, lam = _ec_coefficients(labels, temp_c, fallback_temp_beta_per_c)
+    c = np.asarray(ions_mmol_per_l, dtype=float)
+    molality = c / 1000.0 / density_kg_per_l
+    sqrt_i = np.sqrt(0.5 * (molality @ z2))[..., None]
+    k = k0 - A * sqrt_i / (1 + B * sqrt_i)
+    ec = np.sum(k * molality, axis=-1) + np.sum(lam * c / 1000.0, axis=-1)
+    if not gradient:
+        return ec
+    # dk/dI = -A / (2 sqrt(I) (1 + B sqrt(I))²); m·dk/dI vanishes for I -> 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dk_di = -A / (2 * sqrt_i * (1 + B * sqrt_i) ** 2)
+        strength_term = np.where(sqrt_i > 0, np.sum(molality * dk_di, axis=-1, keepdims=True), 0.0)
+    grad = (k + strength_term * 0.5 * z2) / 1000.0 / density_kg_per_l + lam / 1000.0
+    return ec, grad
+
+
+def scale_to_ec(
+    water_ions_mmol_per_l: np.ndarray,
+    fertilizer_ions_mmol_per_l: np.ndarray,
+    target_ec_mS_per_cm: np.ndarray | float,
+    labels: Sequence[str],
+    temp_c: float = 25.0,
+    density_kg_per_l: float = 1.0,
+    tol: float = 1e-10,
+    max_iter: int = 50,
+) -> np.ndarray:
+    """Factors `s` with EC(water + s·fertilizer) = target, for all rows at once.
+
+    Ion concentrations scale linearly with the fertilizer amounts, so only the ionic
+    strength term is non-linear: a secant start between s=0 and s=1 followed by Newton
+    steps. Rows whose target is below the water EC get 0, rows without fertilizer ions NaN.
+    """
+    W = np.atleast_2d(np.asarray(water_ions_mmol_per_l, dtype=float))
+    F = np.atleast_2d(np.asarray(fertilizer_ions_mmol_per_l, dtype=float))
+    W, F = np.broadcast_arrays(W, F)
+    target = np.broadcast_to(np.asarray(target_ec_mS_per_cm, dtype=float), W.shape[:1])
+    ec0 = ec_batch(W, labels, temp_c, density_kg_per_l)
+    ec1 = ec_batch(W + F, labels, temp_c, density_kg_per_l)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(ec1 > ec0, (target - ec0) / (ec1 - ec0), np.nan)
+    s = np.maximum(s, 0.0)
+    iterations = 0
+    for _ in range(max_iter):
+        ec, grad = ec_batch(W + s[:, None] * F, labels, temp_c, density_kg_per_l, gradient=True)
+        slope = np.sum(grad * F, axis=-1)
+        residual = ec - target
+        done = ~(np.abs(residual) > tol * np.maximum(1.0, np.abs(target)))
+        if done.all():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(done, 0.0, residual / slope)
+        s = np.maximum(s - step, 0.0)
+        iterations += 1
+    telemetry.inc("horticalc_ec_newton_iterations_total", iterations)
+    s[target <= ec0] = 0.0
+    return s
+
+
+# --- model registry -------------------------------------------------------------------
+#
+# A kernel maps ion rows (mmol/L, shape (..., n), columns = labels) and temperatures (T,)
+# to per-ion contributions in mS/cm, shape (..., T, n), plus model-specific arrays
+# (e.g. the ionic strength, broadcastable to (..., T)). The EC is the sum over the last axis.
+
+EcKernel = Callable[
+    [np.ndarray, tuple, np.ndarray, float, float], tuple[np.ndarray, Dict[str, object]]
+]
+
+
+@dataclass(frozen=True)
+class EcModel:
+    """Registered EC model: batched kernel plus capability metadata and parameter tables."""
+
+    name: str
+    description: str
+    method: str
+    kernel: EcKernel
+    # "none" (infinite dilution), "nominal" or "self_consistent"
+    ionic_strength: str
+    parameters: Callable[[], Dict[str, object]]
+    ion_pairs: tuple[str, ...] = ()
+    temperature_range_c: tuple[float, float] = (0.0, 95.0)
+
+    def to_dict(self, include_parameters: bool = True) -> dict:
+        out = {
+            "name": self.name,
+            "description": self.description,
+            "method": self.method,
+            "capabilities": {
+                "ionic_strength": self.ionic_strength,
+                "ion_pairs": list(self.ion_pairs),
+                "temperature_range_c": list(self.temperature_range_c),
+                "ions": sorted(MCCLESKEY_PARAMS),
+                "fallback_ions": sorted(FALLBACK_LAMBDA_25),
+            },
+        }
+        if include_parameters:
+            out["parameters"] = self.parameters()
+        return out
+
+
+EC_MODELS: dict[str, EcModel] = {}
+
+
+def register_ec_model(model: EcModel) -> EcModel:
+    if model.name in EC_MODELS:
+        raise ValueError(f"EC-Modell '{model.name}' ist bereits registriert")
+    EC_MODELS[model.name] = model
+    return model
+
+
+def get_ec_model(name: str) -> EcModel:
+    try:
+        return EC_MODELS[name]
+    except KeyError:
+        raise ValueError(f"Unbekanntes EC-Modell: {name} (erlaubt: {', '.join(EC_MODELS)})") from None
+
+
+def ec_matrix(
+    ions_mmol_per_l: np.ndarray,
+    labels: Sequence[str],
+    temps_c: Sequence[float] | float = (18.0, 25.0),
+    model: str = "mccleskey",
+    density_kg_per_l: float = 1.0,
+    fallback_temp_beta_per_c: float = 0.022,
+) -> np.ndarray:
+    """EC in mS/cm of ion rows (..., n) at every temperature: shape (..., T)."""
+    contrib, _ = get_ec_model(model).kernel(
+        np.asarray(ions_mmol_per_l, dtype=float),
+        tuple(labels),
+        np.atleast_1d(np.asarray(temps_c, dtype=float)),
+        density_kg_per_l,
+        fallback_temp_beta_per_c,
+    )
+    return contrib.sum(axis=-1)
+
+
+@lru_cache(maxsize=256)
+def _coefficient_table(
+    labels: tuple[str, ...], temps_c: tuple[float, ...], fallback_temp_beta_per_c: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """`_ec_coefficients` stacked over temperatures: k0, A, lam (T, n) and B, z² (n,)."""
+    rows = [_ec_coefficients(labels, temp_c, fallback_temp_beta_per_c) for temp_c in temps_c]
+    k0, A, lam = (np.array([row[col] for row in rows]).reshape(len(temps_c), len(labels)) for col in (0, 1, 4))
+    B, z2 = (rows[0][col] if rows else np.zeros(len(labels)) for col in (2, 3))
+    for table in (k0, A, B, z2, lam):
+        table.flags.writeable = False
+    return k0, A, B, z2, lam
+
+
+def _table(labels: tuple[str, ...], temps_c: np.ndarray, beta: float) -> tuple[np.ndarray, ...]:
+    return _coefficient_table(labels, tuple(float(t) for t in temps_c), float(beta))
+
+
+def _mccleskey_contrib(
+    c: np.ndarray, table: tuple[np.ndarray, ...], density_kg_per_l: float, ionic_strength: bool = True
+) -> tuple[np.ndarray, np.ndarray]:
+    """Contributions (..., T, n) for ions `c` broadcastable to (..., T, n), and I (..., T|1)."""
+    k0, A, B, z2, lam = table
+    molality = c / 1000.0 / density_kg_per_l
+    strength = 0.5 * (molality @ z2)
+    if ionic_strength:
+        sqrt_i = np.sqrt(strength)[..., None]
+        k = k0 - A * sqrt_i / (1 + B * sqrt_i)
+    else:
+        k = k0
+    return k * molality + lam * c / 1000.0, strength
+
+
+def _mccleskey_kernel(
+    c: np.ndarray, labels: tuple, temps_c: np.ndarray, density_kg_per_l: float, beta: float
+) -> tuple[np.ndarray, Dict[str, object]]:
+    # the coefficient tables carry the temperature axis: (T, n) * (..., 1, n) -> (..., T, n)
+    contrib, strength = _mccleskey_contrib(c[..., None, :], _table(labels, temps_c, beta), density_kg_per_l)
+    return contrib, {"ionic_strength_mol_per_kg": strength}
+
+
+def _kohlrausch_kernel(
+    c: np.ndarray, labels: tuple, temps_c: np.ndarray, density_kg_per_l: float, beta: float
+) -> tuple[np.ndarray, Dict[str, object]]:
+    contrib, _ = _mccleskey_contrib(
+        c[..., None, :], _table(labels, temps_c, beta), density_kg_per_l, ionic_strength=False
+    )
+    return contrib, {}
+
+
+def _activity_kernel(
+    c: np.ndarray, labels: tuple, temps_c: np.ndarray, density_kg_per_l: float, beta: float
+) -> tuple[np.ndarray, Dict[str, object]]:
+    from .speciation import PAIR_LABELS, speciate
+
+    # the pairing needs Ca, Mg and SO4 columns; absent ones are zero
+    present = {parse_ion_key(label)[0] for label in labels}
+    extra = tuple(label for label in PAIR_LABELS if parse_ion_key(label)[0] not in present)
+    n = len(labels)
+    lead = c.shape[:-1]
+    rows = np.zeros((*lead, len(temps_c), n + len(extra)))
+    rows[..., :n] = c[..., None, :]
+    temps = np.broadcast_to(temps_c, (*lead, len(temps_c)))
+    paired = speciate(rows, labels + extra, None, temps, density_kg_per_l, ion_pairs=True)
+    contrib, _ = _mccleskey_contrib(
+        paired.ions_mmol_per_l[..., :n], _table(labels, temps_c, beta), density_kg_per_l
+    )
+    return contrib, {
+        "ionic_strength_mol_per_kg": paired.ionic_strength_mol_per_kg,
+        "ion_pairs_mmol_per_l": paired.ion_pairs_mmol_per_l,
+        "iterations": paired.iterations,
+    }
+
+
+def _mccleskey_parameters() -> Dict[str, object]:
+    return {
+        "mccleskey": {
+            ion: {"k0": list(params.k0), "A": list(params.A), "B": params.B, "z": params.z}
+            for ion, params in MCCLESKEY_PARAMS.items()
+        },
+        "fallback_lambda_25": dict(FALLBACK_LAMBDA_25),
+    }
+
+
+def _activity_parameters() -> Dict[str, object]:
+    from .speciation import ION_PAIR_CONSTANTS, davies_a
+
+    return {
+        **_mccleskey_parameters(),
+        "ion_pairs": {
+            name: {"log_k_25": log_k25, "delta_h_kj_per_mol": enthalpy}
+            for name, (log_k25, enthalpy) in ION_PAIR_CONSTANTS.items()
+        },
+        "davies": {"A_25": davies_a(25.0), "dA_per_c": 8.074e-4, "b": 0.3},
+    }
+
+
+def _kohlrausch_parameters() -> Dict[str, object]:
+    return {
+        "lambda0_molal": {ion: list(params.k0) for ion, params in MCCLESKEY_PARAMS.items()},
+        "fallback_lambda_25": dict(FALLBACK_LAMBDA_25),
+    }
+
+
+register_ec_model(
+    EcModel(
+        name="mccleskey",
+        description="McCleskey k(T, I) mit der nominellen Ionenstärke aller Ionen",
+        method="McCleskey2012(Eq7-9,Table1) + VanysekCRC93(fallback)",
+        kernel=_mccleskey_kernel,
+        ionic_strength="nominal",
+        parameters=_mccleskey_parameters,
+    )
+)
+register_ec_model(
+    EcModel(
+        name="activity",
+        description="Ionenpaare CaSO4°/MgSO4° mit Davies-Aktivitäten, selbstkonsistente Ionenstärke",
+        method="McCleskey2012(Eq7-9,Table1) + Davies/Ionenpaare(CaSO4,MgSO4) + VanysekCRC93(fallback)",
+        kernel=_activity_kernel,
+        ionic_strength="self_consistent",
+        parameters=_activity_parameters,
+        ion_pairs=("CaSO4", "MgSO4"),
+    )
+)
+register_ec_model(
+    EcModel(
+        name="kohlrausch",
+        description="Unendliche Verdünnung: Grenzleitfähigkeiten ohne Ionenstärke-Korrektur (obere Schranke)",
+        method="Kohlrausch(λ° = McCleskey k0(T)) + VanysekCRC93(fallback)",
+        kernel=_kohlrausch_kernel,
+        ionic_strength="none",
+        parameters=_kohlrausch_parameters,
+    )
+)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class LabelIndex:
+    """Immutable, shared label -> position map for one block of a `CalcResult`.
+
+    The label order is the output order of the corresponding Solution Output field.
+    """
+
+    __slots__ = ("labels", "positions")
+
+    def __init__(self, labels: Iterable[str]) -> None:
+        labels_tuple = tuple(labels)
+        if len(set(labels_tuple)) != len(labels_tuple):
+            raise ValueError("Labels must be unique")
+        object.__setattr__(self, "labels", labels_tuple)
+        object.__setattr__(self, "positions", {label: idx for idx, label in enumerate(labels_tuple)})
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("LabelIndex is immutable")
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __repr__(self) -> str:
+        return f"LabelIndex({list(self.labels)!r})"
+
+    def pack(self, values: Mapping[str, float]) -> np.ndarray:
+        """Dict -> float64 array; labels missing from `values` are stored as NaN."""
+        arr = np.full(len(self.labels), np.nan)
+        positions = self.positions
+        for key, value in values.items():
+            pos = positions.get(key)
+            if pos is None:
+                raise KeyError(f"Unbekanntes Label '{key}' (erwartet: {', '.join(self.labels)})")
+            arr[pos] = value
+        arr.flags.writeable = False
+        return arr
+
+
+class LabeledView(Mapping[str, float]):
+    """Read-only dict-like view on one result block; NaN entries are absent keys."""
+
+    __slots__ = ("index", "values")
+
+    def __init__(self, index: LabelIndex, values: np.ndarray) -> None:
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, key: str) -> float:
+        pos = self.index.positions.get(key)
+        if pos is None:
+            raise KeyError(key)
+        value = float(self.values[pos])
+        if value != value:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        pos = self.index.positions.get(key)
+        if pos is None:
+            return default
+        value = float(self.values[pos])
+        return default if value != value else value
+
+    def __contains__(self, key: object) -> bool:
+        pos = self.index.positions.get(key)  # type: ignore[arg-type]
+        return pos is not None and self.values[pos] == self.values[pos]
+
+    def __iter__(self) -> Iterator[str]:
+        for label, value in zip(self.index.labels, self.values.tolist()):
+            if value == value:
+                yield label
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def items(self):  # type: ignore[override]
+        return self.to_dict().items()
+
+    def to_dict(self) -> dict[str, float]:
+        return {label: value for label, value in zip(self.index.labels, self.values.tolist()) if value == value}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LabeledView({self.to_dict()!r})"
+
+
+def stack_blocks(
+    arrays: Sequence[np.ndarray],
+    index: LabelIndex,
+    fill_value: float = 0.0,
+) -> Tuple[Tuple[str, ...], np.ndarray]:
+    """Stack per-result block arrays into a 2-D (results x labels) array."""
+    if arrays:
+        matrix = np.vstack(arrays)
+    else:
+        matrix = np.empty((0, len(index)))
+    if fill_value == fill_value:
+        matrix = np.where(np.isnan(matrix), fill_value, matrix)
+    return index.labels, matrix
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from dataclasses import asdict, is_dataclass
 from decimal import Decimal, ROUND_HALF_UP
 from typing import TYPE_CHECKING, Mapping
 
@@ -39,12 +38,10 @@ def round1(value: float) -> float:
 
 
 def _get_sources(result: CalcResult | Mapping[str, object]) -> tuple[Mapping[str, float], Mapping[str, float]]:
-    if is_dataclass(result):
-        data = asdict(result)
-    elif isinstance(result, Mapping):
-        data = result
-    else:
-        data = result.__dict__
+    if not isinstance(result, Mapping):
+        # CalcResult exposes read-only views; no copy needed.
+        return result.elements_mg_l, result.oxides_mg_l
+    data = result
 
     elements = data.get("elements_mg_per_l") or data.get("elements_mg_l") or {}
     oxides = data.get("oxides_mg_per_l") or data.get("oxides_mg_l") or {}
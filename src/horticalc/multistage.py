@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from . import telemetry
+from .data_io import DocumentStore, Fertilizer, nutrient_solution_from_data, open_store
+from .solver import _finish_solve, _load_solver_recipe, _nnls, _prepare_problem
+
+if TYPE_CHECKING:
+    from .snapshot import CompiledCatalog
+
+# keys that belong to the program itself, everything else is shared by all stages
+PROGRAM_KEYS = {"name", "stages", "max_fertilizers", "required", "time_limit_s", "workers"}
+UNSUPPORTED_STAGE_KEYS = (
+    "fixed_grams",
+    "min_grams",
+    "max_grams",
+    "max_total_grams",
+    "constraints",
+    "discrete",
+    "ec_target_mS_per_cm",
+    "ec_max_mS_per_cm",
+)
+DEFAULT_TIME_LIMIT_S = 10.0
+
+
+@dataclass
+class ProgramResult:
+    fertilizers: List[str]
+    stages: List[dict]
+    weighted_residual_mg_l: float
+    search: dict
+
+    def to_dict(self) -> dict:
+        return {
+            "fertilizers": self.fertilizers,
+            "stages": self.stages,
+            "weighted_residual_mg_per_l": self.weighted_residual_mg_l,
+            "search": self.search,
+        }
+
+
+def _stage_recipes(program: Mapping, store: DocumentStore | None) -> List[Tuple[str, float, dict]]:
+    stages = list(program.get("stages") or [])
+    if not stages:
+        raise ValueError("Programm braucht mindestens eine Stufe (stages)")
+    base = {key: value for key, value in program.items() if key not in PROGRAM_KEYS}
+    out = []
+    for idx, stage in enumerate(stages):
+        stage = dict(stage)
+        name = str(stage.pop("name", None) or f"Stufe {idx + 1}")
+        weight = float(stage.pop("weight", 1.0))
+        if weight < 0:
+            raise ValueError(f"Stufe '{name}': weight muss >= 0 sein")
+        solution = stage.pop("nutrient_solution", None)
+        recipe = {**base, **stage}
+        if solution and not (stage.get("targets") or stage.get("targets_mg_per_l")):
+            store = store or open_store()
+            data = nutrient_solution_from_data(store.get("nutrient_solutions", str(solution)), str(solution))
+            recipe.pop("targets", None)
+            recipe["targets_mg_per_l"] = data["targets_mg_per_l"]
+        for key in UNSUPPORTED_STAGE_KEYS:
+            if recipe.get(key):
+                raise ValueError(f"Mehrstufiges Lösen unterstützt '{key}' nicht")
+        out.append((name, weight, recipe))
+    return out
+
+
+class _Timeout(Exception):
+    pass
+
+
+class _SubsetSearch:
+    """Best subset of at most `k` columns for the sum of weighted per-stage NNLS residuals.
+
+    Depth-first include/exclude search. A node is pruned when even all of its still
+    available columns together cannot beat the incumbent (NNLS residuals only shrink when
+    columns are added), and taken whole when they fit into `k`.
+    """
+
+    def __init__(
+        self,
+        matrices: Sequence[np.ndarray],
+        targets: Sequence[np.ndarray],
+        weights: Sequence[float],
+        k: int,
+        deadline: float,
+    ) -> None:
+        self.matrices = matrices
+        self.targets = targets
+        self.weights = weights
+        self.k = k
+        self.deadline = deadline
+        self.cache: Dict[Tuple[int, ...], float] = {}
+        self.best: Tuple[int, ...] | None = None
+        self.best_value = math.inf
+
+    def evaluate(self, columns: Sequence[int]) -> float:
+        key = tuple(sorted(columns))
+        value = self.cache.get(key)
+        if value is None:
+            if time.time() > self.deadline:
+                raise _Timeout
+            value = 0.0
+            for A, b, w in zip(self.matrices, self.targets, self.weights):
+                A_sub = A[:, key]
+                r = A_sub @ _nnls(A_sub, b) - b if key else -b
+                value += w * float(r @ r)
+            self.cache[key] = value
+        return value
+
+    def consider(self, columns: Sequence[int]) -> None:
+        value = self.evaluate(columns)
+        if value < self.best_value:
+            self.best, self.best_value = tuple(sorted(columns)), value
+
+    def visit(self, chosen: Tuple[int, ...], candidates: Sequence[int], pos: int) -> None:
+        rest = tuple(candidates[pos:])
+        if len(chosen) + len(rest) <= self.k:
+            self.consider(chosen + rest)
+            return
+        if len(chosen) == self.k:
+            self.consider(chosen)
+            return
+        if self.evaluate(chosen + rest) >= self.best_value - 1e-12 * max(1.0, self.best_value):
+            return
+        self.visit(chosen + (candidates[pos],), candidates, pos + 1)
+        self.visit(chosen, candidates, pos + 1)
+
+    def greedy(self, required: Tuple[int, ...], candidates: Sequence[int]) -> List[int]:
+        """Forward selection up to `k`; seeds the incumbent and the branching order."""
+        chosen = list(required)
+        order: List[int] = []
+        remaining = list(candidates)
+        while remaining and len(chosen) < self.k:
+            scores = [self.evaluate(chosen + [c]) for c in remaining]
+            pick = remaining.pop(int(np.argmin(scores)))
+            chosen.append(pick)
+            order.append(pick)
+        self.consider(chosen)
+        single = {c: self.evaluate(list(required) + [c]) for c in remaining}
+        return order + sorted(remaining, key=single.__getitem__)
+
+
+def _search_subtree(args: tuple) -> Tuple[Tuple[int, ...] | None, float, int, bool]:
+    """Process-pool entry point: one top-level branch of the subset search."""
+    matrices, targets, weights, k, deadline, chosen, candidates, pos, incumbent = args
+    search = _SubsetSearch(matrices, targets, weights, k, deadline)
+    search.best_value = incumbent
+    complete = True
+    try:
+        search.visit(chosen, candidates, pos)
+    except _Timeout:
+        complete = False
+    return search.best, search.best_value, len(search.cache), complete
+
+
+def _select_fertilizers(
+    matrices: Sequence[np.ndarray],
+    targets: Sequence[np.ndarray],
+    weights: Sequence[float],
+    k: int,
+    required: Tuple[int, ...],
+    n_columns: int,
+    time_limit_s: float,
+    workers: int,
+) -> tuple[Tuple[int, ...], float, dict]:
+    started = time.perf_counter()
+    deadline = time.time() + time_limit_s
+    # the greedy seed always runs to completion, the time limit applies to the exact search
+    search = _SubsetSearch(matrices, targets, weights, k, math.inf)
+    candidates = search.greedy(required, [c for c in range(n_columns) if c not in required])
+    greedy_value = search.best_value
+    search.deadline = deadline
+
+    # disjoint subtrees: "first included candidate is i" for every i, plus "none of them"
+    branches = []
+    if len(required) < k:
+        branches = [(required + (candidates[i],), candidates, i + 1) for i in range(len(candidates))]
+    complete = True
+    evaluations = len(search.cache)
+    try:
+        if workers > 1 and len(branches) > 1:
+            tasks = [
+                (matrices, targets, weights, k, deadline, chosen, cand, pos, search.best_value)
+                for chosen, cand, pos in branches
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for best, value, count, done in pool.map(_search_subtree, tasks):
+                    evaluations += count
+                    complete = complete and done
+                    if best is not None and value < search.best_value:
+                        search.best, search.best_value = best, value
+        else:
+            for chosen, cand, pos in branches:
+                search.visit(chosen, cand, pos)
+            evaluations = len(search.cache)
+        search.consider(required)
+    except _Timeout:
+        complete = False
+        evaluations = max(evaluations, len(search.cache))
+
+    info = {
+        "optimal": complete,
+        "evaluations": evaluations,
+        "elapsed_s": time.perf_counter() - started,
+        "greedy_weighted_residual_mg_per_l": math.sqrt(greedy_value),
+    }
+    return search.best or required, search.best_value, info
+
+
+def solve_program(
+    program: Mapping,
+    *,
+    ferts: Mapping[str, Fertilizer] | None = None,
+    mm: Dict[str, float] | None = None,
+    compiled: CompiledCatalog | None = None,
+    store: DocumentStore | None = None,
+) -> ProgramResult:
+    """Pick one set of at most `max_fertilizers` from `fertilizers_allowed` that serves all stages.
+
+    The set minimises Σ weight·‖A_s x_s − b_s‖² over the stages (the block-diagonal joint
+    problem); every stage is then solved and verified with the chosen set.
+    """
+    stages = _stage_recipes(program, store)
+    pool = [str(name) for name in program.get("fertilizers_allowed") or []]
+    k = program.get("max_fertilizers")
+    k = len(pool) if k is None else int(k)
+    if k < 1:
+        raise ValueError("max_fertilizers muss >= 1 sein")
+    required_names = [str(name) for name in program.get("required") or []]
+    for name in required_names:
+        if name not in pool:
+            raise KeyError(f"required: '{name}' fehlt in fertilizers_allowed")
+    if len(required_names) > k:
+        raise ValueError("required enthält mehr Dünger als max_fertilizers")
+
+    problems = []
+    with telemetry.stage("solver.multistage.prepare", stages=len(stages)):
+        for _, _, recipe in stages:
+            problems.append(
+                _prepare_problem(dict(recipe, fertilizers_allowed=pool), ferts=ferts, mm=mm, compiled=compiled)
+            )
+    with telemetry.stage("solver.multistage.select", fertilizers=len(pool), stages=len(stages), k=k):
+        chosen, value, search = _select_fertilizers(
+            [problem.A for problem in problems],
+            [problem.residual_target() for problem in problems],
+            [weight for _, weight, _ in stages],
+            k,
+            tuple(pool.index(name) for name in required_names),
+            len(pool),
+            float(program.get("time_limit_s") or DEFAULT_TIME_LIMIT_S),
+            int(program.get("workers") or 1),
+        )
+    telemetry.inc("horticalc_solver_solves_total", search["evaluations"] * len(stages))
+
+    selected = [pool[idx] for idx in chosen]
+    columns = list(chosen)
+    stage_results = []
+    for (name, weight, _), problem in zip(stages, problems):
+        A = problem.A[:, columns]
+        weights = np.zeros(len(pool))
+        if columns:
+            weights[columns] = _nnls(A, problem.residual_target())
+        result = _finish_solve(problem, weights)
+        stage_results.append({"name": name, "weight": weight, **result.to_dict()})
+    return ProgramResult(
+        fertilizers=selected,
+        stages=stage_results,
+        weighted_residual_mg_l=math.sqrt(value),
+        search=search,
+    )
+
+
+def solve_program_file(path: Path) -> ProgramResult:
+    return solve_program(_load_solver_recipe(path))
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Mapping
+
+import numpy as np
+
+from . import telemetry
+from .data_io import Fertilizer, load_prices
+from .solver import (
+    BoundSpec,
+    SolverProblem,
+    _active_set_qp,
+    _bound_spec,
+    _constraint_rows,
+    _least_squares_qp,
+    _prepare_problem,
+    _recipe_grams,
+    _unbounded_spec,
+)
+
+if TYPE_CHECKING:
+    from .snapshot import CompiledCatalog
+
+DEFAULT_POINTS = 25
+
+
+@dataclass
+class ParetoFront:
+    liters: float
+    objective_elements: List[str]
+    target_weights: Dict[str, float]
+    points: List[dict]
+
+    def to_dict(self) -> dict:
+        return {
+            "liters": self.liters,
+            "objective_elements": self.objective_elements,
+            "target_weights": self.target_weights,
+            "points": self.points,
+        }
+
+
+def fertilizer_unit_costs(fertilizers: List[Fertilizer], prices: Mapping[str, float]) -> np.ndarray:
+    """Cost per recipe unit (g, for liquids ml x `Gewicht`) from prices per kg product."""
+    missing = [fert.name for fert in fertilizers if fert.name not in prices]
+    if missing:
+        raise KeyError(f"Kein Preis für '{missing[0]}' (data/prices.yml oder prices_per_kg)")
+    return np.array([prices[fert.name] * float(fert.weight_factor or 1.0) / 1000.0 for fert in fertilizers])
+
+
+def _target_weights(recipe: dict, keys: List[str]) -> np.ndarray:
+    weights = {str(k): float(v) for k, v in (recipe.get("target_weights") or {}).items()}
+    for key in weights:
+        if key not in keys:
+            raise KeyError(f"target_weights: '{key}' ist kein Zielwert")
+    values = np.array([weights.get(key, 1.0) for key in keys])
+    if np.any(values < 0):
+        raise ValueError("target_weights müssen >= 0 sein")
+    return values
+
+
+def pareto_sweep(
+    A: np.ndarray,
+    b: np.ndarray,
+    weights: np.ndarray,
+    cost: np.ndarray,
+    spec: BoundSpec,
+    names: List[str],
+    points: int = DEFAULT_POINTS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Solve min ½‖W(Ax−b)‖² + λ·cᵀx for a grid of λ, each QP warm-started from the previous one.
+
+    Returns the λ grid and the solutions as rows. λ runs from 0 (pure accuracy) up to the
+    price at which adding any fertilizer no longer pays off.
+    """
+    Aw = A * weights[:, None]
+    H, g = _least_squares_qp(Aw, b * weights)
+    C, d, _ = _constraint_rows(spec, names)
+    gain = -g
+    priced = cost > 0
+    lam_max = float(np.max(gain[priced] / cost[priced])) if np.any(priced) else 0.0
+    if lam_max <= 0 or points < 2:
+        lambdas = np.zeros(1)
+    else:
+        lambdas = np.concatenate([[0.0], np.geomspace(lam_max * 1e-4, lam_max, points - 1)])
+
+    solutions = np.zeros((len(lambdas), A.shape[1]))
+    active = None
+    for idx, lam in enumerate(lambdas):
+        result = _active_set_qp(H, g + lam * cost, C, d, active=active)
+        solutions[idx] = np.clip(result.x, spec.lower, spec.upper)
+        active = result.active
+    solutions[solutions < 1e-9] = 0.0
+    return lambdas, solutions
+
+
+def _nondominated(costs: np.ndarray, errors: np.ndarray) -> List[int]:
+    keep: List[int] = []
+    best_error = np.inf
+    for idx in np.lexsort((errors, costs)):
+        if not keep or errors[idx] < best_error - 1e-9 * max(1.0, best_error):
+            keep.append(int(idx))
+            best_error = errors[idx]
+    return keep
+
+
+def solve_pareto(
+    recipe: dict,
+    *,
+    ferts: Mapping[str, Fertilizer] | None = None,
+    mm: Dict[str, float] | None = None,
+    water_profile_data: dict | None = None,
+    compiled: CompiledCatalog | None = None,
+    prices: Mapping[str, float] | None = None,
+) -> ParetoFront:
+    problem: SolverProblem = _prepare_problem(
+        recipe, ferts=ferts, mm=mm, water_profile_data=water_profile_data, compiled=compiled
+    )
+    if problem.ec_limit is not None:
+        raise ValueError("Die Pareto-Front unterstützt keine EC-Vorgabe")
+    if prices is None:
+        prices = recipe.get("prices_per_kg") or load_prices()
+    if not prices:
+        raise ValueError("Keine Preise: data/prices.yml anlegen oder prices_per_kg angeben")
+    unit_cost = fertilizer_unit_costs(problem.allowed, prices)
+    weights = _target_weights(recipe, problem.objective_keys)
+    names = problem.variable_names
+    mask = problem.variable_mask
+    spec = _bound_spec(recipe, problem.allowed, problem.fixed_grams)
+    if spec is None:
+        spec = _unbounded_spec(len(names))
+
+    residual = problem.residual_target()
+    with telemetry.stage("solver.pareto", fertilizers=len(problem.allowed), targets=len(problem.objective_keys)):
+        lambdas, solutions = pareto_sweep(
+            problem.A[:, mask],
+            residual,
+            weights,
+            unit_cost[mask],
+            spec,
+            names,
+            int(recipe.get("points") or DEFAULT_POINTS),
+        )
+    # cost (fixed grams included) and error of every point at once; the error is measured
+    # against the same clamped residual target the sweep minimizes
+    full = np.tile(problem.fixed_weights, (len(lambdas), 1))
+    full[:, mask] += solutions
+    costs = full @ unit_cost
+    errors_mg_l = solutions @ problem.A[:, mask].T - residual
+    weighted_error = np.sqrt(np.sum((errors_mg_l * weights) ** 2, axis=1))
+
+    points = []
+    for idx in _nondominated(costs, weighted_error):
+        points.append(
+            {
+                "lambda": float(lambdas[idx]),
+                "cost": float(costs[idx]),
+                "error": float(weighted_error[idx]),
+                "errors_mg_per_l": dict(zip(problem.objective_keys, errors_mg_l[idx].tolist())),
+                "fertilizers": _recipe_grams(problem, solutions[idx]),
+            }
+        )
+    telemetry.inc("horticalc_solver_solves_total", len(lambdas))
+    return ParetoFront(
+        liters=problem.liters,
+        objective_elements=problem.objective_keys,
+        target_weights=dict(zip(problem.objective_keys, weights.tolist())),
+        points=points,
+    )
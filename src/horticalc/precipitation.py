@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+
+from .speciation import _R_KJ, _columns, davies_log_gamma, speciate
+
+
+@dataclass(frozen=True)
+class Mineral:
+    name: str
+    formula: str
+    # dissolution products as (ion label, stoichiometric coefficient); water is left out
+    ions: tuple[tuple[str, int], ...]
+    log_ksp_25: float
+    # dissolution enthalpy for van 't Hoff; 0 where no value is tabulated
+    delta_h_kj_per_mol: float = 0.0
+
+    def log_ksp(self, temp_c: float | np.ndarray = 25.0) -> float | np.ndarray:
+        temp_k = np.asarray(temp_c, dtype=float) + 273.15
+        return self.log_ksp_25 - self.delta_h_kj_per_mol / (_R_KJ * math.log(10)) * (1.0 / temp_k - 1.0 / 298.15)
+
+
+# solubility products at 25 °C (phreeqc.dat, minteq.v4)
+MINERALS: dict[str, Mineral] = {
+    "gypsum": Mineral("gypsum", "CaSO4·2H2O", (("Ca+2", 1), ("SO4^2-", 1)), -4.58, -0.46),
+    "brushite": Mineral("brushite", "CaHPO4·2H2O", (("Ca+2", 1), ("HPO4^2-", 1)), -6.59),
+    "monetite": Mineral("monetite", "CaHPO4", (("Ca+2", 1), ("HPO4^2-", 1)), -6.90),
+    "tcp": Mineral("tcp", "β-Ca3(PO4)2", (("Ca+2", 3), ("PO4^3-", 2)), -28.92),
+    "calcite": Mineral("calcite", "CaCO3", (("Ca+2", 1), ("CO3^2-", 1)), -8.48, -9.61),
+    "strengite": Mineral("strengite", "FePO4·2H2O", (("Fe+3", 1), ("PO4^3-", 1)), -26.4),
+}
+
+# Fe3+ + n H2O = Fe(OH)n^(3-n) + n H+, log10 β at 25 °C (phreeqc.dat)
+FE_HYDROLYSIS: tuple[tuple[int, float], ...] = ((1, -2.19), (2, -5.67), (3, -12.56), (4, -21.6))
+
+# Davies turns upward above ~0.5 mol/kg; the screen holds the coefficients at this strength
+DAVIES_MAX_STRENGTH = 0.5
+
+_SCREEN_LABELS: tuple[str, ...] = ("Ca+2", "SO4^2-", "HPO4^2-", "PO4^3-", "CO3^2-")
+_CHARGES = {"Ca+2": 2, "SO4^2-": 2, "HPO4^2-": 2, "PO4^3-": 3, "CO3^2-": 2, "Fe+3": 3}
+
+
+@dataclass
+class PrecipitationScreen:
+    """Saturation indices (..., minerals) of `saturation_indices`; SI > threshold is flagged."""
+
+    minerals: tuple[str, ...]
+    saturation_index: np.ndarray
+    ionic_strength_mol_per_kg: np.ndarray
+    threshold: float
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self.saturation_index > self.threshold
+
+    def summary(self, row: int | tuple = ()) -> Dict[str, object]:
+        values = self.saturation_index[row]
+        # -inf (a missing ion) is not valid JSON: reported as None
+        return {
+            "saturation_index": {
+                name: float(value) if np.isfinite(value) else None for name, value in zip(self.minerals, values)
+            },
+            "flags": [name for name, value in zip(self.minerals, values) if value > self.threshold],
+            "ionic_strength_mol_per_kg": float(self.ionic_strength_mol_per_kg[row]),
+        }
+
+
+def saturation_indices(
+    ions_mmol_per_l: np.ndarray,
+    labels: Sequence[str],
+    ph: np.ndarray | float,
+    fe_mmol_per_l: np.ndarray | float = 0.0,
+    temp_c: np.ndarray | float = 25.0,
+    density_kg_per_l: float = 1.0,
+    minerals: Sequence[str] | None = None,
+    threshold: float = 0.0,
+) -> PrecipitationScreen:
+    """SI = log10(IAP / Ksp) of `minerals` for rows of nominal ion states (mmol/L).
+
+    The rows are speciated in one batch (`speciate` with the pH and CaSO4°/MgSO4° pairs),
+    activities use Davies coefficients at the resulting ionic strength, held at their
+    value for `DAVIES_MAX_STRENGTH` above it (Davies would let them rise again at stock
+    strength). Fe is free Fe3+ after hydrolysis (`fe_mmol_per_l`: unchelated Fe only,
+    chelated Fe does not precipitate). A screen, not a solubility prediction.
+    """
+    names = tuple(minerals) if minerals is not None else tuple(MINERALS)
+    for name in names:
+        if name not in MINERALS:
+            raise KeyError(f"Unbekanntes Mineral: '{name}' (erwartet: {', '.join(MINERALS)})")
+    labels = tuple(labels)
+    species = speciate(ions_mmol_per_l, labels, ph, temp_c, density_kg_per_l, ion_pairs=True)
+    strength = species.ionic_strength_mol_per_kg
+    shape = strength.shape
+    temps = np.broadcast_to(np.asarray(temp_c, dtype=float), shape)
+    log_g1 = davies_log_gamma(np.minimum(strength, DAVIES_MAX_STRENGTH), temps)
+    to_molal = 1.0 / 1000.0 / density_kg_per_l
+
+    log_activity: Dict[str, np.ndarray] = {}
+    with np.errstate(divide="ignore"):
+        for label, col in zip(_SCREEN_LABELS, _columns(labels, _SCREEN_LABELS)):
+            molal = species.ions_mmol_per_l[..., col] * to_molal
+            log_activity[label] = np.log10(molal) + _CHARGES[label] ** 2 * log_g1
+        # free Fe3+: [Fe(OH)n] = β_n [Fe3+] γ3 / (γ_(3-n) a_H^n)
+        log_a_h = -np.broadcast_to(np.asarray(ph, dtype=float), shape)
+        hydrolysis = 1.0 + sum(
+            10.0 ** (log_beta + (9 - (3 - n) ** 2) * log_g1 - n * log_a_h) for n, log_beta in FE_HYDROLYSIS
+        )
+        fe = np.broadcast_to(np.asarray(fe_mmol_per_l, dtype=float), shape) * to_molal
+        log_activity["Fe+3"] = np.log10(fe / hydrolysis) + 9 * log_g1
+
+    si = np.empty((*shape, len(names)))
+    for k, name in enumerate(names):
+        mineral = MINERALS[name]
+        log_iap = sum(nu * log_activity[label] for label, nu in mineral.ions)
+        si[..., k] = log_iap - mineral.log_ksp(temps)
+    return PrecipitationScreen(names, si, strength, float(threshold))
+
+
+def screen_concentrate(
+    water_ions_mmol_per_l: np.ndarray,
+    fertilizer_ions_mmol_per_l: np.ndarray,
+    factor: np.ndarray | float,
+    labels: Sequence[str],
+    ph: np.ndarray | float,
+    water_fe_mmol_per_l: np.ndarray | float = 0.0,
+    fertilizer_fe_mmol_per_l: np.ndarray | float = 0.0,
+    fe_unchelated_fraction: float = 0.0,
+    temp_c: np.ndarray | float = 25.0,
+    threshold: float = 0.0,
+) -> PrecipitationScreen:
+    """Screen a stock concentrate: the fertilizers at `factor`-fold strength in the water.
+
+    Rows broadcast against each other, so one water can be checked against thousands of
+    candidate fertilizer mixes (or factors) in a single call. Fertilizer Fe counts with
+    `fe_unchelated_fraction` (0: all chelated), water Fe in full.
+    """
+    factor = np.asarray(factor, dtype=float)
+    if np.any(factor <= 0):
+        raise ValueError("Konzentrationsfaktor muss > 0 sein")
+    water = np.asarray(water_ions_mmol_per_l, dtype=float)
+    fertilizer = np.asarray(fertilizer_ions_mmol_per_l, dtype=float)
+    concentrate = water + factor[..., None] * fertilizer
+    fe = np.asarray(water_fe_mmol_per_l, dtype=float) + fe_unchelated_fraction * factor * np.asarray(
+        fertilizer_fe_mmol_per_l, dtype=float
+    )
+    return saturation_indices(concentrate, labels, ph, fe, temp_c, threshold=threshold)
+
+
+def screen_recipe_option(
+    spec: bool | Mapping,
+    water_ions_mmol_per_l: Mapping[str, float],
+    fertilizer_ions_mmol_per_l: Mapping[str, float],
+    water_fe_mmol_per_l: float,
+    fertilizer_fe_mmol_per_l: float,
+    ph: float | None = None,
+) -> Dict[str, object]:
+    """Result of the recipe option `precipitation` (`true` or a dict of `screen_concentrate` settings).
+
+    `factor` defaults to 100 (a 1:100 stock tank), `ph` to the recipe's pH; without
+    either the screen cannot run.
+    """
+    from .core import ION_INDEX
+
+    spec = {} if spec is True else dict(spec)
+    factor = float(spec.get("factor", 100.0))
+    if factor <= 0:
+        raise ValueError("precipitation: 'factor' muss > 0 sein")
+    ph = spec.get("ph", ph)
+    if ph is None:
+        raise ValueError("precipitation braucht einen pH-Wert (ph)")
+    temp_c = float(spec.get("temp_c", 25.0))
+    fraction = float(spec.get("fe_unchelated_fraction", 0.0))
+    if not 0.0 <= fraction <= 1.0:
+        raise ValueError("precipitation: 'fe_unchelated_fraction' muss zwischen 0 und 1 liegen")
+    threshold = float(spec.get("threshold", 0.0))
+
+    screen = screen_concentrate(
+        np.nan_to_num(ION_INDEX.pack(water_ions_mmol_per_l)),
+        np.nan_to_num(ION_INDEX.pack(fertilizer_ions_mmol_per_l)),
+        factor,
+        ION_INDEX.labels,
+        float(ph),
+        water_fe_mmol_per_l,
+        fertilizer_fe_mmol_per_l,
+        fraction,
+        temp_c,
+        threshold,
+    )
+    summary = screen.summary()
+    return {
+        "factor": factor,
+        "ph": float(ph),
+        "temp_c": temp_c,
+        "fe_unchelated_fraction": fraction,
+        "threshold": threshold,
+        **summary,
+        "ok": not summary["flags"],
+    }
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+PROFILE_MODES = ("cpu", "mem")
+
+
+class StackSampler:
+    """Samples the stack of one thread and aggregates it as collapsed stacks.
+
+    The collapsed format (`frame;frame;frame count`) is what flamegraph.pl,
+    speedscope and inferno read.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = 0.001, root: object | None = None) -> None:
+        self.thread_id = thread_id
+        self.root = root
+        self.interval_s = interval_s
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="horticalc-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and frame is not self.root and frame.f_back is not self.root:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _with_ext(base: Path, ext: str) -> Path:
+    return base.with_name(base.name + ext)
+
+
+def _profile_cpu(func: Callable[[], T], out_base: Path, top: int) -> tuple[T, str]:
+    # Frames from this function upwards (CLI, runcall) are cut from the stacks.
+    sampler = StackSampler(threading.get_ident(), root=sys._getframe())
+    profiler = cProfile.Profile()
+    sampler.start()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        sampler.stop()
+
+    stats_path = _with_ext(out_base, ".prof")
+    collapsed_path = _with_ext(out_base, ".collapsed")
+    profiler.dump_stats(str(stats_path))
+    collapsed_path.write_text(sampler.collapsed(), encoding="utf-8")
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    report = (
+        f"[Horticalc] CPU-Profil: {stats_path}\n"
+        f"[Horticalc] Collapsed Stacks ({sum(sampler.samples.values())} Samples): {collapsed_path}\n"
+        + buffer.getvalue()
+    )
+    return result, report
+
+
+def _profile_mem(func: Callable[[], T], out_base: Path, top: int) -> tuple[T, str]:
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    baseline_current, _ = tracemalloc.get_traced_memory()
+    try:
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+    )
+    lines = [
+        f"Peak: {(peak - baseline_current) / 1024:.1f} KiB",
+        f"Retained after run: {(current - baseline_current) / 1024:.1f} KiB",
+        "",
+        f"Top {top} allocation sites (by size):",
+    ]
+    for idx, stat in enumerate(snapshot.statistics("lineno")[:top], start=1):
+        frame = stat.traceback[0]
+        lines.append(f"{idx:>3}. {frame.filename}:{frame.lineno}  {stat.size / 1024:.1f} KiB in {stat.count} blocks")
+    lines.append("")
+    lines.append(f"Top {top} allocation tracebacks:")
+    for stat in snapshot.statistics("traceback")[:top]:
+        lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        lines.extend(f"    {line}" for line in stat.traceback.format(limit=8, most_recent_first=True))
+
+    report_path = _with_ext(out_base, ".txt")
+    text = "\n".join(lines) + "\n"
+    report_path.write_text(text, encoding="utf-8")
+    return result, f"[Horticalc] Speicher-Profil: {report_path}\n" + "\n".join(lines[:top + 4]) + "\n"
+
+
+def run_profiled(mode: str, func: Callable[[], T], out_base: Path, top: int = 25) -> tuple[T, str]:
+    """Run `func` under the requested profiler and write the reports next to `out_base`.
+
+    `cpu` writes `<out>.prof` (cProfile/pstats) and `<out>.collapsed`; `mem` writes
+    `<out>.txt` with peak memory and the top tracemalloc allocation sites.
+    """
+    if out_base.suffix in (".prof", ".collapsed", ".txt"):
+        out_base = out_base.with_suffix("")
+    out_base.parent.mkdir(parents=True, exist_ok=True)
+    if mode == "cpu":
+        return _profile_cpu(func, out_base, top)
+    if mode == "mem":
+        return _profile_mem(func, out_base, top)
+    raise ValueError(f"Unknown profile mode: {mode} (expected one of {', '.join(PROFILE_MODES)})")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import TYPE_CHECKING, Dict, Mapping
+
+import numpy as np
+
+from . import telemetry
+from .data_io import Fertilizer
+from .solver import (
+    SolveResult,
+    _bound_spec,
+    _finish_solve,
+    _normalize_targets,
+    _objective_keys,
+    _prepare_problem,
+    _problem_matrix,
+    _solve_problem,
+)
+
+if TYPE_CHECKING:
+    from .snapshot import CompiledCatalog
+
+
+class SolverSession:
+    """A prepared solver recipe that re-solves target edits from the previous solution.
+
+    Water baseline, matrix and bounds are built once. A target edit only rebuilds `b`
+    (and the matrix rows if the set of objective elements changes); the solve restarts
+    from the last NNLS support or active set.
+    """
+
+    def __init__(
+        self,
+        recipe: dict,
+        *,
+        ferts: Mapping[str, Fertilizer] | None = None,
+        mm: Dict[str, float] | None = None,
+        water_profile_data: dict | None = None,
+        compiled: CompiledCatalog | None = None,
+    ) -> None:
+        self.compiled = compiled
+        with telemetry.stage("solver.session.prepare"):
+            self.problem = _prepare_problem(
+                recipe, ferts=ferts, mm=mm, water_profile_data=water_profile_data, compiled=compiled
+            )
+        self.spec = _bound_spec(recipe, self.problem.allowed, self.problem.fixed_grams)
+        self._warm = None
+        self.solves = 0
+        self.result = self._solve()
+
+    @property
+    def targets(self) -> Dict[str, float]:
+        return dict(self.problem.targets)
+
+    def _solve(self) -> SolveResult:
+        solved = _solve_problem(self.problem, self.spec, warm=self._warm)
+        self._warm = solved.warm
+        self.solves += 1
+        return _finish_solve(
+            self.problem,
+            solved.weights,
+            active_constraints=solved.active_constraints,
+            discrete=solved.discrete,
+            diagnostics=solved.diagnostics,
+        )
+
+    def set_targets(self, changes: Mapping[str, float]) -> SolveResult:
+        """Merge `changes` into the targets (0 removes an element) and re-solve."""
+        problem = self.problem
+        targets = dict(problem.targets)
+        targets.update(_normalize_targets(dict(changes)))
+        keys = _objective_keys(targets)
+        if not keys:
+            raise ValueError("No solvable targets defined (S/SO4/Na/Cl are ignored).")
+        A = problem.A
+        if keys != problem.objective_keys:
+            A = _problem_matrix(problem.allowed, problem.molar_masses, keys, problem.liters, self.compiled)
+        b = np.array([targets.get(key, 0.0) - problem.water_elements.get(key, 0.0) for key in keys], dtype=float)
+        self.problem = replace(problem, targets=targets, objective_keys=keys, A=A, b=b)
+        with telemetry.stage("solver.session.resolve"):
+            self.result = self._solve()
+        return self.result
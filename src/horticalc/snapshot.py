@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from . import telemetry
+from .catalog import CATALOG_ENV, FertilizerCatalog
+from .core import ELEMENT_INDEX
+from .data_io import COMP_COLS, Fertilizer, load_fertilizers, load_molar_masses, repo_root
+
+RELOAD_INTERVAL_ENV = "HORTICALC_RELOAD_INTERVAL"
+SHARED_DIR_ENV = "HORTICALC_SHARED_DIR"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class CompiledCatalog:
+    """Dense, read-only matrices over a whole fertilizer catalog.
+
+    `composition` is fertilizers x `COMP_COLS` (mass fractions), `contribution` is
+    fertilizers x `ELEMENT_INDEX` labels (mg element per g product, as used by the solver).
+    """
+
+    names: Tuple[str, ...]
+    index: Mapping[str, int]
+    composition: np.ndarray
+    weight_factors: np.ndarray
+    contribution: np.ndarray
+
+    def rows(self, names: Iterable[str]) -> np.ndarray:
+        try:
+            return np.array([self.index[name] for name in names], dtype=np.intp)
+        except KeyError as exc:
+            raise KeyError(f"Unbekannter Dünger im kompilierten Katalog: '{exc.args[0]}'") from None
+
+    def solver_matrix(self, names: Sequence[str], keys: Sequence[str], liters: float) -> np.ndarray:
+        """Targets x fertilizers matrix in mg/L per g, identical to `solver._build_matrix`."""
+        positions = ELEMENT_INDEX.positions
+        rows = self.rows(names)
+        matrix = np.zeros((len(keys), len(rows)))
+        for row, key in enumerate(keys):
+            pos = positions.get(key)
+            if pos is not None:
+                matrix[row] = self.contribution[rows, pos] * self.weight_factors[rows] / liters
+        return matrix
+
+
+def compile_catalog(fertilizers: Mapping[str, Fertilizer], molar_masses: Mapping[str, float]) -> CompiledCatalog:
+    from .solver import _fertilizer_element_contrib_per_g
+
+    names = tuple(fertilizers)
+    composition = np.zeros((len(names), len(COMP_COLS)))
+    weight_factors = np.ones(len(names))
+    contribution = np.zeros((len(names), len(ELEMENT_INDEX)))
+    positions = ELEMENT_INDEX.positions
+    for row, name in enumerate(names):
+        fert = fertilizers[name]
+        composition[row, fert.comp_index] = fert.comp_values
+        weight_factors[row] = float(fert.weight_factor or 1.0)
+        for key, value in _fertilizer_element_contrib_per_g(fert, dict(molar_masses)).items():
+            contribution[row, positions[key]] = value
+    return CompiledCatalog(
+        names=names,
+        index=MappingProxyType({name: row for row, name in enumerate(names)}),
+        composition=_read_only(composition),
+        weight_factors=_read_only(weight_factors),
+        contribution=_read_only(contribution),
+    )
+
+
+# --- Memory-mapped catalog shared between worker processes ---------------------------
+#
+# Layout: 8-byte magic, 8-byte little-endian header length, JSON header, then the float64
+# arrays, each 64-byte aligned. Workers map the file read-only, so the pages are shared
+# through the OS page cache instead of being parsed and copied per process.
+
+_MAGIC = b"HCAT\x00\x00\x00\x01"
+_ALIGN = 64
+_ARRAYS = ("composition", "weight_factors", "contribution")
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def publish_catalog(
+    path: Path,
+    fertilizers: Mapping[str, Fertilizer],
+    molar_masses: Mapping[str, float],
+    compiled: CompiledCatalog,
+) -> None:
+    """Write a compiled catalog to `path` atomically (temp file + rename)."""
+    extras = {}
+    for row, name in enumerate(compiled.names):
+        if fertilizers[name].extra:
+            extras[str(row)] = dict(fertilizers[name].extra)
+    arrays = {name: np.ascontiguousarray(getattr(compiled, name), dtype="<f8") for name in _ARRAYS}
+    layout: Dict[str, dict] = {}
+    header = {
+        "names": list(compiled.names),
+        "forms": [fertilizers[name].form for name in compiled.names],
+        "raw_weight_factors": [fertilizers[name].weight_factor for name in compiled.names],
+        "extras": extras,
+        "molar_masses": dict(molar_masses),
+        "comp_cols": list(COMP_COLS),
+        "element_labels": list(ELEMENT_INDEX.labels),
+        "arrays": layout,
+    }
+
+    # The array offsets are part of the header, so grow the data start until it fits.
+    start = 0
+    while True:
+        offset = start
+        for name, array in arrays.items():
+            layout[name] = {"offset": offset, "shape": list(array.shape)}
+            offset = _aligned(offset + array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        needed = _aligned(len(_MAGIC) + 8 + len(header_bytes))
+        if needed <= start:
+            break
+        start = needed
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+class MappedFertilizers(Mapping[str, Fertilizer]):
+    """Fertilizer mapping over a mapped catalog; `Fertilizer` objects are built on first use."""
+
+    def __init__(
+        self,
+        compiled: CompiledCatalog,
+        forms: Sequence[str],
+        weight_factors: Sequence[float],
+        extras: Mapping[str, Mapping[str, float]],
+    ) -> None:
+        self.compiled = compiled
+        self.forms = forms
+        self.weight_factors = weight_factors
+        self.extras = extras
+        self._cache: Dict[str, Fertilizer] = {}
+
+    def __getitem__(self, name: str) -> Fertilizer:
+        fert = self._cache.get(name)
+        if fert is not None:
+            return fert
+        row = self.compiled.index[name]
+        values = self.compiled.composition[row]
+        comp = {COMP_COLS[pos]: float(values[pos]) for pos in np.flatnonzero(values).tolist()}
+        comp.update(self.extras.get(str(row), {}))
+        fert = Fertilizer(name=name, form=self.forms[row], weight_factor=self.weight_factors[row], comp=comp)
+        self._cache[name] = fert
+        return fert
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.compiled.index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.compiled.names)
+
+    def __len__(self) -> int:
+        return len(self.compiled.names)
+
+
+def attach_catalog(path: Path) -> Tuple[MappedFertilizers, Mapping[str, float], CompiledCatalog] | None:
+    """Map a published catalog read-only; None if the file is missing or from another layout."""
+    try:
+        with path.open("rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                return None
+            header = json.loads(f.read(int.from_bytes(f.read(8), "little")).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+    if header.get("comp_cols") != list(COMP_COLS) or header.get("element_labels") != list(ELEMENT_INDEX.labels):
+        return None
+
+    arrays = {
+        name: np.memmap(path, dtype="<f8", mode="r", offset=spec["offset"], shape=tuple(spec["shape"]))
+        for name, spec in header["arrays"].items()
+    }
+    names = tuple(header["names"])
+    compiled = CompiledCatalog(
+        names=names,
+        index=MappingProxyType({name: row for row, name in enumerate(names)}),
+        composition=arrays["composition"],
+        weight_factors=arrays["weight_factors"],
+        contribution=arrays["contribution"],
+    )
+    fertilizers = MappedFertilizers(compiled, header["forms"], header["raw_weight_factors"], header["extras"])
+    return fertilizers, MappingProxyType(header["molar_masses"]), compiled
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """Immutable view of the reference data one request works with."""
+
+    version: int
+    digest: str
+    loaded_at: float
+    fertilizers: Mapping[str, Fertilizer]
+    molar_masses: Mapping[str, float]
+    compiled: CompiledCatalog | None
+    shared_path: Path | None = None
+
+    def fertilizers_for(self, names: Iterable[str]) -> Mapping[str, Fertilizer]:
+        # With an SQLite catalog only the referenced rows are loaded, in one query.
+        if isinstance(self.fertilizers, FertilizerCatalog):
+            # recipes are matched on stripped names (see core._fertilizer_forms)
+            return self.fertilizers.get_many(str(name).strip() for name in names)
+        return self.fertilizers
+
+
+class SnapshotManager:
+    """Holds the active `DataSnapshot` and rebuilds it when the source files change.
+
+    Readers call `current()` once per request and keep that snapshot; a reload swaps
+    the reference atomically. A failed reload keeps the previous snapshot.
+    """
+
+    def __init__(
+        self,
+        fertilizers_path: Path | None = None,
+        molar_masses_path: Path | None = None,
+        catalog_db: Path | None = None,
+        shared_dir: Path | None = None,
+    ) -> None:
+        self.fertilizers_path = fertilizers_path or repo_root() / "data" / "fertilizers.csv"
+        self.molar_masses_path = molar_masses_path or repo_root() / "data" / "molar_masses.yml"
+        self.catalog_db = catalog_db
+        self.shared_dir = shared_dir
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stamps = self._source_stamps()
+        self._snapshot = self._build(1)
+
+    @classmethod
+    def from_env(cls) -> "SnapshotManager":
+        db_path = os.environ.get(CATALOG_ENV)
+        shared_dir = os.environ.get(SHARED_DIR_ENV)
+        return cls(
+            catalog_db=Path(db_path).expanduser().resolve() if db_path else None,
+            shared_dir=Path(shared_dir).expanduser().resolve() if shared_dir else None,
+        )
+
+    def _sources(self) -> List[Path]:
+        fertilizers = self.catalog_db if self.catalog_db is not None else self.fertilizers_path
+        return [fertilizers, self.molar_masses_path]
+
+    def _source_stamps(self) -> Tuple[Tuple[int, int], ...]:
+        stamps = []
+        for path in self._sources():
+            stat = path.stat()
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamps)
+
+    def _digest(self) -> str:
+        sha = hashlib.sha256()
+        for path, (mtime_ns, size) in zip(self._sources(), self._stamps):
+            if path == self.catalog_db:
+                sha.update(f"{mtime_ns}:{size}".encode())
+            else:
+                sha.update(path.read_bytes())
+        return sha.hexdigest()[:12]
+
+    def _load_and_compile(self) -> Tuple[Mapping[str, Fertilizer], Mapping[str, float], CompiledCatalog]:
+        molar_masses = load_molar_masses(self.molar_masses_path)
+        fertilizers = MappingProxyType(load_fertilizers(self.fertilizers_path))
+        with telemetry.stage("snapshot.compile", fertilizers=len(fertilizers)):
+            compiled = compile_catalog(fertilizers, molar_masses)
+        return fertilizers, MappingProxyType(molar_masses), compiled
+
+    def _build(self, version: int) -> DataSnapshot:
+        digest = self._digest()
+        shared_path = None
+        with telemetry.stage("snapshot.build", version=version):
+            if self.catalog_db is not None:
+                fertilizers: Mapping[str, Fertilizer] = FertilizerCatalog(self.catalog_db)
+                molar_masses: Mapping[str, float] = MappingProxyType(load_molar_masses(self.molar_masses_path))
+                compiled = None
+            elif self.shared_dir is not None:
+                # The first worker for a given digest publishes, the others only map the file.
+                shared_path = self.shared_dir / f"catalog-{digest}.bin"
+                attached = attach_catalog(shared_path)
+                telemetry.inc("horticalc_cache_total", cache="shared_catalog", result="hit" if attached else "miss")
+                if attached is None:
+                    publish_catalog(shared_path, *self._load_and_compile())
+                    self._remove_stale(shared_path)
+                    attached = attach_catalog(shared_path)
+                    if attached is None:
+                        raise RuntimeError(f"Katalog konnte nicht eingebunden werden: {shared_path}")
+                fertilizers, molar_masses, compiled = attached
+            else:
+                fertilizers, molar_masses, compiled = self._load_and_compile()
+            return DataSnapshot(
+                version=version,
+                digest=digest,
+                loaded_at=time.time(),
+                fertilizers=fertilizers,
+                molar_masses=molar_masses,
+                compiled=compiled,
+                shared_path=shared_path,
+            )
+
+    def _remove_stale(self, keep: Path) -> None:
+        # Mapped files stay valid after unlink on POSIX; where removal fails the file is kept.
+        for path in keep.parent.glob("catalog-*.bin"):
+            if path != keep:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def current(self) -> DataSnapshot:
+        return self._snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild if a source file changed (or `force`); returns True when a new snapshot is active."""
+        with self._lock:
+            try:
+                stamps = self._source_stamps()
+            except OSError:
+                return False
+            if stamps == self._stamps and not force:
+                return False
+            previous = self._stamps
+            self._stamps = stamps
+            try:
+                snapshot = self._build(self._snapshot.version + 1)
+            except Exception:
+                # e.g. a file caught mid-write: keep serving the old data, retry on the next change
+                self._stamps = previous
+                telemetry.inc("horticalc_errors_total", stage="snapshot.reload", error="reload")
+                _LOGGER.exception("Reload der Stammdaten fehlgeschlagen, bisheriger Stand bleibt aktiv")
+                return False
+            self._snapshot = snapshot
+            return True
+
+    def start(self, interval_s: float | None = None) -> None:
+        if interval_s is None:
+            interval_s = float(os.environ.get(RELOAD_INTERVAL_ENV, "2.0"))
+        if interval_s <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch,
+            args=(interval_s,),
+            name="horticalc-snapshot-watcher",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self, interval_s: float) -> None:
+        while not self._stop.wait(interval_s):
+            self.reload()
+
+    def status(self) -> Dict[str, object]:
+        snapshot = self._snapshot
+        return {
+            "data_version": snapshot.version,
+            "data_digest": snapshot.digest,
+            "data_loaded_at": snapshot.loaded_at,
+            "data_shared": snapshot.shared_path is not None,
+        }
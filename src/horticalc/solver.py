@@ -2,20 +2,27 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List, Mapping
 
 import numpy as np
 import yaml
 
+from . import telemetry
+from .catalog import fertilizer_source
 from .core import (
+    ION_INDEX,
     OTHER_ELEMENT_FORMS,
     OXIDE_ELEMENT_FORMS,
     _form_to_element,
     _oxide_to_element,
     apply_osmosis_mix,
     compute_solution,
+    fertilizer_ions_per_g,
 )
-from .data_io import Fertilizer, load_fertilizers, load_molar_masses, load_water_profile_data, repo_root
+from .data_io import Fertilizer, load_molar_masses, load_water_profile_data, repo_root
+
+if TYPE_CHECKING:
+    from .snapshot import CompiledCatalog
 
 
 IGNORED_TARGETS = {"S", "SO4", "NA", "CL"}
@@ -30,9 +37,21 @@ class SolveResult:
     achieved_elements_mg_l: Dict[str, float]
     errors_mg_l: Dict[str, float]
     errors_percent: Dict[str, float]
+    # only set by the bounded mode (min_grams/max_grams/max_total_grams/constraints)
+    active_constraints: List[dict] | None = None
+    # only set by the discrete mode (`discrete` in the recipe)
+    discrete: dict | None = None
+    # presolve report (rank, condition number, pruned columns), set by every single solve
+    diagnostics: dict | None = None
+    # only set with an EC limit (`ec_target_mS_per_cm` / `ec_max_mS_per_cm`)
+    ec: dict | None = None
+    # only set with an acid dose (`acid`)
+    acid: dict | None = None
+    # only set with a saturation screen (`precipitation`)
+    precipitation: dict | None = None
 
     def to_dict(self) -> dict:
-        return {
+        data = {
             "liters": self.liters,
             "fertilizers": self.fertilizers,
             "objective_elements": self.objective_elements,
@@ -41,12 +60,44 @@ class SolveResult:
             "errors_mg_per_l": self.errors_mg_l,
             "errors_percent": self.errors_percent,
         }
-
-
-def _nnls(A: np.ndarray, b: np.ndarray, tol: float = 1e-10, max_iter: int = 500) -> np.ndarray:
+        if self.active_constraints is not None:
+            data["active_constraints"] = self.active_constraints
+        if self.discrete is not None:
+            data["discrete"] = self.discrete
+        if self.diagnostics is not None:
+            data["diagnostics"] = self.diagnostics
+        if self.ec is not None:
+            data["ec"] = self.ec
+        if self.acid is not None:
+            data["acid"] = self.acid
+        if self.precipitation is not None:
+            data["precipitation"] = self.precipitation
+        return data
+
+
+def _nnls(
+    A: np.ndarray,
+    b: np.ndarray,
+    tol: float = 1e-10,
+    max_iter: int = 500,
+    passive: np.ndarray | None = None,
+) -> np.ndarray:
+    """Lawson-Hanson NNLS; `passive` warm-starts from a previous solution's support."""
     m, n = A.shape
     x = np.zeros(n)
-    passive = np.zeros(n, dtype=bool)
+    if passive is None:
+        passive = np.zeros(n, dtype=bool)
+    else:
+        # Shrink the old support until its least-squares solution is positive; from there
+        # the usual iterations continue, typically with nothing left to do.
+        passive = passive.copy()
+        while passive.any():
+            z = np.zeros(n)
+            z[passive], *_ = np.linalg.lstsq(A[:, passive], b, rcond=None)
+            if np.all(z[passive] > tol):
+                x = z
+                break
+            passive &= z > tol
     w = A.T @ (b - A @ x)
     iters = 0
     while np.any(w > tol) and iters < max_iter:
@@ -68,6 +119,7 @@ def _nnls(A: np.ndarray, b: np.ndarray, tol: float = 1e-10, max_iter: int = 500)
             passive[(np.abs(x) <= tol) & passive] = False
         w = A.T @ (b - A @ x)
         iters += 1
+    telemetry.inc("horticalc_solver_iterations_total", iters)
     return x
 
 
@@ -101,8 +153,8 @@ def _fertilizer_element_contrib_per_g(fert: Fertilizer, mm: Dict[str, float]) ->
             return
         elements[key] = elements.get(key, 0.0) + value
 
-    for form, frac in fert.comp.items():
-        mg_per_g = float(frac) * 1000.0
+    for form, frac in fert.components():
+        mg_per_g = frac * 1000.0
         if form in ("NH4", "NO3", "Ur-N"):
             add("N_total", mg_per_g)
             if form == "NH4":
@@ -133,8 +185,10 @@ def _build_matrix(
     matrix = np.zeros((len(keys), len(fertilizers)))
     for col, fert in enumerate(fertilizers):
         contrib = _fertilizer_element_contrib_per_g(fert, mm)
+        # recipe amounts of liquids are ml, their composition is per g (see compute_solution)
+        weight = float(fert.weight_factor or 1.0)
         for row, key in enumerate(keys):
-            matrix[row, col] = contrib.get(key, 0.0) / liters
+            matrix[row, col] = contrib.get(key, 0.0) * weight / liters
     return matrix
 
 
@@ -143,7 +197,15 @@ def _solve_weights(
     b: np.ndarray,
     fixed: np.ndarray,
     variable_mask: np.ndarray,
+    passive: np.ndarray | None = None,
+    keep: np.ndarray | None = None,
 ) -> np.ndarray:
+    """NNLS over the variable columns; columns outside `keep` (pruned by `_presolve`) stay 0.
+
+    Near-duplicates are only pruned when that costs nothing: a pruned column whose
+    gradient shows it would still lower the residual is put back and the solve repeated,
+    so the fit is that of the full problem.
+    """
     if A.size == 0:
         return np.array([])
     if fixed.size:
@@ -152,11 +214,344 @@ def _solve_weights(
     A_var = A[:, variable_mask]
     if A_var.size == 0:
         return np.zeros(int(variable_mask.sum()))
-    return _nnls(A_var, b)
+    if keep is None or keep.all():
+        return _nnls(A_var, b, passive=passive)
+    keep = keep.copy()
+    norms = np.linalg.norm(A_var, axis=0)
+    while True:
+        x = np.zeros(A_var.shape[1])
+        if keep.any():
+            x[keep] = _nnls(A_var[:, keep], b, passive=None if passive is None else passive[keep])
+        residual = b - A_var @ x
+        scale = RESTORE_TOLERANCE * norms * max(float(np.linalg.norm(residual)), 1e-12)
+        restore = ~keep & (norms > 0) & (A_var.T @ residual > scale)
+        if not restore.any():
+            return x
+        keep |= restore
+
+
+# 1 - cos below which two columns count as the same product (e.g. Hakaphos Basis2/Basis3)
+DEFAULT_PRUNE_TOLERANCE = 0.01
+# a pruned column comes back when its cosine with the residual exceeds this
+RESTORE_TOLERANCE = 1e-6
+
+
+def _presolve(
+    A: np.ndarray,
+    b: np.ndarray,
+    names: List[str],
+    keys: List[str],
+    prune: bool = True,
+    tol: float = DEFAULT_PRUNE_TOLERANCE,
+) -> tuple[np.ndarray, dict]:
+    """Structure checks of the variable columns `A` before the solve.
+
+    Columns without any objective element and columns (nearly) parallel to an earlier
+    listed one (1 - cos <= `tol`, e.g. Hakaphos Basis2 next to Basis3) are pruned when
+    `prune` is set: near-duplicates leave the split between them to rounding and blow up
+    the condition number. `_solve_weights` puts a pruned column back if the fit needs it.
+    Such pairs (at least at the default tolerance) are listed under `near_collinear`,
+    pruned or not. Rows without any
+    fertilizer are targets no product can reach. Rank and condition number are taken
+    over the remaining columns, each scaled to unit length, so they do not depend on the
+    gram units of the products.
+    """
+    n = A.shape[1]
+    norms = np.linalg.norm(A, axis=0)
+    nonzero = norms > 0
+    keep = np.ones(n, dtype=bool)
+    pruned: List[dict] = []
+    cols = np.flatnonzero(nonzero)
+    U = A[:, cols] / norms[cols]
+    distance = np.maximum(1.0 - U.T @ U, 0.0)
+    close = distance <= tol
+    # reported at the default tolerance at least, also when pruning is tightened or off
+    near_collinear = [
+        {"fertilizers": [names[cols[i]], names[cols[k]]], "one_minus_cos": float(distance[i, k])}
+        for i, k in zip(*np.nonzero(np.triu(distance <= max(tol, DEFAULT_PRUNE_TOLERANCE), 1)))
+    ]
+    if prune:
+        keep &= nonzero
+        pruned.extend({"name": names[j], "reason": "zero_column"} for j in np.flatnonzero(~nonzero))
+        for pos, j in enumerate(cols):
+            if not keep[j]:
+                continue
+            for other_pos in pos + 1 + np.flatnonzero(close[pos, pos + 1 :]):
+                other = cols[other_pos]
+                if keep[other]:
+                    keep[other] = False
+                    pruned.append(
+                        {
+                            "name": names[other],
+                            "reason": "duplicate",
+                            # 1 g of the pruned product is covered by about this many g of the kept one
+                            "covered_by": {names[j]: float(norms[other] / norms[j])},
+                            "one_minus_cos": float(distance[pos, other_pos]),
+                        }
+                    )
+
+    rows = np.any(A != 0, axis=1)
+    cols = keep & nonzero
+    singular = np.zeros(0)
+    if rows.any() and cols.any():
+        singular = np.linalg.svd(A[rows][:, cols] / norms[cols], compute_uv=False)
+    if singular.size:
+        rank = int(np.sum(singular > singular[0] * max(A.shape) * np.finfo(float).eps))
+        condition = float(singular[0] / singular[rank - 1])
+    else:
+        rank, condition = 0, None
+    diagnostics = {
+        "rank": rank,
+        "columns": int(keep.sum()),
+        "condition_number": condition,
+        "pruned": pruned,
+        "near_collinear": near_collinear,
+        "unreachable_targets": [key for key, row, target in zip(keys, rows, b) if not row and target > 0],
+    }
+    return keep, diagnostics
+
+
+@dataclass
+class QPResult:
+    x: np.ndarray
+    active: List[int]
+    multipliers: np.ndarray
+    iterations: int
+
+
+def _kkt_solve(H: np.ndarray, N: np.ndarray, rhs_x: np.ndarray, rhs_c: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    n, k = N.shape
+    if k == 0:
+        return np.linalg.solve(H, rhs_x), np.zeros(0)
+    K = np.zeros((n + k, n + k))
+    K[:n, :n] = H
+    K[:n, n:] = N
+    K[n:, :n] = N.T
+    sol = np.linalg.solve(K, np.concatenate([rhs_x, rhs_c]))
+    return sol[:n], sol[n:]
+
+
+def _is_dependent(N: np.ndarray, c: np.ndarray, tol: float = 1e-10) -> bool:
+    if N.shape[1] == 0:
+        return False
+    coef, *_ = np.linalg.lstsq(N, c, rcond=None)
+    return float(np.linalg.norm(c - N @ coef)) <= tol * max(1.0, float(np.linalg.norm(c)))
+
+
+def _active_set_qp(
+    H: np.ndarray,
+    g: np.ndarray,
+    C: np.ndarray,
+    d: np.ndarray,
+    active: List[int] | None = None,
+    tol: float = 1e-9,
+    max_iter: int | None = None,
+) -> QPResult:
+    """Dual active-set method (Goldfarb-Idnani) for min ½xᵀHx + gᵀx s.t. Cx ≤ d.
+
+    H must be positive definite. Needs no feasible start; `active` warm-starts from a
+    previous active set (rows of C). Raises ValueError if the constraints are infeasible.
+    """
+    n = H.shape[0]
+    m = C.shape[0]
+    max_iter = max_iter or 10 * (n + m) + 50
+    u = np.zeros(m)
+    act: List[int] = []
+
+    for j in active or []:
+        # a row may have been reset since the previous solve (e.g. the EC tangent: G = 0, d = inf)
+        if not (0 <= j < m) or j in act or not np.isfinite(d[j]) or not C[j].any():
+            continue
+        if not _is_dependent(C[act].T, C[j]):
+            act.append(j)
+    while True:
+        x, u_act = _kkt_solve(H, C[act].T, -g, d[act])
+        if not act or u_act.min() >= -tol:
+            break
+        act.pop(int(np.argmin(u_act)))
+    u[act] = u_act
+
+    iterations = 0
+    while m and iterations < max_iter:
+        violation = C @ x - d
+        violation[act] = -np.inf
+        p = int(np.argmax(violation))
+        if violation[p] <= tol * max(1.0, abs(float(d[p]))):
+            break
+        iterations += 1
+        c_p = C[p]
+        u_p = 0.0
+        while True:
+            N = C[act].T
+            dependent = _is_dependent(N, c_p)
+            if dependent:
+                z = np.zeros(n)
+                r = -np.linalg.lstsq(N, c_p, rcond=None)[0]
+            else:
+                z, r = _kkt_solve(H, N, -c_p, np.zeros(len(act)))
+            drop = None
+            t2 = np.inf
+            for idx in range(len(act)):
+                if r[idx] < -1e-14:
+                    ratio = u[act[idx]] / -r[idx]
+                    if ratio < t2:
+                        t2, drop = ratio, idx
+            if dependent:
+                if drop is None:
+                    raise ValueError("Grenzen/Nebenbedingungen sind widersprüchlich (keine zulässige Lösung)")
+                u[act] += t2 * r
+                u_p += t2
+                u[act[drop]] = 0.0
+                act.pop(drop)
+                continue
+            t1 = float(c_p @ x - d[p]) / -float(c_p @ z)
+            if t1 <= t2:
+                x = x + t1 * z
+                u[act] += t1 * r
+                u[p] = u_p + t1
+                act.append(p)
+                break
+            x = x + t2 * z
+            u[act] += t2 * r
+            u_p += t2
+            u[act[drop]] = 0.0
+            act.pop(drop)
+            iterations += 1
+    telemetry.inc("horticalc_solver_iterations_total", iterations)
+    return QPResult(x=x, active=act, multipliers=u, iterations=iterations)
+
+
+@dataclass
+class BoundSpec:
+    """Per-variable bounds plus general rows `G x <= h` over the variable fertilizers."""
+
+    lower: np.ndarray
+    upper: np.ndarray
+    G: np.ndarray
+    h: np.ndarray
+    labels: List[dict]
+
+
+def _bound_spec(recipe: dict, allowed: List[Fertilizer], fixed_grams: Dict[str, float]) -> BoundSpec | None:
+    min_grams = {str(k): float(v) for k, v in (recipe.get("min_grams") or {}).items()}
+    max_grams = {str(k): float(v) for k, v in (recipe.get("max_grams") or {}).items()}
+    max_total = recipe.get("max_total_grams")
+    constraints = list(recipe.get("constraints") or [])
+    if not (min_grams or max_grams or max_total is not None or constraints):
+        return None
+
+    names = [fert.name for fert in allowed]
+    for name in list(min_grams) + list(max_grams):
+        if name not in names:
+            raise KeyError(f"Unbekannter Dünger in min_grams/max_grams: '{name}'")
+    variable = [name for name in names if name not in fixed_grams]
+    position = {name: idx for idx, name in enumerate(variable)}
+    fixed = np.array([fixed_grams.get(name, 0.0) for name in names])
+
+    lower = np.array([max(0.0, min_grams.get(name, 0.0)) for name in variable])
+    upper = np.array([max_grams.get(name, np.inf) for name in variable])
+    if np.any(lower > upper):
+        bad = variable[int(np.argmax(lower > upper))]
+        raise ValueError(f"min_grams > max_grams für '{bad}'")
+
+    rows: List[np.ndarray] = []
+    h: List[float] = []
+    labels: List[dict] = []
+
+    def add_row(coef: Dict[str, float], limit: float, label: dict, sign: float) -> None:
+        row = np.zeros(len(variable))
+        offset = 0.0
+        for name, value in coef.items():
+            if name not in names:
+                raise KeyError(f"Unbekannter Dünger in constraints: '{name}'")
+            if name in position:
+                row[position[name]] += sign * value
+            else:
+                offset += sign * value * fixed[names.index(name)]
+        rows.append(row)
+        h.append(sign * limit - offset)
+        labels.append(label)
+
+    if max_total is not None:
+        add_row({name: 1.0 for name in names}, float(max_total), {"type": "max_total_grams", "limit": float(max_total)}, 1.0)
+    for idx, constraint in enumerate(constraints):
+        coef = {str(k): float(v) for k, v in (constraint.get("fertilizers") or {}).items()}
+        if not coef:
+            raise ValueError(f"constraints[{idx}] braucht 'fertilizers'")
+        if constraint.get("max") is not None:
+            limit = float(constraint["max"])
+            add_row(coef, limit, {"type": "constraint", "index": idx, "bound": "max", "limit": limit}, 1.0)
+        if constraint.get("min") is not None:
+            limit = float(constraint["min"])
+            add_row(coef, limit, {"type": "constraint", "index": idx, "bound": "min", "limit": limit}, -1.0)
+
+    G = np.vstack(rows) if rows else np.zeros((0, len(variable)))
+    return BoundSpec(lower=lower, upper=upper, G=G, h=np.array(h), labels=labels)
+
+
+def _unbounded_spec(n: int) -> BoundSpec:
+    return BoundSpec(lower=np.zeros(n), upper=np.full(n, np.inf), G=np.zeros((0, n)), h=np.zeros(0), labels=[])
+
+
+def _constraint_rows(spec: BoundSpec, names: List[str]) -> tuple[np.ndarray, np.ndarray, List[dict]]:
+    """Stack box bounds and general rows into `C x <= d` with a label per row."""
+    n = len(names)
+    eye = np.eye(n)
+    rows = [spec.G]
+    d = [spec.h]
+    labels = list(spec.labels)
+    finite = np.isfinite(spec.upper)
+    rows.append(eye[finite])
+    d.append(spec.upper[finite])
+    labels.extend({"type": "max_grams", "fertilizer": names[i], "limit": float(spec.upper[i])} for i in np.flatnonzero(finite))
+    rows.append(-eye)
+    d.append(-spec.lower)
+    labels.extend(
+        {"type": "min_grams" if spec.lower[i] > 0 else "nonnegative", "fertilizer": names[i], "limit": float(spec.lower[i])}
+        for i in range(n)
+    )
+    return np.vstack(rows), np.concatenate(d), labels
+
+
+def _least_squares_qp(A: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # A tiny ridge keeps H positive definite when there are more fertilizers than targets.
+    H = A.T @ A
+    ridge = 1e-10 * max(float(np.trace(H)) / max(H.shape[0], 1), 1e-12)
+    return H + ridge * np.eye(H.shape[0]), -(A.T @ b)
+
+
+def _solve_bounded(
+    A: np.ndarray,
+    b: np.ndarray,
+    fixed: np.ndarray,
+    variable_mask: np.ndarray,
+    spec: BoundSpec,
+    variable_names: List[str],
+    active: List[int] | None = None,
+) -> tuple[np.ndarray, List[dict], List[int]]:
+    if fixed.size:
+        b = b - A @ fixed
+    b = np.maximum(b, 0.0)
+    A_var = A[:, variable_mask]
+    if A_var.shape[1] == 0:
+        return np.zeros(0), [], []
+    H, g = _least_squares_qp(A_var, b)
+    C, d, labels = _constraint_rows(spec, variable_names)
+    result = _active_set_qp(H, g, C, d, active=active)
+    x = np.clip(result.x, spec.lower, spec.upper)
+    x[(spec.lower == 0.0) & (x < 1e-9)] = 0.0
+    labelled = []
+    for j in sorted(result.active):
+        label = dict(labels[j])
+        if label["type"] == "nonnegative":
+            continue
+        label["multiplier"] = float(result.multipliers[j])
+        labelled.append(label)
+    return x, labelled, result.active
 
 
 def _load_solver_recipe(path: Path) -> dict:
-    with path.open("r", encoding="utf-8") as f:
+    with path.open("r", encoding="utf-8") as f, telemetry.stage("io.yaml_load"):
         data = yaml.safe_load(f) or {}
     return data
 
@@ -173,14 +568,88 @@ def _resolve_water_profile(recipe: dict, water_profile_data: dict | None) -> dic
     return load_water_profile_data(wp_path)
 
 
-def solve_recipe_data(
+@dataclass
+class EcLimit:
+    """`ec_max_mS_per_cm` (kind "max") or `ec_target_mS_per_cm` (kind "target") at `temp_c`."""
+
+    kind: str
+    value: float
+    temp_c: float = 25.0
+
+
+def _ec_limit(recipe: dict) -> EcLimit | None:
+    target = recipe.get("ec_target_mS_per_cm")
+    upper = recipe.get("ec_max_mS_per_cm")
+    if target is not None and upper is not None:
+        raise ValueError("ec_target_mS_per_cm und ec_max_mS_per_cm schließen sich aus")
+    if target is None and upper is None:
+        return None
+    kind, value = ("target", float(target)) if target is not None else ("max", float(upper))
+    if value < 0:
+        raise ValueError(f"ec_{kind}: EC muss >= 0 sein")
+    return EcLimit(kind, value, float(recipe.get("ec_temp_c", 25.0)))
+
+
+@dataclass
+class SolverProblem:
+    """Everything derived from a solver recipe before the optimisation itself.
+
+    `A` maps grams of each allowed fertilizer to mg/L of the objective elements, `b` is
+    target minus water baseline (fixed grams not yet subtracted).
+    """
+
+    recipe: dict
+    fertilizers: Mapping[str, Fertilizer]
+    molar_masses: Dict[str, float]
+    liters: float
+    water_mg_l: Dict[str, float]
+    osmosis_percent: float
+    targets: Dict[str, float]
+    objective_keys: List[str]
+    allowed: List[Fertilizer]
+    fixed_grams: Dict[str, float]
+    fixed_weights: np.ndarray
+    variable_mask: np.ndarray
+    water_elements: Mapping[str, float]
+    A: np.ndarray
+    b: np.ndarray
+    # EC limit and the linear ion model it is evaluated on; None without a limit
+    ec_limit: EcLimit | None = None
+    water_ions_mmol_l: np.ndarray | None = None
+    ions_per_g: np.ndarray | None = None
+
+    @property
+    def variable_names(self) -> List[str]:
+        return [fert.name for fert, var in zip(self.allowed, self.variable_mask) if var]
+
+    def residual_target(self) -> np.ndarray:
+        """`b` with fixed grams subtracted, as the variable fertilizers have to cover it."""
+        b = self.b - self.A @ self.fixed_weights if self.fixed_weights.size else self.b
+        return np.maximum(b, 0.0)
+
+
+def _problem_matrix(
+    allowed: List[Fertilizer],
+    mm: Dict[str, float],
+    keys: List[str],
+    liters: float,
+    compiled: CompiledCatalog | None,
+) -> np.ndarray:
+    with telemetry.stage("solver.matrix"):
+        if compiled is not None and all(fert.name in compiled.index for fert in allowed):
+            return compiled.solver_matrix([fert.name for fert in allowed], keys, liters)
+        return _build_matrix(allowed, mm, keys, liters)
+
+
+def _prepare_problem(
     recipe: dict,
     *,
-    ferts: Dict[str, Fertilizer] | None = None,
+    ferts: Mapping[str, Fertilizer] | None = None,
     mm: Dict[str, float] | None = None,
     water_profile_data: dict | None = None,
-) -> SolveResult:
-    fertilizers = ferts or load_fertilizers()
+    compiled: CompiledCatalog | None = None,
+) -> SolverProblem:
+    fertilizers = ferts or fertilizer_source()
     molar_masses = mm or load_molar_masses()
 
     liters = float(recipe.get("liters") or 10.0)
@@ -216,55 +685,309 @@ def solve_recipe_data(
         "fertilizers": [],
         "urea_as_nh4": bool(recipe.get("urea_as_nh4", False)),
         "phosphate_species": recipe.get("phosphate_species", "H2PO4"),
+        "ph": recipe.get("ph"),
+        "ec_model": recipe.get("ec_model"),
+        # the acid dose depends only on the water, so it is part of the baseline
+        "acid": recipe.get("acid"),
     }
-    water_only = compute_solution(
-        water_only_recipe,
-        fertilizers,
-        molar_masses,
-        water_mg_l,
-        osmosis_percent=osmosis_percent,
-    )
+    with telemetry.stage("solver.water_baseline"):
+        water_only = compute_solution(
+            water_only_recipe,
+            fertilizers,
+            molar_masses,
+            water_mg_l,
+            osmosis_percent=osmosis_percent,
+        )
     water_elements = water_only.elements_mg_l
 
     b = np.array([target_raw.get(key, 0.0) - water_elements.get(key, 0.0) for key in objective_keys], dtype=float)
-    A = _build_matrix(allowed, molar_masses, objective_keys, liters)
-    solve_weights = _solve_weights(A, b, fixed_weights, variable_mask)
+    A = _problem_matrix(allowed, molar_masses, objective_keys, liters, compiled)
+    ec_limit = _ec_limit(recipe)
+    water_ions = ions_per_g = None
+    if ec_limit is not None:
+        # the EC row is linear in the ions: with phosphate_species: auto it uses the nominal
+        # species (P as H2PO4-), like the fertilizer columns
+        if water_only.speciation is not None:
+            water_only = compute_solution(
+                dict(water_only_recipe, phosphate_species="H2PO4"),
+                fertilizers,
+                molar_masses,
+                water_mg_l,
+                osmosis_percent=osmosis_percent,
+            )
+        water_ions = np.nan_to_num(water_only.block_array("ions_mmol_l"))
+        ions_per_g = fertilizer_ions_per_g(
+            allowed,
+            molar_masses,
+            liters,
+            urea_as_nh4=water_only_recipe["urea_as_nh4"],
+            phosphate_species=water_only_recipe["phosphate_species"],
+        )
+    return SolverProblem(
+        recipe=recipe,
+        fertilizers=fertilizers,
+        molar_masses=molar_masses,
+        liters=liters,
+        water_mg_l=water_mg_l,
+        osmosis_percent=osmosis_percent,
+        targets=target_raw,
+        objective_keys=objective_keys,
+        allowed=allowed,
+        fixed_grams=fixed_grams,
+        fixed_weights=fixed_weights,
+        variable_mask=variable_mask,
+        water_elements=water_elements,
+        A=A,
+        b=b,
+        ec_limit=ec_limit,
+        water_ions_mmol_l=water_ions,
+        ions_per_g=ions_per_g,
+    )
 
+
+def _recipe_grams(problem: SolverProblem, solve_weights: np.ndarray) -> List[Dict[str, float]]:
     fertilizers_out = []
     var_idx = 0
-    for idx, fert in enumerate(allowed):
-        solved = float(solve_weights[var_idx]) if (solve_weights.size and variable_mask[idx]) else 0.0
-        if variable_mask[idx]:
+    for idx, fert in enumerate(problem.allowed):
+        solved = float(solve_weights[var_idx]) if (solve_weights.size and problem.variable_mask[idx]) else 0.0
+        if problem.variable_mask[idx]:
             var_idx += 1
-        total = solved + fixed_grams.get(fert.name, 0.0)
+        total = solved + problem.fixed_grams.get(fert.name, 0.0)
         if total > 0:
             fertilizers_out.append({"name": fert.name, "grams": total})
+    return fertilizers_out
+
 
+def _finish_solve(problem: SolverProblem, solve_weights: np.ndarray, **extra) -> SolveResult:
+    """Recompute the solution for the solved grams and report the true target errors."""
+    recipe = problem.recipe
+    fertilizers_out = _recipe_grams(problem, solve_weights)
     full_recipe = {
-        "liters": liters,
+        "liters": problem.liters,
         "fertilizers": fertilizers_out,
         "urea_as_nh4": bool(recipe.get("urea_as_nh4", False)),
         "phosphate_species": recipe.get("phosphate_species", "H2PO4"),
+        "ph": recipe.get("ph"),
+        "ec_model": recipe.get("ec_model"),
+        "acid": recipe.get("acid"),
+        "precipitation": recipe.get("precipitation"),
     }
-    achieved = compute_solution(full_recipe, fertilizers, molar_masses, water_mg_l, osmosis_percent=osmosis_percent)
-    achieved_elements = achieved.elements_mg_l
+    with telemetry.stage("solver.verify"):
+        achieved = compute_solution(
+            full_recipe,
+            problem.fertilizers,
+            problem.molar_masses,
+            problem.water_mg_l,
+            osmosis_percent=problem.osmosis_percent,
+        )
+    achieved_elements = achieved.elements_mg_l.to_dict()
+    if achieved.acid is not None:
+        extra["acid"] = achieved.acid
+    if achieved.precipitation is not None:
+        extra["precipitation"] = achieved.precipitation
+    if problem.ec_limit is not None:
+        from .ec import ec_batch
+
+        limit = problem.ec_limit
+        nominal = achieved
+        if achieved.speciation is not None:
+            # reported on the nominal species the limit was solved with
+            nominal = compute_solution(
+                dict(full_recipe, phosphate_species="H2PO4", precipitation=None),
+                problem.fertilizers,
+                problem.molar_masses,
+                problem.water_mg_l,
+                osmosis_percent=problem.osmosis_percent,
+            )
+        extra["ec"] = {
+            "temp_c": limit.temp_c,
+            limit.kind: limit.value,
+            "mS_per_cm": float(
+                ec_batch(np.nan_to_num(nominal.block_array("ions_mmol_l")), ION_INDEX.labels, limit.temp_c)
+            ),
+        }
 
     errors_mg_l = {}
     errors_percent = {}
-    for key in objective_keys:
-        target = target_raw.get(key, 0.0)
+    for key in problem.objective_keys:
+        target = problem.targets.get(key, 0.0)
         achieved_val = achieved_elements.get(key, 0.0)
         errors_mg_l[key] = achieved_val - target
         errors_percent[key] = 0.0 if target == 0 else (achieved_val - target) / target * 100.0
 
     return SolveResult(
-        liters=liters,
+        liters=problem.liters,
         fertilizers=fertilizers_out,
-        objective_elements=objective_keys,
-        targets_mg_l=target_raw,
+        objective_elements=problem.objective_keys,
+        targets_mg_l=problem.targets,
         achieved_elements_mg_l=achieved_elements,
         errors_mg_l=errors_mg_l,
         errors_percent=errors_percent,
+        **extra,
+    )
+
+
+def _solve_ec_bounded(
+    problem: SolverProblem,
+    spec: BoundSpec,
+    warm: List[int] | None = None,
+    tol: float = 1e-9,
+    max_iter: int = 30,
+) -> tuple[np.ndarray, List[dict], List[int], BoundSpec]:
+    """Bounded solve with the EC limit as one extra constraint row.
+
+    EC(x) is smooth in the grams (ions are linear, only the ionic-strength term is not),
+    so the row is a tangent: solve, re-linearise, re-solve warm until the model EC meets
+    the limit. EC is concave in the grams, so a tangent taken above the limit would cut
+    off feasible points down to x = 0; the upper side is therefore linearised where the
+    ray from the water EC to the current solution crosses the limit. Returns the spec
+    with the final EC row for the discrete step.
+    """
+    from .ec import ec_batch, scale_to_ec
+
+    limit = problem.ec_limit
+    mask = problem.variable_mask
+    names = problem.variable_names
+    ions_var = problem.ions_per_g[:, mask]
+    base = problem.water_ions_mmol_l
+    if problem.fixed_weights.size:
+        base = base + problem.ions_per_g @ problem.fixed_weights
+    labels = ION_INDEX.labels
+
+    base_ec = float(ec_batch(base, labels, limit.temp_c))
+    if base_ec > limit.value + tol:
+        raise ValueError(
+            f"EC-{'Ziel' if limit.kind == 'target' else 'Grenze'} {limit.value:g} mS/cm liegt unter der EC "
+            f"von Wasser und fixed_grams ({base_ec:.3g} mS/cm)"
+        )
+    # the EC row starts inactive (h = inf) so the row index, and with it warm starts, stay fixed
+    ec_spec = BoundSpec(
+        lower=spec.lower,
+        upper=spec.upper,
+        G=np.vstack([spec.G, np.zeros((1, len(names)))]),
+        h=np.append(spec.h, np.inf),
+        labels=spec.labels + [{"type": f"ec_{limit.kind}", "limit": limit.value, "temp_c": limit.temp_c}],
+    )
+    args = (problem.A, problem.b, problem.fixed_weights, mask, ec_spec, names)
+    row = len(spec.h)
+    # the previous EC tangent is gone: its row must not be warm-started
+    warm = [j for j in warm or [] if j != row]
+    x, active_constraints, active = _solve_bounded(*args, active=warm)
+    sign = 0.0
+    iterations = 0
+    for _ in range(max_iter):
+        ions = ions_var @ x
+        excess = float(ec_batch(base + ions, labels, limit.temp_c)) - limit.value
+        if abs(excess) <= tol or (sign * excess < 0 and row not in active):
+            break
+        if limit.kind == "max" and excess < 0 and row not in active:
+            break
+        # the side is fixed by the first violation, later tangents only move the row
+        sign = sign or (1.0 if excess > 0 else -1.0)
+        point = x
+        if sign > 0:
+            # tangent on the limit surface: it lies above the concave EC, so x = 0 stays feasible
+            factor = float(scale_to_ec(base, ions, limit.value, labels, limit.temp_c)[0])
+            point = x * factor if np.isfinite(factor) else x
+        ec, grad = ec_batch(base + ions_var @ point, labels, limit.temp_c, gradient=True)
+        slope = grad @ ions_var
+        ec_spec.G[-1] = sign * slope
+        ec_spec.h[-1] = sign * (limit.value - float(ec) + float(slope @ point))
+        x, active_constraints, active = _solve_bounded(*args, active=active)
+        iterations += 1
+    telemetry.inc("horticalc_ec_newton_iterations_total", iterations)
+    if not np.isfinite(ec_spec.h[-1]):
+        ec_spec = spec
+    return x, active_constraints, active, ec_spec
+
+
+@dataclass
+class _Solved:
+    weights: np.ndarray
+    active_constraints: List[dict] | None
+    discrete: dict | None
+    # NNLS support (bool mask) or active constraint rows of the bounded QP, for warm starts
+    warm: np.ndarray | List[int] | None
+    diagnostics: dict
+
+
+def _solve_problem(problem: SolverProblem, spec: BoundSpec | None, warm: np.ndarray | List[int] | None = None) -> _Solved:
+    A, b = problem.A, problem.b
+    allowed, objective_keys, recipe = problem.allowed, problem.objective_keys, problem.recipe
+    fixed_weights, variable_mask = problem.fixed_weights, problem.variable_mask
+    variable_names = problem.variable_names
+
+    # duplicates are only pruned for the plain NNLS, bounds, resolutions and EC are per product
+    plain = spec is None and problem.ec_limit is None and not recipe.get("discrete")
+    prune = plain and recipe.get("prune", True) is not False
+    tol = recipe.get("prune_tolerance")
+    with telemetry.stage("solver.presolve", fertilizers=len(allowed), targets=len(objective_keys)):
+        keep, diagnostics = _presolve(
+            A[:, variable_mask],
+            problem.residual_target(),
+            variable_names,
+            objective_keys,
+            prune=prune,
+            tol=DEFAULT_PRUNE_TOLERANCE if tol is None else float(tol),
+        )
+
+    active_constraints = None
+    if problem.ec_limit is not None:
+        with telemetry.stage("solver.ec_bounded", fertilizers=len(allowed), targets=len(objective_keys)):
+            solve_weights, active_constraints, warm, spec = _solve_ec_bounded(
+                problem, spec or _unbounded_spec(len(variable_names)), warm=warm
+            )
+    elif spec is None:
+        with telemetry.stage("solver.nnls", fertilizers=len(allowed), targets=len(objective_keys)):
+            solve_weights = _solve_weights(A, b, fixed_weights, variable_mask, passive=warm, keep=keep)
+        warm = solve_weights > 0
+        restored = [entry for entry in diagnostics["pruned"] if warm[variable_names.index(entry["name"])]]
+        if restored:
+            diagnostics["pruned"] = [entry for entry in diagnostics["pruned"] if entry not in restored]
+            diagnostics["restored"] = [entry["name"] for entry in restored]
+    else:
+        with telemetry.stage("solver.bounded", fertilizers=len(allowed), targets=len(objective_keys)):
+            solve_weights, active_constraints, warm = _solve_bounded(
+                A, b, fixed_weights, variable_mask, spec, variable_names, active=warm
+            )
+    discrete_info = None
+    if recipe.get("discrete"):
+        from .discrete import discrete_spec, solve_discrete
+
+        discrete = discrete_spec(recipe, [fert for fert, var in zip(allowed, variable_mask) if var])
+        with telemetry.stage("solver.discrete", fertilizers=len(allowed), targets=len(objective_keys)):
+            rounded = solve_discrete(
+                A,
+                b,
+                fixed_weights,
+                variable_mask,
+                spec or _unbounded_spec(len(variable_names)),
+                discrete,
+                solve_weights,
+                variable_names,
+            )
+        solve_weights = rounded.x
+        discrete_info = rounded.to_dict(variable_names, discrete.steps)
+    telemetry.inc("horticalc_solver_solves_total")
+    return _Solved(solve_weights, active_constraints, discrete_info, warm, diagnostics)
+
+
+def solve_recipe_data(
+    recipe: dict,
+    *,
+    ferts: Mapping[str, Fertilizer] | None = None,
+    mm: Dict[str, float] | None = None,
+    water_profile_data: dict | None = None,
+    compiled: CompiledCatalog | None = None,
+) -> SolveResult:
+    problem = _prepare_problem(recipe, ferts=ferts, mm=mm, water_profile_data=water_profile_data, compiled=compiled)
+    solved = _solve_problem(problem, _bound_spec(recipe, problem.allowed, problem.fixed_grams))
+    return _finish_solve(
+        problem,
+        solved.weights,
+        active_constraints=solved.active_constraints,
+        discrete=solved.discrete,
+        diagnostics=solved.diagnostics,
     )
 
 
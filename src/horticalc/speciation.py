@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Sequence
+
+import numpy as np
+
+from . import telemetry
+from .ec import parse_ion_key
+
+# log10 K at 25 °C and reaction enthalpy (kJ/mol) for the van 't Hoff temperature correction
+# (PHREEQC phreeqc.dat / Stumm & Morgan)
+ACID_CONSTANTS: dict[str, tuple[float, float]] = {
+    "H3PO4/H2PO4-": (-2.148, -8.0),
+    "H2PO4-/HPO4^2-": (-7.198, 3.6),
+    "HPO4^2-/PO4^3-": (-12.35, 14.7),
+    "CO2/HCO3-": (-6.352, 9.1),
+    "HCO3-/CO3^2-": (-10.329, 14.9),
+}
+
+# formation constants of the neutral sulfate ion pairs, M²⁺ + SO4²⁻ = MSO4° (phreeqc.dat)
+ION_PAIR_CONSTANTS: dict[str, tuple[float, float]] = {
+    "CaSO4": (2.25, 5.54),
+    "MgSO4": (2.37, 19.04),
+}
+
+PHOSPHATE_LABELS: tuple[str, ...] = ("H2PO4-", "HPO4^2-", "PO4^3-")
+CARBONATE_LABELS: tuple[str, ...] = ("HCO3-", "CO3^2-")
+PAIR_LABELS: tuple[str, ...] = ("Ca+2", "Mg+2", "SO4^2-")
+
+_R_KJ = 8.314462618e-3
+
+
+def log_k(reaction: str, temp_c: float | np.ndarray = 25.0) -> float | np.ndarray:
+    """log10 K of `reaction` at `temp_c` (van 't Hoff with constant enthalpy)."""
+    log_k25, enthalpy = ACID_CONSTANTS[reaction] if reaction in ACID_CONSTANTS else ION_PAIR_CONSTANTS[reaction]
+    temp_k = np.asarray(temp_c, dtype=float) + 273.15
+    return log_k25 - enthalpy / (_R_KJ * math.log(10)) * (1.0 / temp_k - 1.0 / 298.15)
+
+
+def davies_a(temp_c: float | np.ndarray) -> float | np.ndarray:
+    """Debye–Hückel A (kg^½/mol^½) for water, linear fit 0–60 °C."""
+    return 0.4883 + 8.074e-4 * temp_c
+
+
+def davies_log_gamma(ionic_strength: np.ndarray, temp_c: float | np.ndarray = 25.0) -> np.ndarray:
+    """log10 γ of a singly charged ion (multiply by z² for other charges)."""
+    sqrt_i = np.sqrt(ionic_strength)
+    return -davies_a(temp_c) * (sqrt_i / (1.0 + sqrt_i) - 0.3 * ionic_strength)
+
+
+@lru_cache(maxsize=None)
+def label_charges(labels: tuple[str, ...]) -> np.ndarray:
+    """Signed charge per ion label (cached per label tuple)."""
+    charges = np.array([parse_ion_key(label)[1] for label in labels], dtype=float)
+    charges.flags.writeable = False
+    return charges
+
+
+@lru_cache(maxsize=None)
+def _columns(labels: tuple[str, ...], wanted: tuple[str, ...]) -> list[int]:
+    positions = {parse_ion_key(label)[0]: idx for idx, label in enumerate(labels)}
+    missing = [label for label in wanted if parse_ion_key(label)[0] not in positions]
+    if missing:
+        raise ValueError(f"Speziation braucht die Ionen {', '.join(missing)}")
+    return [positions[parse_ion_key(label)[0]] for label in wanted]
+
+
+@dataclass
+class Speciation:
+    """Result of `speciate`; arrays share the leading shape of the input.
+
+    `h3po4_mmol_per_l`/`co2_mmol_per_l` are set with a pH, `ion_pairs_mmol_per_l`
+    (last axis in `ION_PAIR_CONSTANTS` order) with ion pairing.
+    """
+
+    ions_mmol_per_l: np.ndarray
+    h3po4_mmol_per_l: np.ndarray | None
+    co2_mmol_per_l: np.ndarray | None
+    ion_pairs_mmol_per_l: np.ndarray | None
+    ionic_strength_mol_per_kg: np.ndarray
+    temp_c: np.ndarray
+    iterations: int
+
+    def summary(self, row: int | tuple = ()) -> Dict[str, object]:
+        strength = float(self.ionic_strength_mol_per_kg[row])
+        log_gamma = float(davies_log_gamma(np.asarray(strength), float(self.temp_c[row])))
+        out: Dict[str, object] = {
+            "ionic_strength_mol_per_kg": strength,
+            "activity_coefficients": {f"z{z}": 10.0 ** (z * z * log_gamma) for z in (1, 2, 3)},
+        }
+        if self.h3po4_mmol_per_l is not None and self.co2_mmol_per_l is not None:
+            out["neutral_mmol_per_l"] = {
+                "H3PO4": float(self.h3po4_mmol_per_l[row]),
+                "CO2": float(self.co2_mmol_per_l[row]),
+            }
+        if self.ion_pairs_mmol_per_l is not None:
+            pairs = self.ion_pairs_mmol_per_l[row]
+            out["ion_pairs_mmol_per_l"] = {name: float(pairs[k]) for k, name in enumerate(ION_PAIR_CONSTANTS)}
+        out["iterations"] = self.iterations
+        return out
+
+
+def _iterate_strength(
+    mapping: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    strength: np.ndarray,
+    active: np.ndarray,
+    tol: float,
+    max_iter: int,
+) -> int:
+    """Solve I = mapping(rows, I) in place for the `active` rows; returns the iteration count.
+
+    A plain fixed-point step first, then secant steps on mapping(I) - I; rows that have
+    converged drop out.
+    """
+    prev_strength = np.full(len(strength), np.nan)
+    prev_residual = np.full(len(strength), np.nan)
+    iterations = 0
+    for _ in range(max_iter):
+        if not active.size:
+            break
+        iterations += 1
+        current = strength[active]
+        mapped = mapping(active, current)
+        residual = mapped - current
+        slope = (residual - prev_residual[active]) / (current - prev_strength[active])
+        secant = np.isfinite(slope) & (slope != 0.0)
+        prev_strength[active] = current
+        prev_residual[active] = residual
+        step = current - residual / np.where(secant, slope, 1.0)
+        # a secant step past zero (strong pairing at high strength) falls back to the fixed point
+        strength[active] = np.where(secant & (step > 0.0), step, mapped)
+        done = np.abs(residual) <= tol * np.maximum(mapped, 1e-12)
+        active = active[~done]
+    return iterations
+
+
+def speciate(
+    ions_mmol_per_l: np.ndarray,
+    labels: Sequence[str],
+    ph: np.ndarray | float | None,
+    temp_c: np.ndarray | float = 25.0,
+    density_kg_per_l: float = 1.0,
+    ion_pairs: bool = False,
+    tol: float = 1e-10,
+    max_iter: int = 50,
+) -> Speciation:
+    """Distribute total phosphate and carbonate over their species at a given pH.
+
+    Rows of `ions_mmol_per_l` (columns = `labels`) are nominal ion states: the phosphate
+    columns together hold the total P, HCO3-/CO3^2- the total inorganic carbon left in
+    solution. The conditional constants depend on the Davies activity coefficients and
+    these on the ionic strength of the result, so the split is iterated to a fixed point;
+    rows that have converged drop out of the iteration. Neutral H3PO4 and CO2 leave the
+    ion columns and are returned separately.
+
+    With `ion_pairs` Ca2+ and Mg2+ also pair with SO4^2- to neutral CaSO4°/MgSO4°, on the
+    same ionic strength; the ion columns then hold the free ions. Without a pH (`None`)
+    only the pairing is done. `temp_c` may vary per row.
+    """
+    labels = tuple(labels)
+    z2 = label_charges(labels) ** 2
+
+    ions = np.array(ions_mmol_per_l, dtype=float)
+    shape = ions.shape[:-1]
+    c = ions.reshape(-1, len(labels))
+    rows = len(c)
+    temps = np.broadcast_to(np.asarray(temp_c, dtype=float), shape).reshape(-1)
+    scale = 0.5 / 1000.0 / density_kg_per_l
+    touched: list[int] = []
+    active = np.zeros(rows, dtype=bool)
+
+    if ph is not None:
+        p_cols = _columns(labels, PHOSPHATE_LABELS)
+        c_cols = _columns(labels, CARBONATE_LABELS)
+        ph_rows = np.broadcast_to(np.asarray(ph, dtype=float), shape).reshape(-1)
+        if np.any(~np.isfinite(ph_rows)) or np.any((ph_rows <= 0) | (ph_rows >= 14)):
+            raise ValueError("pH muss zwischen 0 und 14 liegen")
+        a_h = 10.0 ** -ph_rows
+        k1, k2, k3 = (10.0 ** log_k(name, temps) for name in ("H3PO4/H2PO4-", "H2PO4-/HPO4^2-", "HPO4^2-/PO4^3-"))
+        kc1, kc2 = (10.0 ** log_k(name, temps) for name in ("CO2/HCO3-", "HCO3-/CO3^2-"))
+        p_total = c[:, p_cols].sum(axis=1)
+        c_total = c[:, c_cols].sum(axis=1)
+        touched += p_cols + c_cols
+        active |= (p_total > 0) | (c_total > 0)
+
+    if ion_pairs:
+        ca_col, mg_col, so4_col = _columns(labels, PAIR_LABELS)
+        kp_ca, kp_mg = (10.0 ** log_k(name, temps) for name in ION_PAIR_CONSTANTS)
+        molal = c / 1000.0 / density_kg_per_l
+        ca_total, mg_total, so4_total = molal[:, ca_col], molal[:, mg_col], molal[:, so4_col]
+        # free SO4 per row, the warm start of the next Newton solve
+        free_so4 = np.zeros(rows)
+        touched += [ca_col, mg_col, so4_col]
+        active |= ((ca_total > 0) | (mg_total > 0)) & (so4_total > 0)
+
+    # ions not touched by the speciation, as ionic strength (mol/kg)
+    fixed = c.copy()
+    fixed[:, touched] = 0.0
+    strength_fixed = scale * (fixed @ z2)
+
+    def ratios(idx: np.ndarray, strength: np.ndarray) -> tuple[np.ndarray, ...]:
+        # ratios of successive species from the conditional (concentration) constants
+        g1 = 10.0 ** davies_log_gamma(strength, temps[idx])
+        g2, g3 = g1**4, g1**9
+        ah = a_h[idx]
+        r1 = k1[idx] / (ah * g1)
+        r2 = r1 * k2[idx] * g1 / (ah * g2)
+        r3 = r2 * k3[idx] * g2 / (ah * g3)
+        s1 = kc1[idx] / (ah * g1)
+        s2 = s1 * kc2[idx] * g1 / (ah * g2)
+        return r1, r2, r3, s1, s2
+
+    def pair(idx: np.ndarray, strength: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # free SO4 from its mass balance, s + Ca·K's/(1 + K's) + Mg·K''s/(1 + K''s) = SO4:
+        # increasing and concave, so Newton from below (clipped at 0) converges monotonically
+        g2_sq = 10.0 ** (8.0 * davies_log_gamma(strength, temps[idx]))
+        kc, km = kp_ca[idx] * g2_sq, kp_mg[idx] * g2_sq
+        ca, mg, total = ca_total[idx], mg_total[idx], so4_total[idx]
+        s = np.minimum(free_so4[idx], total)
+        for _ in range(max_iter):
+            dc, dm = 1.0 + kc * s, 1.0 + km * s
+            f = s + ca * kc * s / dc + mg * km * s / dm - total
+            step = f / (1.0 + ca * kc / (dc * dc) + mg * km / (dm * dm))
+            s = np.maximum(s - step, 0.0)
+            if np.all(np.abs(step) <= tol * total):
+                break
+        free_so4[idx] = s
+        return s, ca / (1.0 + kc * s), mg / (1.0 + km * s)
+
+    def mapping(idx: np.ndarray, strength: np.ndarray) -> np.ndarray:
+        mapped = strength_fixed[idx].copy()
+        if ph is not None:
+            r1, r2, r3, s1, s2 = ratios(idx, strength)
+            mapped += scale * (
+                p_total[idx] * (r1 + 4.0 * r2 + 9.0 * r3) / (1.0 + r1 + r2 + r3)
+                + c_total[idx] * (s1 + 4.0 * s2) / (1.0 + s1 + s2)
+            )
+        if ion_pairs:
+            so4_free, ca_free, mg_free = pair(idx, strength)
+            mapped += 2.0 * (ca_free + mg_free + so4_free)
+        return mapped
+
+    # I = F(I) on the ionic strength only, the species follow from the converged value
+    strength = strength_fixed.copy()
+    iterations = _iterate_strength(mapping, strength, np.flatnonzero(active), tol, max_iter)
+
+    every = np.arange(rows)
+    h3po4 = co2 = pairs = None
+    if ph is not None:
+        r1, r2, r3, s1, s2 = ratios(every, strength)
+        p_species = np.stack([np.ones_like(r1), r1, r2, r3], axis=1)
+        p_frac = p_species / p_species.sum(axis=1, keepdims=True)
+        c_species = np.stack([np.ones_like(s1), s1, s2], axis=1)
+        c_frac = c_species / c_species.sum(axis=1, keepdims=True)
+        c[:, p_cols] = p_total[:, None] * p_frac[:, 1:]
+        c[:, c_cols] = c_total[:, None] * c_frac[:, 1:]
+        h3po4 = (p_total * p_frac[:, 0]).reshape(shape)
+        co2 = (c_total * c_frac[:, 0]).reshape(shape)
+    if ion_pairs:
+        so4_free, ca_free, mg_free = pair(every, strength)
+        to_mmol = 1000.0 * density_kg_per_l
+        c[:, ca_col], c[:, mg_col], c[:, so4_col] = ca_free * to_mmol, mg_free * to_mmol, so4_free * to_mmol
+        pairs = (np.stack([ca_total - ca_free, mg_total - mg_free], axis=1) * to_mmol).reshape(*shape, 2)
+    telemetry.inc("horticalc_speciation_iterations_total", iterations)
+    return Speciation(
+        ions_mmol_per_l=c.reshape(ions.shape),
+        h3po4_mmol_per_l=h3po4,
+        co2_mmol_per_l=co2,
+        ion_pairs_mmol_per_l=pairs,
+        ionic_strength_mol_per_kg=strength.reshape(shape),
+        temp_c=temps.reshape(shape),
+        iterations=iterations,
+    )
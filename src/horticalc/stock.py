@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from string import ascii_uppercase
+from typing import Callable, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from . import telemetry
+from .core import (
+    ION_INDEX,
+    _acid_dose,
+    _ions_of_forms,
+    _mm,
+    apply_osmosis_mix,
+    compute_solution,
+    fertilizer_ions_per_g,
+    normalize_water_profile,
+)
+from .data_io import (
+    COMP_COLS,
+    Fertilizer,
+    load_molar_masses,
+    load_recipe,
+    load_solubility,
+    load_water_profile_data,
+    repo_root,
+)
+from .precipitation import MINERALS, saturation_indices
+
+# catalog acids share the acid tank with the recipe option `acid`
+ACID_NAME_PREFIXES: tuple[str, ...] = ("Salpetersäure", "Phosphorsäure", "Schwefelsäure")
+DEFAULT_SOLUBILITY_G_PER_L = 200.0
+DEFAULT_MAX_FRONTIER = 50000
+MAX_TANKS = 6
+_LOAD_TOL = 1e-9
+
+
+@dataclass
+class StockTank:
+    name: str
+    # amounts for one tank filling: {name, grams} for powders, {name, ml} for liquids
+    fertilizers: List[Dict[str, float]]
+    g_per_l: float
+    ml_per_l: float
+    # share of the tank's budget: sum of g/L over solubility (powders) and ml/L over 1000 (liquids)
+    load: float
+    acid: bool
+    precipitation: Dict[str, object]
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "fertilizers": self.fertilizers,
+            "g_per_l": self.g_per_l,
+            "ml_per_l": self.ml_per_l,
+            "load": self.load,
+            "acid": self.acid,
+            "precipitation": self.precipitation,
+        }
+
+
+@dataclass
+class StockPlan:
+    ratio: float
+    tank_liters: float
+    tanks: List[StockTank]
+    # highest injection ratio at which every tank stays within its budget (None: empty tanks)
+    max_ratio: float | None
+    search: Dict[str, object]
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def working_liters(self) -> float:
+        return self.tank_liters * self.ratio
+
+    def to_dict(self) -> dict:
+        return {
+            "ratio": self.ratio,
+            "tank_liters": self.tank_liters,
+            "working_liters": self.working_liters,
+            "tanks": [tank.to_dict() for tank in self.tanks],
+            "max_ratio": self.max_ratio,
+            "search": self.search,
+            "warnings": self.warnings,
+        }
+
+
+@dataclass
+class _Frontier:
+    """Partial assignments (rows) with the running tank sums (rows x tanks)."""
+
+    assign: np.ndarray
+    ions: np.ndarray
+    fe: np.ndarray
+    load: np.ndarray
+    used: np.ndarray
+    # per tank and mineral the SI the tank may reach: its worst member alone (or the threshold)
+    allow: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.assign)
+
+    def take(self, rows: np.ndarray) -> "_Frontier":
+        return _Frontier(
+            self.assign[rows], self.ions[rows], self.fe[rows], self.load[rows], self.used[rows], self.allow[rows]
+        )
+
+
+def _is_acid(fert: Fertilizer) -> bool:
+    return fert.name.startswith(ACID_NAME_PREFIXES)
+
+
+def _search(
+    order: Sequence[int],
+    ions: np.ndarray,
+    fe: np.ndarray,
+    loads: np.ndarray,
+    alone: np.ndarray,
+    start: _Frontier,
+    n_search: int,
+    feasible: Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+    max_frontier: int,
+    incumbent: float = np.inf,
+) -> Tuple[np.ndarray | None, float, Dict[str, object]]:
+    """Breadth-first over the fertilizers in `order`, one level per fertilizer.
+
+    Every level expands all partial assignments to every search tank at once and checks
+    the changed tank states in one `feasible` call. Rows are pruned when a tank is already
+    infeasible (adding salts rarely helps) or when the lower bound on the final largest
+    load, max(current, (placed + remaining) / tanks), cannot beat `incumbent`. Empty tanks
+    are interchangeable, so only the first of them is tried. Above `max_frontier` rows the
+    lowest bounds are kept and the result is no longer guaranteed to be optimal.
+    """
+    stats = {"nodes": 0, "pruned_infeasible": 0, "pruned_bound": 0, "optimal": True}
+    frontier = start
+    remaining = float(loads[list(order)].sum())
+    symmetric = [t for t in range(n_search) if not start.used[0, t]]
+    for j in order:
+        remaining -= loads[j]
+        allowed = np.ones((len(frontier), n_search), dtype=bool)
+        if len(symmetric) > 1:
+            unused = ~frontier.used[:, symmetric]
+            first = unused & (np.cumsum(unused, axis=1) == 1)
+            allowed[:, symmetric] = ~unused | first
+        rows, tanks = np.nonzero(allowed)
+        new_ions = frontier.ions[rows, tanks] + ions[j]
+        new_fe = frontier.fe[rows, tanks] + fe[j]
+        new_load = frontier.load[rows, tanks] + loads[j]
+        new_allow = np.maximum(frontier.allow[rows, tanks], alone[j])
+        stats["nodes"] += len(rows)
+        ok = feasible(new_ions, new_fe, new_load, new_allow)
+        stats["pruned_infeasible"] += int(np.count_nonzero(~ok))
+        rows, tanks = rows[ok], tanks[ok]
+
+        child = frontier.take(rows)
+        child.assign = np.column_stack([child.assign, tanks])
+        at = np.arange(len(rows))
+        child.ions[at, tanks] = new_ions[ok]
+        child.fe[at, tanks] = new_fe[ok]
+        child.load[at, tanks] = new_load[ok]
+        child.used[at, tanks] = True
+        child.allow[at, tanks] = new_allow[ok]
+
+        search_load = child.load[:, :n_search]
+        bound = np.maximum(search_load.max(axis=1, initial=0.0), (search_load.sum(axis=1) + remaining) / n_search)
+        keep = bound <= incumbent + _LOAD_TOL
+        stats["pruned_bound"] += int(np.count_nonzero(~keep))
+        frontier, bound = child.take(np.flatnonzero(keep)), bound[keep]
+        if len(frontier) > max_frontier:
+            frontier = frontier.take(np.argsort(bound, kind="stable")[:max_frontier])
+            stats["optimal"] = False
+        if not len(frontier):
+            return None, np.inf, stats
+
+    # smallest largest load first, then the most even split
+    search_load = frontier.load[:, :n_search]
+    objective = search_load.max(axis=1, initial=0.0)
+    best = int(np.lexsort(((search_load**2).sum(axis=1), np.round(objective, 12)))[0])
+    return frontier.assign[best], float(objective[best]), stats
+
+
+def plan_stock_tanks(
+    recipe: dict,
+    fertilizers: Mapping[str, Fertilizer],
+    molar_masses: Dict[str, float],
+    water_mg_l: Dict[str, float] | None = None,
+    osmosis_percent: float = 0.0,
+    solubility_g_per_l: Mapping[str, float] | None = None,
+) -> StockPlan:
+    """Split the recipe's fertilizers over A/B(/...) stock tanks injected at 1:`ratio`.
+
+    Options come from the recipe's `stock` block: `ratio` (default 100), `tank_liters`
+    (100), `tanks` (2), `acid_tank` (true: acids get an own tank), `ph` (or the
+    recipe's), `temp_c` (20), `fe_unchelated_fraction`, `threshold`, `fixed` (fertilizer
+    -> tank) and `solubility_g_per_l` / `default_solubility_g_per_l`. A tank is feasible
+    when its budget (`StockTank.load`) is at most 1 and the saturation screen of its
+    concentrate flags nothing; among the feasible assignments the one with the smallest
+    largest load is returned (balanced tanks).
+    """
+    mm = molar_masses
+    spec = recipe.get("stock") or {}
+    spec = {} if spec is True else dict(spec)
+    ratio = float(spec.get("ratio", 100.0))
+    tank_liters = float(spec.get("tank_liters", 100.0))
+    n_search = int(spec.get("tanks", 2))
+    if ratio <= 0 or tank_liters <= 0:
+        raise ValueError("Stammlösung: 'ratio' und 'tank_liters' müssen > 0 sein")
+    if not 1 <= n_search <= MAX_TANKS - 1:
+        raise ValueError(f"Stammlösung: 'tanks' muss zwischen 1 und {MAX_TANKS - 1} liegen")
+    ph = spec.get("ph", recipe.get("ph"))
+    if ph is None:
+        raise ValueError("Stammlösungsplan braucht einen pH-Wert (ph)")
+    ph = float(ph)
+    temp_c = float(spec.get("temp_c", 20.0))
+    fe_fraction = float(spec.get("fe_unchelated_fraction", 0.0))
+    if not 0.0 <= fe_fraction <= 1.0:
+        raise ValueError("Stammlösung: 'fe_unchelated_fraction' muss zwischen 0 und 1 liegen")
+    threshold = float(spec.get("threshold", 0.0))
+    max_frontier = int(spec.get("max_frontier", DEFAULT_MAX_FRONTIER))
+
+    table, default = load_solubility() if solubility_g_per_l is None else (dict(solubility_g_per_l), None)
+    table = {**table, **(spec.get("solubility_g_per_l") or {})}
+    default = float(spec.get("default_solubility_g_per_l") or default or DEFAULT_SOLUBILITY_G_PER_L)
+
+    liters = float(recipe.get("liters") or 10.0)
+    urea_as_nh4 = bool(recipe.get("urea_as_nh4", False))
+    phosphate_species = str(recipe.get("phosphate_species", "H2PO4"))
+    if phosphate_species.lower() == "auto":
+        # the screen speciates by itself; the nominal split only labels the totals
+        phosphate_species = "H2PO4"
+    water_forms = normalize_water_profile(mm, apply_osmosis_mix(water_mg_l or {}, osmosis_percent))
+
+    # the recipe's fertilizers (summed per name) plus the acid dose as a liquid
+    amounts: Dict[str, float] = {}
+    for entry in recipe.get("fertilizers", []):
+        name = str(entry.get("name") or "").strip()
+        grams = float(entry.get("grams") or 0.0)
+        if grams == 0.0:
+            continue
+        if name not in fertilizers:
+            raise KeyError(f"Unbekannter Dünger im Rezept: '{name}'")
+        if fertilizers[name].form == "Zero":
+            continue
+        amounts[name] = amounts.get(name, 0.0) + grams
+    catalog = dict(fertilizers)
+    acids = {name for name in amounts if _is_acid(catalog[name])}
+    dose = _acid_dose(recipe, water_forms, liters, mm)
+    if dose is not None and dose.ml > 0:
+        pseudo = dose.acid.fertilizer(mm, phosphate_species)
+        catalog[pseudo.name] = pseudo
+        amounts[pseudo.name] = amounts.get(pseudo.name, 0.0) + dose.ml
+        acids.add(pseudo.name)
+    if not amounts:
+        raise ValueError("Stammlösung: Rezept enthält keine Dünger")
+
+    names = list(amounts)
+    ferts = [catalog[name] for name in names]
+    acid_tank = bool(spec.get("acid_tank", True)) and bool(acids)
+    tank_names = list(ascii_uppercase[: n_search + int(acid_tank)])
+    liquid = np.array([fert.form == "Flüssig" for fert in ferts])
+    amount = np.array([amounts[name] for name in names])
+    per_l = amount / liters * ratio  # g (ml) per liter of stock
+    capacity = np.array([1000.0 if liq else float(table.get(name, default)) for name, liq in zip(names, liquid)])
+    with np.errstate(divide="ignore"):
+        loads = np.where(per_l > 0, per_l / capacity, 0.0)
+    # working-solution mmol/L per fertilizer; Fe separately for the strengite screen
+    ions = (fertilizer_ions_per_g(ferts, mm, liters, urea_as_nh4, phosphate_species) * amount).T
+    weights = np.array([float(f.weight_factor or 1.0) * f.comp.get("Fe", 0.0) for f in ferts])
+    fe = amount * weights * 1000.0 / liters / _mm(mm, "Fe")
+    water_ions = _ions_of_forms(mm, np.zeros(len(COMP_COLS)), water_forms, urea_as_nh4, phosphate_species)
+    water_fe = water_forms.get("Fe", 0.0) / _mm(mm, "Fe")
+
+    def saturation(tank_ions: np.ndarray, tank_fe: np.ndarray) -> np.ndarray:
+        return saturation_indices(
+            water_ions + ratio * tank_ions, ION_INDEX.labels, ph, water_fe + fe_fraction * ratio * tank_fe, temp_c
+        ).saturation_index
+
+    def feasible(tank_ions: np.ndarray, tank_fe: np.ndarray, tank_load: np.ndarray, allow: np.ndarray) -> np.ndarray:
+        within = saturation(tank_ions, tank_fe) <= allow + _LOAD_TOL
+        return (tank_load <= 1.0 + _LOAD_TOL) & within.all(axis=-1)
+
+    # a fertilizer that is already supersaturated on its own (e.g. Ca and P in one product)
+    # cannot be fixed by the split: mixing must only not make it worse
+    alone = np.maximum(saturation(ions, fe), threshold)
+    minerals = tuple(MINERALS)
+    warnings = [
+        f"{name}: allein bei 1:{ratio:g} übersättigt ({', '.join(minerals[k] for k in np.flatnonzero(row > threshold))})"
+        for name, row in zip(names, alone)
+        if np.any(row > threshold)
+    ]
+
+    # fixed placements (acids, `fixed`) form the start state
+    fixed = {str(name): str(tank) for name, tank in (spec.get("fixed") or {}).items()}
+    for name, tank in fixed.items():
+        if name not in amounts:
+            raise KeyError(f"Stammlösung: '{name}' ist nicht im Rezept")
+        if tank not in tank_names:
+            raise ValueError(f"Stammlösung: unbekannter Tank '{tank}' (Tanks: {', '.join(tank_names)})")
+    placed = np.full(len(names), -1)
+    for idx, name in enumerate(names):
+        if name in fixed:
+            placed[idx] = tank_names.index(fixed[name])
+        elif acid_tank and name in acids:
+            placed[idx] = n_search
+    n_tanks = len(tank_names)
+    start = _Frontier(
+        assign=np.zeros((1, 0), dtype=np.intp),
+        ions=np.zeros((1, n_tanks, len(ION_INDEX))),
+        fe=np.zeros((1, n_tanks)),
+        load=np.zeros((1, n_tanks)),
+        used=np.zeros((1, n_tanks), dtype=bool),
+        allow=np.full((1, n_tanks, len(minerals)), threshold),
+    )
+    for idx in np.flatnonzero(placed >= 0):
+        tank = placed[idx]
+        start.ions[0, tank] += ions[idx]
+        start.fe[0, tank] += fe[idx]
+        start.load[0, tank] += loads[idx]
+        start.used[0, tank] = True
+        start.allow[0, tank] = np.maximum(start.allow[0, tank], alone[idx])
+    bad = ~feasible(start.ions[0], start.fe[0], start.load[0], start.allow[0]) & start.used[0]
+    if bad.any():
+        raise ValueError(
+            f"Stammlösung: Tank {tank_names[int(np.argmax(bad))]} ist mit den festen Düngern bei 1:{ratio:g} nicht zulässig"
+        )
+
+    order = sorted(np.flatnonzero(placed < 0).tolist(), key=lambda idx: -loads[idx])
+    with telemetry.stage("stock.search", fertilizers=len(order), tanks=n_search):
+        # a greedy dive (frontier of one) gives the incumbent for the exact search
+        greedy, greedy_value, greedy_stats = _search(order, ions, fe, loads, alone, start, n_search, feasible, 1)
+        best, value, stats = _search(
+            order, ions, fe, loads, alone, start, n_search, feasible, max_frontier, greedy_value
+        )
+    if best is None:
+        best, value = greedy, greedy_value
+    if best is None:
+        raise ValueError(
+            f"Keine zulässige Aufteilung auf {n_search} Tanks bei 1:{ratio:g} (Löslichkeit oder Fällung);"
+            " Verhältnis senken, Tanks ergänzen oder pH prüfen"
+        )
+    for idx, tank in zip(order, best.tolist()):
+        placed[idx] = tank
+    for key in ("nodes", "pruned_infeasible", "pruned_bound"):
+        stats[key] += greedy_stats[key]
+
+    screen_option = {
+        "factor": ratio,
+        "ph": ph,
+        "temp_c": temp_c,
+        "fe_unchelated_fraction": fe_fraction,
+        "threshold": threshold,
+    }
+    tanks: List[StockTank] = []
+    with telemetry.stage("stock.verify", tanks=n_tanks):
+        for tank, tank_name in enumerate(tank_names):
+            members = np.flatnonzero(placed == tank)
+            sub_recipe = {
+                "liters": liters,
+                "fertilizers": [{"name": names[idx], "grams": float(amount[idx])} for idx in members],
+                "urea_as_nh4": urea_as_nh4,
+                "phosphate_species": phosphate_species,
+                "precipitation": screen_option,
+            }
+            result = compute_solution(sub_recipe, catalog, mm, water_mg_l, osmosis_percent=osmosis_percent)
+            scale = ratio * tank_liters / liters
+            tanks.append(
+                StockTank(
+                    name=tank_name,
+                    fertilizers=[
+                        {"name": names[idx], ("ml" if liquid[idx] else "grams"): float(amount[idx] * scale)}
+                        for idx in members
+                    ],
+                    g_per_l=float(per_l[members][~liquid[members]].sum()),
+                    ml_per_l=float(per_l[members][liquid[members]].sum()),
+                    load=float(loads[members].sum()),
+                    acid=acid_tank and tank == n_search,
+                    precipitation=result.precipitation,
+                )
+            )
+    largest = max(tank.load for tank in tanks)
+    return StockPlan(
+        ratio=ratio,
+        tank_liters=tank_liters,
+        tanks=tanks,
+        max_ratio=ratio / largest if largest > 0 else None,
+        search={**stats, "fertilizers": len(order), "balanced_load": value},
+        warnings=warnings,
+    )
+
+
+def plan_recipe_file(path: Path, stock: Mapping | None = None) -> StockPlan:
+    """Stock plan for a recipe file; `stock` entries override the recipe's `stock` block."""
+    from .catalog import fertilizer_source
+
+    recipe = load_recipe(path)
+    if stock:
+        recipe = dict(recipe, stock={**(recipe.get("stock") or {}), **stock})
+    wp_name = str(recipe.get("water_profile") or "default")
+    water_profile = load_water_profile_data(repo_root() / "data" / "water_profiles" / f"{wp_name}.yml")
+    osmosis_percent = float(recipe.get("osmosis_percent", water_profile.get("osmosis_percent", 0.0)))
+    return plan_stock_tanks(
+        recipe,
+        fertilizer_source(),
+        load_molar_masses(),
+        water_profile.get("mg_per_l") or {},
+        osmosis_percent,
+    )
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from . import tracing
+
+SECONDS_BUCKETS: tuple[float, ...] = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0,
+)
+BYTES_BUCKETS: tuple[float, ...] = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# name -> (type, help, buckets)
+METRICS: dict[str, tuple[str, str, tuple[float, ...]]] = {
+    "horticalc_stage_seconds": ("histogram", "Latency of Horticalc computation stages.", SECONDS_BUCKETS),
+    "horticalc_request_seconds": ("histogram", "Latency of API requests.", SECONDS_BUCKETS),
+    "horticalc_request_bytes": ("histogram", "Size of API request bodies.", BYTES_BUCKETS),
+    "horticalc_response_bytes": ("histogram", "Size of API response bodies.", BYTES_BUCKETS),
+    "horticalc_solver_iterations_total": ("counter", "NNLS outer iterations.", ()),
+    "horticalc_solver_solves_total": ("counter", "Solver runs.", ()),
+    "horticalc_solver_nodes_total": ("counter", "Branch-and-bound nodes of the discrete solver.", ()),
+    "horticalc_ec_newton_iterations_total": ("counter", "Newton steps of EC scaling and EC-bounded solves.", ()),
+    "horticalc_speciation_iterations_total": ("counter", "Fixed-point steps of the pH speciation.", ()),
+    "horticalc_cache_total": ("counter", "Cache lookups by cache and result (hit/miss).", ()),
+    "horticalc_errors_total": ("counter", "Exceptions raised inside a stage.", ()),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _env_enabled() -> bool:
+    return os.environ.get("HORTICALC_TELEMETRY", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class _Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+_REGISTRY = _Registry()
+_ENABLED = _env_enabled()
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def enable() -> None:
+    global _ENABLED
+    _ENABLED = True
+
+
+def disable() -> None:
+    global _ENABLED
+    _ENABLED = False
+
+
+def reset() -> None:
+    _REGISTRY.reset()
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, **labels: object) -> None:
+    if not _ENABLED:
+        return
+    buckets = METRICS[name][2]
+    key = _label_key(labels)
+    with _REGISTRY.lock:
+        series = _REGISTRY.histograms.setdefault(name, {})
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = _Histogram(buckets)
+        hist.observe(float(value))
+
+
+def inc(name: str, amount: float = 1.0, **labels: object) -> None:
+    if not _ENABLED:
+        return
+    key = _label_key(labels)
+    with _REGISTRY.lock:
+        series = _REGISTRY.counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + float(amount)
+
+
+def _counted(exc: BaseException) -> bool:
+    """True if `exc` or an exception it was raised from was already counted."""
+    seen = 0
+    while exc is not None and seen < 16:
+        if getattr(exc, "_horticalc_counted", False):
+            return True
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return False
+
+
+class _Stage:
+    __slots__ = ("name", "start", "span")
+
+    def __init__(self, name: str, span) -> None:
+        self.name = name
+        self.start = 0.0
+        self.span = span
+
+    def __enter__(self) -> "_Stage":
+        self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        observe("horticalc_stage_seconds", time.perf_counter() - self.start, stage=self.name)
+        if exc is not None and not _counted(exc):
+            # counted once, at the innermost stage; enclosing stages see the same error
+            inc("horticalc_errors_total", stage=self.name, error=exc_type.__name__)
+            try:
+                exc._horticalc_counted = True
+            except AttributeError:
+                pass
+        self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def stage(name: str, **attrs: object):
+    """Time a block as `horticalc_stage_seconds{stage=name}` and as a trace span.
+
+    With telemetry disabled and no active trace this returns a shared no-op.
+    `attrs` are only recorded on the trace span.
+    """
+    if not _ENABLED:
+        return tracing.span(name, **attrs)
+    return _Stage(name, tracing.span(name, **attrs))
+
+
+def _format_labels(key: Iterable[tuple[str, str]], extra: tuple[str, str] | None = None) -> str:
+    items = list(key)
+    if extra is not None:
+        items.append(extra)
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    with _REGISTRY.lock:
+        histograms = {name: dict(series) for name, series in _REGISTRY.histograms.items()}
+        counters = {name: dict(series) for name, series in _REGISTRY.counters.items()}
+        for name in sorted(set(histograms) | set(counters)):
+            kind, help_text, _ = METRICS.get(name, ("counter", name, ()))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, hist in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_number(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_number(hist.total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List
+
+# Spans are written as Chrome trace "complete" events (ph = "X"), one JSON object per
+# line. `export_chrome_trace` wraps such files into a document that chrome://tracing,
+# Perfetto and speedscope open directly.
+
+_LOGGER_NAME = "horticalc.tracing"
+_span_ids = itertools.count(1)
+
+
+class _Trace:
+    __slots__ = ("trace_id", "events", "lock")
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.events: List[dict] = []
+        self.lock = threading.Lock()
+
+
+_current_trace: contextvars.ContextVar[_Trace | None] = contextvars.ContextVar("horticalc_trace", default=None)
+_current_span: contextvars.ContextVar[int | None] = contextvars.ContextVar("horticalc_span", default=None)
+
+
+class _Config:
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self.sample_rate = 1.0
+        self.logger: logging.Logger | None = None
+
+
+_CONFIG = _Config()
+
+
+def configure(
+    path: Path | str | None,
+    *,
+    sample_rate: float = 1.0,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 3,
+) -> None:
+    """Enable tracing into a rotating JSONL file, or disable it with `path=None`."""
+    if _CONFIG.logger is not None:
+        for handler in list(_CONFIG.logger.handlers):
+            _CONFIG.logger.removeHandler(handler)
+            handler.close()
+    _CONFIG.logger = None
+    _CONFIG.path = None
+    _CONFIG.sample_rate = max(0.0, min(float(sample_rate), 1.0))
+    if path is None:
+        return
+
+    trace_path = Path(path).expanduser().resolve()
+    trace_path.parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        trace_path,
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger(_LOGGER_NAME)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    _CONFIG.logger = logger
+    _CONFIG.path = trace_path
+
+
+def configure_from_env() -> None:
+    path = os.environ.get("HORTICALC_TRACE_FILE")
+    if not path:
+        return
+    configure(
+        path,
+        sample_rate=float(os.environ.get("HORTICALC_TRACE_SAMPLE_RATE", "1.0")),
+        max_bytes=int(os.environ.get("HORTICALC_TRACE_MAX_BYTES", str(10 * 1024 * 1024))),
+        backup_count=int(os.environ.get("HORTICALC_TRACE_BACKUPS", "3")),
+    )
+
+
+def is_enabled() -> bool:
+    return _CONFIG.logger is not None
+
+
+def in_trace() -> bool:
+    return _current_trace.get() is not None
+
+
+def _json_safe(value: object) -> object:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set(self, **attrs: object) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "span_id", "parent_id", "start_us", "start", "token", "root")
+
+    def __init__(self, trace: _Trace, name: str, attrs: dict, root: bool = False) -> None:
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(_span_ids)
+        self.parent_id: int | None = None
+        self.start_us = 0
+        self.start = 0.0
+        self.token: contextvars.Token | None = None
+        self.root = root
+
+    def set(self, **attrs: object) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "_Span":
+        self.parent_id = _current_span.get()
+        self.token = _current_span.set(self.span_id)
+        self.start_us = time.time_ns() // 1000
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration_us = (time.perf_counter() - self.start) * 1e6
+        if self.token is not None:
+            _current_span.reset(self.token)
+        args = {key: _json_safe(value) for key, value in self.attrs.items()}
+        args["trace_id"] = self.trace.trace_id
+        args["span_id"] = self.span_id
+        if self.parent_id is not None:
+            args["parent_id"] = self.parent_id
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+        event = {
+            "name": self.name,
+            "cat": "horticalc",
+            "ph": "X",
+            "ts": self.start_us,
+            "dur": round(duration_us, 3),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self.trace.lock:
+            self.trace.events.append(event)
+        return False
+
+
+class _RootSpan(_Span):
+    __slots__ = ("trace_token",)
+
+    def __enter__(self) -> "_RootSpan":
+        self.trace_token = _current_trace.set(self.trace)
+        super().__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        super().__exit__(exc_type, exc, tb)
+        _current_trace.reset(self.trace_token)
+        _flush(self.trace)
+        return False
+
+
+def _flush(trace: _Trace) -> None:
+    logger = _CONFIG.logger
+    if logger is None:
+        return
+    with trace.lock:
+        events = sorted(trace.events, key=lambda event: event["ts"])
+        trace.events.clear()
+    for event in events:
+        logger.info(json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+
+
+def trace(name: str, **attrs: object) -> _RootSpan | _NoopSpan:
+    """Start a sampled root span; nested `span()` calls attach to it and are written on exit."""
+    if _CONFIG.logger is None or _current_trace.get() is not None:
+        return span(name, **attrs)
+    if _CONFIG.sample_rate < 1.0 and random.random() >= _CONFIG.sample_rate:
+        return _NOOP_SPAN
+    return _RootSpan(_Trace(f"{random.getrandbits(64):016x}"), name, dict(attrs), root=True)
+
+
+def span(name: str, **attrs: object) -> _Span | _NoopSpan:
+    current = _current_trace.get()
+    if current is None:
+        return _NOOP_SPAN
+    return _Span(current, name, dict(attrs))
+
+
+def read_events(paths: Iterable[Path]) -> List[dict]:
+    events: List[dict] = []
+    for path in paths:
+        with Path(path).open("r", encoding="utf-8") as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    return events
+
+
+def export_chrome_trace(jsonl_paths: Iterable[Path], out_path: Path) -> int:
+    """Merge JSONL span files (e.g. the active file plus rotated backups) into one Chrome trace."""
+    events = sorted(read_events(jsonl_paths), key=lambda event: event["ts"])
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return len(events)
+
+
+configure_from_env()
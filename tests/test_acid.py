@@ -0,0 +1,146 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.acid import ACID_PRODUCTS, doses_for_residual, get_acid, titration_curves
+from horticalc.core import compute_solution
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_water_profile_data
+from horticalc.ec import compute_ec
+from horticalc.solver import _load_solver_recipe, _prepare_problem, solve_recipe_data
+
+HARD = {"Ca": 120, "Mg": 20, "KH": 14}
+
+
+@pytest.fixture(scope="module")
+def mm():
+    return load_molar_masses()
+
+
+@pytest.fixture(scope="module")
+def water():
+    return load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")["mg_per_l"]
+
+
+def test_acid_pseudo_fertilizer_matches_catalog_neutralization(mm):
+    # the catalog's HCO3-V column is mg/L HCO3 per g in 10 L
+    ferts = load_fertilizers()
+    for name, acid in (("Salpetersäure 5%", "HNO3"), ("Schwefelsäure 20%", "H2SO4")):
+        percent = float(name.split()[-1].rstrip("%"))
+        pseudo = get_acid({"acid": acid, "percent": percent, "density_g_per_ml": 1.0}).fertilizer(mm)
+        assert pseudo.comp["HCO3"] == pytest.approx(ferts[name].extra["HCO3-V"] / 100.0, rel=1e-3)
+    nitric = ACID_PRODUCTS["Salpetersäure 53%"].fertilizer(mm)
+    assert nitric.weight_factor == 1.33
+    assert nitric.comp["NO3"] == pytest.approx(0.53 * mm["N"] / (mm["H"] + mm["NO3"]))
+
+
+def test_recipe_acid_neutralizes_water_hco3(mm, water):
+    ferts = load_fertilizers()
+    recipe = {"liters": 10, "fertilizers": [{"name": "Yara Tera CALCINIT", "grams": 8.0}]}
+    base = compute_solution(recipe, ferts, mm, water)
+    acid = {"name": "Salpetersäure 38%", "residual_hco3_mg_per_l": 30.0}
+    result = compute_solution(dict(recipe, acid=acid), ferts, mm, water)
+
+    assert result.elements_mg_l["HCO3"] == pytest.approx(30.0)
+    neutralized_mmol = (base.elements_mg_l["HCO3"] - 30.0) / mm["HCO3"]
+    added_n = result.elements_mg_l["N_NO3"] - base.elements_mg_l["N_NO3"]
+    assert added_n == pytest.approx(neutralized_mmol * mm["N"])
+    # NO3- replaces HCO3- one for one: the ion balance is unchanged
+    assert result.ion_balance["error_percent_signed"] == pytest.approx(
+        base.ion_balance["error_percent_signed"], abs=0.5
+    )
+    data = result.to_dict()
+    assert data["acid"]["ml"] == pytest.approx(neutralized_mmol * 10 / ACID_PRODUCTS["Salpetersäure 38%"].mmol_per_ml(mm))
+    assert "acid" not in base.to_dict()
+
+    overdosed = compute_solution(dict(recipe, acid={"name": "Salpetersäure 38%", "ml": 100.0}), ferts, mm, water)
+    assert "HCO3" not in overdosed.elements_mg_l
+    assert overdosed.acid["free_acid_mmol_per_l"] > 0
+    # the excess acid is free H+: it keeps the ions balanced and raises the EC
+    assert overdosed.ions_mmol_l["H+"] == pytest.approx(overdosed.acid["free_acid_mmol_per_l"])
+    assert abs(overdosed.ion_balance["error_percent_signed"]) < abs(result.ion_balance["error_percent_signed"]) + 0.5
+    ec = overdosed.to_dict()["ec"]
+    assert ec["contrib_mS_per_cm"]["25.0"]["H+"] > 0.5 * ec["ec_mS_per_cm"]["25.0"]
+
+    with pytest.raises(ValueError, match="genau eines"):
+        compute_solution(dict(recipe, acid={"name": "Salpetersäure 38%"}), ferts, mm, water)
+    with pytest.raises(KeyError):
+        compute_solution(dict(recipe, acid={"name": "Zitronensäure", "ml": 1.0}), ferts, mm, water)
+
+
+def test_titration_curves_match_compute_solution(mm, water):
+    acid = ACID_PRODUCTS["Phosphorsäure 75%"]
+    doses = np.linspace(0.0, 1.0, 11)
+    curves = titration_curves(acid, [water, HARD, {}], doses, mm, names=["default", "hart", "RO"])
+    assert curves.hco3_mg_l.shape == curves.ec_mS_per_cm.shape == (3, 11)
+    assert np.all(np.diff(curves.hco3_mg_l, axis=1) <= 0)
+    assert np.all(curves.free_acid_mmol_l[2, 1:] > 0)
+    # past neutralization the EC rises much faster (H+ conducts best)
+    slopes = np.diff(curves.ec_mS_per_cm[0])
+    assert slopes[-1] > 3 * slopes[0]
+
+    ferts = load_fertilizers()
+    for row, profile in enumerate([water, HARD]):
+        for col in (3, 10):
+            recipe = {"liters": 1.0, "fertilizers": [], "acid": {"name": acid.name, "ml": float(doses[col])}}
+            result = compute_solution(recipe, ferts, mm, profile)
+            assert curves.hco3_mg_l[row, col] == pytest.approx(result.elements_mg_l.get("HCO3", 0.0), abs=1e-9)
+            ec = compute_ec(result.ions_mmol_l.to_dict())["ec_mS_per_cm"]["25.0"]
+            assert curves.ec_mS_per_cm[row, col] == pytest.approx(ec)
+
+    dose = doses_for_residual(acid, [water, HARD, {}], 50.0, mm)
+    assert dose[2] == 0.0
+    check = titration_curves(acid, [water, HARD], dose[:2], mm)
+    assert np.diag(check.hco3_mg_l) == pytest.approx([50.0, 50.0])
+
+
+def test_solver_targets_include_acid_nitrogen():
+    recipe = _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+    acid_recipe = dict(recipe, acid={"name": "Salpetersäure 53%", "residual_hco3_mg_per_l": 0.0})
+    plain = solve_recipe_data(recipe)
+    acidified = solve_recipe_data(acid_recipe)
+    assert acidified.acid["ml"] > 0
+    assert acidified.achieved_elements_mg_l.get("HCO3", 0.0) == pytest.approx(0.0)
+    # the acid's nitrate is part of the water baseline the fertilizers are fitted on top of
+    baseline = _prepare_problem(recipe).water_elements
+    acid_baseline = _prepare_problem(acid_recipe).water_elements
+    assert acid_baseline["N_NO3"] > baseline["N_NO3"]
+    for key, error in plain.errors_mg_l.items():
+        assert abs(acidified.errors_mg_l[key]) <= abs(error) + 1.0
+
+
+def test_acid_titration_endpoint():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {
+        "acid": "Schwefelsäure 37%",
+        "water_profiles": ["default", {"name": "hart", "mg_per_l": HARD}],
+        "doses_ml_per_l": [0.0, 0.1, 0.2],
+        "residual_hco3_mg_per_l": 40.0,
+    }
+    response = client.post("/acid/titration", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["profiles"]) == {"default", "hart"}
+    assert len(data["profiles"]["hart"]["ec_mS_per_cm"]) == 3
+    assert data["dose_ml_per_l"]["hart"] > 0
+
+    custom = dict(payload, acid={"acid": "HNO3", "percent": 60, "density_g_per_ml": 1.37})
+    assert client.post("/acid/titration", json=custom).status_code == 200
+    assert client.post("/acid/titration", json=dict(payload, acid="Essig")).status_code == 400
+    assert client.post("/acid/titration", json=dict(payload, water_profiles=["gibtsnicht"])).status_code == 404
+
+    recipe = {"fertilizers": [], "water_mg_l": HARD, "acid": {"name": "Salpetersäure 38%", "residual_hco3_mg_per_l": 30}}
+    calculated = client.post("/calculate", json=recipe).json()
+    assert calculated["elements_mg_per_l"]["HCO3"] == pytest.approx(30.0)
+    assert calculated["acid"]["ml"] > 0
@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from api.app import app
+
+
+RECIPE = {
+    "liters": 10.0,
+    "fertilizers": [
+        {"name": "Yara Tera CALCINIT", "grams": 2},
+        {"name": "K+S EPSO Top Bittersalz 16-39", "grams": 6},
+    ],
+    "water_mg_l": {"Ca": 107, "Mg": 17, "HCO3": 309.2},
+    "osmosis_percent": 66,
+}
+
+
+def test_live_calculation_matches_http_and_sends_only_changes() -> None:
+    client = TestClient(app)
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_json({"op": "replace", "recipe": RECIPE, "seq": 1})
+        first = ws.receive_json()
+        assert first["type"] == "result"
+        assert first["seq"] == 1
+        assert first["changed"] == client.post("/calculate", json=RECIPE).json()
+
+        ws.send_json({"op": "grams", "name": "Yara Tera CALCINIT", "grams": 4, "seq": 2})
+        second = ws.receive_json()
+        assert second["seq"] == 2
+        assert "elements_mg_per_l" in second["changed"]
+        assert "water_elements_mg_per_l" not in second["changed"]
+
+        edited = dict(RECIPE)
+        edited["fertilizers"] = [
+            {"name": "Yara Tera CALCINIT", "grams": 4},
+            {"name": "K+S EPSO Top Bittersalz 16-39", "grams": 6},
+        ]
+        expected = client.post("/calculate", json=edited).json()
+        assert second["changed"]["elements_mg_per_l"] == pytest.approx(expected["elements_mg_per_l"])
+
+
+def test_live_calculation_reports_errors() -> None:
+    client = TestClient(app)
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_json({"op": "water", "key": "Unobtainium", "value": 1, "seq": 7})
+        message = ws.receive_json()
+        assert message == {"type": "error", "seq": 7, "detail": "Invalid water key: Unobtainium"}
+
+        ws.send_json({"op": "grams", "name": "Gibt es nicht", "grams": 1, "seq": 8})
+        message = ws.receive_json()
+        assert message["type"] == "error"
+        assert message["seq"] == 8
+
+
+def test_live_calculation_survives_bad_json_and_internal_errors(monkeypatch) -> None:
+    import api.app as api_app
+
+    client = TestClient(app)
+    with client.websocket_connect("/ws/calculate") as ws:
+        ws.send_text("{nicht json")
+        assert ws.receive_json() == {"type": "error", "seq": None, "detail": "Message is not valid JSON"}
+
+        def broken(*args, **kwargs):
+            raise ArithmeticError("kaputt")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(api_app, "compute_solution", broken)
+            ws.send_json({"op": "replace", "recipe": RECIPE, "seq": 1})
+            assert ws.receive_json() == {"type": "error", "seq": 1, "detail": "kaputt"}
+
+        ws.send_json({"op": "liters", "value": 20, "seq": 2})
+        message = ws.receive_json()
+        assert message["type"] == "result"
+        assert message["seq"] == 2
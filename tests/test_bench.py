@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from horticalc.bench import compare_ec_models, compare_results, discover_cases, time_case
+
+
+def _results(**medians: float) -> dict:
+    return {"results": {name: {"median_s": value} for name, value in medians.items()}}
+
+
+def test_compare_flags_regressions_beyond_threshold() -> None:
+    baseline = _results(fast=1.0, slow=1.0, gone=1.0)
+    current = _results(fast=0.5, slow=1.2, added=1.0)
+    report = compare_results(baseline, current, threshold=0.1)
+    assert report["regressions"] == ["slow"]
+    assert report["cases"]["fast"]["status"] == "improvement"
+    assert report["cases"]["added"]["status"] == "new"
+    assert report["missing"] == ["gone"]
+
+
+def test_core_cases_are_discovered_and_timed() -> None:
+    cases = discover_cases("core.compute_solution")
+    assert "core.compute_solution" in cases
+    timing = time_case(cases["core.compute_solution"], repeats=2, min_time_s=0.0)
+    assert timing["repeats"] == 2
+    assert timing["median_s"] > 0
+
+
+def test_compare_ec_models_on_golden_outputs() -> None:
+    import json
+
+    import pytest
+
+    from horticalc.ec import EC_MODELS, compute_ec
+
+    report = compare_ec_models(rows=8, repeats=1, min_time_s=0.0)
+    assert set(report["models"]) == set(EC_MODELS)
+    assert "golden" in report["cases"]
+    reference = report["models"]["mccleskey"]
+    assert reference["max_rel_diff"] == 0.0
+    ions = json.loads((Path(__file__).resolve().parents[1] / "solutions" / "golden_output.json").read_text())
+    expected = compute_ec(ions["ions_mmol_per_l"])["ec_mS_per_cm"]["25.0"]
+    assert reference["ec_mS_per_cm"]["golden"]["25.0"] == pytest.approx(expected, rel=1e-12)
+    assert report["models"]["kohlrausch"]["max_rel_diff"] > 0
+    assert all(model["us_per_row"] > 0 for model in report["models"].values())
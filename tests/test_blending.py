@@ -0,0 +1,91 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.blending import BlendSources, load_sources, optimize_blend
+from horticalc.core import apply_osmosis_mix, blend_water_profiles, normalize_water_profile
+from horticalc.data_io import load_molar_masses, load_water_profile_data
+
+RAIN = {"name": "Regen", "mg_per_l": {"Ca": 5, "HCO3": 10, "Na": 1}}
+WELL = {"name": "Brunnen", "mg_per_l": {"Ca": 150, "Mg": 30, "Na": 60, "KH": 20, "Cl": 80}}
+RO = {"name": "RO"}
+
+
+@pytest.fixture(scope="module")
+def mm():
+    return load_molar_masses()
+
+
+@pytest.fixture(scope="module")
+def sources(mm):
+    names, profiles = load_sources(["default", RAIN, WELL, RO])
+    return BlendSources(names, profiles, mm)
+
+
+def test_two_source_blend_matches_osmosis_mix(mm):
+    water = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")["mg_per_l"]
+    blended = blend_water_profiles(mm, [water, {}], [0.34, 0.66])
+    expected = normalize_water_profile(mm, apply_osmosis_mix(water, 66))
+    assert blended.keys() == expected.keys()
+    for key, value in expected.items():
+        assert blended[key] == pytest.approx(value)
+    # normalized profiles stay valid water profiles
+    assert normalize_water_profile(mm, blended) == blended
+    with pytest.raises(ValueError):
+        blend_water_profiles(mm, [water, {}], [0.5, 0.6])
+
+
+def test_optimize_blend_minimizes_ro_within_limits(sources, mm):
+    limits = {"max_mg_per_l": {"HCO3": 100.0, "Na": 20.0}, "min_mg_per_l": {"Ca": 30.0}}
+    result = optimize_blend(sources, max_fraction={"Regen": 0.2}, **limits)
+    assert result.minimized == ["RO"]
+    assert sum(result.fractions.values()) == pytest.approx(1.0)
+    assert result.elements_mg_l["HCO3"] <= 100.0 + 1e-6
+    assert result.elements_mg_l["Ca"] >= 30.0 - 1e-6
+    assert {item["type"] for item in result.binding} >= {"max_mg_per_l", "max_fraction"}
+
+    # no feasible random blend uses less RO
+    candidates = np.random.default_rng(0).dirichlet(np.ones(4), 100_000)
+    candidates = candidates[candidates[:, 1] <= 0.2]
+    feasible = sources.feasible(candidates, limits["max_mg_per_l"], limits["min_mg_per_l"])
+    assert feasible.any()
+    assert candidates[feasible, 3].min() >= result.minimized_fraction - 1e-9
+
+    # the reported water is the direct mix of the profiles
+    _, profiles = load_sources(["default", RAIN, WELL, RO])
+    direct = blend_water_profiles(mm, profiles, list(result.fractions.values()))
+    assert result.mg_per_l == pytest.approx(direct)
+
+
+def test_optimize_blend_errors(sources):
+    with pytest.raises(ValueError, match="erfüllt die Grenzen"):
+        optimize_blend(sources, max_mg_per_l={"HCO3": 50.0}, min_mg_per_l={"Ca": 100.0})
+    with pytest.raises(KeyError):
+        optimize_blend(sources, max_mg_per_l={"Gold": 1.0})
+    with pytest.raises(KeyError):
+        optimize_blend(sources, minimize=["Osmose"])
+
+
+def test_blend_endpoint():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {"sources": ["default", RO], "max_mg_per_l": {"HCO3": 100.0}}
+    response = client.post("/water-profiles/blend", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["elements_mg_per_l"]["HCO3"] == pytest.approx(100.0, abs=1e-6)
+    assert data["fractions"]["RO"] == pytest.approx(data["minimized_fraction"])
+
+    assert client.post("/water-profiles/blend", json=dict(payload, sources=["gibtsnicht"])).status_code == 404
+    assert client.post("/water-profiles/blend", json=dict(payload, max_mg_per_l={"HCO3": -1})).status_code == 400
@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from horticalc.core import CalcResult, compute_solution, stack_results
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+
+
+@pytest.fixture(scope="module")
+def golden():
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    ferts = load_fertilizers()
+    mm = load_molar_masses()
+    return recipe, ferts, mm, profile["mg_per_l"], profile["osmosis_percent"]
+
+
+def test_result_is_slotted_with_read_only_views(golden) -> None:
+    recipe, ferts, mm, water, osmosis = golden
+    result = compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis)
+
+    assert not hasattr(result, "__dict__")
+    elements = result.elements_mg_l
+    assert "C" not in elements
+    assert elements.get("C", 0.0) == 0.0
+    assert list(elements)[:4] == ["N_total", "N_NH4", "N_NO3", "N_UREA"]
+    with pytest.raises(TypeError):
+        elements["K"] = 1.0  # type: ignore[index]
+    with pytest.raises(ValueError):
+        result.block_array("elements_mg_l")[0] = 1.0
+
+    # Results with the same blocks share one label index.
+    other = compute_solution(recipe, ferts, mm, water, osmosis_percent=0.0)
+    assert other.elements_mg_l.index is elements.index
+
+
+def test_to_dict_round_trips_through_json(golden) -> None:
+    recipe, ferts, mm, water, osmosis = golden
+    data = compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis).to_dict()
+    assert json.loads(json.dumps(data)) == data
+    assert all(type(value) is float for value in data["elements_mg_per_l"].values())
+    assert list(data["ions_mmol_per_l"]) == [
+        "NH4+", "K+", "Ca+2", "Mg+2", "Na+", "NO3-", "H2PO4-", "SO4^2-", "Cl-", "HCO3-",
+    ]
+
+
+def test_empty_fertilizer_balance_serializes_float_zeros(golden) -> None:
+    # pre-array outputs wrote int 0 here; all block values are floats now
+    recipe, ferts, mm, water, osmosis = golden
+    data = compute_solution(dict(recipe, fertilizers=[]), ferts, mm, water, osmosis_percent=osmosis).to_dict()
+    assert data["fertilizer_ion_balance"] == {
+        "cations_meq_per_l": 0.0,
+        "anions_meq_per_l": 0.0,
+        "error_percent_signed": 0.0,
+        "error_percent_abs": 0.0,
+    }
+    assert '"cations_meq_per_l": 0.0' in json.dumps(data["fertilizer_ion_balance"])
+
+
+def test_stack_results(golden) -> None:
+    recipe, ferts, mm, water, osmosis = golden
+    results = []
+    for grams in (0.0, 1.0, 2.0):
+        scaled = dict(recipe, fertilizers=[{"name": "Yara Tera CALCINIT", "grams": grams}])
+        results.append(compute_solution(scaled, ferts, mm, water, osmosis_percent=osmosis))
+
+    labels, matrix = stack_results(results, "fertilizer_elements_mg_l")
+    assert labels == CalcResult.block_labels("fertilizer_elements_mg_l")
+    assert matrix.shape == (3, len(labels))
+    ca = matrix[:, labels.index("Ca")]
+    assert ca[0] == 0.0
+    assert ca[2] == pytest.approx(2 * ca[1])
+
+    _, with_nan = stack_results(results, "fertilizer_elements_mg_l", fill_value=np.nan)
+    assert np.isnan(with_nan[0, labels.index("Ca")])
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from horticalc.catalog import FertilizerCatalog, import_csv, search_fertilizers
+from horticalc.core import compute_solution
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+from horticalc.snapshot import DataSnapshot
+
+
+@pytest.fixture(scope="module")
+def catalog(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("catalog") / "fertilizers.sqlite"
+    assert import_csv(db_path) == len(load_fertilizers())
+    return FertilizerCatalog(db_path)
+
+
+def test_catalog_matches_csv(catalog):
+    ferts = load_fertilizers()
+    assert list(catalog) == list(ferts)
+    assert len(catalog) == len(ferts)
+    name = "Yara Tera CALCINIT"
+    assert catalog[name] == ferts[name]
+    assert "nicht vorhanden" not in catalog
+    assert list(catalog.get_many([name, "nicht vorhanden"])) == [name]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {"contains": ["Mg"], "minimums": {"K2O": 0.2}},
+        {"q": "yara", "limit": 3, "offset": 2},
+        {"contains": ["N", "Ca"], "maximums": {"Cl": 0.0}},
+        {},
+    ],
+)
+def test_search_matches_in_memory_filter(catalog, query):
+    total, page = catalog.search(**query)
+    expected_total, expected_page = search_fertilizers(load_fertilizers(), **query)
+    assert total == expected_total
+    assert [f.name for f in page] == [f.name for f in expected_page]
+
+
+def test_compute_solution_with_catalog(catalog):
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    mm = load_molar_masses()
+    names = [entry["name"] for entry in recipe["fertilizers"]]
+
+    expected = compute_solution(recipe, load_fertilizers(), mm, profile["mg_per_l"]).to_dict()
+    assert compute_solution(recipe, catalog.get_many(names), mm, profile["mg_per_l"]).to_dict() == expected
+    assert compute_solution(recipe, catalog, mm, profile["mg_per_l"]).to_dict() == expected
+
+
+def test_snapshot_lookup_strips_names(catalog):
+    # the CSV source tolerates padded recipe names, the SQLite catalog has to as well
+    mm = load_molar_masses()
+    snapshot = DataSnapshot(version=1, digest="", loaded_at=0.0, fertilizers=catalog, molar_masses=mm, compiled=None)
+    recipe = {"liters": 10.0, "fertilizers": [{"name": " Yara Tera CALCINIT ", "grams": 5.0}]}
+    ferts = snapshot.fertilizers_for(entry["name"] for entry in recipe["fertilizers"])
+    expected = compute_solution(recipe, load_fertilizers(), mm, {}).to_dict()
+    assert compute_solution(recipe, ferts, mm, {}).to_dict() == expected
@@ -2,14 +2,23 @@ import math
 import sys
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
 
 from horticalc.ec import (
+    EC_MODELS,
     MCCLESKEY_PARAMS,
     FALLBACK_LAMBDA_25,
+    EcModel,
     compute_ec,
+    ec_batch,
+    ec_matrix,
+    get_ec_model,
+    register_ec_model,
     parse_ion_key,
     _ionic_strength,
     _mccleskey_k,
@@ -42,6 +51,21 @@ def test_mccleskey_k_small_strength_example() -> None:
     assert _mccleskey_k(params, temp_c, ionic_strength) == pytest.approx(expected, rel=0, abs=1e-12)
 
 
+def test_mccleskey_kernel_matches_scalar_reference() -> None:
+    labels = tuple(MCCLESKEY_PARAMS)
+    row = np.linspace(0.5, 6.0, len(labels))
+    temps = (10.0, 25.0, 35.0)
+    contrib, info = get_ec_model("mccleskey").kernel(row, labels, np.array(temps), 1.0, 0.022)
+    # the nominal ionic strength does not depend on the temperature
+    strengths = np.broadcast_to(info["ionic_strength_mol_per_kg"], len(temps))
+    for t, temp_c in enumerate(temps):
+        strength = float(strengths[t])
+        expected = [
+            _mccleskey_k(MCCLESKEY_PARAMS[ion], temp_c, strength) * mmol / 1000.0 for ion, mmol in zip(labels, row)
+        ]
+        np.testing.assert_allclose(contrib[t], expected, rtol=1e-12)
+
+
 def test_ionic_strength() -> None:
     molalities = {"Ca2+": 0.001, "Cl-": 0.001}
     charges = {"Ca2+": 2, "Cl-": -1}
@@ -80,3 +104,93 @@ def test_transport_numbers_sum_to_one() -> None:
     )
     tnums = result["transport_numbers"]["25.0"]
     assert sum(tnums.values()) == pytest.approx(1.0, rel=0, abs=1e-12)
+
+
+def test_ec_batch_matches_compute_ec_and_gradient() -> None:
+    labels = ["NH4+", "K+", "Ca+2", "Mg+2", "NO3-", "H2PO4-", "HPO4^2-", "SO4^2-", "HCO3-"]
+    rng = np.random.default_rng(3)
+    ions = rng.uniform(0.0, 8.0, size=(4, len(labels)))
+    for temp_c in (18.0, 25.0):
+        ec = ec_batch(ions, labels, temp_c)
+        for row, value in zip(ions, ec):
+            expected = compute_ec(dict(zip(labels, row)), temps_c=(temp_c,))["ec_mS_per_cm"][f"{temp_c:.1f}"]
+            assert value == pytest.approx(expected, rel=1e-12)
+
+    ec, grad = ec_batch(ions[0], labels, gradient=True)
+    step = 1e-6
+    numeric = [(ec_batch(ions[0] + step * np.eye(len(labels))[j], labels) - ec) / step for j in range(len(labels))]
+    np.testing.assert_allclose(grad, numeric, rtol=1e-4)
+    assert ec_batch(np.zeros(len(labels)), labels, gradient=True)[1][1] > 0
+
+
+def test_ec_model_kernels_match_compute_ec() -> None:
+    labels = ["NH4+", "K+", "Ca+2", "Mg+2", "NO3-", "H2PO4-", "SO4^2-", "HCO3-", "Cl-"]
+    rng = np.random.default_rng(8)
+    ions = rng.uniform(0.0, 8.0, size=(2, 3, len(labels)))
+    temps = (10.0, 18.0, 25.0, 40.0)
+    results = {name: ec_matrix(ions, labels, temps, name) for name in EC_MODELS}
+    assert set(results) >= {"mccleskey", "activity", "kohlrausch"}
+    for name, ec in results.items():
+        assert ec.shape == (2, 3, len(temps))
+        for index in np.ndindex(2, 3):
+            single = compute_ec(dict(zip(labels, ions[index])), temps_c=temps, model=name)
+            assert ec[index] == pytest.approx([single["ec_mS_per_cm"][f"{t:.1f}"] for t in temps], rel=1e-9)
+    np.testing.assert_allclose(results["mccleskey"][..., 2], ec_batch(ions, labels, 25.0), rtol=1e-12)
+    # infinite dilution bounds the ionic-strength models from above
+    assert np.all(results["kohlrausch"] > results["mccleskey"])
+    assert np.all(results["activity"] < results["mccleskey"])
+
+
+def test_ec_model_registry_metadata() -> None:
+    model = get_ec_model("activity")
+    data = model.to_dict()
+    assert data["capabilities"]["ionic_strength"] == "self_consistent"
+    assert data["capabilities"]["ion_pairs"] == ["CaSO4", "MgSO4"]
+    assert data["parameters"]["ion_pairs"]["CaSO4"]["log_k_25"] == pytest.approx(2.25)
+    assert "parameters" not in get_ec_model("kohlrausch").to_dict(include_parameters=False)
+    assert compute_ec({"K+": 1.0, "Cl-": 1.0}, temps_c=(120.0,))["warnings"]
+
+    with pytest.raises(ValueError, match="EC-Modell"):
+        get_ec_model("pitzer")
+    with pytest.raises(ValueError, match="bereits registriert"):
+        register_ec_model(model)
+
+    def half_kernel(c, labels, temps, density, beta):
+        contrib, _ = get_ec_model("mccleskey").kernel(c, labels, temps, density, beta)
+        return 0.5 * contrib, {}
+
+    register_ec_model(
+        EcModel(
+            name="test_half",
+            description="half of McCleskey",
+            method="test",
+            kernel=half_kernel,
+            ionic_strength="nominal",
+            parameters=dict,
+        )
+    )
+    try:
+        ions = {"K+": 2.0, "NO3-": 2.0}
+        half = compute_ec(ions, model="test_half")["ec_mS_per_cm"]["25.0"]
+        assert half == pytest.approx(0.5 * compute_ec(ions)["ec_mS_per_cm"]["25.0"])
+    finally:
+        EC_MODELS.pop("test_half")
+
+
+def test_ec_models_endpoint() -> None:
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    models = client.get("/ec/models").json()
+    assert [model["name"] for model in models] == list(EC_MODELS)
+    assert "parameters" not in models[0]
+    detailed = client.get("/ec/models", params={"parameters": True}).json()
+    assert "K+" in detailed[0]["parameters"]["mccleskey"]
+
+    payload = {"fertilizers": [{"name": "Yara Tera CALCINIT", "grams": 8.0}], "ec_model": "kohlrausch"}
+    data = client.post("/calculate", json=payload).json()
+    assert data["ec"]["inputs"]["model"] == "kohlrausch"
@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.core import ION_INDEX, compute_solution
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+from horticalc.ec import compute_ec, ec_matrix
+from horticalc.speciation import davies_log_gamma, label_charges, log_k, speciate
+
+LABELS = ION_INDEX.labels
+POS = ION_INDEX.positions
+
+
+def test_ion_pairs_mass_balance_and_mass_action():
+    rng = np.random.default_rng(11)
+    ions = rng.uniform(0.0, 12.0, size=(30, len(LABELS)))
+    temps = rng.uniform(10.0, 35.0, size=30)
+    result = speciate(ions, LABELS, None, temps, ion_pairs=True)
+    free = result.ions_mmol_per_l
+    pairs = result.ion_pairs_mmol_per_l
+    assert result.h3po4_mmol_per_l is None and result.iterations < 50
+
+    np.testing.assert_allclose(free[:, POS["Ca+2"]] + pairs[:, 0], ions[:, POS["Ca+2"]])
+    np.testing.assert_allclose(free[:, POS["Mg+2"]] + pairs[:, 1], ions[:, POS["Mg+2"]])
+    np.testing.assert_allclose(free[:, POS["SO4^2-"]] + pairs.sum(axis=1), ions[:, POS["SO4^2-"]])
+    untouched = [POS[label] for label in LABELS if label not in ("Ca+2", "Mg+2", "SO4^2-")]
+    np.testing.assert_array_equal(free[:, untouched], ions[:, untouched])
+
+    # the ionic strength is that of the free ions, and the pair constants hold with it
+    strength = result.ionic_strength_mol_per_kg
+    np.testing.assert_allclose(strength, 0.5 * free @ label_charges(LABELS) ** 2 / 1000.0, rtol=1e-9)
+    log_g2 = 4.0 * davies_log_gamma(strength, temps)
+    quotient = (pairs[:, 0] / 1000.0) / (free[:, POS["Ca+2"]] / 1000.0 * free[:, POS["SO4^2-"]] / 1000.0)
+    np.testing.assert_allclose(np.log10(quotient), log_k("CaSO4", temps) + 2.0 * log_g2, rtol=1e-8)
+
+    single = speciate(ions[3], LABELS, None, temps[3], ion_pairs=True)
+    np.testing.assert_allclose(single.ions_mmol_per_l, free[3], rtol=1e-9)
+
+    # strong pairing at stock-tank strength: the secant must not step below zero
+    concentrate = np.zeros(len(LABELS))
+    concentrate[[POS["Mg+2"], POS["SO4^2-"], POS["Ca+2"]]] = (240.0, 240.0, 1.0)
+    strong = speciate(concentrate, LABELS, 5.5, 20.0, ion_pairs=True)
+    assert np.isfinite(strong.ionic_strength_mol_per_kg) and strong.iterations < 50
+    assert strong.ion_pairs_mmol_per_l[1] + strong.ions_mmol_per_l[POS["Mg+2"]] == pytest.approx(240.0)
+
+
+def test_activity_ec_model():
+    no_sulfate = {"K+": 4.0, "NO3-": 4.0, "H2PO4-": 1.0, "NH4+": 1.0}
+    assert compute_ec(no_sulfate, model="activity")["ec_mS_per_cm"] == compute_ec(no_sulfate)["ec_mS_per_cm"]
+
+    ions = {"Ca+2": 5.0, "Mg+2": 2.0, "SO4^2-": 4.0, "K+": 3.0, "NO3-": 11.0}
+    nominal = compute_ec(ions)
+    paired = compute_ec(ions, model="activity")
+    assert paired["inputs"]["model"] == "activity"
+    for temp_key, ec in paired["ec_mS_per_cm"].items():
+        # neutral pairs do not conduct, and the lower ionic strength only partly makes up for it
+        assert ec < nominal["ec_mS_per_cm"][temp_key]
+        assert paired["activity"]["ionic_strength_mol_per_kg"][temp_key] < nominal["ionic_strength_mol_per_kg"]
+        assert paired["activity"]["ion_pairs_mmol_per_l"][temp_key]["MgSO4"] > 0
+        assert sum(paired["transport_numbers"][temp_key].values()) == pytest.approx(1.0)
+
+    row = ION_INDEX.pack(ions)
+    batch = ec_matrix(np.nan_to_num(np.vstack([row, row])), LABELS, (18.0, 25.0), "activity")
+    assert batch[1] == pytest.approx([paired["ec_mS_per_cm"]["18.0"], paired["ec_mS_per_cm"]["25.0"]], rel=1e-9)
+    with pytest.raises(ValueError, match="EC-Modell"):
+        compute_ec(ions, model="pitzer")
+
+
+def test_activity_model_in_compute_solution():
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    args = (load_fertilizers(), load_molar_masses(), profile["mg_per_l"], profile["osmosis_percent"])
+
+    nominal = compute_solution(recipe, *args)
+    result = compute_solution(dict(recipe, ec_model="activity"), *args)
+    data = result.to_dict()
+    assert data["ec"]["inputs"]["model"] == "activity"
+    assert data["ec_water"]["inputs"]["model"] == "activity"
+    assert data["ec"]["ec_mS_per_cm"]["25.0"] < nominal.to_dict()["ec"]["ec_mS_per_cm"]["25.0"]
+    # the model changes the EC, not the composition
+    assert data["ions_mmol_per_l"] == nominal.to_dict()["ions_mmol_per_l"]
+
+    # with pH speciation the phosphate split sees the ionic strength after pairing
+    auto = dict(recipe, phosphate_species="auto", ph=6.0)
+    split = compute_solution(auto, *args).speciation
+    paired = compute_solution(dict(auto, ec_model="activity"), *args).speciation
+    assert "ion_pairs_mmol_per_l" not in split
+    assert paired["ion_pairs_mmol_per_l"]["CaSO4"] > 0
+    assert paired["ionic_strength_mol_per_kg"] < split["ionic_strength_mol_per_kg"]
+
+    with pytest.raises(ValueError):
+        compute_solution(dict(recipe, ec_model="pitzer"), *args)
+
+
+def test_calculate_endpoint_ec_model():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {
+        "fertilizers": [{"name": "Yara Tera CALCINIT", "grams": 8.0}],
+        "water_mg_l": {"Ca": 40, "Mg": 10, "SO4": 60},
+        "ec_model": "activity",
+    }
+    response = client.post("/calculate", json=payload)
+    assert response.status_code == 200
+    assert response.json()["ec"]["activity"]["ion_pairs_mmol_per_l"]["25.0"]["CaSO4"] > 0
+    assert client.post("/calculate", json=dict(payload, ec_model="pitzer")).status_code == 400
+
+
+def test_canonical_labels_keep_their_charge():
+    # "Ca2+" is the canonical key of "Ca+2"; both spellings must give the same EC
+    caret = {"Ca+2": 5.0, "Mg+2": 2.0, "SO4^2-": 4.0, "K+": 3.0, "NO3-": 11.0}
+    canonical = {"Ca2+": 5.0, "Mg2+": 2.0, "SO4^2-": 4.0, "K+": 3.0, "NO3-": 11.0}
+    for model in ("mccleskey", "activity"):
+        expected = compute_ec(caret, model=model)
+        result = compute_ec(canonical, model=model)
+        assert result["ionic_strength_mol_per_kg"] == pytest.approx(0.029)
+        assert result["ec_mS_per_cm"] == pytest.approx(expected["ec_mS_per_cm"], rel=1e-12)
+        assert result["warnings"] == []
+    assert compute_ec(canonical, model="activity")["ec_mS_per_cm"]["25.0"] == pytest.approx(1.8388, abs=1e-4)
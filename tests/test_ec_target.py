@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.core import compute_solution, scale_recipe_to_ec, scale_recipes_to_ec
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+from horticalc.solver import _load_solver_recipe, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def golden():
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    return recipe, load_fertilizers(), load_molar_masses(), profile["mg_per_l"], profile["osmosis_percent"]
+
+
+@pytest.fixture(scope="module")
+def solver_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+def _ec25(recipe, ferts, mm, water, osmosis):
+    return compute_solution(recipe, ferts, mm, water, osmosis_percent=osmosis).to_dict()["ec"]["ec_mS_per_cm"]["25.0"]
+
+
+def test_scale_recipe_to_ec_hits_target(golden):
+    recipe, ferts, mm, water, osmosis = golden
+    scaled = scale_recipe_to_ec(recipe, 1.8, ferts, mm, water, osmosis)
+    assert scaled.reachable
+    assert _ec25(scaled.recipe, ferts, mm, water, osmosis) == pytest.approx(1.8, abs=1e-9)
+    grams = {entry["name"]: entry["grams"] for entry in scaled.recipe["fertilizers"]}
+    for entry in recipe["fertilizers"]:
+        assert grams[entry["name"]] == pytest.approx(float(entry.get("grams") or 0.0) * scaled.factor)
+
+
+def test_scale_recipes_to_ec_batch(golden):
+    recipe, ferts, mm, water, osmosis = golden
+    halved = [dict(entry, grams=float(entry.get("grams") or 0) / 2) for entry in recipe["fertilizers"]]
+    half = dict(recipe, fertilizers=halved)
+    targets = [0.8, 1.4, 2.6, 0.0]
+    results = scale_recipes_to_ec([recipe, half, recipe, recipe], targets, ferts, mm, water, osmosis)
+    for result, target in zip(results[:3], targets):
+        assert result.reachable
+        assert _ec25(result.recipe, ferts, mm, water, osmosis) == pytest.approx(target, abs=1e-9)
+    # the same solution twice: half the grams need twice the factor
+    assert results[1].factor == pytest.approx(2 * scale_recipe_to_ec(recipe, 1.4, ferts, mm, water, osmosis).factor)
+    # below the water EC
+    assert results[3].factor == 0.0 and not results[3].reachable
+
+
+def test_solver_respects_ec_max_and_target(solver_recipe):
+    free = solve_recipe_data(solver_recipe)
+    capped = solve_recipe_data(dict(solver_recipe, ec_max_mS_per_cm=1.5))
+    assert capped.ec["mS_per_cm"] == pytest.approx(1.5, abs=1e-8)
+    assert capped.active_constraints[0]["type"] == "ec_max"
+    assert sum(np.square(list(capped.errors_mg_l.values()))) > sum(np.square(list(free.errors_mg_l.values())))
+
+    loose = solve_recipe_data(dict(solver_recipe, ec_max_mS_per_cm=5.0))
+    assert loose.active_constraints == []
+    assert loose.ec["mS_per_cm"] < 5.0
+
+    target = solve_recipe_data(dict(solver_recipe, ec_target_mS_per_cm=1.2, max_grams={"Yara Tera CALCINIT": 3.0}))
+    assert target.ec["mS_per_cm"] == pytest.approx(1.2, abs=1e-8)
+    grams = {entry["name"]: entry["grams"] for entry in target.fertilizers}
+    assert grams["Yara Tera CALCINIT"] <= 3.0 + 1e-9
+
+
+def test_solver_ec_errors(solver_recipe):
+    with pytest.raises(ValueError, match="unter der EC"):
+        solve_recipe_data(dict(solver_recipe, ec_max_mS_per_cm=0.01))
+    with pytest.raises(ValueError, match="schließen sich aus"):
+        solve_recipe_data(dict(solver_recipe, ec_max_mS_per_cm=2.0, ec_target_mS_per_cm=1.5))
+
+
+def test_solver_ec_limit_just_above_water(solver_recipe):
+    # the water alone is at ~0.093 mS/cm: x = 0 is feasible, the solve must not report a conflict
+    for key in ("ec_max_mS_per_cm", "ec_target_mS_per_cm"):
+        for limit in (0.1, 0.15):
+            result = solve_recipe_data(dict(solver_recipe, **{key: limit}))
+            assert result.ec["mS_per_cm"] == pytest.approx(limit, abs=1e-8)
+            assert result.active_constraints[0]["type"] == key.split("_mS")[0]
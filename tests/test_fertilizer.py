@@ -0,0 +1,38 @@
+import pickle
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from horticalc.data_io import COMP_COLS, Fertilizer, load_fertilizers
+
+
+def test_sparse_composition_drops_zero_columns():
+    fert = Fertilizer(
+        name="Kalksalpeter",
+        form="Pulver",
+        weight_factor=1.0,
+        comp={"NO3": 0.155, "NH4": 0.0, "CaO": 0.26, "MgO": 0.0, "HCO3-V": 0.5},
+    )
+    assert [COMP_COLS[pos] for pos in fert.comp_index] == ["NO3", "CaO"]
+    assert fert.comp_values.tolist() == [0.155, 0.26]
+    assert dict(fert.extra) == {"HCO3-V": 0.5}
+    assert dict(fert.comp) == {"NO3": 0.155, "CaO": 0.26, "HCO3-V": 0.5}
+    assert list(fert.components()) == [("NO3", 0.155), ("CaO", 0.26)]
+
+    with pytest.raises(AttributeError):
+        fert.weight_factor = 2.0
+    with pytest.raises(ValueError):
+        fert.comp_values[0] = 1.0
+    with pytest.raises(TypeError):
+        fert.comp["NO3"] = 1.0
+
+
+def test_catalog_fertilizers_are_slotted_and_picklable():
+    ferts = load_fertilizers()
+    fert = next(f for f in ferts.values() if len(f.comp_index))
+    assert not hasattr(fert, "__dict__")
+    assert pickle.loads(pickle.dumps(fert)) == fert
@@ -0,0 +1,101 @@
+import itertools
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.data_io import load_fertilizers
+from horticalc.multistage import _SubsetSearch, _stage_recipes, solve_program, solve_program_file
+from horticalc.solver import _prepare_problem, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def program():
+    ferts = load_fertilizers()
+    pool = [name for name, fert in ferts.items() if fert.form in ("Pulver", "Flüssig")][5:17]
+    return {
+        "liters": 10.0,
+        "water_profile": "default",
+        "fertilizers_allowed": pool,
+        "max_fertilizers": 4,
+        "stages": [
+            {"nutrient_solution": "Hoagland_Arnon_1950_Solution1_Nitrate"},
+            {"nutrient_solution": "Knop_1861_Standard", "weight": 2.0},
+            {"name": "Blüte", "targets_mg_per_l": {"N_total": 150, "K": 200, "Ca": 150, "Mg": 40, "P": 40}},
+        ],
+    }
+
+
+def test_search_matches_enumeration(program):
+    result = solve_program(program)
+    assert result.search["optimal"] is True
+    assert len(result.fertilizers) <= 4
+
+    stages = _stage_recipes(program, None)
+    pool = program["fertilizers_allowed"]
+    problems = [_prepare_problem(dict(recipe, fertilizers_allowed=pool)) for _, _, recipe in stages]
+    search = _SubsetSearch([p.A for p in problems], [p.residual_target() for p in problems], [w for _, w, _ in stages], 4, math.inf)
+    best = min(search.evaluate(columns) for columns in itertools.combinations(range(len(pool)), 4))
+    assert result.weighted_residual_mg_l == pytest.approx(math.sqrt(best))
+    assert result.search["evaluations"] < len(search.cache)
+
+    # per-stage recipes are the plain solver result restricted to the chosen set
+    _, _, recipe = stages[2]
+    single = solve_recipe_data(dict(recipe, fertilizers_allowed=result.fertilizers))
+    assert result.stages[2]["name"] == "Blüte"
+    assert result.stages[2]["errors_mg_per_l"] == pytest.approx(single.errors_mg_l)
+
+
+def test_required_and_workers(program):
+    required = program["fertilizers_allowed"][0]
+    serial = solve_program(dict(program, required=[required]))
+    parallel = solve_program(dict(program, required=[required], workers=2))
+    assert required in serial.fertilizers
+    assert parallel.fertilizers == serial.fertilizers
+    with pytest.raises(ValueError):
+        solve_program(dict(program, stages=[{"targets": {"K": 100}, "min_grams": {required: 1}}]))
+
+
+def test_max_fertilizers_zero_is_rejected(program):
+    for k in (0, -1):
+        with pytest.raises(ValueError, match="max_fertilizers"):
+            solve_program(dict(program, max_fertilizers=k))
+    unlimited = {key: value for key, value in program.items() if key != "max_fertilizers"}
+    assert solve_program(unlimited).search["optimal"] is True
+
+
+def test_shipped_tomato_program():
+    result = solve_program_file(ROOT / "programs" / "tomate.yml")
+    assert [stage["name"] for stage in result.stages] == ["Jungpflanze", "Vegetativ", "Ernte"]
+    assert "Yara Tera CALCINIT" in result.fertilizers
+    assert len(result.fertilizers) <= 6
+
+
+def test_multistage_endpoint(program):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    payload = {
+        "fertilizers_allowed": program["fertilizers_allowed"],
+        "max_fertilizers": 3,
+        "stages": [
+            {"nutrient_solution": "Knop_1861_Standard.yml"},
+            {"name": "Blüte", "targets": {"K": 200, "Ca": 150, "Mg": 40}},
+        ],
+    }
+    response = TestClient(app).post("/solve/multistage", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["fertilizers"]) <= 3
+    assert [stage["name"] for stage in data["stages"]] == ["Stufe 1", "Blüte"]
+
+    response = TestClient(app).post("/solve/multistage", json=dict(payload, stages=[{"nutrient_solution": "gibtsnicht"}]))
+    assert response.status_code == 400
@@ -0,0 +1,97 @@
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.data_io import load_prices
+from horticalc.pareto import solve_pareto
+from horticalc.solver import _load_solver_recipe, _prepare_problem, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def golden_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+@pytest.fixture(scope="module")
+def prices(golden_recipe):
+    return dict(zip(golden_recipe["fertilizers_allowed"], [1.5, 0.8, 4.0, 6.0, 2.5]))
+
+
+def test_front_is_monotone_and_ends_at_unweighted_solve(golden_recipe, prices):
+    front = solve_pareto(golden_recipe, prices=prices)
+    costs = np.array([point["cost"] for point in front.points])
+    errors = np.array([point["error"] for point in front.points])
+    assert len(front.points) > 5
+    assert np.all(np.diff(costs) > 0)
+    assert np.all(np.diff(errors) < 0)
+    assert front.points[0]["fertilizers"] == []
+
+    plain = solve_recipe_data(golden_recipe)
+    assert front.points[-1]["lambda"] == 0.0
+    assert errors[-1] == pytest.approx(math.sqrt(sum(v * v for v in plain.errors_mg_l.values())), rel=1e-6)
+    for key, value in plain.errors_mg_l.items():
+        assert front.points[-1]["errors_mg_per_l"][key] == pytest.approx(value, abs=1e-6)
+
+
+def test_target_weights_and_missing_prices(golden_recipe, prices):
+    weighted = solve_pareto(dict(golden_recipe, target_weights={"Mg": 10.0}), prices=prices)
+    assert weighted.target_weights["Mg"] == 10.0
+    with pytest.raises(ValueError, match="Keine Preise"):
+        solve_pareto(golden_recipe, prices={})
+    with pytest.raises(KeyError):
+        solve_pareto(golden_recipe, prices=dict(list(prices.items())[1:]))
+    with pytest.raises(KeyError):
+        solve_pareto(dict(golden_recipe, target_weights={"Xx": 1.0}), prices=prices)
+
+
+def test_errors_measured_against_clamped_residual(golden_recipe, prices):
+    # 40 g Bittersalz overshoot Mg on their own; the sweep can only fit the clamped residual
+    recipe = dict(golden_recipe, fixed_grams={"K+S EPSO Top Bittersalz 16-39": 40.0})
+    problem = _prepare_problem(recipe)
+    residual = problem.residual_target()
+    mg = problem.objective_keys.index("Mg")
+    assert residual[mg] == 0.0 and (problem.b - problem.A @ problem.fixed_weights)[mg] < 0
+
+    front = solve_pareto(recipe, prices=prices)
+    for point in front.points:
+        grams = {row["name"]: row["grams"] for row in point["fertilizers"]}
+        total = np.array([grams.get(fert.name, 0.0) for fert in problem.allowed])
+        expected = problem.A @ (total - problem.fixed_weights) - residual
+        assert np.array(list(point["errors_mg_per_l"].values())) == pytest.approx(expected, abs=1e-6)
+
+
+def test_load_prices(tmp_path):
+    path = tmp_path / "prices.yml"
+    path.write_text("currency: EUR\nprices_per_kg:\n  Kaliumsulfat: 2.4\n", encoding="utf-8")
+    assert load_prices(path) == {"Kaliumsulfat": 2.4}
+
+
+def test_pareto_endpoint(golden_recipe, prices):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    payload = {
+        "liters": golden_recipe["liters"],
+        "targets": golden_recipe["targets_mg_per_l"],
+        "fertilizers_allowed": golden_recipe["fertilizers_allowed"],
+        "prices_per_kg": prices,
+        "points": 10,
+    }
+    response = TestClient(app).post("/solve/pareto", json=payload)
+    assert response.status_code == 200
+    points = response.json()["points"]
+    assert 2 <= len(points) <= 10
+    assert points[-1]["lambda"] == 0.0
+
+    response = TestClient(app).post("/solve/pareto", json=dict(payload, prices_per_kg={}))
+    assert response.status_code == 400
@@ -0,0 +1,129 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.core import ION_INDEX, compute_solution
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+from horticalc.precipitation import MINERALS, saturation_indices, screen_concentrate
+from horticalc.solver import _load_solver_recipe, solve_recipe_data
+
+LABELS = ION_INDEX.labels
+POS = ION_INDEX.positions
+
+
+@pytest.fixture(scope="module")
+def golden():
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    return recipe, (load_fertilizers(), load_molar_masses(), profile["mg_per_l"], profile["osmosis_percent"])
+
+
+def _row(**ions):
+    row = np.zeros(len(LABELS))
+    for label, value in ions.items():
+        row[POS[label]] = value
+    return row
+
+
+def test_gypsum_saturates_near_its_solubility():
+    # gypsum dissolves to ~15 mmol/L CaSO4 at 25 °C
+    calcium = np.array([5.0, 10.0, 15.0, 20.0, 40.0])
+    rows = calcium[:, None] * (_row(**{"Ca+2": 1.0, "SO4^2-": 1.0}))
+    screen = saturation_indices(rows, LABELS, 6.0, minerals=["gypsum"])
+    si = screen.saturation_index[:, 0]
+    assert np.all(np.diff(si) > 0)
+    assert si[2] == pytest.approx(0.0, abs=0.1)
+    assert screen.flags[:, 0].tolist() == [False, False, False, True, True]
+    # no phosphate: the phosphate minerals cannot form
+    summary = saturation_indices(rows[0], LABELS, 6.0).summary()
+    assert summary["saturation_index"]["brushite"] is None and summary["flags"] == []
+    with pytest.raises(KeyError):
+        saturation_indices(rows, LABELS, 6.0, minerals=["apatite"])
+
+
+def test_batch_screen_matches_single_rows():
+    rng = np.random.default_rng(3)
+    rows = rng.uniform(0.0, 20.0, size=(200, len(LABELS)))
+    ph = rng.uniform(4.5, 7.5, size=200)
+    fe = rng.uniform(0.0, 0.05, size=200)
+    batch = saturation_indices(rows, LABELS, ph, fe, temp_c=20.0)
+    assert batch.saturation_index.shape == (200, len(MINERALS))
+    for row in (0, 57, 199):
+        single = saturation_indices(rows[row], LABELS, ph[row], fe[row], temp_c=20.0)
+        np.testing.assert_allclose(single.saturation_index, batch.saturation_index[row], rtol=1e-9)
+
+    # calcium phosphates are more soluble in acid
+    acid = saturation_indices(rows, LABELS, np.full(200, 4.5), fe).saturation_index
+    neutral = saturation_indices(rows, LABELS, np.full(200, 7.0), fe).saturation_index
+    for name in ("brushite", "tcp"):
+        column = list(MINERALS).index(name)
+        assert np.all(neutral[:, column] > acid[:, column])
+
+
+def test_concentrate_factor_sweep():
+    water = _row(**{"Ca+2": 1.0, "HCO3-": 2.0})
+    fertilizer = _row(**{"Ca+2": 3.0, "NO3-": 6.0, "K+": 2.0, "H2PO4-": 1.0, "SO4^2-": 0.5})
+    factors = np.array([1.0, 10.0, 50.0, 100.0])
+    screen = screen_concentrate(water, fertilizer, factors, LABELS, 5.5)
+    gypsum = screen.saturation_index[:, list(MINERALS).index("gypsum")]
+    assert np.all(np.diff(gypsum) > 0)
+    assert not screen.flags[0].any() and screen.flags[-1].any()
+    with pytest.raises(ValueError):
+        screen_concentrate(water, fertilizer, 0.0, LABELS, 5.5)
+
+
+def test_precipitation_option_in_compute_solution(golden):
+    recipe, args = golden
+    plain = compute_solution(recipe, *args)
+    assert plain.precipitation is None and "precipitation" not in plain.to_dict()
+
+    working = compute_solution(dict(recipe, precipitation={"factor": 1, "ph": 5.5}), *args).to_dict()
+    stock = compute_solution(dict(recipe, precipitation={"factor": 100}, ph=5.5), *args).to_dict()
+    assert "gypsum" not in working["precipitation"]["flags"]
+    assert {"gypsum", "brushite"} <= set(stock["precipitation"]["flags"])
+    assert stock["precipitation"]["ok"] is False and stock["precipitation"]["ph"] == 5.5
+    # a screen only: the solution itself is unchanged
+    assert stock["ions_mmol_per_l"] == plain.to_dict()["ions_mmol_per_l"]
+
+    with pytest.raises(ValueError, match="ph"):
+        compute_solution(dict(recipe, precipitation=True), *args)
+    with pytest.raises(ValueError):
+        compute_solution(dict(recipe, precipitation={"factor": 100, "ph": 5.5, "fe_unchelated_fraction": 2}), *args)
+
+
+def test_solver_reports_precipitation():
+    recipe = dict(_load_solver_recipe(ROOT / "recipes" / "solve_golden.yml"), precipitation={"factor": 100, "ph": 5.8})
+    result = solve_recipe_data(recipe)
+    data = result.to_dict()
+    assert data["precipitation"]["factor"] == 100.0
+    assert set(data["precipitation"]["saturation_index"]) == set(MINERALS)
+    assert "precipitation" not in solve_recipe_data(dict(recipe, precipitation=None)).to_dict()
+
+
+def test_calculate_endpoint_precipitation():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {
+        "fertilizers": [
+            {"name": "Yara Tera CALCINIT", "grams": 8.0},
+            {"name": "K+S EPSO Top Bittersalz 16-39", "grams": 5.0},
+        ],
+        "water_mg_l": {"Ca": 40, "Mg": 10},
+        "precipitation": {"factor": 100, "ph": 5.5},
+    }
+    response = client.post("/calculate", json=payload)
+    assert response.status_code == 200
+    assert "gypsum" in response.json()["precipitation"]["flags"]
+    assert client.post("/calculate", json=dict(payload, precipitation={"factor": 100})).status_code == 400
+    assert client.post("/calculate", json=dict(payload, precipitation={"factor": 0, "ph": 5.5})).status_code == 422
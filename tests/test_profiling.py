@@ -0,0 +1,29 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from horticalc.__main__ import main
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_cpu_profile_writes_pstats_and_collapsed_stacks(tmp_path, capsys) -> None:
+    out = tmp_path / "golden"
+    main([str(ROOT / "recipes" / "golden.yml"), "--profile", "cpu", "--profile-out", str(out)])
+    captured = capsys.readouterr()
+    assert "liters" in json.loads(captured.out)
+    assert "CPU-Profil" in captured.err
+    assert (tmp_path / "golden.prof").stat().st_size > 0
+    assert (tmp_path / "golden.collapsed").exists()
+
+
+def test_mem_profile_reports_peak_for_solve(tmp_path, capsys) -> None:
+    out = tmp_path / "solve"
+    main(["solve", str(ROOT / "recipes" / "solve_golden.yml"), "--profile", "mem", "--profile-out", str(out)])
+    captured = capsys.readouterr()
+    assert "fertilizers" in json.loads(captured.out)
+    report = (tmp_path / "solve.txt").read_text(encoding="utf-8")
+    assert report.startswith("Peak:")
+    assert "allocation sites" in report
@@ -0,0 +1,146 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.session import SolverSession
+from horticalc.solver import _load_solver_recipe, _nnls, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def golden_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+def _with_targets(recipe, **changes):
+    return dict(recipe, targets_mg_per_l=dict(recipe["targets_mg_per_l"], **changes))
+
+
+def test_warm_nnls_matches_cold():
+    rng = np.random.default_rng(11)
+    for _ in range(100):
+        A = np.abs(rng.normal(size=(8, 6)))
+        b = rng.normal(size=8) * 3
+        x = _nnls(A, b)
+        b2 = b + rng.normal(size=8) * 0.3
+        np.testing.assert_allclose(_nnls(A, b2, passive=x > 0), _nnls(A, b2), atol=1e-9)
+        np.testing.assert_allclose(_nnls(A, b2, passive=rng.random(6) > 0.5), _nnls(A, b2), atol=1e-9)
+
+
+def test_session_matches_full_solve(golden_recipe):
+    session = SolverSession(golden_recipe)
+    assert session.result.to_dict() == solve_recipe_data(golden_recipe).to_dict()
+    mg = golden_recipe["targets_mg_per_l"]["Mg"]
+    for step in (5.0, 10.0, -3.0):
+        result = session.set_targets({"Mg": mg + step})
+        expected = solve_recipe_data(_with_targets(golden_recipe, Mg=mg + step))
+        assert result.errors_mg_l == pytest.approx(expected.errors_mg_l, abs=1e-9)
+
+    # adding/removing objective elements rebuilds the matrix rows
+    result = session.set_targets({"Zn": 0, "K": 200})
+    expected = solve_recipe_data(_with_targets(golden_recipe, Mg=mg - 3.0, Zn=0, K=200))
+    assert result.objective_elements == expected.objective_elements
+    assert result.errors_mg_l == pytest.approx(expected.errors_mg_l, abs=1e-9)
+    assert session.solves == 5
+
+
+def test_bounded_session(golden_recipe):
+    recipe = dict(golden_recipe, max_total_grams=12.0)
+    session = SolverSession(recipe)
+    result = session.set_targets({"Ca": 180})
+    expected = solve_recipe_data(dict(_with_targets(golden_recipe, Ca=180), max_total_grams=12.0))
+    assert result.errors_mg_l == pytest.approx(expected.errors_mg_l, abs=1e-7)
+    assert result.active_constraints[0]["type"] == "max_total_grams"
+    with pytest.raises(ValueError):
+        session.set_targets({key: 0 for key in golden_recipe["targets_mg_per_l"]})
+
+
+def test_live_solve_websocket(golden_recipe):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    request = {
+        "liters": golden_recipe["liters"],
+        "targets": golden_recipe["targets_mg_per_l"],
+        "fertilizers_allowed": golden_recipe["fertilizers_allowed"],
+    }
+    client = TestClient(app)
+    with client.websocket_connect("/ws/solve") as ws:
+        ws.send_json({"op": "targets", "targets": {"Mg": 70}, "seq": 0})
+        assert ws.receive_json()["type"] == "error"
+
+        ws.send_json({"op": "replace", "request": request, "seq": 1})
+        first = ws.receive_json()
+        assert first["seq"] == 1
+        assert first["result"] == client.post("/solve", json=request).json()
+
+        ws.send_json({"op": "targets", "targets": {"Mg": 70}, "seq": 2})
+        second = ws.receive_json()
+        assert second["seq"] == 2
+        expected = client.post("/solve", json=dict(request, targets=dict(request["targets"], Mg=70))).json()
+        assert second["result"]["errors_mg_per_l"] == pytest.approx(expected["errors_mg_per_l"], abs=1e-9)
+
+        # a failed solve must not drop its edits: the next one starts from the full targets
+        zeros = {key: 0 for key in request["targets"]}
+        ws.send_json({"op": "targets", "targets": zeros, "seq": 3})
+        assert ws.receive_json() == {"type": "error", "seq": 3, "detail": "No solvable targets defined (S/SO4/Na/Cl are ignored)."}
+        ws.send_json({"op": "targets", "targets": {"Mg": 70}, "seq": 4})
+        fourth = ws.receive_json()
+        assert fourth["seq"] == 4
+        expected = client.post("/solve", json=dict(request, targets=dict(zeros, Mg=70))).json()
+        assert fourth["result"]["objective_elements"] == ["Mg"]
+        assert fourth["result"]["errors_mg_per_l"] == pytest.approx(expected["errors_mg_per_l"], abs=1e-9)
+
+        ws.send_text("{kein json")
+        assert ws.receive_json()["detail"] == "Message is not valid JSON"
+        ws.send_json({"op": "targets", "targets": {"K": 150}, "seq": 5})
+        assert ws.receive_json()["type"] == "result"
+
+
+def test_live_solve_survives_internal_errors(golden_recipe, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import api.app as api_app
+
+    request = {
+        "liters": golden_recipe["liters"],
+        "targets": golden_recipe["targets_mg_per_l"],
+        "fertilizers_allowed": golden_recipe["fertilizers_allowed"],
+    }
+    original = api_app.SolverSession
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("kaputt")
+
+    client = TestClient(api_app.app)
+    with client.websocket_connect("/ws/solve") as ws:
+        monkeypatch.setattr(api_app, "SolverSession", broken)
+        ws.send_json({"op": "replace", "request": request, "seq": 1})
+        assert ws.receive_json() == {"type": "error", "seq": 1, "detail": "kaputt"}
+        monkeypatch.setattr(api_app, "SolverSession", original)
+        ws.send_json({"op": "targets", "targets": {"Mg": 70}, "seq": 2})
+        data = ws.receive_json()
+        assert data["type"] == "result" and data["seq"] == 2
+
+
+@pytest.mark.parametrize("option", [{"ec_max_mS_per_cm": 1.2}, {"ec_target_mS_per_cm": 1.5}])
+def test_ec_limited_session_edits(golden_recipe, option):
+    # the EC tangent row is rebuilt on every solve: warm starts must not reuse the reset row
+    recipe = dict(golden_recipe, **option)
+    session = SolverSession(recipe)
+    targets = golden_recipe["targets_mg_per_l"]
+    for changes in ({"K": targets["K"] * 1.05}, {"Mg": targets["Mg"] * 0.9}):
+        result = session.set_targets(changes)
+        expected = solve_recipe_data(dict(recipe, targets_mg_per_l=session.targets))
+        assert result.errors_mg_l == pytest.approx(expected.errors_mg_l, abs=1e-7)
+        assert result.to_dict()["ec"]["mS_per_cm"] == pytest.approx(next(iter(option.values())), abs=1e-6)
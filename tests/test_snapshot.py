@@ -0,0 +1,139 @@
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.core import compute_solution
+from horticalc.snapshot import MappedFertilizers, SnapshotManager
+from horticalc.solver import _build_matrix
+
+NEW_ROW = "999,Test Kaliumsulfat,Pulver,1.0,0,0,0,0.5,0,0,0,0.45,0,0,0,0,0,0,0,0,,0,0,0,\n"
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    ferts = tmp_path / "fertilizers.csv"
+    mm = tmp_path / "molar_masses.yml"
+    shutil.copy(ROOT / "data" / "fertilizers.csv", ferts)
+    shutil.copy(ROOT / "data" / "molar_masses.yml", mm)
+    return ferts, mm
+
+
+def _touch_append(path: Path, text: str) -> None:
+    with path.open("a", encoding="utf-8") as f:
+        f.write(text)
+    stat = path.stat()
+    # make the change visible even on filesystems with coarse mtime resolution
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_swaps_snapshot_and_keeps_old_one(data_files):
+    ferts, mm = data_files
+    manager = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm)
+    first = manager.current()
+    assert manager.reload() is False
+
+    _touch_append(ferts, NEW_ROW)
+    assert manager.reload() is True
+    second = manager.current()
+    assert second.version == first.version + 1
+    assert second.digest != first.digest
+    assert "Test Kaliumsulfat" in second.fertilizers
+    assert "Test Kaliumsulfat" not in first.fertilizers
+    assert second.compiled.names[-1] == "Test Kaliumsulfat"
+
+    # a broken file keeps the last good snapshot active
+    _touch_append(mm, "K: [kaputt\n")
+    assert manager.reload() is False
+    assert manager.current() is second
+
+
+def test_compiled_matrix_matches_solver_matrix(data_files):
+    ferts, mm = data_files
+    snapshot = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm).current()
+    names = list(snapshot.fertilizers)[1:40]
+    keys = ["N_NO3", "N_NH4", "P", "K", "Ca", "Mg", "Fe", "HCO3"]
+    expected = _build_matrix([snapshot.fertilizers[n] for n in names], dict(snapshot.molar_masses), keys, 10.0)
+    assert np.array_equal(snapshot.compiled.solver_matrix(names, keys, 10.0), expected)
+    with pytest.raises(ValueError):
+        snapshot.compiled.contribution[0, 0] = 1.0
+
+
+def test_solver_matrices_use_weight_factor(data_files):
+    # liquids are dosed in ml with a composition per g: the fit has to use the density
+    ferts, mm = data_files
+    snapshot = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm).current()
+    name = "S3 Kaliwasser 28 Be"
+    fert = snapshot.fertilizers[name]
+    assert fert.form == "Flüssig" and fert.weight_factor != 1.0
+    recipe = {"liters": 10.0, "fertilizers": [{"name": name, "grams": 5.0}]}
+    potassium = compute_solution(recipe, snapshot.fertilizers, dict(snapshot.molar_masses), {}).to_dict()
+    expected = potassium["elements_mg_per_l"]["K"]
+    assert _build_matrix([fert], dict(snapshot.molar_masses), ["K"], 10.0)[0, 0] * 5.0 == pytest.approx(expected)
+    assert snapshot.compiled.solver_matrix([name], ["K"], 10.0)[0, 0] * 5.0 == pytest.approx(expected)
+
+
+def test_watcher_picks_up_changes(data_files):
+    ferts, mm = data_files
+    manager = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm)
+    manager.start(interval_s=0.02)
+    try:
+        _touch_append(ferts, NEW_ROW)
+        deadline = time.monotonic() + 5.0
+        while manager.current().version == 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.stop()
+    assert manager.current().version == 2
+
+
+def test_shared_catalog_is_published_once_and_mapped(data_files, tmp_path):
+    ferts, mm = data_files
+    shared = tmp_path / "shared"
+    publisher = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm, shared_dir=shared)
+    worker = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm, shared_dir=shared)
+    published = publisher.current()
+    attached = worker.current()
+    assert [path.name for path in shared.iterdir()] == [published.shared_path.name]
+    assert attached.shared_path == published.shared_path
+    assert isinstance(attached.fertilizers, MappedFertilizers)
+    assert isinstance(attached.compiled.contribution, np.memmap)
+    assert not attached.compiled.contribution.flags.writeable
+    assert np.array_equal(attached.compiled.contribution, published.compiled.contribution)
+
+    plain = SnapshotManager(fertilizers_path=ferts, molar_masses_path=mm).current()
+    recipe = {"liters": 10.0, "fertilizers": [{"name": name, "grams": 1.5} for name in list(plain.fertilizers)[1:6]]}
+    assert (
+        compute_solution(recipe, attached.fertilizers, attached.molar_masses).to_dict()
+        == compute_solution(recipe, plain.fertilizers, plain.molar_masses).to_dict()
+    )
+
+    # a changed catalog gets a new file and the old one is cleaned up
+    _touch_append(ferts, NEW_ROW)
+    assert publisher.reload() is True
+    assert [path.name for path in shared.iterdir()] == [publisher.current().shared_path.name]
+    assert "Test Kaliumsulfat" in publisher.current().fertilizers
+
+
+def test_api_reports_data_version():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import SNAPSHOTS, app
+
+    client = TestClient(app)
+    snapshot = SNAPSHOTS.current()
+    health = client.get("/health").json()
+    assert health["data_version"] == snapshot.version
+    assert health["data_digest"] == snapshot.digest
+    response = client.post("/calculate", json={"liters": 10, "fertilizers": []})
+    assert response.headers["X-Data-Version"] == f"{snapshot.version}-{snapshot.digest}"
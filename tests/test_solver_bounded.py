@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.solver import _active_set_qp, _load_solver_recipe, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def golden_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+def test_active_set_qp_satisfies_kkt():
+    rng = np.random.default_rng(7)
+    for _ in range(100):
+        n, m = int(rng.integers(2, 6)), int(rng.integers(1, 8))
+        M = rng.normal(size=(n + 2, n))
+        H = M.T @ M + 0.1 * np.eye(n)
+        g = rng.normal(size=n) * 3
+        C = rng.normal(size=(m, n))
+        d = rng.normal(size=m) + 0.5
+        try:
+            result = _active_set_qp(H, g, C, d)
+        except ValueError:
+            continue
+        x, u = result.x, result.multipliers
+        assert np.all(C @ x - d <= 1e-7)
+        assert np.all(u >= -1e-9)
+        np.testing.assert_allclose(H @ x + g + C.T @ u, 0.0, atol=1e-7)
+        np.testing.assert_allclose(u * (C @ x - d), 0.0, atol=1e-7)
+        warm = _active_set_qp(H, g, C, d, active=result.active)
+        assert warm.iterations == 0
+        np.testing.assert_allclose(warm.x, x, atol=1e-8)
+
+
+def test_loose_bounds_match_nnls(golden_recipe):
+    unbounded = solve_recipe_data(golden_recipe)
+    bounded = solve_recipe_data(dict(golden_recipe, max_total_grams=1000.0))
+    assert bounded.active_constraints == []
+    expected = {entry["name"]: entry["grams"] for entry in unbounded.fertilizers}
+    for entry in bounded.fertilizers:
+        assert entry["grams"] == pytest.approx(expected.get(entry["name"], 0.0), abs=1e-6)
+
+
+def test_bounds_are_respected_and_reported(golden_recipe):
+    recipe = dict(
+        golden_recipe,
+        min_grams={"S3 Kaliwasser 28 Be": 0.5},
+        max_grams={"Yara Tera CALCINIT": 5.0},
+        max_total_grams=12.0,
+    )
+    result = solve_recipe_data(recipe)
+    grams = {entry["name"]: entry["grams"] for entry in result.fertilizers}
+    assert grams["Yara Tera CALCINIT"] <= 5.0 + 1e-9
+    assert grams["S3 Kaliwasser 28 Be"] >= 0.5 - 1e-9
+    assert sum(grams.values()) <= 12.0 + 1e-9
+    active = {(item["type"], item.get("fertilizer")) for item in result.active_constraints}
+    assert ("max_total_grams", None) in active
+    assert all(item["multiplier"] >= 0 for item in result.active_constraints)
+
+    with pytest.raises(ValueError):
+        solve_recipe_data(dict(golden_recipe, min_grams={"Yara Tera CALCINIT": 10.0}, max_total_grams=5.0))
+
+
+def test_solve_endpoint_accepts_bounds(golden_recipe):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    payload = {
+        "liters": golden_recipe["liters"],
+        "targets": golden_recipe["targets_mg_per_l"],
+        "fertilizers_allowed": golden_recipe["fertilizers_allowed"],
+        "constraints": [{"fertilizers": {"Yara Tera CALCINIT": 1, "K+S EPSO Top Bittersalz 16-39": 2}, "max": 6}],
+    }
+    response = TestClient(app).post("/solve", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    grams = {entry["name"]: entry["grams"] for entry in data["fertilizers"]}
+    assert grams.get("Yara Tera CALCINIT", 0) + 2 * grams.get("K+S EPSO Top Bittersalz 16-39", 0) <= 6 + 1e-9
+    assert data["active_constraints"][0]["type"] == "constraint"
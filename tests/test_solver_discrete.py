@@ -0,0 +1,88 @@
+import itertools
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.discrete import DiscreteSpec, solve_discrete
+from horticalc.solver import BoundSpec, _load_solver_recipe, solve_recipe_data
+
+
+@pytest.fixture(scope="module")
+def golden_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+def test_branch_and_bound_matches_enumeration():
+    rng = np.random.default_rng(3)
+    for trial in range(40):
+        A = np.abs(rng.normal(size=(4, 3)))
+        b = A @ np.abs(rng.normal(size=3)) * 3
+        steps = rng.choice([0.5, 1.0, 2.0], size=3)
+        G = np.ones((1, 3)) if trial % 2 else np.zeros((0, 3))
+        h = np.array([6.0]) if trial % 2 else np.zeros(0)
+        spec = BoundSpec(np.zeros(3), np.full(3, np.inf), G, h, [])
+        result = solve_discrete(
+            A, b, np.zeros(3), np.ones(3, dtype=bool), spec, DiscreteSpec(steps, 5.0, 100000), np.zeros(3), ["a", "b", "c"]
+        )
+        X = np.array(list(itertools.product(range(25), repeat=3))) * steps
+        if G.size:
+            X = X[np.all(X @ G.T <= h + 1e-9, axis=1)]
+        best = 0.5 * np.min(np.sum((X @ A.T - b) ** 2, axis=1))
+        assert result.optimal
+        assert result.objective == pytest.approx(best, abs=1e-9)
+
+
+def test_discrete_recipe_uses_resolution_and_reports_true_errors(golden_recipe):
+    recipe = dict(
+        golden_recipe,
+        discrete={"resolution": 0.5, "resolution_by_fertilizer": {"Yara Tera CALCINIT": 2.0}},
+    )
+    result = solve_recipe_data(recipe)
+    grams = {entry["name"]: entry["grams"] for entry in result.fertilizers}
+    assert grams["Yara Tera CALCINIT"] % 2.0 == 0.0
+    assert all((value * 2) == round(value * 2) for value in grams.values())
+    assert result.discrete["optimal"] is True
+    assert result.discrete["residual_mg_per_l"] >= result.discrete["relaxed_residual_mg_per_l"]
+
+    recomputed = solve_recipe_data(dict(golden_recipe, fixed_grams=grams, fertilizers_allowed=list(grams)))
+    assert recomputed.errors_mg_l == pytest.approx(result.errors_mg_l)
+
+
+def test_discrete_errors(golden_recipe):
+    with pytest.raises(KeyError):
+        solve_recipe_data(dict(golden_recipe, discrete={"resolution_by_fertilizer": {"Gibt es nicht": 1}}))
+    with pytest.raises(ValueError):
+        solve_recipe_data(
+            dict(
+                golden_recipe,
+                min_grams={"Yara Tera CALCINIT": 1.2},
+                max_grams={"Yara Tera CALCINIT": 1.8},
+                discrete={"resolution": 1.0},
+            )
+        )
+
+
+def test_solve_endpoint_discrete(golden_recipe):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    payload = {
+        "liters": golden_recipe["liters"],
+        "targets": golden_recipe["targets_mg_per_l"],
+        "fertilizers_allowed": golden_recipe["fertilizers_allowed"],
+        "discrete": {"resolution": 1.0},
+    }
+    response = TestClient(app).post("/solve", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert all(entry["grams"] == round(entry["grams"]) for entry in data["fertilizers"])
+    assert data["discrete"]["resolution"]["Yara Tera CALCINIT"] == 1.0
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.solver import _load_solver_recipe, _presolve, _solve_weights, solve_recipe_data
+
+FE_CHELATES = ["Biolchim Eisenchelat Fe EDDHA 6%", "Compo Fetrilon 13", "Compo Basafer Plus"]
+
+
+@pytest.fixture(scope="module")
+def golden_recipe():
+    return _load_solver_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+
+def test_presolve_prunes_zero_and_parallel_columns():
+    A = np.array(
+        [
+            [1.0, 0.0, 2.0, 0.0, 1.0],
+            [0.0, 0.0, 0.0, 1.0, 1.0],
+            [0.0, 0.0, 0.0, 0.0, 0.0],
+        ]
+    )
+    keep, diagnostics = _presolve(A, np.array([1.0, 1.0, 3.0]), list("abcde"), ["N", "K", "Mo"])
+    assert keep.tolist() == [True, False, False, True, True]
+    assert diagnostics["pruned"] == [
+        {"name": "b", "reason": "zero_column"},
+        {"name": "c", "reason": "duplicate", "covered_by": {"a": 2.0}, "one_minus_cos": 0.0},
+    ]
+    assert diagnostics["near_collinear"] == [{"fertilizers": ["a", "c"], "one_minus_cos": 0.0}]
+    assert diagnostics["unreachable_targets"] == ["Mo"]
+    # a, d and e = a + d span only two directions
+    assert diagnostics["rank"] == 2
+    assert diagnostics["columns"] == 3
+
+    keep, diagnostics = _presolve(A, np.zeros(3), list("abcde"), ["N", "K", "Mo"], prune=False)
+    assert keep.all()
+    assert diagnostics["pruned"] == [] and diagnostics["unreachable_targets"] == []
+    # the pairs are reported even when nothing is pruned
+    assert diagnostics["near_collinear"] == [{"fertilizers": ["a", "c"], "one_minus_cos": 0.0}]
+
+
+def test_duplicate_products_are_pruned_without_changing_the_fit(golden_recipe):
+    recipe = dict(golden_recipe, fertilizers_allowed=list(golden_recipe["fertilizers_allowed"]) + FE_CHELATES)
+    pruned = solve_recipe_data(recipe)
+    unpruned = solve_recipe_data(dict(recipe, prune=False))
+
+    names = [entry["name"] for entry in pruned.diagnostics["pruned"]]
+    assert names == FE_CHELATES[1:]
+    assert not set(names) & {entry["name"] for entry in pruned.fertilizers}
+    assert unpruned.diagnostics["pruned"] == []
+    for key, error in unpruned.errors_mg_l.items():
+        assert pruned.errors_mg_l[key] == pytest.approx(error, abs=1e-6)
+    assert pruned.diagnostics["condition_number"] < unpruned.diagnostics["condition_number"]
+
+
+def test_liquid_fertilizer_matrix_uses_weight_factor():
+    # recipe amounts of liquids are ml; the fit has to use the density like the verification does
+    result = solve_recipe_data({"liters": 10, "targets": {"K": 100.0}, "fertilizers_allowed": ["S3 Kaliwasser 28 Be"]})
+    assert result.errors_mg_l["K"] == pytest.approx(0.0, abs=1e-9)
+    assert result.to_dict()["diagnostics"]["condition_number"] == pytest.approx(1.0)
+
+
+HAKAPHOS = [
+    "Compo Hakaphos Basis2 3-9-40(+4)",
+    "Compo Hakaphos Azerka 20-7-10(+3)",
+    "Compo Hakaphos Grün 20-5-10(+2)",
+    "Compo Hakaphos Soft Naranja 15-5-30(+2)",
+    "Compo Hakaphos Soft Plus 14-6-24(+3)",
+]
+
+
+def test_near_duplicate_products_are_collapsed(golden_recipe):
+    # the Hakaphos variants are 0.5–1 % apart (1 - cos), not exactly parallel
+    recipe = dict(golden_recipe, fertilizers_allowed=list(golden_recipe["fertilizers_allowed"]) + HAKAPHOS)
+    pruned = solve_recipe_data(recipe)
+    exact = solve_recipe_data(dict(recipe, prune_tolerance=1e-9))
+
+    names = {entry["name"] for entry in pruned.diagnostics["pruned"]}
+    assert {"Compo Hakaphos Basis2 3-9-40(+4)", "Compo Hakaphos Grün 20-5-10(+2)"} <= names
+    assert all(0 < entry["one_minus_cos"] <= 0.01 for entry in pruned.diagnostics["pruned"])
+    assert exact.diagnostics["pruned"] == []
+    pairs = {tuple(pair["fertilizers"]) for pair in exact.diagnostics["near_collinear"]}
+    assert ("Compo Hakaphos Azerka 20-7-10(+3)", "Compo Hakaphos Grün 20-5-10(+2)") in pairs
+    assert pruned.diagnostics["condition_number"] < exact.diagnostics["condition_number"]
+    # pruning never costs fit: the residual is that of the full problem
+    for key, error in exact.errors_mg_l.items():
+        assert pruned.errors_mg_l[key] == pytest.approx(error, abs=1e-6)
+
+
+def test_pruned_column_comes_back_when_the_fit_needs_it():
+    # b and a are 0.5 % apart; only b reaches the target exactly
+    A = np.array([[1.0, 1.0], [0.0, 0.1]])
+    target = np.array([1.0, 0.1])
+    keep, diagnostics = _presolve(A, target, ["a", "b"], ["N", "K"])
+    assert keep.tolist() == [True, False]
+    x = _solve_weights(A, target, np.zeros(0), np.ones(2, dtype=bool), keep=keep)
+    np.testing.assert_allclose(A @ x, target, atol=1e-9)
@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.core import ION_INDEX, compute_solution
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_recipe, load_water_profile_data
+from horticalc.ec import compute_ec, parse_ion_key
+from horticalc.solver import _load_solver_recipe, solve_recipe_data
+from horticalc.speciation import davies_log_gamma, log_k, speciate
+
+LABELS = ION_INDEX.labels
+
+
+@pytest.fixture(scope="module")
+def golden():
+    recipe = load_recipe(ROOT / "recipes" / "golden.yml")
+    profile = load_water_profile_data(ROOT / "data" / "water_profiles" / "default.yml")
+    return recipe, load_fertilizers(), load_molar_masses(), profile["mg_per_l"], profile["osmosis_percent"]
+
+
+def _row(**ions):
+    row = np.zeros(len(LABELS))
+    for label, value in ions.items():
+        row[ION_INDEX.positions[label]] = value
+    return row
+
+
+def test_dilute_split_follows_the_acid_constants():
+    # at ~zero ionic strength the activity corrections vanish: pH = pKa gives a 1:1 split
+    pk2 = -log_k("H2PO4-/HPO4^2-")
+    pk_c = -log_k("CO2/HCO3-")
+    dilute = speciate(_row(**{"H2PO4-": 1e-6, "HCO3-": 1e-6}), LABELS, pk2)
+    ions = dilute.ions_mmol_per_l
+    assert ions[ION_INDEX.positions["HPO4^2-"]] / ions[ION_INDEX.positions["H2PO4-"]] == pytest.approx(1.0, rel=1e-3)
+    at_pk_c = speciate(_row(**{"HCO3-": 1e-6}), LABELS, pk_c)
+    assert at_pk_c.co2_mmol_per_l == pytest.approx(at_pk_c.ions_mmol_per_l[ION_INDEX.positions["HCO3-"]], rel=1e-3)
+
+
+def test_batch_speciation_conserves_totals_and_is_self_consistent():
+    rng = np.random.default_rng(5)
+    ions = rng.uniform(0.0, 10.0, size=(40, len(LABELS)))
+    ph = rng.uniform(4.0, 8.0, size=40)
+    result = speciate(ions, LABELS, ph)
+
+    p_cols = [ION_INDEX.positions[label] for label in ("H2PO4-", "HPO4^2-", "PO4^3-")]
+    c_cols = [ION_INDEX.positions[label] for label in ("HCO3-", "CO3^2-")]
+    out = result.ions_mmol_per_l
+    np.testing.assert_allclose(out[:, p_cols].sum(axis=1) + result.h3po4_mmol_per_l, ions[:, p_cols].sum(axis=1))
+    np.testing.assert_allclose(out[:, c_cols].sum(axis=1) + result.co2_mmol_per_l, ions[:, c_cols].sum(axis=1))
+    other = [idx for idx in range(len(LABELS)) if idx not in p_cols + c_cols]
+    np.testing.assert_array_equal(out[:, other], ions[:, other])
+
+    # the ionic strength is that of the returned species, and the mass action holds with it
+    z2 = np.array([parse_ion_key(label)[1] ** 2 for label in LABELS], dtype=float)
+    np.testing.assert_allclose(result.ionic_strength_mol_per_kg, 0.5 * out @ z2 / 1000.0, rtol=1e-9)
+    log_g1 = davies_log_gamma(result.ionic_strength_mol_per_kg)
+    ratio = out[:, p_cols[1]] / out[:, p_cols[0]]
+    np.testing.assert_allclose(np.log10(ratio), log_k("H2PO4-/HPO4^2-") + ph + log_g1 - 4 * log_g1, rtol=1e-7)
+
+    # rows are independent: one row alone gives the same result
+    single = speciate(ions[7], LABELS, ph[7])
+    np.testing.assert_allclose(single.ions_mmol_per_l, out[7], rtol=1e-9)
+    with pytest.raises(ValueError):
+        speciate(ions, LABELS, 15.0)
+
+
+def test_auto_speciation_in_compute_solution(golden):
+    recipe, ferts, mm, water, osmosis = golden
+    nominal = compute_solution(recipe, ferts, mm, water, osmosis)
+    assert "speciation" not in nominal.to_dict()
+
+    results = {
+        ph: compute_solution(dict(recipe, phosphate_species="auto", ph=ph), ferts, mm, water, osmosis)
+        for ph in (5.0, 6.5)
+    }
+    p_total = nominal.ions_mmol_l["H2PO4-"]
+    for ph, result in results.items():
+        data = result.to_dict()
+        species = sum(result.ions_mmol_l.get(label, 0.0) for label in ("H2PO4-", "HPO4^2-", "PO4^3-"))
+        assert species + data["speciation"]["neutral_mmol_per_l"]["H3PO4"] == pytest.approx(p_total)
+        assert data["speciation"]["ph"] == ph
+        # the species feed the EC and the ion balance
+        assert data["ec"] == compute_ec(result.ions_mmol_l.to_dict())
+        assert result.ions_meq_l["HPO4^2-"] == pytest.approx(-2 * result.ions_mmol_l["HPO4^2-"])
+        assert result.water_ions_mmol_l["HCO3-"] < nominal.water_ions_mmol_l["HCO3-"]
+    assert results[6.5].ions_mmol_l["HPO4^2-"] > results[5.0].ions_mmol_l["HPO4^2-"]
+    assert results[6.5].ions_mmol_l["HCO3-"] > results[5.0].ions_mmol_l["HCO3-"]
+    # elements are not touched
+    assert results[5.0].elements_mg_l.to_dict() == nominal.elements_mg_l.to_dict()
+
+    with pytest.raises(ValueError, match="ph"):
+        compute_solution(dict(recipe, phosphate_species="auto"), ferts, mm, water, osmosis)
+
+
+def test_solver_with_auto_speciation():
+    recipe = dict(_load_solver_recipe(ROOT / "recipes" / "solve_golden.yml"), phosphate_species="auto", ph=5.8)
+    plain = solve_recipe_data(dict(recipe, phosphate_species="H2PO4"))
+    result = solve_recipe_data(recipe)
+    # speciation changes ions, not elements: the same grams
+    assert result.fertilizers == plain.fertilizers
+    capped = solve_recipe_data(dict(recipe, ec_max_mS_per_cm=1.5))
+    assert capped.ec["mS_per_cm"] == pytest.approx(1.5, abs=1e-8)
+
+
+def test_calculate_endpoint_speciation():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {
+        "fertilizers": [{"name": "K+S soluMKP PK 51,5-34", "grams": 2.0}],
+        "water_mg_l": {"Ca": 40, "HCO3": 120},
+        "phosphate_species": "auto",
+        "ph": 6.0,
+    }
+    response = client.post("/calculate", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["speciation"]["ph"] == 6.0
+    assert data["ions_mmol_per_l"]["HPO4^2-"] > 0
+    assert client.post("/calculate", json=dict(payload, ph=None)).status_code == 400
@@ -0,0 +1,139 @@
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.data_io import load_fertilizers, load_molar_masses, load_solubility
+from horticalc.stock import plan_recipe_file, plan_stock_tanks
+
+CALCINIT = "Yara Tera CALCINIT"
+KNO3 = "Yara Tera KRISTA K PLUS"
+MKP = "HAIFA monokaliumphosphat MKP"
+EPSO = "K+S EPSO Top Bittersalz 16-39"
+FE = "Biolchim Eisenchelat Fe EDTA 13%"
+SOP = "Yara Tera KRISTA SOP"
+ACID = "Salpetersäure 38%"
+
+
+@pytest.fixture(scope="module")
+def data():
+    return load_fertilizers(), load_molar_masses()
+
+
+def _recipe(**stock):
+    return {
+        "liters": 1000,
+        "fertilizers": [
+            {"name": name, "grams": grams}
+            for name, grams in ((CALCINIT, 900), (KNO3, 400), (MKP, 150), (EPSO, 450), (FE, 15), (SOP, 100))
+        ],
+        "ph": 5.8,
+        "acid": {"name": ACID, "ml": 30},
+        "stock": stock,
+    }
+
+
+def _members(plan):
+    return {tank.name: {entry["name"] for entry in tank.fertilizers} for tank in plan.tanks}
+
+
+def test_classic_split_separates_calcium_from_sulfate_and_phosphate(data):
+    plan = plan_stock_tanks(_recipe(ratio=100, tank_liters=50), *data, water_mg_l={})
+    members = _members(plan)
+    assert set(members) == {"A", "B", "C"}
+    calcium = next(name for name, ferts in members.items() if CALCINIT in ferts)
+    assert not members[calcium] & {MKP, EPSO, SOP}
+    assert members["C"] == {ACID} and plan.tanks[2].acid
+    assert all(tank.precipitation["ok"] for tank in plan.tanks)
+    assert plan.warnings == [] and plan.search["optimal"] is True
+
+    # grams per tank filling: recipe amount x ratio x tank volume / recipe liters
+    by_name = {entry["name"]: entry for tank in plan.tanks for entry in tank.fertilizers}
+    assert by_name[CALCINIT]["grams"] == pytest.approx(900 * 100 * 50 / 1000)
+    assert by_name[ACID]["ml"] == pytest.approx(30 * 100 * 50 / 1000)
+    largest = max(tank.load for tank in plan.tanks)
+    assert plan.max_ratio == pytest.approx(100 / largest)
+    assert plan.working_liters == 5000
+    data_out = plan.to_dict()
+    assert [tank["name"] for tank in data_out["tanks"]] == ["A", "B", "C"]
+
+
+def test_search_matches_exhaustive_assignment(data):
+    ratio = 150
+    best = min(
+        max(tank.load for tank in plan.tanks[:2])
+        for plan in _all_fixed_plans(data, ratio)
+    )
+    plan = plan_stock_tanks(_recipe(ratio=ratio), *data, water_mg_l={})
+    assert plan.search["balanced_load"] == pytest.approx(best)
+    assert plan.search["pruned_bound"] + plan.search["pruned_infeasible"] > 0
+
+
+def _all_fixed_plans(data, ratio):
+    names = [CALCINIT, KNO3, MKP, EPSO, FE, SOP]
+    for tanks in itertools.product("AB", repeat=len(names)):
+        try:
+            yield plan_stock_tanks(
+                _recipe(ratio=ratio, fixed=dict(zip(names, tanks))), *data, water_mg_l={}
+            )
+        except ValueError:
+            continue
+
+
+def test_fixed_placement_and_infeasible_plans(data):
+    plan = plan_stock_tanks(_recipe(fixed={MKP: "A"}), *data, water_mg_l={})
+    assert MKP in _members(plan)["A"] and CALCINIT not in _members(plan)["A"]
+
+    with pytest.raises(ValueError, match="Tank A"):
+        plan_stock_tanks(_recipe(fixed={MKP: "A", CALCINIT: "A"}), *data, water_mg_l={})
+    with pytest.raises(ValueError, match="Keine zulässige Aufteilung"):
+        plan_stock_tanks(_recipe(tanks=1), *data, water_mg_l={})
+    with pytest.raises(ValueError, match="Tank"):
+        plan_stock_tanks(_recipe(fixed={MKP: "Z"}), *data, water_mg_l={})
+    with pytest.raises(KeyError):
+        plan_stock_tanks(_recipe(fixed={"Superphosphat": "A"}), *data, water_mg_l={})
+    with pytest.raises(ValueError, match="ph"):
+        plan_stock_tanks(dict(_recipe(), ph=None), *data, water_mg_l={})
+
+
+def test_solubility_limits_the_ratio(data):
+    table, default = load_solubility()
+    assert table[CALCINIT] > table[SOP] and default > 0
+
+    plan = plan_stock_tanks(_recipe(ratio=100), *data, water_mg_l={})
+    assert all(tank.load <= 1.0 for tank in plan.tanks)
+    # SOP at ~111 g/L alone fills a tank at about 1:1100; with a tiny solubility it cannot fit
+    with pytest.raises(ValueError, match="Keine zulässige Aufteilung"):
+        plan_stock_tanks(_recipe(ratio=100, solubility_g_per_l={SOP: 5.0}), *data, water_mg_l={})
+    # without an acid tank the acid joins one of the A/B tanks
+    plan = plan_stock_tanks(_recipe(acid_tank=False), *data, water_mg_l={})
+    assert [tank.name for tank in plan.tanks] == ["A", "B"] and not any(tank.acid for tank in plan.tanks)
+
+
+def test_calcium_phosphate_products_are_warned_not_blocked():
+    plan = plan_recipe_file(ROOT / "recipes" / "golden.yml", {"tanks": 3, "ph": 5.8})
+    assert any(warning.startswith("Agrolution Special 313") for warning in plan.warnings)
+    agrolution = next(tank for tank in plan.tanks if any("313" in entry["name"] for entry in tank.fertilizers))
+    assert not any(entry["name"] == "K+S EPSO Top Bittersalz 16-39" for entry in agrolution.fertilizers)
+
+
+def test_stock_plan_endpoint():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = dict(_recipe(), water_mg_l={}, stock={"ratio": 100, "tank_liters": 50})
+    response = client.post("/stock/plan", json=payload)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["working_liters"] == 5000 and len(body["tanks"]) == 3
+    assert client.post("/stock/plan", json=dict(payload, stock={"tanks": 1})).status_code == 400
+    assert client.post("/stock/plan", json=dict(payload, stock={"ratio": 0})).status_code == 422
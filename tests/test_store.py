@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+sys.path.append(str(ROOT))
+
+from horticalc.data_io import DocumentStore, SqliteStore, StoreConflictError, YamlStore, copy_documents
+
+
+@pytest.fixture(params=["yaml", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "yaml":
+        return YamlStore(tmp_path)
+    return SqliteStore(tmp_path / "store.sqlite")
+
+
+def test_put_get_list(store):
+    store.put("recipes", "tomate", {"name": "Tomate Blüte", "tags": ["tomate", "bluete"], "liters": 10.0})
+    store.put("recipes", "gurke", {"name": "Gurke", "tags": ["gurke"], "liters": 20.0})
+    store.put("recipes", "salat", {"name": "Salat", "liters": 5.0})
+
+    assert store.get("recipes", "gurke")["liters"] == 20.0
+    total, infos = store.list("recipes")
+    assert total == 3
+    assert [info.key for info in infos] == ["gurke", "salat", "tomate"]
+    assert [info.key for info in store.list("recipes", tag="tomate")[1]] == ["tomate"]
+    assert [info.key for info in store.list("recipes", q="BLÜ")[1]] == ["tomate"]
+    assert store.list("recipes", limit=1, offset=1) == (3, [infos[1]])
+    assert store.list("water_profiles") == (0, [])
+
+    store.delete("recipes", "salat")
+    with pytest.raises(KeyError):
+        store.get("recipes", "salat")
+
+
+def test_stale_version_is_rejected(store):
+    info = store.put("water_profiles", "brunnen", {"name": "Brunnen", "mg_per_l": {"Ca": 40.0}})
+    store.put("water_profiles", "brunnen", {"name": "Brunnen", "mg_per_l": {"Ca": 45.0}}, expected_version=info.version)
+    with pytest.raises(StoreConflictError):
+        store.put("water_profiles", "brunnen", {"name": "Brunnen", "mg_per_l": {"Ca": 50.0}}, expected_version=info.version)
+    assert store.get("water_profiles", "brunnen")["mg_per_l"] == {"Ca": 45.0}
+
+
+def test_incomplete_backend_fails_on_construction():
+    class ReadOnlyStore(DocumentStore):
+        def get(self, kind, key):
+            return {}
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
+
+
+def test_copy_between_backends(tmp_path):
+    source = YamlStore(ROOT)
+    sqlite_store = SqliteStore(tmp_path / "store.sqlite")
+    counts = copy_documents(source, sqlite_store)
+    assert counts["recipes"] == source.list("recipes")[0]
+    assert sqlite_store.get("recipes", "golden") == source.get("recipes", "golden")
+
+    exported = YamlStore(tmp_path / "export")
+    assert copy_documents(sqlite_store, exported) == counts
+    assert exported.get("nutrient_solutions", "Knop_1861_Standard") == source.get("nutrient_solutions", "Knop_1861_Standard")
+
+
+def test_api_uses_configured_store(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import api.app as api_app
+
+    monkeypatch.setattr(api_app, "STORE", SqliteStore(tmp_path / "store.sqlite"))
+    client = TestClient(api_app.app)
+
+    saved = client.post("/recipes", json={"name": "Tomate A", "tags": ["tomate"], "liters": 12.0})
+    assert saved.json() == {"status": "ok", "filename": "Tomate_A.yml", "version": 1}
+    listed = client.get("/recipes", params={"tag": "tomate"})
+    assert listed.headers["X-Total-Count"] == "1"
+    assert listed.json()[0]["name"] == "Tomate A"
+    assert client.get("/recipes/Tomate_A.yml").json()["liters"] == 12.0
+
+    stale = client.post("/recipes", json={"name": "Tomate A"}, headers={"If-Match": "0"})
+    assert stale.status_code == 409
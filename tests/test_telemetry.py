@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from horticalc import telemetry
+from horticalc.core import run_recipe
+from horticalc.solver import solve_recipe
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture()
+def enabled_telemetry():
+    telemetry.reset()
+    telemetry.enable()
+    yield
+    telemetry.disable()
+    telemetry.reset()
+
+
+def test_disabled_stage_is_shared_noop() -> None:
+    telemetry.disable()
+    assert telemetry.stage("a") is telemetry.stage("b")
+    telemetry.inc("horticalc_solver_solves_total")
+    assert "horticalc_solver_solves_total" not in telemetry.render_prometheus()
+
+
+def test_stage_histograms_and_counters(enabled_telemetry) -> None:
+    run_recipe(ROOT / "recipes" / "golden.yml")
+    solve_recipe(ROOT / "recipes" / "solve_golden.yml")
+    text = telemetry.render_prometheus()
+
+    for stage in (
+        "core.water_normalization",
+        "core.state.total",
+        "core.state.water",
+        "core.state.fertilizer",
+        "ec.compute",
+        "metrics.format_npks",
+        "core.sluijsmann",
+        "io.yaml_load",
+        "solver.matrix",
+        "solver.nnls",
+        "solver.verify",
+    ):
+        assert f'horticalc_stage_seconds_count{{stage="{stage}"}}' in text
+    assert "# TYPE horticalc_stage_seconds histogram" in text
+    assert "horticalc_solver_solves_total 1" in text
+    assert "horticalc_solver_iterations_total" in text
+
+
+def test_stage_counts_errors(enabled_telemetry) -> None:
+    with pytest.raises(KeyError):
+        with telemetry.stage("unit"):
+            raise KeyError("boom")
+    text = telemetry.render_prometheus()
+    assert 'horticalc_errors_total{error="KeyError",stage="unit"} 1' in text
+    assert 'horticalc_stage_seconds_bucket{stage="unit",le="+Inf"} 1' in text
+
+    # one error through nested stages (and re-raised as another type) counts once
+    with pytest.raises(ValueError):
+        with telemetry.stage("outer"):
+            try:
+                with telemetry.stage("inner"):
+                    raise KeyError("boom")
+            except KeyError as exc:
+                raise ValueError("wrapped") from exc
+    errors = [line for line in telemetry.render_prometheus().splitlines() if line.startswith("horticalc_errors_total{")]
+    assert errors == [
+        'horticalc_errors_total{error="KeyError",stage="inner"} 1',
+        'horticalc_errors_total{error="KeyError",stage="unit"} 1',
+    ]
+
+
+def test_metrics_endpoint(enabled_telemetry) -> None:
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    sys.path.append(str(ROOT))
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {"liters": 10.0, "fertilizers": [{"name": "Yara Tera CALCINIT", "grams": 2}]}
+    assert client.post("/calculate", json=payload).status_code == 200
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'horticalc_request_seconds_count{endpoint="/calculate",status="200"} 1' in response.text
+    assert 'horticalc_stage_seconds_count{stage="api.serialize"}' in response.text
+    assert 'horticalc_request_bytes_count{endpoint="/calculate"} 1' in response.text
+
+    # path parameters and unknown paths do not create new series
+    client.get("/water-profiles/gibtsnicht-1")
+    client.get("/water-profiles/gibtsnicht-2")
+    client.get("/gibtsnicht")
+    text = client.get("/metrics").text
+    assert 'horticalc_request_seconds_count{endpoint="/water-profiles/{profile_name}",status="404"} 2' in text
+    assert 'endpoint="unmatched",status="404"' in text
+    assert "gibtsnicht" not in text
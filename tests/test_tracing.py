@@ -0,0 +1,72 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+
+from horticalc import tracing
+from horticalc.solver import solve_recipe
+
+
+@pytest.fixture()
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure(path, sample_rate=1.0)
+    yield path
+    tracing.configure(None)
+
+
+def _events(path: Path) -> list:
+    return tracing.read_events([path])
+
+
+def test_spans_are_nested_under_root(trace_file) -> None:
+    with tracing.trace("cli.solve", recipe="solve_golden"):
+        solve_recipe(ROOT / "recipes" / "solve_golden.yml")
+
+    events = _events(trace_file)
+    by_name = {event["name"]: event for event in events}
+    root = by_name["cli.solve"]
+    assert root["ph"] == "X"
+    assert root["args"]["recipe"] == "solve_golden"
+    assert {"solver.matrix", "solver.nnls", "solver.verify", "core.state.total", "ec.compute"} <= set(by_name)
+    assert by_name["solver.nnls"]["args"]["parent_id"] == root["args"]["span_id"]
+    assert by_name["solver.nnls"]["args"]["fertilizers"] == 5
+    assert {event["args"]["trace_id"] for event in events} == {root["args"]["trace_id"]}
+
+
+def test_sampling_and_disabled_tracing(trace_file, tmp_path) -> None:
+    tracing.configure(trace_file, sample_rate=0.0)
+    with tracing.trace("unsampled"):
+        with tracing.span("child"):
+            pass
+    assert trace_file.read_text(encoding="utf-8") == ""
+
+    tracing.configure(None)
+    assert tracing.span("outside") is tracing.trace("outside")
+
+
+def test_api_request_trace_and_chrome_export(trace_file, tmp_path) -> None:
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    sys.path.append(str(ROOT))
+    from fastapi.testclient import TestClient
+
+    from api.app import app
+
+    client = TestClient(app)
+    payload = {"liters": 10.0, "fertilizers": [{"name": "Yara Tera CALCINIT", "grams": 2}]}
+    assert client.post("/calculate", json=payload).status_code == 200
+
+    names = [event["name"] for event in _events(trace_file)]
+    assert "POST /calculate" in names
+    assert "core.water_normalization" in names
+    assert "api.serialize" in names
+
+    out = tmp_path / "trace.json"
+    count = tracing.export_chrome_trace([trace_file], out)
+    document = json.loads(out.read_text(encoding="utf-8"))
+    assert len(document["traceEvents"]) == count == len(names)